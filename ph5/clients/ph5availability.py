@@ -15,9 +15,9 @@ import time
 from uuid import uuid4
 from argparse import RawTextHelpFormatter
 
-from ph5.core import ph5api, ph5utils, timedoy, experiment
+from ph5.core import availability, ph5api, ph5utils, timedoy, experiment
 
-PROG_VERSION = '2023.047'
+PROG_VERSION = '2026.291'
 LOGGER = logging.getLogger(__name__)
 
 
@@ -31,6 +31,144 @@ class PH5AvailabilityError(Exception):
     pass
 
 
+class ArrayRows(object):
+    """
+    Array_t rows walked once and shared by the requests of process_all.
+    The Das_t windows, availability and extents looked up for a row are
+    kept so that a DAS matched by several station/location/channel
+    patterns is only queried once.
+    """
+
+    def __init__(self, ph5availability):
+        self.availability = ph5availability
+        self.rows = None
+        self.matches = {}
+        self.das_info = {}
+        self.time_das_t = {}
+        self.one_availability = {}
+        self.extents = {}
+
+    def read(self):
+        """
+        Walk Array_t in the order the get_* methods report
+        :rtype: list(tuple(dict, tuple(str, str, str), tuple(float, float)))
+        :returns: A list of (st, (station, location, channel),
+            (start_chan_epoch, end_chan_epoch)) for each row where the
+            channel epochs are the first deploy and the last pickup of
+            the row's das, channel, sample rate and station over the
+            deployments walked up to the row's one
+        """
+        rows = []
+        das_time = {}
+        array_names = sorted(self.availability.ph5.Array_t_names)
+        for array_name in array_names:
+            if self.availability.array is not None:
+                a_n = int(array_name.split('_')[2])
+                if self.availability.array != a_n:
+                    continue
+            arrayorder, arraybyid = \
+                self.availability.get_array_order_id(array_name)
+
+            for ph5_station in arrayorder:
+                station_list = arraybyid.get(ph5_station)
+
+                for deployment in station_list:
+                    deployed = station_list[deployment]
+                    keys = []
+                    for stat in deployed:
+                        key = (stat['das/serial_number_s'],
+                               stat['channel_number_i'],
+                               stat['sample_rate_i'],
+                               stat['seed_station_name_s'])
+                        window = (stat['deploy_time/epoch_l'],
+                                  stat['deploy_time/micro_seconds_i'],
+                                  stat['pickup_time/epoch_l'],
+                                  stat['pickup_time/micro_seconds_i'],
+                                  stat['id_s'])
+                        if key in das_time:
+                            first, last = das_time[key]
+                            das_time[key] = (min(first, window),
+                                             max(last, window))
+                        else:
+                            das_time[key] = (window, window)
+                        keys.append(key)
+                    for st, key in zip(deployed, keys):
+                        slc = self.availability.get_slc_info(
+                            st, '*', '*', '*')
+                        first, last = das_time[key]
+                        start_chan_epoch = \
+                            float(first[0]) + float(first[1]) / 1000000
+                        end_chan_epoch = \
+                            float(last[2]) + float(last[3]) / 1000000
+                        rows.append(
+                            (st, slc, (start_chan_epoch, end_chan_epoch)))
+        return rows
+
+    def match(self, station='*', location='*', channel='*'):
+        """
+        Rows of which station, location and channel match the patterns,
+        in walk order
+        """
+        if self.rows is None:
+            self.rows = self.read()
+        for row in self.rows:
+            k = (row[1], station, location, channel)
+            if k not in self.matches:
+                ph5_seed_station, ph5_loc, ph5_channel = row[1]
+                self.matches[k] = (
+                    ph5utils.does_pattern_exists([station],
+                                                 ph5_seed_station) and
+                    ph5utils.does_pattern_exists([channel], ph5_channel) and
+                    ph5utils.does_pattern_exists([location], ph5_loc))
+            if self.matches[k]:
+                yield row
+
+    def query_das_t(self, st):
+        """
+        Das_t windows over the deployment of an Array_t row at any
+        sample rate
+        """
+        ph5_das = st['das/serial_number_s']
+        if ph5_das not in self.das_info:
+            self.das_info[ph5_das] = {}
+        info_k = (st['channel_number_i'], st['deploy_time/epoch_l'],
+                  st['pickup_time/epoch_l'], st['sample_rate_i'])
+        if info_k not in self.das_info[ph5_das]:
+            self.das_info[ph5_das][info_k] = self.availability.query_das_t(
+                ph5_das,
+                st['channel_number_i'],
+                st['deploy_time/epoch_l'],
+                st['pickup_time/epoch_l'],
+                st['sample_rate_i'],
+                st['sample_rate_multiplier_i'])
+        return self.das_info[ph5_das][info_k]
+
+    def get_one_availability(self, das, sample_rate, chan,
+                             deploy_time, pickup_time, start, end):
+        k = (das, sample_rate, chan, deploy_time, pickup_time, start, end)
+        if k not in self.one_availability:
+            self.one_availability[k] = \
+                self.availability.get_one_availability(
+                    das, self.das_info, sample_rate, chan,
+                    deploy_time, pickup_time, start, end)
+        return self.one_availability[k]
+
+    def get_extent(self, das, chan, sample_rate, start, end):
+        k = (das, chan, sample_rate, start, end)
+        if k not in self.extents:
+            self.extents[k] = self.availability.get_extent(
+                das, chan, sample_rate, start, end)
+        return self.extents[k]
+
+    def get_time_das_t(self, das, start, end,
+                       component=None, sample_rate=None):
+        k = (das, start, end, component, sample_rate)
+        if k not in self.time_das_t:
+            self.time_das_t[k] = self.availability.get_time_das_t(
+                das, start, end, component, sample_rate)
+        return self.time_das_t[k]
+
+
 class PH5Availability(object):
     """
     Availability methods for Ph5 archive
@@ -278,22 +416,31 @@ class PH5Availability(object):
         :return: list of tuples (sample_rate, start, end)
         '''
         das_t_t = None
-        gaps = 0
         if chan is None:
             raise ValueError("Component required for get_availability")
         if sample_rate is None:
             raise ValueError("Sample rate required for get_availability")
 
+        summary = self.ph5.availability_summary(das)
+        if summary is not None:
+            entries = summary.entries(das, chan, sample_rate, start, end)
+            if not entries:
+                LOGGER.warning("No Das table found for " + das)
+                return None
+            return availability.merge(entries, deploy_time, pickup_time)
+
         info_k = (chan, start, end, sample_rate)
         if info_k in das_info[das].keys():
             das_t_t = das_info[das][info_k]
         else:
+            # Windows at any multiplier, the sample rate is matched below
             das_t_t = self.ph5.query_das_t(
                 das,
                 chan=chan,
                 start_epoch=start,
                 stop_epoch=end,
-                sample_rate=sample_rate)
+                sample_rate=sample_rate,
+                check_samplerate=False)
             if not das_t_t:
                 LOGGER.warning("No Das table found for " + das)
                 return None
@@ -303,7 +450,7 @@ class PH5Availability(object):
 
         if sample_rate > 0:
             Das_t = [das_t for das_t in Das_t if
-                     das_t['sample_rate_i'] /
+                     float(das_t['sample_rate_i']) /
                      das_t['sample_rate_multiplier_i'] == sample_rate]
         else:
             Das_t = [das_t for das_t in Das_t if
@@ -315,90 +462,52 @@ class PH5Availability(object):
             LOGGER.warning("No Das table found for " + das)
             return None
 
-        overlaps = 0
-        gaps = 0
-        prev_start = None
-        prev_end = None
-        prev_len = None
-        prev_sr = None
-        times = []
-        count = 0
-        for entry in new_das_t:
-            # set the values for this entry
-            cur_time = (float(entry['time/epoch_l']) +
-                        float(entry['time/micro_seconds_i']) /
-                        1000000)
-            if entry['sample_rate_i'] > 0:
-                cur_len = (float(entry['sample_count_i']) /
-                           float(entry['sample_rate_i']) /
-                           float(entry['sample_rate_multiplier_i']))
-                cur_sr = (float(entry['sample_rate_i']) /
-                          float(entry['sample_rate_multiplier_i']))
-            else:
-                cur_len = 0
-                cur_sr = 0
-            cur_end = cur_time + cur_len
-
-            if (prev_start is None and prev_end is None and
-                    prev_len is None and prev_sr is None):
-                prev_start = cur_time
-                prev_end = cur_end
-                prev_len = cur_len
-                prev_sr = cur_sr
-            else:
-                if cur_end < deploy_time:
-                    continue
-                if cur_time > pickup_time:
-                    break
-                if (cur_time == prev_start and
-                        cur_len == prev_len and
-                        cur_sr == prev_sr):
-                    # duplicate entry - skip
-                    continue
-                elif (cur_time > prev_end or
-                        cur_sr != prev_sr):
-                    if count == 0:
-                        # adjust start time of the first segment not smaller
-                        # than deploy_time
-                        prev_start = max(deploy_time, prev_start)
-                        count += 1
-                    if cur_time > prev_end:
-                        # there is a gap
-                        gaps = gaps + 1
-                    # add a new entry
-                    times.append((prev_sr,
-                                  prev_start,
-                                  prev_end))
-                    # reset previous
-                    prev_start = cur_time
-                    prev_end = cur_end
-                    prev_len = cur_len
-                    prev_sr = cur_sr
-                elif (cur_time == prev_end and
-                        cur_sr == prev_sr):
-                    # extend the end time since this was a continuous segment
-                    prev_end = cur_end
-                    prev_len += cur_len
-                    prev_sr = cur_sr
-                elif (cur_time < prev_end < cur_end):
-                    # there is an overlap => extend end time
-                    prev_len += cur_len - (prev_end - cur_time)
-                    prev_end = cur_end
-                    prev_sr = cur_sr
-                    overlaps += 1
-
-        # adjust end time of the last segment not greater than pickup_time
-        prev_end = min(pickup_time, prev_end)
-
-        # add the last continuous segment
-        times.append((prev_sr,
-                      prev_start,
-                      prev_end))
-
-        return times
+        return availability.merge(availability.das_t_entries(new_das_t),
+                                  deploy_time, pickup_time)
+
+    def query_das_t(self, das, chan, start_epoch, stop_epoch,
+                    sample_rate, sample_rate_multiplier):
+        '''
+        Das_t windows on chan between start_epoch and stop_epoch at any
+        sample rate. The segments in Availability_t stand in for the
+        windows when it is up to date for das.
+        :return: list of rows as dictionaries with at least sample_rate_i
+            and sample_rate_multiplier_i
+        '''
+        summary = self.ph5.availability_summary(das)
+        if summary is not None:
+            return summary.rows(das, chan, start_epoch, stop_epoch)
+
+        return self.ph5.query_das_t(
+            das,
+            chan=chan,
+            start_epoch=start_epoch,
+            stop_epoch=stop_epoch,
+            sample_rate=sample_rate,
+            sample_rate_multiplier=sample_rate_multiplier,
+            check_samplerate=False)
+
+    def get_extent(self, das, chan, sample_rate, start=None, end=None):
+        '''
+        ph5api get_extent() answered from Availability_t when it is up
+        to date for das
+        :return: earliest epoch and latest epoch
+        '''
+        summary = self.ph5.availability_summary(das)
+        if summary is None or not sample_rate > 0:
+            return self.ph5.get_extent(das, chan, sample_rate, start, end)
+        if start or end:
+            if not (start and end):
+                raise ValueError("if start or end, both are required")
+        earliest, latest = summary.extent(das, chan, sample_rate, start, end)
+        if earliest is None:
+            LOGGER.warning("No Das table found for " + das)
+
+        return earliest, latest
 
     def get_slc(self, station='*', location='*', channel='*',
-                starttime=None, endtime=None, include_sample_rate=False):
+                starttime=None, endtime=None, include_sample_rate=False,
+                rows=None):
         """
         Get a list of tuples [(sta, loc, cha),...] containing information
         on what streams are included in PH5.
@@ -415,53 +524,33 @@ class PH5Availability(object):
         :param starttime: Start of requested time window as epoch in seconds
         :type endtime: float
         :param endtime: End of requested time window as epoch in seconds
+        :type rows: ArrayRows
+        :param rows: Array_t rows shared with other requests, read when
+            not given
         :rtype: list(tuple(str, str, str, str))
         :returns: A list of tuples [(station, location, channel)...]
             containing information on what streams are included in PH5 archive.
         """
+        if rows is None:
+            rows = ArrayRows(self)
         slc = []
-
-        array_names = sorted(self.ph5.Array_t_names)
-        for array_name in array_names:
-            if self.array is not None:
-                a_n = int(array_name.split('_')[2])
-                if self.array != a_n:
+        for st, tup, window in rows.match(station, location, channel):
+            ph5_das = st['das/serial_number_s']
+            ph5_channum = st['channel_number_i']
+            ph5_sample_rate = self.get_sample_rate(st)
+            if tup not in slc:
+                ret = rows.get_time_das_t(
+                    ph5_das, starttime, endtime,
+                    ph5_channum, ph5_sample_rate)
+                if ret == -1:
                     continue
-            ret = self.get_array_order_id(array_name)
-
-            arrayorder, arraybyid = ret
-
-            for ph5_station in arrayorder:
-
-                station_list = arraybyid.get(ph5_station)
-
-                for deployment in station_list:
-                    station_len = len(station_list[deployment])
-                    for st_num in range(0, station_len):
-                        st = station_list[deployment][st_num]
-                        ret = self.get_slc_info(st, station, location, channel)
-                        if ret == -1:
-                            continue
-                        ph5_seed_station, ph5_loc, ph5_channel = ret
-
-                        ph5_das = st['das/serial_number_s']
-                        ph5_channum = st['channel_number_i']
-                        ph5_sample_rate = self.get_sample_rate(st)
-                        tup = (ph5_seed_station,
-                               ph5_loc, ph5_channel)
-                        if tup not in slc:
-                            ret = self.get_time_das_t(
-                                ph5_das, starttime, endtime,
-                                ph5_channum, ph5_sample_rate)
-                            if ret == -1:
-                                continue
-                            slc.append(tup)
+                slc.append(tup)
 
         return slc
 
     def get_availability_extent(self, station='*', location='*',
                                 channel='*', starttime=None, endtime=None,
-                                include_sample_rate=False):
+                                include_sample_rate=False, rows=None):
         """
         Get a list of tuples [(station, location, channel,
         early, end)] containing data extent info for time series
@@ -479,6 +568,9 @@ class PH5Availability(object):
         :param starttime: Start of requested time window as epoch in seconds
         :type endtime: float
         :param endtime: End of requested time window as epoch in seconds
+        :type rows: ArrayRows
+        :param rows: Array_t rows shared with other requests, read when
+            not given
         :rtype: list(tuple(str, str, str, str, float, float))
         :returns: A list of tuples [(station, location, channel,
             early, end)...] containing data extent info for time series
@@ -487,205 +579,102 @@ class PH5Availability(object):
         Leverage this
         """
         availability_extents = []
-        self.das_time = {}
         sr_mismatch = False
         empty_times = True
         or_start_switch = False
         or_stop_switch = False
+        das = psr = early = end = None
         self.SR_included = include_sample_rate
         if starttime or endtime:
             if not (starttime and endtime):
                 raise ValueError("if start or end, both are required")
-
-        array_names = sorted(self.ph5.Array_t_names)
-
-        for array_name in array_names:
-            if self.array is not None:
-                a_n = int(array_name.split('_')[2])
-                if self.array != a_n:
-                    continue
-            ret = self.get_array_order_id(array_name)
-
-            arrayorder, arraybyid = ret
-
-            for ph5_station in arrayorder:
-
-                station_list = arraybyid.get(ph5_station)
-
-                for deployment in station_list:
-                    station_len = len(station_list[deployment])
-                    # Build a for loop to solve for the das time extent
-                    # The first loop is necessary to determine full time
-                    # extent
-                    for st_num in range(0, station_len):
-                        stat = station_list[deployment][st_num]
-                        ss = stat['seed_station_name_s']
-                        d = stat['das/serial_number_s']
-                        c = stat['channel_number_i']
-                        spr = stat['sample_rate_i']
-                        # Add an index into the key that is associated with the
-                        # DTation mkae them match up.
-                        key = (d, c, spr, ss)
-                        if key not in self.das_time.keys():
-                            self.das_time[key] = {'time_windows': []}
-                        self.das_time[key]['time_windows'].append(
-                            (stat['deploy_time/epoch_l'],
-                             stat['deploy_time/micro_seconds_i'],
-                             stat['pickup_time/epoch_l'],
-                             stat['pickup_time/micro_seconds_i'],
-                             stat['id_s']))
-                    for st_num in range(0, station_len):
-                        st = station_list[deployment][st_num]
-                        ret = self.get_slc_info(st, station, location, channel)
-                        if ret == -1:
-                            continue
-                        ph5_seed_station, ph5_loc, ph5_channel = ret
-                        ph5das = st['das/serial_number_s']
-                        chanum = st['channel_number_i']
-                        # Seem to be replacing a channel time with a
-                        # stationtime. Replace in DAS group
-                        ph5_start_epoch = st['deploy_time/epoch_l']
-                        ph5_start_ms = st['deploy_time/micro_seconds_i']
-                        ph5_stop_epoch = st['pickup_time/epoch_l']
-                        ph5_stop_ms = st['pickup_time/micro_seconds_i']
-                        ph5_sample_rate = st['sample_rate_i']
-                        ph5_multiplier = st['sample_rate_multiplier_i']
-                        samplerate_return = None
-                        Das_t = self.ph5.query_das_t(
-                            ph5das,
-                            chan=chanum,
-                            start_epoch=ph5_start_epoch,
-                            stop_epoch=ph5_stop_epoch,
-                            sample_rate=ph5_sample_rate,
-                            sample_rate_multiplier=ph5_multiplier,
-                            check_samplerate=False)
-
-                        # Find key that corresponds to the das and station
-                        # Try to match on the key
-                        for key in self.das_time.keys():
-                            if (key[0] == ph5das and
-                               key[1] == chanum and
-                               key[2] == ph5_sample_rate and
-                               key[3] == ph5_seed_station):
-                                dt = self.das_time[key]
-                                dt['time_windows'].sort()
-                                start_chan_s = float(dt['time_windows']
-                                                       [0][0])
-                                start_chan_ms = float(dt['time_windows']
-                                                        [0][1])/1000000
-                                start_chan_epoch = start_chan_s+start_chan_ms
-                                if start_chan_epoch < ph5_start_epoch:
-                                    or_start_switch = True
-                                    override_start = float(ph5_start_epoch) +\
-                                        float(ph5_start_ms)\
-                                        / 1000000
-                                # -1 is the last extent in the das tables
-                                end_chan_s = float(dt['time_windows']
-                                                     [-1][2])
-
-                                end_chan_ms = float(dt['time_windows']
-                                                      [-1][3])/1000000
-                                end_chan_epoch = end_chan_s+end_chan_ms
-                                if end_chan_epoch > ph5_stop_epoch:
-                                    or_stop_switch = True
-                                    override_stop = float(ph5_stop_epoch) +\
-                                        float(ph5_stop_ms)\
-                                        / 1000000
-                            for das in Das_t:
-                                if das['sample_rate_i'] == st['sample_rate_i']:
-                                    samplerate_return = das['sample_rate_i']
-                                    psr = das['sample_rate_i']
-                                    if(key[3] == ph5_seed_station):
-                                        extent = self.ph5.get_extent
-                                        early, end = extent(ph5das,
-                                                            chanum,
-                                                            psr,
-                                                            starttime,
-                                                            endtime
-                                                            )
-                                    else:
-                                        continue
-                                    empty_times = False
-                                else:
-                                    continue
-                            if empty_times is True:
-                                for i, das in enumerate(Das_t):
-                                    # Checks to see if all DAS
-                                    # tables have same SR
-                                    sr_prev = Das_t[i-1]['sample_rate_i']
-                                    if das['sample_rate_i'] != sr_prev:
-                                        sr_mismatch = True
-                                try:
-                                    if sr_mismatch is True:
-                                        LOGGER.error('DAS and Array Table' +
-                                                     ' sample rates do not' +
-                                                     ' match, DAS table' +
-                                                     ' sample rates do not' +
-                                                     ' match. Data must be'
-                                                     ' updated.')
-                                        continue
-                                    else:
-                                        # Uses SR if consistent
-                                        dsri = das['sample_rate_i']
-                                        samplerate_return = dsri
-                                        psr = das['sample_rate_i']
-                                        LOGGER.warning('Using sample rate' +
-                                                       ' from DAS Table ' +
-                                                       ph5das + '.')
-                                        if(key[3] == ph5_seed_station):
-                                            extent = self.ph5.get_extent
-                                            early, end = extent(ph5das,
-                                                                chanum,
-                                                                psr,
-                                                                starttime,
-                                                                endtime
-                                                                )
-                                        else:
-                                            continue
-                                except(UnboundLocalError):
-                                    continue
-                        if early is None or end is None:
-                            continue
-                        # trim user defined time range if it extends beyond the
-                        # deploy/pickup times
-                        # Logic to fix the deploy time error
-                        if starttime is not None and early < starttime:
-                            early = starttime
-                        if endtime is not None and endtime < end:
-                            end = endtime
-                        # Start channel trim
-                        if float(early) < float(start_chan_epoch):
-                            early = start_chan_epoch
-                        if or_start_switch is True:
-                            early = override_start
-                            or_start_switch = False
-                        if float(end) > float(end_chan_epoch):
-                            end = end_chan_epoch
-                            if or_stop_switch is True:
-                                end = override_stop
-                                or_stop_switch = False
-                        # End of channel trim
-                        if early is None or end is None:
-                            return None
-                        if not include_sample_rate:
-                            tup = (ph5_seed_station, ph5_loc, ph5_channel,
-                                   early, end)
-                        else:
-                            if samplerate_return is not None:
-                                tup = (ph5_seed_station, ph5_loc, ph5_channel,
-                                       early, end,
-                                       float(samplerate_return))
-                            else:
-                                tup = (ph5_seed_station, ph5_loc, ph5_channel,
-                                       early, end, float(psr)
-                                       )
-                        availability_extents.append(tup)
+        if rows is None:
+            rows = ArrayRows(self)
+
+        for st, slc, chan_epochs in rows.match(station, location, channel):
+            ph5_seed_station, ph5_loc, ph5_channel = slc
+            ph5das = st['das/serial_number_s']
+            chanum = st['channel_number_i']
+            # Seem to be replacing a channel time with a
+            # stationtime. Replace in DAS group
+            ph5_start_epoch = st['deploy_time/epoch_l']
+            ph5_start_ms = st['deploy_time/micro_seconds_i']
+            ph5_stop_epoch = st['pickup_time/epoch_l']
+            ph5_stop_ms = st['pickup_time/micro_seconds_i']
+            ph5_sample_rate = st['sample_rate_i']
+            samplerate_return = None
+            Das_t = rows.query_das_t(st)
+
+            start_chan_epoch, end_chan_epoch = chan_epochs
+            if start_chan_epoch < ph5_start_epoch:
+                or_start_switch = True
+                override_start = float(ph5_start_epoch) +\
+                    float(ph5_start_ms) / 1000000
+            if end_chan_epoch > ph5_stop_epoch:
+                or_stop_switch = True
+                override_stop = float(ph5_stop_epoch) +\
+                    float(ph5_stop_ms) / 1000000
+
+            if Das_t:
+                das = Das_t[-1]
+            if [d for d in Das_t if d['sample_rate_i'] == ph5_sample_rate]:
+                samplerate_return = psr = ph5_sample_rate
+                early, end = rows.get_extent(ph5das, chanum, psr,
+                                             starttime, endtime)
+                empty_times = False
+            elif empty_times is True:
+                # Checks to see if all DAS tables have same SR
+                if len(set(d['sample_rate_i'] for d in Das_t)) > 1:
+                    sr_mismatch = True
+                if sr_mismatch is True:
+                    LOGGER.error('DAS and Array Table sample rates do not'
+                                 ' match, DAS table sample rates do not'
+                                 ' match. Data must be updated.')
+                elif das is not None:
+                    # Uses SR if consistent
+                    samplerate_return = psr = das['sample_rate_i']
+                    LOGGER.warning('Using sample rate from DAS Table ' +
+                                   ph5das + '.')
+                    early, end = rows.get_extent(ph5das, chanum, psr,
+                                                 starttime, endtime)
+            if early is None or end is None:
+                continue
+            # trim user defined time range if it extends beyond the
+            # deploy/pickup times
+            # Logic to fix the deploy time error
+            if starttime is not None and early < starttime:
+                early = starttime
+            if endtime is not None and endtime < end:
+                end = endtime
+            # Start channel trim
+            if float(early) < float(start_chan_epoch):
+                early = start_chan_epoch
+            if or_start_switch is True:
+                early = override_start
+                or_start_switch = False
+            if float(end) > float(end_chan_epoch):
+                end = end_chan_epoch
+                if or_stop_switch is True:
+                    end = override_stop
+                    or_stop_switch = False
+            # End of channel trim
+            if not include_sample_rate:
+                tup = (ph5_seed_station, ph5_loc, ph5_channel,
+                       early, end)
+            else:
+                if samplerate_return is not None:
+                    tup = (ph5_seed_station, ph5_loc, ph5_channel,
+                           early, end, float(samplerate_return))
+                else:
+                    tup = (ph5_seed_station, ph5_loc, ph5_channel,
+                           early, end, float(psr))
+            availability_extents.append(tup)
 
         return availability_extents
 
     def get_availability(self, station='*', location='*',
                          channel='*', starttime=None, endtime=None,
-                         include_sample_rate=False):
+                         include_sample_rate=False, rows=None):
         """
         Get a list of tuples [(station, location, channel,
         starttime, endtime),...] containing data availability info for
@@ -710,6 +699,9 @@ class PH5Availability(object):
         :param include_sample_rate: If ``include_sample_rate=True``, then
             a tuple containing the sample rate [(sta, loc, cha,
             start, end, sample_rate),...] is returned.
+        :type rows: ArrayRows
+        :param rows: Array_t rows shared with other requests, read when
+            not given
         :rtype: list(tuple(str, str, str, str, str, str))
         :returns: A list of tuples [(station, location, channel,
             earliest, latest)...] representing contiguous time spans for
@@ -723,226 +715,125 @@ class PH5Availability(object):
         or_start_switch = False
         or_stop_switch = False
         empty_times = True
-        self.das_time = {}
+        das = samplerate_return = ph5_sr = None
         self.SR_included = include_sample_rate
-        array_names = sorted(self.ph5.Array_t_names)
-        das_info = {}
-        for array_name in array_names:
-            if self.array is not None:
-                a_n = int(array_name.split('_')[2])
-                if self.array != a_n:
-                    continue
-            ret = self.get_array_order_id(array_name)
-
-            arrayorder, arraybyid = ret
-
-            for ph5_station in arrayorder:
-
-                station_list = arraybyid.get(ph5_station)
-
-                for deployment in station_list:
-                    station_len = len(station_list[deployment])
-                    # Build a for loop to solve for the das time extent
-                    # The first loop is necessary to determine full time
-                    # extent
-                    for st_num in range(0, station_len):
-                        stat = station_list[deployment][st_num]
-                        ss = stat['seed_station_name_s']
-                        d = stat['das/serial_number_s']
-                        c = stat['channel_number_i']
-                        spr = stat['sample_rate_i']
-                        key = (d, c, spr, ss)
-                        if key not in self.das_time.keys():
-                            self.das_time[key] = {'time_windows': []}
-                        self.das_time[key]['time_windows'].append(
-                            (stat['deploy_time/epoch_l'],
-                             stat['deploy_time/micro_seconds_i'],
-                             stat['pickup_time/epoch_l'],
-                             stat['pickup_time/micro_seconds_i'],
-                             stat['id_s']))
-                    for st_num in range(0, station_len):
-                        st = station_list[deployment][st_num]
-                        ret = self.get_slc_info(st, station, location, channel)
-                        if ret == -1:
-                            continue
-                        ph5_seed_station, ph5_loc, ph5_channel = ret
-                        ph5_das = st['das/serial_number_s']
-                        channum = st['channel_number_i']
-                        ph5_start_epoch = st['deploy_time/epoch_l']
-                        ph5_start_ms = st['deploy_time/micro_seconds_i']
-                        ph5_stop_epoch = st['pickup_time/epoch_l']
-                        ph5_stop_ms = st['pickup_time/micro_seconds_i']
-                        ph5_sample_rate = st['sample_rate_i']
-                        ph5_multiplier = st['sample_rate_multiplier_i']
-                        deploy_time = (
-                            ph5_start_epoch + ph5_start_ms / 10. ** 6.)
-                        pickup_time = (
-                            ph5_stop_epoch + ph5_stop_ms / 10. ** 6.)
-                        if ph5_das not in das_info.keys():
-                            das_info[ph5_das] = {}
-                        info_k = (channum,  ph5_start_epoch,
-                                  ph5_stop_epoch, ph5_sample_rate)
-                        if info_k in das_info[ph5_das].keys():
-                            Das_t = das_info[ph5_das][info_k]
-                        else:
-                            Das_t = self.ph5.query_das_t(
-                                ph5_das,
-                                chan=channum,
-                                start_epoch=ph5_start_epoch,
-                                stop_epoch=ph5_stop_epoch,
-                                sample_rate=ph5_sample_rate,
-                                sample_rate_multiplier=ph5_multiplier,
-                                check_samplerate=False)
-                            das_info[ph5_das][info_k] = Das_t
-
-                        # Find key that corresponds to the das
-                        for key in self.das_time.keys():
-                            if (key[0] == ph5_das and
-                               key[1] == channum and
-                               key[2] == ph5_sample_rate and
-                               key[3] == ph5_seed_station):
-                                dt = self.das_time[key]
-                                dt['time_windows'].sort()
-                                start_chan_s = float(dt['time_windows']
-                                                       [0][0])
-                                start_chan_ms = float(dt['time_windows']
-                                                        [0][1])/1000000
-                                start_chan_epoch = start_chan_s+start_chan_ms
-                                if start_chan_epoch < ph5_start_epoch:
-                                    or_start_switch = True
-                                    override_start = float(ph5_start_epoch) +\
-                                        float(ph5_start_ms)\
-                                        / 1000000
-                                # -1 is the last extent in the das tables
-                                end_chan_s = float(dt['time_windows']
-                                                     [-1][2])
-
-                                end_chan_ms = float(dt['time_windows']
-                                                      [-1][3])/1000000
-                                end_chan_epoch = end_chan_s+end_chan_ms
-                                if end_chan_epoch > ph5_stop_epoch:
-                                    or_stop_switch = True
-                                    override_stop = float(ph5_stop_epoch) +\
-                                        float(ph5_stop_ms)\
-                                        / 1000000
-                                # Add switch to override time stamp
-                                # End Chan Micro Seconds aadded in HERE
-
-                            for das in Das_t:
-                                # Does Array.sr == DAS.sr? If so use sr
-                                if das['sample_rate_i'] == st['sample_rate_i']:
-                                    samplerate_return = das['sample_rate_i']
-                                    ph5_sr = das['sample_rate_i']
-                                    if(key[3] == ph5_seed_station):
-                                        avail = self.get_one_availability
-                                        time = avail(ph5_das,
-                                                     das_info,
+        if rows is None:
+            rows = ArrayRows(self)
+        for st, slc, chan_epochs in rows.match(station, location, channel):
+            ph5_seed_station, ph5_loc, ph5_channel = slc
+            ph5_das = st['das/serial_number_s']
+            channum = st['channel_number_i']
+            ph5_start_epoch = st['deploy_time/epoch_l']
+            ph5_start_ms = st['deploy_time/micro_seconds_i']
+            ph5_stop_epoch = st['pickup_time/epoch_l']
+            ph5_stop_ms = st['pickup_time/micro_seconds_i']
+            ph5_sample_rate = st['sample_rate_i']
+            deploy_time = (
+                ph5_start_epoch + ph5_start_ms / 10. ** 6.)
+            pickup_time = (
+                ph5_stop_epoch + ph5_stop_ms / 10. ** 6.)
+            Das_t = rows.query_das_t(st)
+
+            start_chan_epoch, end_chan_epoch = chan_epochs
+            if start_chan_epoch < ph5_start_epoch:
+                or_start_switch = True
+                override_start = float(ph5_start_epoch) +\
+                    float(ph5_start_ms) / 1000000
+            # Add switch to override time stamp
+            if end_chan_epoch > ph5_stop_epoch:
+                or_stop_switch = True
+                override_stop = float(ph5_stop_epoch) +\
+                    float(ph5_stop_ms) / 1000000
+
+            if Das_t:
+                das = Das_t[-1]
+            # Does Array.sr == DAS.sr? If so use sr
+            if [d for d in Das_t if d['sample_rate_i'] == ph5_sample_rate]:
+                samplerate_return = ph5_sr = ph5_sample_rate
+                time = rows.get_one_availability(ph5_das,
+                                                 ph5_sr,
+                                                 channum,
+                                                 deploy_time,
+                                                 pickup_time,
+                                                 starttime,
+                                                 endtime)
+                empty_times = False
+            elif empty_times is True:
+                # IF DAS.SR != Array.SR, USe DAS.SR if
+                # match checks to see if all DAS
+                # tables have same SR
+                if len(set(d['sample_rate_i'] for d in Das_t)) > 1:
+                    sr_mismatch = True
+                if sr_mismatch is True:
+                    # Else throw warning and fail
+                    LOGGER.error('DAS and Array Table sample rates do not'
+                                 ' match, DAS table sample rates do not'
+                                 ' match. Data must be updated.')
+                elif das is not None:
+                    # Uses SR if consistent
+                    samplerate_return = ph5_sr = das['sample_rate_i']
+                    LOGGER.warning('Using sample rate from DAS Table ' +
+                                   ph5_das + '.')
+                    time = rows.get_one_availability(ph5_das,
                                                      ph5_sr,
                                                      channum,
                                                      deploy_time,
                                                      pickup_time,
                                                      starttime,
                                                      endtime)
-
-                                    else:
-                                        continue
-                                    empty_times = False
-                                else:
-                                    continue
-                            if empty_times is True:
-                                for i, das in enumerate(Das_t):
-                                    # IF DAS.SR != Array.SR, USe DAS.SR if
-                                    # match checks to see if all DAS
-                                    # tables have same SR
-                                    sr_prev = Das_t[i-1]['sample_rate_i']
-                                    if das['sample_rate_i'] != sr_prev:
-                                        sr_mismatch = True
-                                try:
-                                    if sr_mismatch is True:
-                                        # Else throw warning and fail
-                                        LOGGER.error('DAS and Array Table' +
-                                                     ' sample rates do not' +
-                                                     ' match, DAS table' +
-                                                     ' sample rates do not' +
-                                                     ' match. Data must be'
-                                                     ' updated.')
-                                        continue
-                                    else:
-                                        # Uses SR if consistent
-                                        dassampr = das['sample_rate_i']
-                                        samplerate_return = dassampr
-                                        ph5_sr = das['sample_rate_i']
-                                        LOGGER.warning('Using sample rate' +
-                                                       ' from DAS Table ' +
-                                                       ph5_das + '.')
-                                        if(key[3] == ph5_seed_station):
-                                            # Station matcher
-                                            avail = self.get_one_availability
-                                            time = avail(ph5_das,
-                                                         das_info,
-                                                         ph5_sr,
-                                                         channum,
-                                                         deploy_time,
-                                                         pickup_time,
-                                                         starttime,
-                                                         endtime)
-                                        else:
-                                            continue
-                                except(UnboundLocalError):
-                                    continue
-                        if time is None:
+            if time is None:
+                continue
+            for T in time:
+                start = T[1] if T[1] > starttime \
+                    or starttime is None else starttime
+                end = T[2] if T[2] < endtime \
+                    or endtime is None else endtime
+                if float(start) < start_chan_epoch:
+                    start = start_chan_epoch
+                if or_start_switch is True:
+                    start = override_start
+                    or_start_switch = False
+                if float(end) > end_chan_epoch:
+                    end = end_chan_epoch
+                    if or_stop_switch is True:
+                        end = override_stop
+                        or_stop_switch = False
+                if T[1] is None or T[2] is None:
+                    return None
+                if include_sample_rate:
+                    if samplerate_return is not None:
+                        if(start > end):
+                            continue
+                        else:
+                            availability.append((
+                                ph5_seed_station, ph5_loc,
+                                ph5_channel,
+                                start, end,
+                                float(samplerate_return)))
+                    elif(T[0] is None):
+                        if(start > end):
+                            continue
+                        else:
+                            availability.append((
+                                ph5_seed_station, ph5_loc,
+                                ph5_channel,
+                                start, end, float(ph5_sr)))
+                    else:
+                        if(start > end):
                             continue
-                        for T in time:
-                            start = T[1] if T[1] > starttime \
-                                or starttime is None else starttime
-                            end = T[2] if T[2] < endtime \
-                                or endtime is None else endtime
-                            if float(start) < start_chan_epoch:
-                                start = start_chan_epoch
-                            if or_start_switch is True:
-                                start = override_start
-                                or_start_switch = False
-                            if float(end) > end_chan_epoch:
-                                end = end_chan_epoch
-                                if or_stop_switch is True:
-                                    end = override_stop
-                                    or_stop_switch = False
-                            if T[1] is None or T[2] is None:
-                                return None
-                            if include_sample_rate:
-                                if samplerate_return is not None:
-                                    if(start > end):
-                                        continue
-                                    else:
-                                        availability.append((
-                                            ph5_seed_station, ph5_loc,
-                                            ph5_channel,
-                                            start, end,
-                                            float(samplerate_return)))
-                                elif(T[0] is None):
-                                    if(start > end):
-                                        continue
-                                    else:
-                                        availability.append((
-                                            ph5_seed_station, ph5_loc,
-                                            ph5_channel,
-                                            start, end, float(ph5_sr)))
-                                else:
-                                    if(start > end):
-                                        continue
-                                    else:
-                                        availability.append((
-                                            ph5_seed_station, ph5_loc,
-                                            ph5_channel,
-                                            start, end, float(T[0])))
-                            else:
-                                if(start > end):
-                                    continue
-                                else:
-                                    availability.append((
-                                        ph5_seed_station, ph5_loc,
-                                        ph5_channel,
-                                        start, end))
+                        else:
+                            availability.append((
+                                ph5_seed_station, ph5_loc,
+                                ph5_channel,
+                                start, end, float(T[0])))
+                else:
+                    if(start > end):
+                        continue
+                    else:
+                        availability.append((
+                            ph5_seed_station, ph5_loc,
+                            ph5_channel,
+                            start, end))
         return availability
 
     def get_start(self, das_t):
@@ -1023,7 +914,7 @@ class PH5Availability(object):
     def get_availability_percentage(self, station,
                                     location, channel,
                                     starttime, endtime,
-                                    include_sample_rate=False):
+                                    include_sample_rate=False, rows=None):
         """
         Get percentage of available data.
         :type station: str
@@ -1036,6 +927,9 @@ class PH5Availability(object):
         :param starttime: Start of requested time window as epoch in seconds
         :type endtime: float
         :param endtime: End of requested time window as epoch in seconds
+        :type rows: ArrayRows
+        :param rows: Array_t rows shared with other requests, read when
+            not given
         :rtype: tuple(float, int)
         :returns: Tuple of percentage of available data (``0.0`` to ``1.0``)
             and number of gaps/overlaps.
@@ -1051,47 +945,27 @@ class PH5Availability(object):
         sampleNo = 0
         expected_sampleNo = 0
         gapOverlap = 0
-        array_names = sorted(self.ph5.Array_t_names)
-
-        for array_name in array_names:
-            if self.array is not None:
-                a_n = int(array_name.split('_')[2])
-                if self.array != a_n:
-                    continue
-            ret = self.get_array_order_id(array_name)
-
-            arrayorder, arraybyid = ret
-
-            for ph5_station in arrayorder:
-                station_list = arraybyid.get(ph5_station)
-
-                for deployment in station_list:
-                    station_len = len(station_list[deployment])
-                    for st_num in range(0, station_len):
-                        st = station_list[deployment][st_num]
-
-                        ret = self.get_slc_info(st, station, location, channel)
-                        if ret == -1:
-                            continue
-
-                        ph5_das = st['das/serial_number_s']
-                        ph5_sample_rate = self.get_sample_rate(st)
-                        ph5_channum = st['channel_number_i']
-
-                        ret = self.get_time_das_t(
-                            ph5_das, starttime, endtime,
-                            ph5_channum, ph5_sample_rate)
-                        if ret == -1:
-                            continue
-                        ph5_earliest, ph5_latest, das_t = ret
-
-                        ret = self.get_sampleNos_gapOverlap(
-                            das_t, ph5_earliest, ph5_latest,
-                            starttime, endtime, ph5_sample_rate, st)
-
-                        expected_sampleNo += ret[0]
-                        sampleNo += ret[1]
-                        gapOverlap += ret[2]
+        if rows is None:
+            rows = ArrayRows(self)
+        for st, slc, chan_epochs in rows.match(station, location, channel):
+            ph5_das = st['das/serial_number_s']
+            ph5_sample_rate = self.get_sample_rate(st)
+            ph5_channum = st['channel_number_i']
+
+            ret = rows.get_time_das_t(
+                ph5_das, starttime, endtime,
+                ph5_channum, ph5_sample_rate)
+            if ret == -1:
+                continue
+            ph5_earliest, ph5_latest, das_t = ret
+
+            ret = self.get_sampleNos_gapOverlap(
+                das_t, ph5_earliest, ph5_latest,
+                starttime, endtime, ph5_sample_rate, st)
+
+            expected_sampleNo += ret[0]
+            sampleNo += ret[1]
+            gapOverlap += ret[2]
         if sampleNo == 0:
             sampleResult = 0.0
             if self.array is not None:
@@ -1106,7 +980,7 @@ class PH5Availability(object):
 
     def has_data(self, station='*', location='*',
                  channel='*', starttime=None, endtime=None,
-                 include_sample_rate=False):
+                 include_sample_rate=False, rows=None):
         """
         Return whether there is data for a specified station,
         location, channel, starttime, and endtime combination.
@@ -1123,60 +997,42 @@ class PH5Availability(object):
         :param starttime: Start of requested time window as epoch in seconds
         :type endtime: float
         :param endtime: End of requested time window as epoch in seconds
+        :type rows: ArrayRows
+        :param rows: Array_t rows shared with other requests, read when
+            not given
         :rtype: bool
         :returns: Returns ``True`` if there is data in Ph5 for a given
             station, location, channel, starttime, endtime.
         """
-        array_names = sorted(self.ph5.Array_t_names)
-
-        for array_name in array_names:
-            if self.array is not None:
-                a_n = int(array_name.split('_')[2])
-                if self.array != a_n:
-                    continue
-            ret = self.get_array_order_id(array_name)
-
-            arrayorder, arraybyid = ret
-
-            for ph5_station in arrayorder:
-
-                station_list = arraybyid.get(ph5_station)
-
-                for deployment in station_list:
-                    station_len = len(station_list[deployment])
-                    for st_num in range(0, station_len):
-                        st = station_list[deployment][st_num]
-                        ret = self.get_slc_info(st, station, location, channel)
-                        if ret == -1:
-                            continue
-
-                        ph5_das = st['das/serial_number_s']
-                        ph5_channum = st['channel_number_i']
-
-                        if channel == "*":
-                            ret = self.get_time_das_t(
-                                ph5_das, starttime, endtime)
-                        else:
-                            ph5_sample_rate = self.get_sample_rate(st)
-                            ph5_sample_rate = self.get_sample_rate(st)
-                            ret = self.get_time_das_t(
-                                ph5_das, starttime, endtime,
-                                component=ph5_channum,
-                                sample_rate=ph5_sample_rate)
-                        if ret == -1:
-                            continue
-                        ph5_earliest, ph5_latest, das_t = ret
-
-                        for d in das_t:
-                            if d['sample_count_i'] > 0:
-                                return True
-                            elif d['sample_rate_i'] == 0:
-                                ref = self.ph5.ph5_g_receivers.\
-                                    find_trace_ref(
-                                        d['array_name_data_a'].strip())
-                                if ref.nrows > 0:
-                                    return True
-                        self.ph5.forget_das_t(ph5_das)
+        if rows is None:
+            rows = ArrayRows(self)
+        for st, slc, chan_epochs in rows.match(station, location, channel):
+            ph5_das = st['das/serial_number_s']
+            ph5_channum = st['channel_number_i']
+
+            if channel == "*":
+                ret = rows.get_time_das_t(
+                    ph5_das, starttime, endtime)
+            else:
+                ph5_sample_rate = self.get_sample_rate(st)
+                ret = rows.get_time_das_t(
+                    ph5_das, starttime, endtime,
+                    component=ph5_channum,
+                    sample_rate=ph5_sample_rate)
+            if ret == -1:
+                continue
+            ph5_earliest, ph5_latest, das_t = ret
+
+            for d in das_t:
+                if d['sample_count_i'] > 0:
+                    return True
+                elif d['sample_rate_i'] == 0:
+                    ref = self.ph5.ph5_g_receivers.\
+                        find_trace_ref(
+                            d['array_name_data_a'].strip())
+                    if ref.nrows > 0:
+                        return True
+            self.ph5.forget_das_t(ph5_das)
 
         return False
 
@@ -1404,12 +1260,14 @@ class PH5Availability(object):
                  4: self.get_availability_percentage}
         result = []
         has_data = False
+        # Array_t is walked once for all the requests
+        rows = ArrayRows(self)
         for st in self.stations:
             for ch in self.channels:
                 for loc in self.locations:
                     avail = AVAIL[self.avail](
                         st, loc, ch, self.starttime, self.endtime,
-                        self.SR_included)
+                        self.SR_included, rows=rows)
                     if isinstance(avail, bool):
                         if avail:
                             has_data = True
@@ -12,7 +12,7 @@ import logging
 from ph5 import LOGGING_FORMAT
 from ph5.core import ph5api, segyfactory, decimate, timedoy, external_file
 
-PROG_VERSION = "2022.144"
+PROG_VERSION = "2026.291"
 LOGGER = logging.getLogger(__name__)
 # This should never get used. See ph5api.
 CHAN_MAP = {1: 'Z', 2: 'N', 3: 'E', 4: 'Z', 5: 'N', 6: 'E'}
@@ -571,17 +571,14 @@ def gather(args, p5):
                                 \t{1}".format(
                                           outfilename, e.message))
                                 sys.exit()
-                        # Write reel headers and first trace
-                        logs = segyfactory.write_segy_hdr(
-                            trace, fh, sf, num_traces)
-                        # Write any messages
-                        for log in logs:
-                            LOGGER.info(log)
-                    else:
-                        # Write trace
-                        logs = segyfactory.write_segy(trace, fh, sf)
-                        for log in logs:
-                            LOGGER.info(log)
+                        # Reel headers go with the first trace
+                        segy = segyfactory.SegyGather(fh, sf, num_traces)
+                    # Write trace
+                    logs = segy.add(trace)
+                    for log in logs:
+                        LOGGER.info(log)
+        if fh:
+            segy.flush()
         # Traces found does not match traces expected
         if i != num_traces and fh:
             # Need to update reel_header
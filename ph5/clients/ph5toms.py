@@ -13,6 +13,9 @@ import copy
 import itertools
 import io
 import datetime
+import collections
+import multiprocessing
+import types
 from obspy.core.inventory.inventory import read_inventory as read_inventory
 from obspy import Trace
 from obspy import Stream
@@ -23,7 +26,7 @@ from ph5.core.ph5utils import PH5ResponseManager
 from ph5.core import ph5api
 from ph5.core.timedoy import epoch2passcal, passcal2epoch
 
-PROG_VERSION = '2019.93'
+PROG_VERSION = '2026.291'
 LOGGER = logging.getLogger(__name__)
 
 
@@ -146,7 +149,7 @@ class PH5toMSeed(object):
                  sample_rate_keep=None, doy_keep=[], stream=False,
                  reduction_velocity=-1., notimecorrect=False,
                  restricted=[], format='MSEED', cut_len=86400,
-                 log_epoch=False):
+                 log_epoch=False, workers=1, chunk_samples=None):
 
         self.chan_map = {1: 'Z', 2: 'N', 3: 'E', 4: 'Z', 5: 'N', 6: 'E'}
         self.reqtype = reqtype.upper()
@@ -176,6 +179,8 @@ class PH5toMSeed(object):
         self.cut_len = cut_len
         self.hash_list = []
         self.log_epoch = log_epoch
+        self.workers = workers
+        self.chunk_samples = chunk_samples
 
         self.resp_manager = PH5ResponseManager()
 
@@ -188,6 +193,11 @@ class PH5toMSeed(object):
         if self.reqtype == "SHOT" or self.reqtype == "RECEIVER":
             self.ph5.read_event_t_names()
 
+        if self.chunk_samples and self.decimation:
+            raise PH5toMSAPIError(
+                "Error - Decimation needs whole traces, it cannot be used "
+                "with chunks.")
+
         if not self.stream and not os.path.exists(self.out_dir):
             try:
                 os.mkdir(self.out_dir)
@@ -507,9 +517,37 @@ class PH5toMSeed(object):
                                                   datalogger_keys)
 
     def create_trace(self, station_to_cut, mp=False):
+        obspy_stream = Stream()
+        for obspy_trace in self.cut_traces(station_to_cut):
+            if obspy_trace is None:
+                return
+            obspy_stream.append(obspy_trace)
+        if len(obspy_stream.traces) < 1:
+            return
+
+        return obspy_stream
+
+    def create_trace_chunks(self, station_to_cut):
+        '''
+           create_trace() as a generator of Streams each holding one trace
+           of at most self.chunk_samples samples. Data is read from PH5 as
+           the chunks are reached so memory use does not grow with the
+           length of the cut.
+        '''
+        for obspy_trace in self.cut_traces(station_to_cut,
+                                           self.chunk_samples):
+            if obspy_trace is None:
+                return
+            yield Stream([obspy_trace])
+
+    def cut_traces(self, station_to_cut, chunk_samples=None):
+        '''
+           Obspy traces of the non-restricted segments of station_to_cut,
+           None when the cut is abandoned. With chunk_samples the traces
+           are cut in pieces of at most chunk_samples samples.
+        '''
         station_to_cut_segments = PH5toMSeed.get_nonrestricted_segments(
             [station_to_cut], self.restricted)
-        obspy_stream = Stream()
         sr_mismatch = False
         empty_times = True
         for stc in station_to_cut_segments:
@@ -520,10 +558,12 @@ class PH5toMSeed(object):
                                        stc.sample_rate_multiplier,
                                        check_samplerate=False)
             if not das:
+                yield None
                 return
             das = [x for x in das]
             Das_tf = next(iter(das or []), None)
             if Das_tf is None:
+                yield None
                 return
             else:
                 das_t_start = (float(Das_tf['time/epoch_l']) +
@@ -559,6 +599,7 @@ class PH5toMSeed(object):
                                      ' rates do not match, DAS table' +
                                      ' sample rates do not match.' +
                                      ' Data must be updated.')
+                        yield None
                         return
                     else:
                         # Uses DAS SR if consistent
@@ -574,7 +615,15 @@ class PH5toMSeed(object):
                             actual_sample_rate = 0
                 except(UnboundLocalError):
                     continue
-            if actual_sample_rate != 0:
+            if actual_sample_rate != 0 and chunk_samples:
+                traces = self.ph5.cut_chunks(stc.das, start_time,
+                                             stc.endtime,
+                                             chan=stc.component,
+                                             sample_rate=actual_sample_rate,
+                                             apply_time_correction=nt,
+                                             das_t=das,
+                                             chunk_samples=chunk_samples)
+            elif actual_sample_rate != 0:
                 traces = self.ph5.cut(stc.das, start_time,
                                       stc.endtime,
                                       chan=stc.component,
@@ -587,7 +636,8 @@ class PH5toMSeed(object):
                                                stc.endtime,
                                                chan=stc.component,
                                                das_t=das)
-            if not isinstance(traces, list):
+            if not isinstance(traces, (list, types.GeneratorType)):
+                yield None
                 return
 
             for trace in traces:
@@ -657,11 +707,7 @@ class PH5toMSeed(object):
                 obspy_trace.stats.starttime = trace.start_time.getFdsnTime()
                 if self.decimation:
                     obspy_trace.decimate(int(self.decimation))
-                obspy_stream.append(obspy_trace)
-        if len(obspy_stream.traces) < 1:
-            return
-
-        return obspy_stream
+                yield obspy_trace
 
     def get_channel_and_component(self, station_list, deployment, st_num):
         if 'seed_band_code_s' in station_list[deployment][st_num]:
@@ -1047,13 +1093,91 @@ class PH5toMSeed(object):
     def process_all(self):
         cuts = self.create_cut_list()
         if cuts:
+            if self.workers > 1:
+                streams = self.process_parallel(cuts)
+            else:
+                streams = self.process_serial(cuts)
+            for stream in streams:
+                yield stream
+        else:
+            raise PH5toMSAPIError("Request resulted in no data.")
+
+    def process_chunks(self):
+        '''
+           process_all() in pieces of at most self.chunk_samples samples.
+           Yields for each cut a generator of its Streams, in order.
+           Cuts are made one at a time in this process.
+        '''
+        cuts = self.create_cut_list()
+        if not cuts:
+            raise PH5toMSAPIError("Request resulted in no data.")
+        for cut in cuts:
+            self.ph5.clear()
+            chunks = self.create_trace_chunks(cut)
+            first = next(chunks, None)
+            if first is not None:
+                yield itertools.chain([first], chunks)
+
+    def process_serial(self, cuts):
+        for cut in cuts:
+            self.ph5.clear()
+            stream = self.create_trace(cut)
+            if stream is not None:
+                yield stream
+
+    def worker_state(self):
+        '''
+           Attributes a worker process needs to cut traces,
+           less the PH5 handle and caches that belong to this process
+        '''
+        state = dict(self.__dict__)
+        for k in ('ph5', 'resp_manager', 'hash_list'):
+            del state[k]
+        return state
+
+    def process_parallel(self, cuts):
+        '''
+           Cut traces in a pool of self.workers processes, each with its
+           own read only PH5 handle. Streams are yielded in the order of
+           cuts, with at most two cuts per worker in flight.
+        '''
+        pool = multiprocessing.Pool(
+            processes=self.workers, initializer=_init_worker,
+            initargs=(self.ph5.currentpath, self.ph5.nickname,
+                      self.worker_state()))
+        try:
+            pending = collections.deque()
             for cut in cuts:
-                self.ph5.clear()
-                stream = self.create_trace(cut)
+                pending.append(pool.apply_async(_cut_worker, (cut,)))
+                if len(pending) >= self.workers * 2:
+                    stream = pending.popleft().get()
+                    if stream is not None:
+                        yield stream
+            while pending:
+                stream = pending.popleft().get()
                 if stream is not None:
                     yield stream
-        else:
-            raise PH5toMSAPIError("Request resulted in no data.")
+        finally:
+            pool.terminate()
+            pool.join()
+
+
+# PH5toMSeed of a worker process in PH5toMSeed.process_parallel
+_WORKER = None
+
+
+def _init_worker(path, nickname, state):
+    global _WORKER
+    _WORKER = PH5toMSeed.__new__(PH5toMSeed)
+    _WORKER.__dict__.update(state)
+    _WORKER.ph5 = ph5api.PH5(path=path, nickname=nickname)
+    _WORKER.resp_manager = PH5ResponseManager()
+    _WORKER.hash_list = []
+
+
+def _cut_worker(cut):
+    _WORKER.ph5.clear()
+    return _WORKER.create_trace(cut)
 
 
 def get_args():
@@ -1198,11 +1322,87 @@ def get_args():
         help="Log the epoch of the miniseed files to the terminal"
     )
 
+    parser.add_argument(
+        "--workers", action="store", type=int, default=1,
+        metavar="workers",
+        help="Number of processes to cut traces with, default 1"
+    )
+
+    parser.add_argument(
+        "--chunk", action="store", type=int, default=None,
+        metavar="chunk",
+        help="Write each trace in pieces of at most this many samples, "
+             "reading them from PH5 as they are written, so memory use "
+             "does not grow with the length of the request. "
+             "Cuts are made in one process."
+    )
+
     the_args = parser.parse_args()
 
     return the_args
 
 
+def write_stream(ph5ms, stream, args):
+    if args.epoch:
+        fmt = "{:>32} {:>32}"
+        msg = fmt.format(stream.traces[0].stats['starttime'],
+                         stream.traces[0].stats['endtime'])
+        print(msg)
+
+    if args.format.upper() == "MSEED":
+        if not args.non_standard:
+            stream.write(ph5ms.filenamemseed_gen(stream),
+                         format='MSEED', reclen=4096)
+        else:
+            stream.write(ph5ms.filenamemseed_nongen(stream),
+                         format='MSEED', reclen=4096)
+    elif args.format.upper() == "SAC":
+        for trace in stream:
+            sac = SACTrace.from_obspy_trace(trace)
+            if not args.non_standard:
+                sac.write(ph5ms.filenamesac_gen(trace))
+            else:
+                sac.write(ph5ms.filenamesac_nongen(trace))
+
+
+def write_chunks(ph5ms, chunks, args):
+    '''
+       Write the Streams of one cut from PH5toMSeed.process_chunks as they
+       are cut. MiniSEED records of all chunks go to the one file named
+       after the first chunk, SAC writes a file per chunk.
+    '''
+    first = None
+    last = None
+    fh = None
+    try:
+        for stream in chunks:
+            if first is None:
+                first = stream
+            last = stream
+            if args.format.upper() == "MSEED":
+                if fh is None:
+                    if not args.non_standard:
+                        fh = open(ph5ms.filenamemseed_gen(stream), 'wb')
+                    else:
+                        fh = open(ph5ms.filenamemseed_nongen(stream), 'wb')
+                stream.write(fh, format='MSEED', reclen=4096)
+            elif args.format.upper() == "SAC":
+                for trace in stream:
+                    sac = SACTrace.from_obspy_trace(trace)
+                    if not args.non_standard:
+                        sac.write(ph5ms.filenamesac_gen(trace))
+                    else:
+                        sac.write(ph5ms.filenamesac_nongen(trace))
+    finally:
+        if fh is not None:
+            fh.close()
+    if args.epoch and first is not None:
+        fmt = "{:>32} {:>32}"
+        msg = fmt.format(first.traces[0].stats['starttime'],
+                         last.traces[-1].stats['endtime'])
+        print(msg)
+
+
 def main():
     args = get_args()
 
@@ -1265,33 +1465,20 @@ def main():
                            reduction_velocity=args.red_vel,
                            notimecorrect=args.notimecorrect,
                            format=args.format,
-                           log_epoch=args.epoch)
+                           log_epoch=args.epoch,
+                           workers=args.workers,
+                           chunk_samples=args.chunk)
 
         if args.epoch:
             epoch_header = "{:>32} {:>32}".format('Start time', 'End time')
             print(epoch_header)
 
-        for stream in ph5ms.process_all():
-            if args.epoch:
-                fmt = "{:>32} {:>32}"
-                msg = fmt.format(stream.traces[0].stats['starttime'],
-                                 stream.traces[0].stats['endtime'])
-                print(msg)
-
-            if args.format.upper() == "MSEED":
-                if not args.non_standard:
-                    stream.write(ph5ms.filenamemseed_gen(stream),
-                                 format='MSEED', reclen=4096)
-                else:
-                    stream.write(ph5ms.filenamemseed_nongen(stream),
-                                 format='MSEED', reclen=4096)
-            elif args.format.upper() == "SAC":
-                for trace in stream:
-                    sac = SACTrace.from_obspy_trace(trace)
-                    if not args.non_standard:
-                        sac.write(ph5ms.filenamesac_gen(trace))
-                    else:
-                        sac.write(ph5ms.filenamesac_nongen(trace))
+        if args.chunk:
+            for chunks in ph5ms.process_chunks():
+                write_chunks(ph5ms, chunks, args)
+        else:
+            for stream in ph5ms.process_all():
+                write_stream(ph5ms, stream, args)
 
     except PH5toMSAPIError as err:
         LOGGER.error("{0}".format(err.message))
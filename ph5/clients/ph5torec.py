@@ -12,7 +12,7 @@ import logging
 from ph5 import LOGGING_FORMAT
 from ph5.core import ph5api, segyfactory, decimate, timedoy, external_file
 
-PROG_VERSION = "2022.144"
+PROG_VERSION = "2026.291"
 LOGGER = logging.getLogger(__name__)
 # This should never get used. See ph5api.
 CHAN_MAP = {1: 'Z', 2: 'N', 3: 'E', 4: 'Z', 5: 'N', 6: 'E'}
@@ -482,26 +482,28 @@ def gather(args, p5):
                                 LOGGER.error("Failed to open {0}.\t{1}"
                                              .format(outfilename, e.message))
                                 sys.exit()
-                        # Write reel headers and first trace
-                        try:
-                            logs = segyfactory.write_segy_hdr(
-                                trace, fh, sf, num_traces)
-                            # Write any messages
-                            for log in logs:
-                                LOGGER.info(log)
-                        except segyfactory.SEGYError as e:
-                            LOGGER.error("Header write failure.")
-                            sys.exit()
-                    else:
-                        # Write trace
-                        try:
-                            logs = segyfactory.write_segy(trace, fh, sf)
-                            for log in logs:
-                                LOGGER.info(log)
+                        # Reel headers go with the first trace
+                        segy = segyfactory.SegyGather(fh, sf, num_traces)
+                    # Write trace
+                    first = segy.count == 0
+                    try:
+                        logs = segy.add(trace)
+                        for log in logs:
+                            LOGGER.info(log)
+                        if not first:
                             LOGGER.info('=-' * 40)
-                        except segyfactory.SEGYError as e:
+                    except segyfactory.SEGYError as e:
+                        if first:
+                            LOGGER.error("Header write failure.")
+                        else:
                             LOGGER.error("Trace write failure.")
-                            sys.exit()
+                        sys.exit()
+        if fh:
+            try:
+                segy.flush()
+            except segyfactory.SEGYError as e:
+                LOGGER.error("Trace write failure.")
+                sys.exit()
         # Traces found does not match traces expected
         if fh and i != num_traces:
             # Need to update reel_header
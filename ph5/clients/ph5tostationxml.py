@@ -6,7 +6,9 @@ import sys
 import io
 import os
 import argparse
+import collections
 import fnmatch
+import multiprocessing
 
 import logging
 import pickle
@@ -22,8 +24,10 @@ from ph5.core import ph5utils, ph5api
 from ph5.core.ph5utils import PH5ResponseManager
 from ph5.utilities import validation
 
-PROG_VERSION = '2021.47'
+PROG_VERSION = '2026.291'
 LOGGER = logging.getLogger(__name__)
+# Extension of the response cache sidecar of a master file
+RESPONSE_CACHE_EXT = '.responses'
 
 
 def get_args():
@@ -157,6 +161,17 @@ def get_args():
                         help='Output stationxml even if bug is '
                              'present in data.')
 
+    parser.add_argument("--workers", action="store", type=int, default=1,
+                        metavar="workers",
+                        help=("Number of processes to read experiments "
+                              "with, default 1"))
+
+    parser.add_argument("--response_cache", action='store_true',
+                        default=False,
+                        help=("Keep parsed responses between runs in a "
+                              "{0} file next to each PH5 master file."
+                              .format(RESPONSE_CACHE_EXT)))
+
     args = parser.parse_args()
     return args
 
@@ -177,6 +192,83 @@ class NoDataError(Exception):
         self.message = message
 
 
+def parse_response(response_a):
+    """
+    Returns the obspy Response of the contents of a Response_a array,
+    RESP text or a pickled Response
+    """
+    with io.BytesIO(response_a) as buf:
+        buf.seek(0, 0)
+        if _is_resp(buf):
+            buf.seek(0, 0)
+            return read_inventory(buf, format="RESP")[0][0][0].response
+    return pickle.loads(response_a)
+
+
+class ResponseCache(object):
+    """
+    Parsed responses of the Response_a arrays of one experiment by array
+    name, so each array is read and parsed once.
+    Given the path of the master file, the cache is kept between runs in a
+    sidecar file next to it. The sidecar is only used while the master
+    file has the modification time it was written for.
+    """
+
+    def __init__(self, master=None):
+        self.path = None
+        self.mtime = None
+        self.responses = {}
+        self.changed = False
+        if master is not None:
+            self.path = master + RESPONSE_CACHE_EXT
+            self.mtime = os.path.getmtime(master)
+            self.load()
+
+    def load(self):
+        try:
+            with open(self.path, 'rb') as fh:
+                mtime, responses = pickle.load(fh)
+        except (IOError, EOFError, ValueError, TypeError,
+                pickle.UnpicklingError):
+            return
+        if mtime == self.mtime:
+            self.responses = responses
+
+    def save(self):
+        """
+        Write the sidecar if responses were added since it was read
+        """
+        if self.path is None or not self.changed:
+            return
+        tmp = "{0}.{1}".format(self.path, os.getpid())
+        try:
+            with open(tmp, 'wb') as fh:
+                pickle.dump((self.mtime, self.responses), fh,
+                            pickle.HIGHEST_PROTOCOL)
+            os.rename(tmp, self.path)
+        except (IOError, OSError) as e:
+            LOGGER.warning("Can't write response cache {0}: {1}"
+                           .format(self.path, e))
+            return
+        self.changed = False
+
+    def get(self, name):
+        """
+        Returns a copy of the response of Response_a array name,
+        None if it is not in the cache
+        """
+        response = self.responses.get(name)
+        if response is not None:
+            # Callers change the stages of the response they get
+            response = pickle.loads(response)
+        return response
+
+    def add(self, name, response):
+        self.responses[name] = pickle.dumps(response,
+                                            pickle.HIGHEST_PROTOCOL)
+        self.changed = True
+
+
 class PH5toStationXMLRequest(object):
 
     def __init__(self, network_list=None, reportnum_list=None,
@@ -301,9 +393,12 @@ class PH5toStationXMLRequestManager(object):
 
 class PH5toStationXMLParser(object):
 
-    def __init__(self, manager):
+    def __init__(self, manager, response_cache=None):
         self.manager = manager
         self.resp_manager = PH5ResponseManager()
+        if response_cache is None:
+            response_cache = ResponseCache()
+        self.response_cache = response_cache
         self.response_table_n_i = None
         self.response_by_n_i = {}
         self.receiver_table_n_i = None
@@ -420,6 +515,18 @@ class PH5toStationXMLParser(object):
         else:
             return
 
+    def read_response(self, name):
+        """
+        Returns the parsed response of Response_a array name, from
+        self.response_cache or read and parsed, then cached
+        """
+        response = self.response_cache.get(name)
+        if response is None:
+            response = parse_response(
+                self.manager.ph5.ph5_g_responses.get_response(name))
+            self.response_cache.add(name, response)
+        return response
+
     def get_response_inv(self, obs_channel, a_id, sta_id, cha_id,
                          spr, spr_m, emp_resp):
 
@@ -456,37 +563,11 @@ class PH5toStationXMLParser(object):
 
         # parse datalogger response
         if response_file_das_a_name:
-            response_file_das_a = \
-                self.manager.ph5.ph5_g_responses.get_response(
-                                                response_file_das_a_name
-                                        )
-
-            with io.BytesIO(response_file_das_a) as buf:
-                buf.seek(0, 0)
-                if _is_resp(buf):
-                    buf.seek(0, 0)
-                    dl_resp = read_inventory(buf, format="RESP")
-                    dl_resp = dl_resp[0][0][0].response
-                else:
-                    buf.seek(0, 0)
-                    dl_resp = pickle.loads(response_file_das_a)
+            dl_resp = self.read_response(response_file_das_a_name)
 
         # parse sensor response if present
         if response_file_sensor_a_name:
-            response_file_sensor_a = \
-                self.manager.ph5.ph5_g_responses.get_response(
-                                            response_file_sensor_a_name
-                                        )
-
-            with io.BytesIO(response_file_sensor_a) as buf:
-                buf.seek(0, 0)
-                if _is_resp(buf):
-                    buf.seek(0, 0)
-                    sensor_resp = read_inventory(buf, format="RESP")
-                    sensor_resp = sensor_resp[0][0][0].response
-                else:
-                    buf.seek(0, 0)
-                    sensor_resp = pickle.loads(response_file_sensor_a)
+            sensor_resp = self.read_response(response_file_sensor_a_name)
 
         inv_resp = None
         if response_file_das_a_name and response_file_sensor_a_name:
@@ -938,7 +1019,8 @@ class PH5toStationXMLParser(object):
         return all_channels
 
 
-def execute(path, args_dict_list, nickname, level, out_format):
+def execute(path, args_dict_list, nickname, level, out_format,
+            response_cache=False):
     ph5sxml = [PH5toStationXMLRequest(
                             network_list=args_dict.get('network_list'),
                             reportnum_list=args_dict.get('reportnum_list'),
@@ -969,33 +1051,73 @@ def execute(path, args_dict_list, nickname, level, out_format):
         level=level,
         format=out_format,
         stationxml_on_error=args_dict.get('stationxml_on_error'))
-    ph5sxmlparser = PH5toStationXMLParser(ph5sxmlmanager)
-    return ph5sxmlparser.get_network()
+    cache = None
+    if response_cache:
+        cache = ResponseCache(os.path.join(path, nickname))
+    ph5sxmlparser = PH5toStationXMLParser(ph5sxmlmanager, cache)
+    network = ph5sxmlparser.get_network()
+    ph5sxmlparser.response_cache.save()
+    return network
+
+
+def execute_path(path, args_dict_list, nickname, level, out_format,
+                 response_cache=False):
+    """
+    execute() for the experiment in path, logging the outcome
+    Returns the network, None if no StationXML data was created
+    """
+    try:
+        LOGGER.info("CHECKING %s" % os.path.join(path, nickname))
+        n = execute(path,
+                    args_dict_list,
+                    nickname,
+                    level,
+                    out_format,
+                    response_cache)
+        if n is None:
+            LOGGER.info("NO STATIONXML DATA CREATED FOR %s" %
+                        os.path.join(path, nickname))
+        else:
+            LOGGER.info("STATIONXML DATA CREATED FOR %s" %
+                        os.path.join(path, nickname))
+        return n
+    except PH5toStationXMLError as e:
+        LOGGER.error(e.message)
+        LOGGER.info("NO STATIONXML DATA CREATED FOR %s" %
+                    os.path.join(path, nickname))
+
+
+def execute_parallel(paths, workers, *args):
+    """
+    execute_path() for each of paths in a pool of workers processes.
+    Networks are yielded in the order of paths, with at most two
+    experiments per worker in flight.
+    """
+    pool = multiprocessing.Pool(processes=workers)
+    try:
+        pending = collections.deque()
+        for path in paths:
+            pending.append(pool.apply_async(execute_path, (path, ) + args))
+            if len(pending) >= workers * 2:
+                yield pending.popleft().get()
+        while pending:
+            yield pending.popleft().get()
+    finally:
+        pool.terminate()
+        pool.join()
 
 
 def run_ph5_to_stationxml(paths, nickname, out_format,
-                          level, uri, args_dict_list):
+                          level, uri, args_dict_list, workers=1,
+                          response_cache=False):
     networks = []
     if paths:
-        for path in paths:
-            try:
-                LOGGER.info("CHECKING %s" % os.path.join(path, nickname))
-                n = execute(path,
-                            args_dict_list,
-                            nickname,
-                            level,
-                            out_format)
-                if n is None:
-                    LOGGER.info("NO STATIONXML DATA CREATED FOR %s" %
-                                os.path.join(path, nickname))
-                else:
-                    networks.append(n)
-                    LOGGER.info("STATIONXML DATA CREATED FOR %s" %
-                                os.path.join(path, nickname))
-            except PH5toStationXMLError as e:
-                LOGGER.error(e.message)
-                LOGGER.info("NO STATIONXML DATA CREATED FOR %s" %
-                            os.path.join(path, nickname))
+        args = (args_dict_list, nickname, level, out_format, response_cache)
+        if workers > 1:
+            found = execute_parallel(paths, workers, *args)
+        else:
+            found = (execute_path(path, *args) for path in paths)
+        networks = [n for n in found if n is not None]
 
         if networks:
             inv = inventory.Inventory(
@@ -1066,7 +1188,9 @@ def main():
                                     out_format,
                                     level,
                                     uri,
-                                    args_dict_list)
+                                    args_dict_list,
+                                    args_dict.get('workers'),
+                                    args_dict.get('response_cache'))
         if not inv:
             raise NoDataError("Request resulted in no data.")
 
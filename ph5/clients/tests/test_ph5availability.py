@@ -6,14 +6,16 @@ import unittest
 import sys
 import os
 import logging
+import shutil
 
 from mock import patch
 from testfixtures import OutputCapture, LogCapture
 
 from ph5.clients import ph5availability
-from ph5.core import ph5api
+from ph5.core import availability, columns, experiment, ph5api
 from ph5.core.tests.test_base import LogTestCase, TempDirTestCase
 from ph5.clients.ph5toms import PH5toMSeed
+from ph5.utilities import availability_t
 
 
 def checkTupleAlmostEqualIn(tup, tupList, place):
@@ -823,6 +825,43 @@ class TestPH5Availability(LogTestCase, TempDirTestCase):
                 starttime=605809504,
                 endtime=1741883104))
 
+    def test_array_rows(self):
+        # requests sharing ArrayRows get what they get on their own
+        requests = [('*', '*', '*'), ('9001', '', 'DPZ'), ('9*', '*', 'D*'),
+                    ('500', '', 'DP1'), ('8001', '*', 'HL?'),
+                    ('0407', '', 'LOG'), ('500', '', 'LOG')]
+        for times in ((None, None), (1463568480, 1550850190)):
+            rows = ph5availability.ArrayRows(self.availability)
+            for method in (self.availability.get_availability,
+                           self.availability.get_availability_extent,
+                           self.availability.get_slc,
+                           self.availability.has_data):
+                for sr in (False, True):
+                    for st, loc, ch in requests:
+                        args = (st, loc, ch) + times + (sr, )
+                        self.assertEqual(method(*args),
+                                         method(*args, rows=rows))
+        for st, loc, ch in (('9001', '', 'DPZ'), ('500', '*', 'DP1'),
+                            ('8001', '', 'HL1'), ('500', '', 'LOG')):
+            self.assertEqual(
+                self.availability.get_availability_percentage(
+                    st, loc, ch, None, None),
+                self.availability.get_availability_percentage(
+                    st, loc, ch, None, None, rows=rows))
+
+        # Array_t is read once and each deployment of a DAS queried once
+        rows = ph5availability.ArrayRows(self.availability)
+        with patch.object(self.ph5_object, 'read_array_t',
+                          wraps=self.ph5_object.read_array_t) as read, \
+            patch.object(self.availability, 'query_das_t',
+                         wraps=self.availability.query_das_t) as query:
+            for st, loc, ch in requests:
+                self.availability.get_availability(st, loc, ch, rows=rows)
+        self.assertEqual(len(self.ph5_object.Array_t_names), read.call_count)
+        self.assertEqual(len(set(c[0] for c in query.call_args_list)),
+                         query.call_count)
+        self.assertEqual(10, query.call_count)
+
     def test_get_args(self):
         with OutputCapture():
             with self.assertRaises(SystemExit):
@@ -2062,5 +2101,160 @@ class TestPH5Availability_Overlap_ArrayTime(LogTestCase, TempDirTestCase):
             test_args, test_path, 'wanted_avail1511.txt')
 
 
+def build_availability_t(path, args=[]):
+    """
+    run availability_t on master.ph5 in path
+    """
+    testargs = ['availability_t', '-n', 'master.ph5', '-p', path] + args
+    with patch.object(sys, 'argv', testargs):
+        availability_t.main()
+
+
+class TestPH5Availability_Summary(LogTestCase, TempDirTestCase):
+    def setUp(self):
+        super(TestPH5Availability_Summary, self).setUp()
+        for f in ('master.ph5', 'miniPH5_00001.ph5'):
+            shutil.copy(os.path.join(self.home, 'ph5/test_data/ph5', f),
+                        self.tmpdir)
+
+    def get_all(self):
+        """
+        availability and extents with and without a time range
+        """
+        ph5_object = ph5api.PH5(path=self.tmpdir, nickname='master.ph5')
+        avail = ph5availability.PH5Availability(ph5_object)
+        ret = [avail.get_availability(include_sample_rate=True),
+               avail.get_availability_extent(include_sample_rate=True),
+               avail.get_availability(starttime=1463568480,
+                                      endtime=1550850190),
+               avail.get_availability_extent(starttime=1463568480,
+                                             endtime=1550850190)]
+        summary = [ph5_object.availability_summary(das) is not None
+                   for das in ('3X500', '9EEF', '5553', '12183')]
+        ph5_object.close()
+        return ret, summary
+
+    def edit_das_t(self, das, **cols):
+        """
+        set Das_t columns of das in place through columns.update_rows,
+        as kef2ph5 does for fix_srm or fix_num_samples, from functions of
+        the column
+        """
+        ex = experiment.ExperimentGroup(self.tmpdir, 'master.ph5')
+        ex.ph5open(True)
+        ex.initgroup()
+        receivers = ex.ph5_g_receivers
+        receivers.setcurrent(receivers.getdas_g(das))
+        das_t = receivers.current_t_das
+        table = das_t.read()
+        ps = [{'array_name_data_a': a}
+              for a in table['array_name_data_a'].tolist()]
+        for k, f in cols.items():
+            for p, v in zip(ps, f(table[k]).tolist()):
+                p[k] = v
+        columns.update_rows(das_t, ps, 'array_name_data_a')
+        ex.ph5close()
+
+    def test_same_as_das_t(self):
+        expected, summary = self.get_all()
+        self.assertEqual([False] * 4, summary)
+        build_availability_t(self.tmpdir)
+        ret, summary = self.get_all()
+        self.assertEqual([True] * 4, summary)
+        for e, r in zip(expected, ret):
+            self.assertTrue(e)
+            self.assertEqual(e, r)
+
+    def test_stale(self):
+        build_availability_t(self.tmpdir)
+        # append a Das_t row to 9EEF
+        ex = experiment.ExperimentGroup(self.tmpdir, 'master.ph5')
+        ex.ph5open(True)
+        ex.initgroup()
+        receivers = ex.ph5_g_receivers
+        receivers.setcurrent(receivers.getdas_g('9EEF'))
+        rows, keys = receivers.read_das()
+        p = dict(rows[-1])
+        p['time/epoch_l'] += 3600
+        receivers.populateDas_t(p)
+        self.assertEqual(['9EEF'], availability.stale(receivers))
+        ex.ph5close()
+
+        ret, summary = self.get_all()
+        self.assertEqual([True, False, True, True], summary)
+
+        build_availability_t(self.tmpdir, ['-d', '9EEF'])
+        ret, summary = self.get_all()
+        self.assertEqual([True] * 4, summary)
+        ph5_object = ph5api.PH5(path=self.tmpdir, nickname='master.ph5')
+        ph5_object.read_availability_t()
+        self.assertEqual(19, len(ph5_object.Availability_t))
+        ph5_object.close()
+
+        build_availability_t(self.tmpdir, ['-r'])
+        ex_ret, summary = self.get_all()
+        self.assertEqual([False] * 4, summary)
+        self.assertEqual(ex_ret, ret)
+
+    def test_edit_in_place(self):
+        build_availability_t(self.tmpdir)
+        # same number of rows, one window longer
+        self.edit_das_t('9EEF',
+                        sample_count_i=lambda c: c + (c == c[-1]) * 100)
+        ret, summary = self.get_all()
+        self.assertEqual([True, False, True, True], summary)
+        ex = experiment.ExperimentGroup(self.tmpdir, 'master.ph5')
+        ex.ph5open(True)
+        ex.initgroup()
+        self.assertEqual(['9EEF'], availability.stale(ex.ph5_g_receivers))
+        ex.ph5close()
+
+    def test_sample_rate_multiplier(self):
+        # 100 samples per second as 200 / 2
+        self.edit_das_t('9EEF', sample_rate_i=lambda c: c * 2,
+                        sample_rate_multiplier_i=lambda c: c * 2)
+
+        def get_one():
+            ph5_object = ph5api.PH5(path=self.tmpdir, nickname='master.ph5')
+            avail = ph5availability.PH5Availability(ph5_object)
+            ret = [avail.get_one_availability('9EEF', {'9EEF': {}}, 100.,
+                                              chan, 0, 1550850190)
+                   for chan in (1, 2, 3)]
+            summary = ph5_object.availability_summary('9EEF') is not None
+            ph5_object.close()
+            return ret, summary
+
+        expected, summary = get_one()
+        self.assertFalse(summary)
+        self.assertEqual([[100.]] * 3,
+                         [[e[0] for e in entries] for entries in expected])
+        build_availability_t(self.tmpdir)
+        ret, summary = get_one()
+        self.assertTrue(summary)
+        self.assertEqual(expected, ret)
+
+    def test_overlap_arraytime(self):
+        test_path = os.path.join(
+            self.home, 'ph5/test_data/ph5_notrace/avail_overlap_arraytime')
+        for name, station in (('overlap_1000sps', '8133'),
+                              ('overlap_2000sps', '1068'),
+                              ('start_b4_deploy', '1511')):
+            path = os.path.join(self.tmpdir, name)
+            shutil.copytree(os.path.join(test_path, name), path)
+            build_availability_t(path)
+            test_args = ['ph5availability', '-n', 'master.ph5', '-a', '2',
+                         '-S', '-f', 't', '-p', path, '--station', station]
+            with open(os.path.join(
+                    path, 'wanted_avail{0}.txt'.format(station))) as f:
+                wanted = [ln for ln in f.read().strip().split('\n')
+                          if not ln.startswith('#')]
+            with patch.object(sys, 'argv', test_args):
+                with OutputCapture() as out:
+                    ph5availability.main()
+            outputs = [ln for ln in out.captured.strip().split('\n')
+                       if not ln.startswith('#')]
+            self.assertListEqual(wanted, outputs)
+
+
 if __name__ == "__main__":
     unittest.main()
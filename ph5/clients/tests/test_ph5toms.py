@@ -296,6 +296,89 @@ class TestPH5toMSeed_samplerate(LogTestCase, TempDirTestCase):
         self.assertIsNotNone(log)
 
 
+class TestPH5toMSeed_workers(LogTestCase, TempDirTestCase):
+    def tearDown(self):
+        self.ph5_object.close()
+        super(TestPH5toMSeed_workers, self).tearDown()
+
+    def test_process_all_workers(self):
+        self.ph5_object = ph5api.PH5(
+            path=os.path.join(self.home, 'ph5/test_data/ph5'),
+            nickname='master.ph5')
+        serial = list(PH5toMSeed(self.ph5_object,
+                                 stream=True).process_all())
+        parallel = list(PH5toMSeed(self.ph5_object, stream=True,
+                                   workers=3).process_all())
+        self.assertEqual(10, len(serial))
+        # same streams in the same order
+        self.assertEqual(len(serial), len(parallel))
+        for s, p in zip(serial, parallel):
+            self.assertEqual(s, p)
+
+
+class TestPH5toMSeed_chunks(LogTestCase, TempDirTestCase):
+    def setUp(self):
+        super(TestPH5toMSeed_chunks, self).setUp()
+        self.ph5_object = ph5api.PH5(
+            path=os.path.join(self.home, 'ph5/test_data/ph5'),
+            nickname='master.ph5')
+
+    def tearDown(self):
+        self.ph5_object.close()
+        super(TestPH5toMSeed_chunks, self).tearDown()
+
+    def test_process_chunks(self):
+        whole = list(PH5toMSeed(self.ph5_object,
+                                stream=True).process_all())
+        chunked = [list(chunks) for chunks in
+                   PH5toMSeed(self.ph5_object, stream=True,
+                              chunk_samples=1000).process_chunks()]
+        self.assertEqual(len(whole), len(chunked))
+        for stream, chunks in zip(whole, chunked):
+            # textural LOG channels are not split
+            self.assertTrue(all(len(c[0].data) <= 1000 for c in chunks
+                                if c[0].stats.sampling_rate))
+            merged = obspy.Stream()
+            for c in chunks:
+                merged += c
+            merged.merge()
+            stream = stream.copy().merge()
+            # same samples and times once the chunks are put back together
+            self.assertEqual(len(stream), len(merged))
+            for t, m in zip(stream, merged):
+                self.assertEqual(t.stats.starttime, m.stats.starttime)
+                self.assertEqual(t.stats.npts, m.stats.npts)
+                self.assertEqual(t.id, m.id)
+                self.assertTrue((t.data == m.data).all())
+
+        with self.assertRaises(ph5toms.PH5toMSAPIError):
+            PH5toMSeed(self.ph5_object, stream=True, decimation='2',
+                       chunk_samples=5000)
+
+    def test_main_chunk(self):
+        # MiniSEED of a chunked cut goes to one file
+        testargs = ['ph5toms', '-n', 'master.ph5', '-p',
+                    os.path.join(self.home, 'ph5/test_data/ph5'),
+                    '-o', 'whole', '--station', '9001']
+        with patch.object(sys, 'argv', testargs):
+            ph5toms.main()
+        with patch.object(sys, 'argv', testargs[:-3] + [
+                'chunked', '--station', '9001', '--chunk', '1000']):
+            ph5toms.main()
+        self.assertEqual(1, len(os.listdir('whole')))
+        self.assertEqual(sorted(os.listdir('whole')),
+                         sorted(os.listdir('chunked')))
+        for name in os.listdir('whole'):
+            whole = obspy.read(os.path.join('whole', name))
+            chunked = obspy.read(os.path.join('chunked', name))
+            chunked.merge()
+            whole.merge()
+            self.assertEqual(len(whole), len(chunked))
+            for t, c in zip(whole, chunked):
+                self.assertEqual(t.stats.starttime, c.stats.starttime)
+                self.assertTrue((t.data == c.data).all())
+
+
 class TestPH5toMSeed_SRM(TempDirTestCase, LogTestCase):
     '''
     Test sample_rate_multiplier=0 or missing
@@ -42,9 +42,9 @@ class TestPh5torec_precision(TempDirTestCase, LogTestCase):
                 ph5torec.main()
 
         # before fixed: Wrote: 751 samples with -1 sample padding.
-        self.assertEqual(
-            log.records[24].msg,
-            "Wrote: 750 samples with 0 sample padding."
+        self.assertIn(
+            "Wrote: 750 samples with 0 sample padding.",
+            [r.msg for r in log.records]
         )
 
 
@@ -5,6 +5,7 @@ import unittest
 import os
 import sys
 import logging
+import shutil
 
 from obspy.core import inventory as inv
 from mock import patch
@@ -623,5 +624,89 @@ class TestPh5ToStationxml(LogTestCase, TempDirTestCase):
         self.assertAlmostEqual(response.instrument_sensitivity.value,
                                612759.438589, 4)
 
+    def test_run_ph5_to_stationxml_workers(self):
+        arg_dict_list = [{'network_list': None, 'reportnum_list': None,
+                          'station_list': None, 'location_list': None,
+                          'channel_list': None, 'component_list': None,
+                          'receiver_list': None, 'array_list': None,
+                          'emp_resp': True, 'stationxml_on_error': True}]
+        paths = []
+        for d in ('ph5', 'ph5_different_response'):
+            os.mkdir(d)
+            shutil.copy(os.path.join(self.home, 'ph5/test_data', d,
+                                     'master.ph5'), d)
+            paths.append(os.path.join(self.tmpdir, d))
+
+        invs = [ph5tostationxml.run_ph5_to_stationxml(
+                    paths, 'master.ph5', 'STATIONXML', 'RESPONSE', '',
+                    arg_dict_list, workers=workers, response_cache=cache)
+                for workers, cache in ((1, False), (2, True), (2, True))]
+        self.assertEqual(['AA', 'XW'],
+                         [n.code for n in invs[0].networks])
+        self.assertEqual(invs[0].networks, invs[1].networks)
+        # the second run reads responses from the sidecars
+        self.assertEqual(invs[0].networks, invs[2].networks)
+        for path in paths:
+            self.assertTrue(os.path.exists(os.path.join(
+                path, 'master.ph5' + ph5tostationxml.RESPONSE_CACHE_EXT)))
+
+
+class TestResponseCache(LogTestCase, TempDirTestCase):
+    def setUp(self):
+        super(TestResponseCache, self).setUp()
+        shutil.copy(os.path.join(self.home, 'ph5/test_data/ph5/master.ph5'),
+                    self.tmpdir)
+        self.master = os.path.join(self.tmpdir, 'master.ph5')
+        self.sidecar = self.master + ph5tostationxml.RESPONSE_CACHE_EXT
+
+    def test_response_cache(self):
+        cache = ph5tostationxml.ResponseCache(self.master)
+        self.assertIsNone(cache.get('/Experiment_g/Responses_g/gs11v'))
+        response = inv.response.Response(
+            instrument_sensitivity=inv.response.InstrumentSensitivity(
+                value=10., frequency=1., input_units='M/S',
+                output_units='V'))
+        cache.add('/Experiment_g/Responses_g/gs11v', response)
+        # a copy each time
+        cached = cache.get('/Experiment_g/Responses_g/gs11v')
+        self.assertEqual(response, cached)
+        self.assertIsNot(cached,
+                         cache.get('/Experiment_g/Responses_g/gs11v'))
+        cache.save()
+
+        cache = ph5tostationxml.ResponseCache(self.master)
+        self.assertEqual(response,
+                         cache.get('/Experiment_g/Responses_g/gs11v'))
+        # nothing added so the sidecar is not written again
+        os.utime(self.sidecar, (1000, 1000))
+        cache.save()
+        self.assertEqual(1000, os.path.getmtime(self.sidecar))
+
+        # the master file changed since the sidecar was written
+        mtime = os.path.getmtime(self.master)
+        os.utime(self.master, (mtime + 10, mtime + 10))
+        cache = ph5tostationxml.ResponseCache(self.master)
+        self.assertIsNone(cache.get('/Experiment_g/Responses_g/gs11v'))
+
+        # no sidecar without a master file
+        cache = ph5tostationxml.ResponseCache()
+        cache.add('/Experiment_g/Responses_g/gs11v', response)
+        cache.save()
+        self.assertEqual(response,
+                         cache.get('/Experiment_g/Responses_g/gs11v'))
+
+    def test_read_response(self):
+        ph5sxml, mng, parser = getParser(self.tmpdir, 'master.ph5',
+                                         'RESPONSE')
+        name = '/Experiment_g/Responses_g/gs11v'
+        with patch.object(mng.ph5.ph5_g_responses, 'get_response',
+                          wraps=mng.ph5.ph5_g_responses.get_response) as get:
+            response = parser.read_response(name)
+            self.assertEqual(response, parser.read_response(name))
+        self.assertEqual(1, get.call_count)
+        self.assertIsNotNone(response.instrument_sensitivity)
+        mng.ph5.close()
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,414 @@
+#
+# Summary of continuous data segments, /Experiment_g/Receivers_g/Availability_t
+#
+# Availability_t is optional. It holds the Das_t windows of each DAS merged
+# into continuous segments per channel and sample rate, so availability
+# requests do not have to read and merge every Das_t.
+#
+
+import logging
+import os
+
+import numpy as np
+
+from ph5.core import columns
+
+PROG_VERSION = '2026.291'
+LOGGER = logging.getLogger(__name__)
+
+
+def das_t_entries(das_t):
+    '''   Windows of Das_t rows for merge()
+          Inputs:
+             das_t -> list of Das_t rows as dictionaries
+          Returns:
+             list of (start, end, sample rate) as floats
+    '''
+    entries = []
+    for entry in das_t:
+        cur_time = (float(entry['time/epoch_l']) +
+                    float(entry['time/micro_seconds_i']) /
+                    1000000)
+        if entry['sample_rate_i'] > 0:
+            cur_len = (float(entry['sample_count_i']) /
+                       float(entry['sample_rate_i']) /
+                       float(entry['sample_rate_multiplier_i']))
+            cur_sr = (float(entry['sample_rate_i']) /
+                      float(entry['sample_rate_multiplier_i']))
+        else:
+            cur_len = 0
+            cur_sr = 0
+        entries.append((cur_time, cur_time + cur_len, cur_sr))
+
+    return entries
+
+
+def merge(entries, deploy_time=float('-inf'), pickup_time=float('inf')):
+    '''   Merge windows of data into continuous segments
+          Inputs:
+             entries -> list of (start, end, sample rate) sorted on start
+             deploy_time -> windows after the first ending before this
+                            are skipped
+             pickup_time -> windows starting after this are skipped
+          Returns:
+             list of (sample rate, start, end). The first start is moved
+             up to deploy_time when there is more than one segment and
+             the last end is moved back to pickup_time.
+    '''
+    if not entries:
+        return []
+    prev_start = None
+    prev_end = None
+    prev_len = None
+    prev_sr = None
+    times = []
+    count = 0
+    for cur_time, cur_end, cur_sr in entries:
+        cur_len = cur_end - cur_time
+        if prev_start is None:
+            prev_start = cur_time
+            prev_end = cur_end
+            prev_len = cur_len
+            prev_sr = cur_sr
+            continue
+        if cur_end < deploy_time:
+            continue
+        if cur_time > pickup_time:
+            break
+        if (cur_time == prev_start and
+                cur_len == prev_len and
+                cur_sr == prev_sr):
+            # duplicate entry - skip
+            continue
+        elif cur_time > prev_end or cur_sr != prev_sr:
+            if count == 0:
+                # adjust start time of the first segment not smaller
+                # than deploy_time
+                prev_start = max(deploy_time, prev_start)
+                count += 1
+            # add a new entry
+            times.append((prev_sr, prev_start, prev_end))
+            # reset previous
+            prev_start = cur_time
+            prev_end = cur_end
+            prev_len = cur_len
+            prev_sr = cur_sr
+        elif cur_time == prev_end and cur_sr == prev_sr:
+            # extend the end time since this was a continuous segment
+            prev_end = cur_end
+            prev_len += cur_len
+        elif cur_time < prev_end < cur_end:
+            # there is an overlap => extend end time
+            prev_len += cur_len - (prev_end - cur_time)
+            prev_end = cur_end
+            prev_sr = cur_sr
+
+    # adjust end time of the last segment not greater than pickup_time
+    prev_end = min(pickup_time, prev_end)
+    # add the last continuous segment
+    times.append((prev_sr, prev_start, prev_end))
+
+    return times
+
+
+def summarize(das, das_t):
+    '''   Merge the windows of a Das_t into Availability_t rows. Windows
+          are grouped on channel, sample rate and multiplier, windows
+          without a sample rate are grouped whatever their multiplier.
+          Inputs:
+             das -> DAS serial number
+             das_t -> Das_t table node
+          Returns:
+             list of Availability_t rows as dictionaries, None if Das_t has
+             a missing or zero sample_rate_multiplier_i
+    '''
+    table = das_t.read()
+    if 'sample_rate_multiplier_i' not in table.dtype.names or \
+            np.any(table['sample_rate_multiplier_i'] == 0):
+        return None
+    chan = table['channel_number_i']
+    rate = table['sample_rate_i']
+    mult = table['sample_rate_multiplier_i']
+    epoch = table['time']['epoch_l']
+    micro = table['time']['micro_seconds_i']
+    key_mult = np.where(rate > 0, mult, 1)
+    # Window times as das_t_entries computes them
+    start = epoch.astype(np.float64) + micro / 1000000.
+    with np.errstate(divide='ignore', invalid='ignore'):
+        length = np.where(rate > 0,
+                          table['sample_count_i'].astype(np.float64) /
+                          rate / mult, 0.)
+        sr = np.where(rate > 0, rate.astype(np.float64) / mult, 0.)
+    end = start + length
+    stamp = columns.das_t_stamp(das_t)
+
+    rows = []
+    groups = set(zip(chan.tolist(), rate.tolist(), key_mult.tolist()))
+    for c, r, m in sorted(groups):
+        pos = np.flatnonzero((chan == c) & (rate == r) & (key_mult == m))
+        if len(pos) > 1:
+            # Drop a window at the same time and rate as the one before it
+            # in Das_t, as filter_das_t does
+            same = np.ones(len(pos) - 1, dtype=bool)
+            for col in (mult, micro, epoch):
+                v = col[pos]
+                same &= v[1:] == v[:-1]
+            pos = pos[np.concatenate(([True], ~same))]
+        # On epoch_l, then start time, then Das_t order
+        pos = pos[np.lexsort((start[pos], epoch[pos]))]
+        entries = zip(start[pos].tolist(), end[pos].tolist(),
+                      sr[pos].tolist())
+        for seg_sr, seg_start, seg_end in merge(entries):
+            rows.append({'serial_number_s': das,
+                         'channel_number_i': c,
+                         'sample_rate_i': r,
+                         'sample_rate_multiplier_i': m,
+                         'start_epoch_d': seg_start,
+                         'end_epoch_d': seg_end,
+                         'das_t_stamp_s': stamp})
+
+    return rows
+
+
+def refresh(receivers, dases=None):
+    '''   Rewrite the Availability_t rows of DASes from their Das_t
+          Inputs:
+             receivers -> experiment.ReceiversGroup opened for editing
+                          with Availability_t created
+             dases -> list of DAS serial numbers, all DASes if None
+          Returns:
+             number of segments written
+    '''
+    table = receivers.ph5_t_availability
+    existing = table.read()
+    if dases is None:
+        dases = sorted([name[len('Das_g_'):]
+                        for name in receivers.alldas_g().keys()])
+        keep = existing[:0]
+    else:
+        keep = existing[~np.in1d(existing['serial_number_s'], dases)]
+    table.truncate(0)
+    if len(keep):
+        table.append(keep)
+
+    n = 0
+    with columns.BulkWriter(table):
+        for das in dases:
+            g = receivers.getdas_g(das)
+            if g is None:
+                LOGGER.warning("No Das_g found for {0}.".format(das))
+                continue
+            receivers.setcurrent(g)
+            das_t = receivers.current_t_das
+            if das_t is None:
+                continue
+            if columns.das_t_stamp(das_t) is None:
+                columns.stamp_das_t(das_t)
+            columns.summarized(das_t)
+            rows = summarize(das, das_t)
+            if rows is None:
+                LOGGER.warning("Das_t_{0} has sample_rate_multiplier_i "
+                               "missing or 0. Please run fix_srm. Not "
+                               "adding it to Availability_t.".format(das))
+                continue
+            for p in rows:
+                receivers.populateAvailability_t(p)
+            n += len(rows)
+
+    return n
+
+
+def stale(receivers):
+    '''   DASes whose Das_t has been written since their Availability_t
+          rows were, or that have none
+          Inputs:
+             receivers -> experiment.ReceiversGroup with Availability_t
+          Returns:
+             sorted list of DAS serial numbers
+    '''
+    table = receivers.ph5_t_availability
+    written = dict(zip(table.col('serial_number_s').tolist(),
+                       table.col('das_t_stamp_s').tolist()))
+    ret = []
+    for name in sorted(receivers.alldas_g().keys()):
+        das = name[len('Das_g_'):]
+        receivers.setcurrent(receivers.getdas_g(das))
+        if receivers.current_t_das is None:
+            continue
+        stamp = columns.das_t_stamp(receivers.current_t_das)
+        if stamp is None or written.get(das) != stamp:
+            ret.append(das)
+
+    return ret
+
+
+def written(receivers):
+    '''   DASes of this experiment whose Das_t has been written in this
+          process and not summarized since, columns.DAS_T_WRITTEN
+          Inputs:
+             receivers -> experiment.ReceiversGroup
+          Returns:
+             sorted list of DAS serial numbers
+    '''
+    path = os.path.dirname(os.path.abspath(receivers.ph5.filename))
+    return sorted(set(
+        das for (filename, p), das in columns.DAS_T_WRITTEN.items()
+        if os.path.dirname(filename) == path))
+
+
+def update(receivers):
+    '''   Refresh the DASes written() finds if Availability_t has been
+          built
+          Inputs:
+             receivers -> experiment.ReceiversGroup opened for editing
+          Returns:
+             number of segments written, None if there is no
+             Availability_t
+    '''
+    if receivers.ph5_t_availability is None:
+        return None
+    dases = written(receivers)
+    if not dases:
+        return 0
+    n = refresh(receivers, dases)
+    LOGGER.info("Refreshed {0} segments in Availability_t".format(n))
+
+    return n
+
+
+class AvailabilityIndex(object):
+    '''   Availability_t read once into numpy column arrays sorted on DAS,
+          channel, sample rate and start time. Segments of one DAS,
+          channel and sample rate do not overlap so their start and end
+          times are both in order and are searched with searchsorted.
+          das_t_stamp -> columns.DAS_T_STAMP of the Das_t summarized,
+                         keyed on DAS serial number
+          nbytes -> Memory used by the arrays
+    '''
+
+    def __init__(self, table):
+        '''   table -> Availability_t rows as a structured array   '''
+        order = np.lexsort((table['start_epoch_d'],
+                            table['sample_rate_multiplier_i'],
+                            table['sample_rate_i'],
+                            table['channel_number_i'],
+                            table['serial_number_s']))
+        table = table[order]
+        self.start = table['start_epoch_d']
+        self.end = table['end_epoch_d']
+        serial = table['serial_number_s']
+        chan = table['channel_number_i']
+        rate = table['sample_rate_i']
+        mult = table['sample_rate_multiplier_i']
+        n = len(table)
+        new = np.ones(n, dtype=bool)
+        if n:
+            new[1:] = (serial[1:] != serial[:-1]) | \
+                (chan[1:] != chan[:-1]) | (rate[1:] != rate[:-1]) | \
+                (mult[1:] != mult[:-1])
+        first = np.flatnonzero(new)
+        last = np.append(first[1:], n)
+        # (das, chan, sample rate, multiplier) -> (first, last) positions
+        self.groups = {}
+        # (das, chan) -> group keys
+        self.channels = {}
+        # (das, chan, sample_rate_i / sample_rate_multiplier_i) -> group
+        # keys, as query_das_t callers give the sample rate
+        self.rates = {}
+        for lo, hi in zip(first.tolist(), last.tolist()):
+            key = (str(serial[lo]), int(chan[lo]), int(rate[lo]),
+                   int(mult[lo]))
+            self.groups[key] = (lo, hi)
+            self.channels.setdefault(key[:2], []).append(key)
+            self.rates.setdefault(key[:2] + (self._rate(*key[2:]),),
+                                  []).append(key)
+        self.das_t_stamp = dict(zip(serial.tolist(),
+                                    table['das_t_stamp_s'].tolist()))
+        self.nbytes = table.nbytes
+
+    def __len__(self):
+        return len(self.start)
+
+    def is_current(self, das, stamp):
+        '''   True if the segments of das were written from a Das_t with
+              columns.DAS_T_STAMP stamp   '''
+        return stamp is not None and self.das_t_stamp.get(das) == stamp
+
+    @staticmethod
+    def _rate(sample_rate, multiplier=1):
+        '''   Sample rate as a float, 0 if there is none   '''
+        if sample_rate > 0:
+            return float(sample_rate) / float(multiplier)
+        return 0.
+
+    def _find(self, key, start=None, end=None):
+        '''   Positions of the segments of group key overlapping start to
+              end   '''
+        if key not in self.groups:
+            return 0, 0
+        first, last = self.groups[key]
+        lo, hi = first, last
+        if start is not None:
+            lo = first + np.searchsorted(self.end[first:last], start, 'left')
+        if end is not None:
+            hi = first + np.searchsorted(self.start[first:last], end,
+                                         'right')
+
+        return lo, max(lo, hi)
+
+    def _keys(self, das, chan, sample_rate):
+        '''   Groups at sample_rate, sample_rate_i divided by
+              sample_rate_multiplier_i, so 500 / 2 is found at 250   '''
+        return self.rates.get((das, chan, self._rate(sample_rate)), [])
+
+    def entries(self, das, chan, sample_rate, start=None, end=None):
+        '''   Segments on chan at sample_rate overlapping start to end
+              Returns:
+                 list of (start, end, sample rate) for merge() sorted on
+                 start time
+        '''
+        sr = self._rate(sample_rate)
+        ret = []
+        for key in self._keys(das, chan, sample_rate):
+            lo, hi = self._find(key, start, end)
+            ret += [(s, e, sr) for s, e in zip(self.start[lo:hi].tolist(),
+                                               self.end[lo:hi].tolist())]
+        ret.sort(key=lambda e: e[0])
+
+        return ret
+
+    def rows(self, das, chan, start=None, end=None):
+        '''   Segments on chan at any sample rate overlapping start to end
+              Returns:
+                 list of Availability_t rows as dictionaries sorted on
+                 start time
+        '''
+        ret = []
+        for key in self.channels.get((das, chan), []):
+            lo, hi = self._find(key, start, end)
+            for s, e in zip(self.start[lo:hi].tolist(),
+                            self.end[lo:hi].tolist()):
+                ret.append({'serial_number_s': das,
+                            'channel_number_i': chan,
+                            'sample_rate_i': key[2],
+                            'sample_rate_multiplier_i': key[3],
+                            'start_epoch_d': s,
+                            'end_epoch_d': e})
+        ret.sort(key=lambda r: r['start_epoch_d'])
+
+        return ret
+
+    def extent(self, das, chan, sample_rate, start=None, end=None):
+        '''   Start of the first and end of the last segment on chan at
+              sample_rate overlapping start to end, None, None if there
+              are none   '''
+        earliest = latest = None
+        for key in self._keys(das, chan, sample_rate):
+            lo, hi = self._find(key, start, end)
+            if lo == hi:
+                continue
+            s, e = float(self.start[lo]), float(self.end[hi - 1])
+            earliest = s if earliest is None else min(earliest, s)
+            latest = e if latest is None else max(latest, e)
+
+        return earliest, latest
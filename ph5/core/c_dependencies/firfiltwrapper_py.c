@@ -1,88 +1,83 @@
 /*   firfiltwrapper_py.c   */
 
-#define PROG_VERSION "2013.261"
+#define PROG_VERSION "2026.291"
 
 #include "Python.h"
 #include "numpy/arrayobject.h"
 
-extern int firfilt (char *, double *, int, uint32_t *, uint32_t *);
-
-PyObject *
-PyTuple_FromArray (int32_t *values, int num_values)
-{
-  int i;
-  
-  PyObject *tuple = PyList_New (num_values);
-  if (tuple == NULL)
-	return NULL;
-  
-  for (i = 0; i < num_values; i++)
-	PyList_SetItem (tuple, i, PyInt_FromLong ((long int) values[i]));
-  
-  free (values);
-  
-  if (PyErr_Occurred ())
-    return NULL;
-  else
-    return tuple;
-}
+extern int firfilt (char *, double *, int, double **, int *);
 
 PyObject *
 run_firfilt (PyObject *self, PyObject *args)
 {
-  //const char *buf;
   char *dfacts;
   int ionum;
   double *dodata; 
   int i, iinum, samp_shift; 
+  npy_intp onum;
   int32_t *obuf;
+  long *l;
   double *didata, *d;
-  PyObject *input, *item;
+  PyObject *input;
+  PyArrayObject *idata, *odata;
   /*
-   *   input  -> input data to be decimated
+   *   input  -> input data to be decimated, an array or a sequence
    *   iinum  -> number of samples in input
    *   dfacts -> the decimation factors 2, 4, or 5. Up to 5
    *             levels of decimation comma separated.
    */
-  //printf ("ParseTuple\n");
   if (! PyArg_ParseTuple (args, "Ois", &input, &iinum, &dfacts))
     return NULL;
     
-  //printf ("calloc double\n");
+  /*   Input as whole numbers, converted in one go if not already   */
+  idata = (PyArrayObject *) PyArray_FROMANY (input, NPY_LONG, 1, 1,
+                                             NPY_ARRAY_IN_ARRAY |
+                                             NPY_ARRAY_FORCECAST);
+  if (idata == NULL)
+    return NULL;
+
+  if (PyArray_SIZE (idata) < iinum) {
+    PyErr_Format (PyExc_ValueError, "input holds %ld samples, not %d",
+                  (long) PyArray_SIZE (idata), iinum);
+    Py_DECREF (idata);
+    return NULL;
+  }
+
   didata = (double *) calloc (iinum, sizeof (double));
-  if (didata == NULL)
-    return PyErr_NoMemory ();
-    
-  //printf ("calloc int32\n");
-  obuf = (int32_t *) calloc (iinum, sizeof (int32_t));
-  if (obuf == NULL)
+  if (didata == NULL) {
+    Py_DECREF (idata);
     return PyErr_NoMemory ();
-
-  //printf ("Convert to double\n");
-  /*   Convert input python list to an array of doubles   */
-  for (i = 0; i < iinum; i++) {
-    item = PySequence_GetItem (input, i);
-    didata[i] = (double) PyInt_AsLong (item);
-    Py_DECREF (item);
   }
 
-  //printf ("firfilt\n");
+  l = (long *) PyArray_DATA (idata);
+  for (i = 0; i < iinum; i++)
+    didata[i] = (double) l[i];
+  Py_DECREF (idata);
+
   /*   Decimate the data returning the number of samples to shift in time   */
   samp_shift = firfilt (dfacts, didata, iinum, &dodata, &ionum);
+  free (didata);
   /*   dodata contains a pointer to the output array   */
   d = dodata;
+  onum = ionum + 1;
+  odata = (PyArrayObject *) PyArray_SimpleNew (1, &onum, NPY_INT32);
+  if (odata == NULL) {
+    free (d);
+    return NULL;
+  }
+
+  obuf = (int32_t *) PyArray_DATA (odata);
   for (i = 0; i < ionum; i++)
     obuf[i] = (int32_t) d[i] + 0.5;
     
-  //printf ("return\n");
   obuf[ionum] = (int32_t) samp_shift;
-  free (didata); free (d);
-  return PyTuple_FromArray (obuf, ionum + 1);
+  free (d);
+  return (PyObject *) odata;
 
 }
 
 static PyMethodDef firfiltmethods[] = {
-    { "decimate", run_firfilt, METH_VARARGS, "Decimate a timeseries." },
+    { "decimate", run_firfilt, METH_VARARGS, "Decimate a timeseries. Returns an int32 array of the decimated samples then the samples to shift in time." },
     { NULL, NULL, 0, NULL }
 } ;
 
@@ -90,4 +85,5 @@ PyMODINIT_FUNC
 initfirfilt_py (void)
 {
   (void) Py_InitModule ("firfilt_py", firfiltmethods);
+  import_array ();
 }
\ No newline at end of file
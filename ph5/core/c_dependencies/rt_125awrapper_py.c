@@ -6,33 +6,43 @@
  *   Steve Azevedo, June 2010
  */
  
- #define PROG_VERSION "2010.236"
+ #define PROG_VERSION "2026.291"
  
  #include "Python.h"
  #include "numpy/arrayobject.h"
  
  extern void cvt24to32 (uint8_t *, int32_t *, int);
  
-PyObject *
-PyTuple_FromArray (long int *values, int num_values)
+/*
+ *   Return out with a new reference, or a new int32 array of num samples
+ *   if out is NULL or None.
+ */
+static PyArrayObject *
+int32_array (PyObject *out, npy_intp num)
 {
-  int i;
-  int32_t *ivalues;
-  
-  PyObject *tuple = PyList_New (num_values);
-  if (tuple == NULL)
-	return NULL;
-  
-  ivalues = (int32_t *) values;
-  for (i = 0; i < num_values; i++)
-	PyList_SetItem (tuple, i, PyInt_FromLong ((long int) ivalues[i]));
-  
-  free (values);
-  
-  if (PyErr_Occurred ())
+  PyArrayObject *arr;
+
+  if (out == NULL || out == Py_None)
+    return (PyArrayObject *) PyArray_SimpleNew (1, &num, NPY_INT32);
+
+  if (! PyArray_Check (out)) {
+    PyErr_SetString (PyExc_TypeError, "out must be a numpy array");
+    return NULL;
+  }
+  arr = (PyArrayObject *) out;
+  if (PyArray_TYPE (arr) != NPY_INT32 || ! PyArray_ISCARRAY (arr)) {
+    PyErr_SetString (PyExc_TypeError,
+                     "out must be a writeable contiguous int32 array");
+    return NULL;
+  }
+  if (PyArray_SIZE (arr) < num) {
+    PyErr_Format (PyExc_ValueError,
+                  "out holds %ld samples, %ld needed",
+                  (long) PyArray_SIZE (arr), (long) num);
     return NULL;
-  else
-    return tuple;
+  }
+  Py_INCREF (out);
+  return arr;
 }
  
 /*   */
@@ -41,28 +51,29 @@ rt_125a_data_decode (PyObject *self, PyObject *args)
 {
   const char *buf;
   int num;
-  int32_t *data;
+  PyArrayObject *data;
   PyObject *input;
+  PyObject *out = NULL;
   Py_ssize_t len;
-  //printf ("Get args...\n");
-  if (!PyArg_ParseTuple (args, "Oi", &input, &num))
+  if (!PyArg_ParseTuple (args, "Oi|O", &input, &num, &out))
 	return NULL;
-  //printf ("Read buffer...num: %d\n", num);
   if (PyObject_AsCharBuffer (input, &buf, &len) != 0)
 	return NULL;
-  //printf ("Convert buffer...num: %d len: %d\n", num, (int) len);
-  data = (int32_t *) calloc (num, sizeof (int32_t));
+  if (len < (Py_ssize_t) num * 3) {
+    PyErr_Format (PyExc_ValueError,
+                  "%ld bytes is less than %d samples", (long) len, num);
+    return NULL;
+  }
+  data = int32_array (out, num);
   if (data == NULL)
-	return PyErr_NoMemory ();
-  //printf ("Now num: %d\n", num);
-  cvt24to32 ((uint8_t *) buf, (int32_t *) data, num);
-  //printf ("Done...\n");
-  return PyTuple_FromArray ((long int *) data, num);
+	return NULL;
+  cvt24to32 ((uint8_t *) buf, (int32_t *) PyArray_DATA (data), num);
+  return (PyObject *) data;
 
 } 
  
 static PyMethodDef rt_125amethods[] = {
-  { "data_decode", rt_125a_data_decode, METH_VARARGS, "Decode a packet of 24 bit ints to a list of 32 bit ints."},
+  { "data_decode", rt_125a_data_decode, METH_VARARGS, "Decode a packet, or the joined packets of an event, of 24 bit ints to an int32 array, out if given."},
   { NULL, NULL, 0, NULL } 
 };
 
@@ -70,4 +81,5 @@ PyMODINIT_FUNC
 initrt_125a_py (void)
 {
   (void) Py_InitModule ("rt_125a_py", rt_125amethods);
+  import_array ();
 }
\ No newline at end of file
@@ -7,7 +7,7 @@
  *   Steve Azevedo, October 2008
  */
 
-#define PROG_VERSION "2010.242" 
+#define PROG_VERSION "2026.291"
  
 #include "Python.h"
 #include "numpy/arrayobject.h"
@@ -89,24 +89,36 @@ rt_130_parse_data_header (PyObject *self, PyObject *args)
 
 }
 
-PyObject *
-PyTuple_FromArray (int32_t *values, int num_values)
+/*
+ *   Return out with a new reference, or a new int32 array of num samples
+ *   if out is NULL or None.
+ */
+static PyArrayObject *
+int32_array (PyObject *out, npy_intp num)
 {
-  int i;
-  
-  PyObject *tuple = PyList_New (num_values);
-  if (tuple == NULL)
-	return NULL;
-  
-  for (i = 0; i < num_values; i++)
-	PyList_SetItem (tuple, i, PyInt_FromLong ((long int) values[i]));
-  
-  free (values);
-  
-  if (PyErr_Occurred ())
+  PyArrayObject *arr;
+
+  if (out == NULL || out == Py_None)
+    return (PyArrayObject *) PyArray_SimpleNew (1, &num, NPY_INT32);
+
+  if (! PyArray_Check (out)) {
+    PyErr_SetString (PyExc_TypeError, "out must be a numpy array");
+    return NULL;
+  }
+  arr = (PyArrayObject *) out;
+  if (PyArray_TYPE (arr) != NPY_INT32 || ! PyArray_ISCARRAY (arr)) {
+    PyErr_SetString (PyExc_TypeError,
+                     "out must be a writeable contiguous int32 array");
     return NULL;
-  else
-    return tuple;
+  }
+  if (PyArray_SIZE (arr) < num) {
+    PyErr_Format (PyExc_ValueError,
+                  "out holds %ld samples, %ld needed",
+                  (long) PyArray_SIZE (arr), (long) num);
+    return NULL;
+  }
+  Py_INCREF (out);
+  return arr;
 }
 
 /*   */
@@ -116,22 +128,23 @@ rt_130_parse_int16 (PyObject *self, PyObject *args)
   const char *buf;	  /*   Converted packet buffer   */
   int num;		  /*   num -> number of samples, len -> packet buffer length   */
   Py_ssize_t len;
-  int32_t *data;	  /*   Converted data   */
+  PyArrayObject *data;	  /*   Converted data   */
   PyObject *input;	  /*   Input packet buffer   */
+  PyObject *out = NULL;	  /*   Optional array to convert into   */
   
-  if (! PyArg_ParseTuple (args, "Oi", &input, &num))
+  if (! PyArg_ParseTuple (args, "Oi|O", &input, &num, &out))
     return NULL;
 	
   if (PyObject_AsCharBuffer (input, &buf, &len) != 0)
 	return NULL;
     
-  data = (int32_t *) malloc (sizeof (int32_t) * num);
+  data = int32_array (out, num);
   if (data == NULL)
-    return PyErr_NoMemory ();
+    return NULL;
     
-  parse_int16 ((uint8_t *) buf, data, num);
+  parse_int16 ((uint8_t *) buf, (int32_t *) PyArray_DATA (data), num);
   
-  return PyTuple_FromArray (data, num);
+  return (PyObject *) data;
 
 }
 
@@ -142,85 +155,179 @@ rt_130_parse_int32 (PyObject *self, PyObject *args)
   const char *buf;
   int num;
   Py_ssize_t len;
-  int32_t *data;
+  PyArrayObject *data;
   PyObject *input;
+  PyObject *out = NULL;
   
-  if (!PyArg_ParseTuple (args, "Oi", &input, &num))
+  if (!PyArg_ParseTuple (args, "Oi|O", &input, &num, &out))
 	return NULL;
 	
   if (PyObject_AsCharBuffer (input, &buf, &len) != 0)
 	return NULL;
 	
-  data = (int32_t *) calloc (num, sizeof (int32_t));
+  data = int32_array (out, num);
   if (data == NULL)
-	return PyErr_NoMemory ();
+	return NULL;
 	
-  parse_int32 ((uint8_t *) buf, (int32_t *) data, num);
+  parse_int32 ((uint8_t *) buf, (int32_t *) PyArray_DATA (data), num);
   
-  return PyTuple_FromArray (data, num);
+  return (PyObject *) data;
 
 }
 
-/*   */
-PyObject *
-rt_130_parse_steim1 (PyObject *self, PyObject *args)
+/*
+ *   Steim1 or steim2 decode num samples of buf into out. The samples are
+ *   followed by x0 and xn, see steim docs.
+ */
+static PyObject *
+rt_130_steim (PyObject *args,
+              int (*parse_steim) (uint8_t *, int32_t *, size_t, int32_t *, int32_t *),
+              const char *name)
 {
   const char *buf;
   int num, ret;
   Py_ssize_t len;
-  int32_t *data, x0, xn;
+  int32_t *data, x0 = 0, xn = 0;
+  PyArrayObject *arr;
   PyObject *input;
+  PyObject *out = NULL;
   
-  if (! PyArg_ParseTuple (args, "Oi", &input, &num))
+  if (! PyArg_ParseTuple (args, "Oi|O", &input, &num, &out))
 	return NULL;
 	
   if (PyObject_AsCharBuffer (input, &buf, &len) != 0)
 	return NULL;
 	
-  data = (int32_t *) calloc (num + 2, sizeof (int32_t));
-  if (data == NULL)
-	return PyErr_NoMemory ();
+  arr = int32_array (out, num + 2);
+  if (arr == NULL)
+	return NULL;
 	
-  ret = parse_steim1 ((uint8_t *) buf, data, num, &x0, &xn);
-  if (ret != 0) {
-	fprintf (stderr, "Warning: Steim1 raw data decompression error. Data from RefTek packet garbled.\n");
+  data = (int32_t *) PyArray_DATA (arr);
+  if (num > 0) {
+    ret = parse_steim ((uint8_t *) buf, data, num, &x0, &xn);
+    if (ret != 0) {
+      fprintf (stderr, "Warning: %s raw data decompression error. Data from RefTek packet garbled.\n", name);
+    }
   }
   data[num] = x0; data[num + 1] = xn;
-  //printf ("C %ld %ld\n", x0, xn);
-  /*   Dec Ref???   */
-  //buf = NULL;
-  return PyTuple_FromArray (data, num + 2);
+  return (PyObject *) arr;
+
+}
 
+/*   */
+PyObject *
+rt_130_parse_steim1 (PyObject *self, PyObject *args)
+{
+  return rt_130_steim (args, parse_steim1, "Steim1");
 }
 
 /*   */
 PyObject *
 rt_130_parse_steim2 (PyObject *self, PyObject *args)
+{
+  return rt_130_steim (args, parse_steim2, "Steim2");
+}
+
+/*
+ *   Decode the samples of a sequence of data packets, all the packets of
+ *   an event, in one call. Returns the samples of all packets in one
+ *   int32 array and an int32 array of the number of samples of each
+ *   packet.
+ */
+PyObject *
+rt_130_parse_packets (PyObject *self, PyObject *args)
 {
   const char *buf;
-  int num, ret;
-  Py_ssize_t len;
-  int32_t *data, x0, xn;
-  PyObject *input;
-  
-  if (! PyArg_ParseTuple (args, "Oi", &input, &num))
+  Py_ssize_t len, n, i;
+  npy_intp total = 0, num;
+  int max = 0, ret;
+  int32_t *scratch = NULL, *d, *c, x0, xn;
+  DataHeader dh;
+  PyObject *packets, *seq;
+  PyArrayObject *data = NULL, *counts = NULL;
+
+  if (! PyArg_ParseTuple (args, "O", &packets))
 	return NULL;
-	
-  if (PyObject_AsCharBuffer (input, &buf, &len) != 0)
-	return NULL;  
-	
-  data = (int32_t *) calloc (num + 2, sizeof (int32_t));
+
+  seq = PySequence_Fast (packets, "packets must be a sequence");
+  if (seq == NULL)
+	return NULL;
+
+  n = PySequence_Fast_GET_SIZE (seq);
+  num = n;
+  counts = (PyArrayObject *) PyArray_SimpleNew (1, &num, NPY_INT32);
+  if (counts == NULL)
+	goto fail;
+
+  /*   Sample counts from the data headers   */
+  c = (int32_t *) PyArray_DATA (counts);
+  for (i = 0; i < n; i++) {
+    if (PyObject_AsCharBuffer (PySequence_Fast_GET_ITEM (seq, i), &buf, &len) != 0)
+      goto fail;
+    parse_data_header ((unsigned char *) buf, &dh);
+    switch (dh.data_format) {
+      case 0x16: case 0x32: case 0xc0: case 0xc2:
+        break;
+      default:
+        PyErr_Format (PyExc_ValueError,
+                      "Can't parse data format 0x%x of packet %ld",
+                      dh.data_format, (long) i);
+        goto fail;
+    }
+    c[i] = dh.samples;
+    total += dh.samples;
+    if (dh.samples > max)
+      max = dh.samples;
+  }
+
+  data = (PyArrayObject *) PyArray_SimpleNew (1, &total, NPY_INT32);
   if (data == NULL)
-	return PyErr_NoMemory ();
-	
-  ret = parse_steim2 ((uint8_t *) buf, data, num, &x0, &xn);
-  if (ret != 0) {
-	fprintf (stderr, "Warning: Steim2 raw data decompression error. Data from RefTek packet garbled.\n");
+	goto fail;
+
+  /*   Steim decoding may write a sample past num   */
+  scratch = (int32_t *) calloc (max + 2, sizeof (int32_t));
+  if (scratch == NULL) {
+    PyErr_NoMemory ();
+    goto fail;
   }
-  data[num] = x0; data[num + 1] = xn;
-  /*   Dec Ref???   */
-  //buf = NULL;
-  return PyTuple_FromArray (data, num + 2);
+
+  d = (int32_t *) PyArray_DATA (data);
+  for (i = 0; i < n; i++) {
+    PyObject_AsCharBuffer (PySequence_Fast_GET_ITEM (seq, i), &buf, &len);
+    parse_data_header ((unsigned char *) buf, &dh);
+    if (dh.samples == 0)
+      continue;
+    switch (dh.data_format) {
+      case 0x16:
+        parse_int16 ((uint8_t *) buf, d, dh.samples);
+        break;
+      case 0x32:
+        parse_int32 ((uint8_t *) buf, d, dh.samples);
+        break;
+      case 0xc0: case 0xc2:
+        if (dh.data_format == 0xc0)
+          ret = parse_steim1 ((uint8_t *) buf, scratch, dh.samples, &x0, &xn);
+        else
+          ret = parse_steim2 ((uint8_t *) buf, scratch, dh.samples, &x0, &xn);
+        if (ret != 0) {
+          fprintf (stderr, "Warning: Steim raw data decompression error. Data from RefTek packet garbled.\n");
+        }
+        memcpy (d, scratch, dh.samples * sizeof (int32_t));
+        break;
+    }
+    d += dh.samples;
+  }
+
+  free (scratch);
+  Py_DECREF (seq);
+  return Py_BuildValue ("NN", data, counts);
+
+fail:
+  free (scratch);
+  Py_XDECREF (data);
+  Py_XDECREF (counts);
+  Py_DECREF (seq);
+  return NULL;
 
 }
 
@@ -252,10 +359,11 @@ rt_130_bcd2int (PyObject *self, PyObject *args)
 static PyMethodDef rt_130methods[] = {
   { "get_packet_header", rt_130_parse_packet_header, METH_VARARGS, "Parse an rt-130 packet header and return the contents." },
   { "get_data_header", rt_130_parse_data_header, METH_VARARGS, "Parse an rt-130 data packet header and return the contents." },
-  { "read_int16", rt_130_parse_int16, METH_VARARGS, "Parse two byte rt-130 data and return in an array." },
-  { "read_int32", rt_130_parse_int32, METH_VARARGS, "Parse four byte rt-130 data and return in an array."},
-  { "read_steim1", rt_130_parse_steim1, METH_VARARGS, "Parse steim1 compressed data from an rt-130 data packet."},
-  { "read_steim2", rt_130_parse_steim2, METH_VARARGS, "Parse steim2 compressed data from an rt-130 data packet."},
+  { "read_int16", rt_130_parse_int16, METH_VARARGS, "Parse two byte rt-130 data and return in an int32 array, out if given." },
+  { "read_int32", rt_130_parse_int32, METH_VARARGS, "Parse four byte rt-130 data and return in an int32 array, out if given."},
+  { "read_steim1", rt_130_parse_steim1, METH_VARARGS, "Parse steim1 compressed data from an rt-130 data packet. Returns an int32 array, out if given, of the samples then x0 and xn."},
+  { "read_steim2", rt_130_parse_steim2, METH_VARARGS, "Parse steim2 compressed data from an rt-130 data packet. Returns an int32 array, out if given, of the samples then x0 and xn."},
+  { "read_packets", rt_130_parse_packets, METH_VARARGS, "Parse the data of a sequence of rt-130 data packets. Returns an int32 array of all samples and an int32 array of the samples in each packet."},
   { "bcd2int", rt_130_bcd2int, METH_VARARGS, "Pass in a char buf in BCD and return an int"},
   { NULL, NULL, 0, NULL } 
 };
@@ -264,4 +372,5 @@ PyMODINIT_FUNC
 initrt_130_py (void)
 {
   (void) Py_InitModule ("rt_130_py", rt_130methods);
+  import_array ();
 }
@@ -72,9 +72,11 @@ import types
 import os
 import string
 import logging
+import numpy
+import uuid
 
 PH5VERSION = '4.1.2'
-PROG_VERSION = '2018.268'
+PROG_VERSION = '2026.291'
 LOGGER = logging.getLogger(__name__)
 
 #  TIME_TYPE = tables.Enum (['EPOCH', 'ASCII', 'BOTH'])
@@ -411,6 +413,19 @@ class Index (tables.IsDescription):
         ascii_s = tables.StringCol(32)
         micro_seconds_i = tables.Int32Col()
 
+
+class Availability (tables.IsDescription):
+    '''   Continuous segments of data for each DAS, channel and sample rate,
+          /Experiment_g/Receivers_g/Availability_t (optional)   '''
+    serial_number_s = tables.StringCol(64, pos=1)  # DAS serial number
+    channel_number_i = tables.Int8Col(pos=2)  # Channel number
+    sample_rate_i = tables.Int16Col(pos=3)  # Sample rate
+    sample_rate_multiplier_i = tables.Int16Col(pos=4)
+    start_epoch_d = tables.Float64Col(pos=5)  # First sample, epoch seconds
+    end_epoch_d = tables.Float64Col(pos=6)  # End of the last sample
+    # DAS_T_STAMP of Das_t when the segment was written
+    das_t_stamp_s = tables.StringCol(32, pos=7)
+
 # class Sort (tables.IsDescription) :
     # '''   Table to describe a data subset, such as a gather.
     # Also associates an instrument with a location on the ground   '''
@@ -801,17 +816,9 @@ def keys(ltable):
 
     return all, names
 
-# XXX   Should required_keys be a single key???   XXX
-
 
-def validate(ltable, p, required_keys=[]):
-    '''
-          Validate that key/value p has keys that match column names in ltable,
-          and optionally that the required keys in list
-          required_keys exist in p.
-    '''
-    fail_keys = []
-    fail_required = []
+def colpaths(ltable):
+    '''   Column paths of ltable as the keys of a dictionary   '''
     #
     # Try colpathnames, version 2 only, first
     try:
@@ -822,6 +829,23 @@ def validate(ltable, p, required_keys=[]):
     except AttributeError:
         all_keys = _flatten(ltable.colnames)
 
+    return all_keys
+
+# XXX   Should required_keys be a single key???   XXX
+
+
+def validate(ltable, p, required_keys=[], all_keys=None):
+    '''
+          Validate that key/value p has keys that match column names in ltable,
+          and optionally that the required keys in list
+          required_keys exist in p.
+          all_keys -> colpaths (ltable) when validating many rows
+    '''
+    fail_keys = []
+    fail_required = []
+    if all_keys is None:
+        all_keys = colpaths(ltable)
+
     for k in p.keys():
         if k not in all_keys:
             # Column does not exist so remove it from p
@@ -885,77 +909,285 @@ def _cast(vtype, val):
     return val
 
 
-def search(ltable, key, value):
-    # XXX   More sophisticated searches using table.where???
+# Key indexes kept while an IndexedBatch is open,
+# keyed on (file name, table path, key)
+KEY_INDEXES = {}
+_BATCH_DEPTH = 0
+
+
+def _key_value(value):
+    '''   Key values compare as stripped strings   '''
     if isinstance(value, types.StringType):
-        v = value.strip()
+        return value.strip()
 
-    for r in ltable.iterrows():
-        if isinstance(r[key], types.StringType):
-            rk = r[key].strip()
-        else:
-            rk = str(r[key])
+    return str(value)
 
-        if rk == v:
-            return r
 
-    return None
+def _key_values(ltable, key, start=0, stop=None):
+    '''   The key column of rows start to stop as _key_value strings   '''
+    col = ltable.read(start=start, stop=stop, field=key)
+    if col.dtype.kind == 'S':
+        return numpy.char.strip(col).tolist()
+
+    return [str(v) for v in col.tolist()]
+
+
+class KeyIndex(object):
+    '''
+       Map the values of column key in ltable to row numbers. Rows
+       appended to the table are picked up when the index is next used.
+    '''
+
+    def __init__(self, ltable, key):
+        self.ltable = ltable
+        self.key = key
+        self.rows = {}
+        self.nrows = 0
+
+    def extend(self):
+        '''   Index rows added since the last call   '''
+        nrows = self.ltable.nrows
+        if nrows < self.nrows:
+            # Rows were removed, start over
+            self.rows = {}
+            self.nrows = 0
+        if nrows == self.nrows:
+            return
+        values = _key_values(self.ltable, self.key, self.nrows, nrows)
+        rows = self.rows
+        for i, v in enumerate(values, self.nrows):
+            if v in rows:
+                rows[v].append(i)
+            else:
+                rows[v] = [i]
+        self.nrows = nrows
+
+    def find(self, value):
+        '''   Row numbers where column key matches value   '''
+        self.extend()
+        return self.rows.get(_key_value(value), [])
+
+
+class IndexedBatch(object):
+    '''
+       While open, search, lindex, update and delete look rows up in a
+       KeyIndex built once per table and key instead of scanning the
+       table on each call. Tables should only be changed through this
+       module while the batch is open.
+
+           with columns.IndexedBatch():
+               for p in rows:
+                   columns.update(ltable, p, key)
+    '''
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def open(self):
+        global _BATCH_DEPTH
+        _BATCH_DEPTH += 1
+        return self
+
+    def close(self):
+        '''   Key indexes are dropped when the outermost batch closes   '''
+        global _BATCH_DEPTH
+        _BATCH_DEPTH -= 1
+        if _BATCH_DEPTH == 0:
+            KEY_INDEXES.clear()
+
+
+def _drop_key_indexes(ltable, keys=None):
+    '''   Forget key indexes on ltable, for keys or all of them   '''
+    if not KEY_INDEXES:
+        return
+    tkey = _writer_key(ltable)
+    for k in KEY_INDEXES.keys():
+        if k[:2] == tkey and (keys is None or k[2] in keys):
+            del KEY_INDEXES[k]
+
+
+def find_rows(ltable, key, value):
+    '''   Row numbers in ltable where column key matches value   '''
+    write_pending(ltable)
+    if _BATCH_DEPTH:
+        k = _writer_key(ltable) + (key,)
+        if k not in KEY_INDEXES:
+            KEY_INDEXES[k] = KeyIndex(ltable, key)
+        return KEY_INDEXES[k].find(value)
+
+    v = _key_value(value)
+    values = _key_values(ltable, key)
+    return [i for i, rk in enumerate(values) if rk == v]
+
+
+def search(ltable, key, value):
+    rows = find_rows(ltable, key, value)
+    if not rows:
+        return None
+
+    for r in ltable.iterrows(start=rows[0], stop=rows[0] + 1):
+        return r
 
 
 def lindex(ltable, value, key):
-    if isinstance(value, types.StringType):
-        v = value.strip()
+    rows = find_rows(ltable, key, value)
+    if not rows:
+        return None
 
-    i = 0
-    for r in ltable.iterrows():
-        if isinstance(r[key], types.StringType):
-            rk = r[key].strip()
-        else:
-            rk = str(r[key])
+    return rows[0]
 
-        if rk == v:
-            return i
-        else:
-            i = i + 1
 
-    return None
+# Das_t attribute replaced with a new token when Das_t is written.
+# Availability_t rows hold the token of the Das_t they were written from.
+DAS_T_STAMP = 'das_t_stamp'
+# Das_t written and not summarized since, (file name, table path) -> DAS
+# serial number. Kept when ph5close reloads this module.
+try:
+    DAS_T_WRITTEN
+except NameError:
+    DAS_T_WRITTEN = {}
+
+
+def _das_t_key(ltable):
+    return (os.path.abspath(ltable._v_file.filename), ltable._v_pathname)
+
+
+def das_t_stamp(ltable):
+    '''   The DAS_T_STAMP of a Das_t, None if it has none   '''
+    return getattr(ltable._v_attrs, DAS_T_STAMP, None)
+
+
+def stamp_das_t(ltable):
+    '''   Give a Das_t a new DAS_T_STAMP and return it   '''
+    stamp = uuid.uuid4().hex
+    setattr(ltable._v_attrs, DAS_T_STAMP, stamp)
+    return stamp
+
+
+def touch(ltable):
+    '''
+       Record a write to ltable. The first write to a Das_t since it was
+       summarized gives it a new stamp and adds it to DAS_T_WRITTEN.
+    '''
+    if ltable._v_name != 'Das_t':
+        return
+    key = _das_t_key(ltable)
+    if key not in DAS_T_WRITTEN:
+        stamp_das_t(ltable)
+        DAS_T_WRITTEN[key] = ltable._v_parent._v_name[len('Das_g_'):]
+
+
+def summarized(ltable):
+    '''   Remove a Das_t from DAS_T_WRITTEN   '''
+    DAS_T_WRITTEN.pop(_das_t_key(ltable), None)
 
 
 def delete(ltable, value, key):
     r = lindex(ltable, value, key)
     if r is not None:
-        ltable.remove_rows(r)
+        touch(ltable)
+        ltable.remove_row(r)
         ltable.flush()
+        _drop_key_indexes(ltable)
 
 
 def update(ltable, p, key):
     #
     # Find row and update
     #
-    if isinstance(p[key], types.StringType):
-        v = p[key].strip()
+    rows = find_rows(ltable, key, p[key])
+    if rows:
+        recs = ltable.read_coordinates(rows)
+        for k in p.keys():
+            try:
+                _column(recs, k)[:] = p[k]
+            except IndexError:
+                # Not all columns need exist
+                pass
+
+        touch(ltable)
+        ltable.modify_coordinates(rows, recs)
+        # Other key columns may have changed
+        _drop_key_indexes(ltable, [k for k in p.keys() if k != key])
+
+    ltable.flush()
 
-    # Not sure why this does not work using the search proceedure above?
-    for r in ltable.iterrows():
-        if isinstance(r[key], types.StringType):
-            rk = r[key].strip()
-        else:
-            rk = str(r[key])
 
-        if rk == v:
+def update_rows(ltable, ps, key):
+    '''
+       update (ltable, p, key) for each p in ps, in order, with the rows
+       matched read and modified once for all of them
+    '''
+    found = []
+    for p in ps:
+        found.append(find_rows(ltable, key, p[key]))
+    coords = sorted(set(r for rows in found for r in rows))
+    if coords:
+        pos = dict((r, i) for i, r in enumerate(coords))
+        recs = ltable.read_coordinates(coords)
+        for p, rows in zip(ps, found):
+            if not rows:
+                continue
+            i = [pos[r] for r in rows]
             for k in p.keys():
                 try:
-                    r.__setitem__(k, p[k])
+                    _column(recs, k)[i] = p[k]
                 except IndexError:
                     # Not all columns need exist
                     pass
 
-            r.update()
+        touch(ltable)
+        ltable.modify_coordinates(coords, recs)
+        # Other key columns may have changed
+        _drop_key_indexes(ltable, set(k for p in ps for k in p.keys()
+                                      if k != key))
+
+    ltable.flush()
+
 
+def delete_rows(ltable, values, key):
+    '''
+       delete (ltable, value, key) for each value in values, removing
+       the rows after they are all found
+    '''
+    doomed = set()
+    deleted = {}
+    for value in values:
+        rows = find_rows(ltable, key, value)
+        # Rows of value deleted so far are still in rows
+        v = _key_value(value)
+        n = deleted.get(v, 0)
+        if n < len(rows):
+            doomed.add(rows[n])
+            deleted[v] = n + 1
+    if not doomed:
+        return
+
+    touch(ltable)
+    # Remove runs of rows from the end so row numbers stay valid
+    doomed = sorted(doomed, reverse=True)
+    stop = start = doomed[0]
+    for r in doomed[1:] + [None]:
+        if r == start - 1:
+            start = r
+            continue
+        ltable.remove_rows(start, stop + 1)
+        start = stop = r
     ltable.flush()
+    _drop_key_indexes(ltable)
 
 
 def append(ltable, p):
+    if BULK_WRITERS:
+        writer = BULK_WRITERS.get(_writer_key(ltable))
+        if writer is not None:
+            writer.append(p)
+            return
+
+    touch(ltable)
     r = ltable.row
     try:
         vtypes = ltable.coltypes
@@ -979,6 +1211,164 @@ def append(ltable, p):
     ltable.flush()
 
 
+# Rows buffered by a BulkWriter before they are appended to the table
+BULK_CHUNKSIZE = 4096
+# Open BulkWriters keyed on (file name, table path)
+BULK_WRITERS = {}
+
+
+def _writer_key(ltable):
+    return (ltable._v_file.filename, ltable._v_pathname)
+
+
+def _caster(vtype):
+    '''   Return the function _cast uses to convert a string for vtype   '''
+    if vtype in ('Float64', 'float64', 'Float32', 'float32'):
+        return float
+    elif vtype in ('Int64', 'int64', 'UInt32', 'uint32'):
+        return long
+    elif vtype in ('Int32', 'int32', 'Int16', 'int16', 'UInt16', 'uint16',
+                   'Int8', 'int8', 'UInt8', 'uint8'):
+        return int
+
+    return None
+
+
+def _column(recs, path):
+    '''   The field of structured array recs for column path a/b/c   '''
+    for name in path.split('/'):
+        recs = recs[name]
+    return recs
+
+
+def is_buffered(ltable):
+    '''   Is a BulkWriter open on ltable?   '''
+    return bool(BULK_WRITERS) and _writer_key(ltable) in BULK_WRITERS
+
+
+def bulk_colpaths(ltable):
+    '''   Column paths of ltable cached by its open BulkWriter, for
+          validate, None if it is not buffered   '''
+    if BULK_WRITERS:
+        writer = BULK_WRITERS.get(_writer_key(ltable))
+        if writer is not None:
+            return writer.colkeys
+
+    return None
+
+
+def write_pending(ltable):
+    '''   Append any rows a BulkWriter is holding for ltable   '''
+    if BULK_WRITERS:
+        writer = BULK_WRITERS.get(_writer_key(ltable))
+        if writer is not None:
+            writer.write()
+
+
+class BulkWriter(object):
+    '''
+       Append rows to ltable in chunks of chunksize rows and flush once
+       when closed. Rows are cast as in append, but are collected in a
+       numpy structured array and written with a single Table.append
+       per chunk.
+
+           with columns.BulkWriter(ltable) as w:
+               for p in rows:
+                   w.append(p)
+
+       While the writer is open append and populate on ltable go through
+       it, and search, lindex, update and delete write the pending rows
+       first. Reads through tables directly do not see pending rows.
+    '''
+
+    def __init__(self, ltable, chunksize=BULK_CHUNKSIZE):
+        self.ltable = ltable
+        self.chunksize = chunksize
+        self.key = _writer_key(ltable)
+        self.nrows = 0
+        self.npending = 0
+        # Column types and casts are worked out once for the table
+        try:
+            vtypes = ltable.coltypes
+        except AttributeError:
+            vtypes = ltable.colstypes
+        self.casters = {}
+        for k, t in vtypes.items():
+            self.casters[k] = _caster(t)
+        self.empty = numpy.zeros(1, dtype=ltable.dtype)
+        for k, d in ltable.coldflts.items():
+            _column(self.empty, k)[0] = d
+        self.buf = numpy.empty(chunksize, dtype=ltable.dtype)
+        self.buf[:] = self.empty
+        self.cols = {}
+        for k in vtypes.keys():
+            self.cols[k] = _column(self.buf, k)
+        self.colkeys = set(self.cols)
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def open(self):
+        '''   Route append and populate on ltable through this writer   '''
+        if self.key in BULK_WRITERS and BULK_WRITERS[self.key] is not self:
+            raise ValueError("A BulkWriter is already open on {0}"
+                             .format(self.key[1]))
+        BULK_WRITERS[self.key] = self
+        return self
+
+    def append(self, p):
+        '''   Add row p, a dictionary keyed on column path   '''
+        if not self.colkeys.issuperset(p):
+            # Unknown columns raise KeyError as in append
+            raise KeyError(sorted(set(p) - self.colkeys)[0])
+        i = self.npending
+        for k, val in p.items():
+            if val is None:
+                continue
+            if isinstance(val, types.StringType):
+                val = val.strip()
+                if val == "":
+                    continue
+                caster = self.casters[k]
+                if caster is not None:
+                    try:
+                        val = caster(val)
+                    except ValueError:
+                        continue
+
+            try:
+                self.cols[k][i] = val
+            except Exception as e:
+                LOGGER.warning("Warning in append: Exception \'%s\'" % e)
+
+        self.npending = i + 1
+        if self.npending == self.chunksize:
+            self.write()
+
+    def write(self):
+        '''   Append the pending rows to ltable   '''
+        n = self.npending
+        if n == 0:
+            return
+        touch(self.ltable)
+        self.ltable.append(self.buf[:n])
+        self.buf[:n] = self.empty
+        self.nrows += n
+        self.npending = 0
+
+    def close(self):
+        '''   Write pending rows, flush ltable and stop buffering   '''
+        try:
+            self.write()
+            self.ltable.flush()
+        finally:
+            if BULK_WRITERS.get(self.key) is self:
+                del BULK_WRITERS[self.key]
+
+
 def is_mini(ltable):
     '''
        Check to see if this is an external file, and re-open 'a'
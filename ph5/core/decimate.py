@@ -3,14 +3,15 @@
 import firfilt_py
 import logging
 
-PROG_VERSION = '2018.268'
+PROG_VERSION = '2026.291'
 LOGGER = logging.getLogger(__name__)
 
 
 def decimate(decfacts, data_in):
     n = len(data_in)
+    # int32 array of the decimated samples then the shift
     data_out = firfilt_py.decimate(data_in, n, decfacts)
-    samp_shift = data_out[-1]
+    samp_shift = int(data_out[-1])
 
     return samp_shift, data_out[:-1]
 
@@ -14,20 +14,40 @@ import sys
 import logging
 import string
 import re
+from collections import OrderedDict
 from ph5.core import columns
 try:
     import importlib.reload as reload
 except ImportError:
     pass
 
-PROG_VERSION = '2024.318'
+PROG_VERSION = '2026.291'
 LOGGER = logging.getLogger(__name__)
 ZLIBCOMP = 6
+# Compression profile of new data, SOH and log arrays when none is recorded
+COMPRESSION = 'zlib'
+# Compression profile -> tables.Filters arguments. zlib:1 to zlib:9 are
+# zlib at that level.
+COMPRESSION_PROFILES = {
+    'zlib': {'complib': 'zlib', 'complevel': ZLIBCOMP},
+    'blosc:lz4': {'complib': 'blosc:lz4', 'complevel': 5, 'shuffle': True},
+    'blosc:zstd': {'complib': 'blosc:zstd', 'complevel': 5,
+                   'shuffle': True},
+    'lzo': {'complib': 'lzo', 'complevel': 1, 'shuffle': True},
+    'none': {'complevel': 0}
+}
+# Target size in bytes of a chunk of new data, SOH and log arrays. A cut
+# decompresses every chunk it touches, so smaller chunks make short cuts
+# from long arrays cheaper at some cost in compression.
+CHUNK_BYTES = 16 * 1024
+# Default number of mini files an ExperimentGroup keeps open
+MAX_OPEN_MINI_FILES = 64
 
 os.environ['TZ'] = 'UTM'
 time.tzset()
 
 externalLinkRE = re.compile(".*ExternalLink.*")
+miniPH5RE = re.compile(r".*miniPH5_(\d\d\d\d\d)\.ph5")
 
 
 def check_srm_valid(rows, keys, tablename, ignore_srm=False):
@@ -69,6 +89,67 @@ class HDF5InteractionError (Exception):
         self.msg = msg
 
 
+def compression_profiles():
+    '''   Names of the compression profiles   '''
+    return sorted(COMPRESSION_PROFILES.keys()) + \
+        ['zlib:{0}'.format(i) for i in range(1, 10)]
+
+
+def compression_filters(profile=None):
+    '''   Filters new arrays are written with under a compression profile.
+          Readers do not need to know the profile, HDF5 records the filters
+          of each array.
+          Inputs:
+             profile -> one of compression_profiles(), None for the default
+          Returns:
+             tables.Filters
+    '''
+    if profile is None:
+        profile = COMPRESSION
+    if profile in COMPRESSION_PROFILES:
+        kwargs = COMPRESSION_PROFILES[profile]
+    elif profile[:5] == 'zlib:' and profile[5:] in \
+            [str(i) for i in range(1, 10)]:
+        kwargs = {'complib': 'zlib', 'complevel': int(profile[5:])}
+    else:
+        raise HDF5InteractionError(
+            8, "Unknown compression profile {0}. Choose from {1}."
+            .format(profile, ', '.join(compression_profiles())))
+    # zlib is built into PyTables, lzo, blosc and blosc codecs may not be
+    lib, _, codec = kwargs.get('complib', '').partition(':')
+    if lib in ('lzo', 'blosc'):
+        if tables.which_lib_version(lib) is None or \
+                (codec and codec not in tables.blosc_compressor_list()):
+            raise HDF5InteractionError(
+                8, "Compression profile {0} is not available in this "
+                "PyTables.".format(profile))
+
+    return tables.Filters(**kwargs)
+
+
+def chunk_rows(itemsize, nrows=None, sample_rate=None,
+               chunk_bytes=CHUNK_BYTES):
+    '''   Rows per chunk of a new array
+          Inputs:
+             itemsize -> bytes per row
+             nrows -> rows the array is expected to hold, chunks are no
+                      longer than this
+             sample_rate -> samples per second, chunks hold whole seconds
+                            when a second fits in chunk_bytes
+             chunk_bytes -> target size of a chunk
+          Returns:
+             rows per chunk
+    '''
+    rows = max(1, int(chunk_bytes // itemsize))
+    if sample_rate and sample_rate == int(sample_rate) and \
+            1 <= sample_rate <= rows:
+        rows = rows // int(sample_rate) * int(sample_rate)
+    if nrows:
+        rows = min(rows, int(nrows))
+
+    return max(1, rows)
+
+
 class MapsGroup:
     ''' /Experiment_g/Maps_g
                         /Das_g_[nnnn]
@@ -251,7 +332,8 @@ class MapsGroup:
                        key,
                        required_keys)
 
-        self.ph5.flush()
+        if not columns.is_buffered(self.ph5_t_index):
+            self.ph5.flush()
 #
 # Mixins refactor here Dec 11
 #
@@ -403,6 +485,58 @@ class SortsGroup:
 
         return ret
 
+    def read_offsets_fast(self, pairs, name=None):
+        '''   Read offsets for many shot and station pairs in one pass
+              Inputs:
+                 pairs -> list of (shot id_s, station id_s)
+                 name -> offset table name, Offset_t_002_003
+              Returns:
+                 A dictionary keyed on (shot, station) as strings, each
+                 holding what read_offset_fast returns for the pair
+        '''
+        if name is None and 'Offset_t' in self.ph5_t_offset:
+            # Legacy
+            name = 'Offset_t'
+
+        pairs = [(str(shot), str(station)) for shot, station in pairs]
+        ret = dict((p, {}) for p in pairs)
+        if not pairs:
+            return ret
+        table = self.ph5_t_offset[name]
+        shots = sorted(set([shot for shot, station in pairs]))
+        stations = sorted(set([station for shot, station in pairs]))
+        # Use the indexes from index_offset_table for a single shot or
+        # station, else read just the id columns to find the rows
+        if len(shots) == 1 and table.cols.event_id_s.is_indexed:
+            rows = table.read_where(
+                "event_id_s == b'{0}'".format(shots[0]))
+        elif len(stations) == 1 and table.cols.receiver_id_s.is_indexed:
+            rows = table.read_where(
+                "receiver_id_s == b'{0}'".format(stations[0]))
+        else:
+            keep = numpy.in1d(table.col('event_id_s'), shots) & \
+                numpy.in1d(table.col('receiver_id_s'), stations)
+            rows = table.read_coordinates(numpy.flatnonzero(keep))
+
+        found = zip(rows['event_id_s'].tolist(),
+                    rows['receiver_id_s'].tolist(),
+                    rows['offset']['value_d'].tolist(),
+                    rows['offset']['units_s'].tolist(),
+                    rows['azimuth']['value_f'].tolist(),
+                    rows['azimuth']['units_s'].tolist())
+        for shot, station, offset, offset_units, azimuth, azimuth_units \
+                in found:
+            if (shot, station) not in ret:
+                continue
+            ret[(shot, station)] = {'offset/value_d': offset,
+                                    'offset/units_s': offset_units,
+                                    'azimuth/value_f': azimuth,
+                                    'azimuth/units_s': azimuth_units,
+                                    'event_id_s': shot,
+                                    'receiver_id_s': station}
+
+        return ret
+
     def read_offsets(self, shotrange=None, stations=None, name='Offset_t'):
         offsets = []
 
@@ -696,6 +830,138 @@ class SortsGroup:
         return rm_das_arrays
 
 
+class MiniFilePool(object):
+    '''   Least recently used pool of open mini files. Das_g external
+          links are dereferenced through the pool so each mini file is
+          opened once, instead of once per link, and closed only when the
+          pool is full or closed. The first link to a file holds it, so
+          closing the master closes it as for any external link.
+          max_open -> Most files kept open, at least 1
+          opens -> Number of files opened
+          hits -> Number of links dereferenced with the file already open
+          closes -> Number of files closed to stay under max_open
+    '''
+
+    def __init__(self, max_open=MAX_OPEN_MINI_FILES):
+        self.max_open = max_open
+        self.opens = 0
+        self.hits = 0
+        self.closes = 0
+        self._links = OrderedDict()
+
+    def __len__(self):
+        return len(self._links)
+
+    def __repr__(self):
+        return "Open: {0}/{1} Opens: {2} Hits: {3} Closes: {4}".format(
+            len(self), self.max_open, self.opens, self.hits, self.closes)
+
+    def node(self, link, mode='r'):
+        '''   Return the node an external link points to, opening its
+              file in mode if it is not open   '''
+        filename, target = link._get_filename_node()
+        if not os.path.isabs(filename):
+            # Relative to the file holding the link as PyTables resolves it
+            filename = os.path.join(
+                os.path.dirname(link._v_file.filename), filename)
+        key = (os.path.abspath(filename), mode)
+        holder = self._links.pop(key, None)
+        if holder is not None and holder._v_isopen and \
+                holder.extfile is not None and holder.extfile.isopen:
+            self.hits += 1
+            node = holder.extfile.get_node(target)
+        else:
+            node = link(mode=mode)
+            holder = link
+            self.opens += 1
+        # Most recently used last
+        self._links[key] = holder
+        while len(self._links) > max(self.max_open, 1):
+            k, h = self._links.popitem(last=False)
+            # A closed link has already closed its file
+            if h._v_isopen:
+                h.umount()
+            self.closes += 1
+
+        return node
+
+    def close(self):
+        '''   Close all files in the pool   '''
+        while self._links:
+            k, h = self._links.popitem(last=False)
+            if h._v_isopen:
+                h.umount()
+
+
+class MiniAllocator(object):
+    '''   Picks the miniPH5_xxxxx file loaders write the data of a DAS to.
+          A DAS stays in the file it is in. A new DAS goes to the newest
+          file, or the next one if max_bytes would be passed. With
+          num_mini, each new DAS goes to the next file until num_mini
+          files from first_mini are used, then to the smallest file.
+          The DAS of Index_t and the sizes of the mini files are read
+          once and kept up to date in memory as data is allocated.
+          max_bytes -> Most bytes in a mini file
+          first_mini -> Number of the first mini file
+          num_mini -> Number of mini files to spread DAS over, or None
+          das_mini -> {DAS serial number: mini file number}
+          sizes -> {mini file number: bytes}
+          newest -> Largest mini file number in use, None if none
+    '''
+
+    def __init__(self, max_bytes, index_rows=(), first_mini=1,
+                 num_mini=None, path='.'):
+        self.max_bytes = max_bytes
+        self.first_mini = first_mini
+        self.num_mini = num_mini
+        self.das_mini = {}
+        self.newest = None
+        for i in index_rows:
+            n = int(miniPH5RE.match(i['external_file_name_s']).group(1))
+            # The first row of a DAS names its file
+            self.das_mini.setdefault(i['serial_number_s'], n)
+            if self.newest is None or n > self.newest:
+                self.newest = n
+        self.sizes = {}
+        for f in os.listdir(path):
+            mo = miniPH5RE.match(f)
+            if mo:
+                self.sizes[int(mo.group(1))] = os.path.getsize(
+                    os.path.join(path, f))
+
+    @staticmethod
+    def name(n):
+        '''   Nickname of mini file number n   '''
+        return "miniPH5_{0:05d}".format(n)
+
+    def allocate(self, das, size_of_data):
+        '''   Return the nickname of the mini file size_of_data bytes of
+              das go to and count them in its size   '''
+        das = str(das)
+        if das in self.das_mini:
+            n = self.das_mini[das]
+        elif self.newest is None:
+            # This is the first file added
+            n = self.first_mini
+        elif self.num_mini is not None:
+            if self.newest - (self.first_mini - 1) < self.num_mini:
+                n = self.newest + 1
+            else:
+                n = min(self.sizes, key=lambda k: (self.sizes[k], k))
+        elif self.sizes.get(self.newest, 0) + size_of_data > \
+                self.max_bytes:
+            n = self.newest + 1
+        else:
+            n = self.newest
+
+        self.das_mini[das] = n
+        if self.newest is None or n > self.newest:
+            self.newest = n
+        self.sizes[n] = self.sizes.get(n, 0) + size_of_data
+
+        return self.name(n)
+
+
 class Data_Trace (object):
     __slots__ = ("das", "epoch", "length", "channel",
                  "data_trace", "receiver", "keys")
@@ -719,6 +985,8 @@ class ReceiversGroup:
                                     /Receiver_t            # columns.Receiver
                                     /Time_t                # columns.Time
                                     /Index_t               # columns.Index
+                                    /Availability_t
+                                    # columns.Availability (optional)
     '''
 
     def __init__(self, ph5):
@@ -729,6 +997,12 @@ class ReceiversGroup:
         self.ph5_t_receiver = None  # Current receiver table
         self.ph5_t_time = None  # Current time table
         self.ph5_t_index = None                             #
+        self.ph5_t_availability = None  # Availability table, None if missing
+        self.filters = None  # Filters of new arrays, None for the default
+        self.chunk_bytes = CHUNK_BYTES  # Target chunk size of new arrays
+        # MiniFilePool to open mini files through, None to let each
+        # external link open its own
+        self.mini_files = None
         # Match arrays under Das_g_[sn]
         self.arrayRE = re.compile(r"([DSEL]\w+_a_)(\d+)")
         self.dasRE = re.compile(r"Das_g_(.+)")  # Match Das_g groups
@@ -784,6 +1058,15 @@ class ReceiversGroup:
 
         return ret, keys
 
+    def read_availability(self):
+        '''   Read Availability table   '''
+        if self.ph5_t_availability is None:
+            return None, None
+
+        ret, keys = read_table(self.ph5_t_availability)
+
+        return ret, keys
+
     def get_array_nodes(self, name):
         '''   Find array nodes based on name prefix   '''
         arrays = get_nodes_by_name(self.ph5,
@@ -851,12 +1134,17 @@ class ReceiversGroup:
 
         return t, trace_ref.byteorder
 
-    def read_trace(self, trace_ref, start=None, stop=None):
-        '''   Read data trace   '''
+    def read_trace(self, trace_ref, start=None, stop=None, out=None):
+        '''   Read data trace, optionally into the preallocated array out
+              (a contiguous slice of a larger buffer works)   '''
+        if out is not None and out.dtype != trace_ref.atom.dtype:
+            # PyTables can only read directly into a matching type
+            out[:] = self.read_trace(trace_ref, start=start, stop=stop)
+            return out
         if start is None and stop is None:
-            data = trace_ref.read()
+            data = trace_ref.read(out=out)
         else:
-            data = trace_ref.read(start=start, stop=stop)
+            data = trace_ref.read(start=start, stop=stop, out=out)
         return data
 
     def find_trace_ref(self, name):
@@ -934,10 +1222,11 @@ class ReceiversGroup:
         # If this is an external link it needs to be redirected.
         if externalLinkRE.match(g.__str__()):
             try:
-                if self.ph5.mode == 'r':
-                    g = g()
+                mode = 'r' if self.ph5.mode == 'r' else 'a'
+                if self.mini_files is not None:
+                    g = self.mini_files.node(g, mode=mode)
                 else:
-                    g = g(mode='a')
+                    g = g(mode=mode)
             except tables.exceptions.NoSuchNodeError:
                 self.current_g_das = None
                 self.current_t_das = None
@@ -1024,28 +1313,47 @@ class ReceiversGroup:
 
     def newearray(self, name, description=None, expectedrows=None):
         batom = tables.StringAtom(itemsize=80)
+        chunkshape = (chunk_rows(batom.itemsize, expectedrows,
+                                 chunk_bytes=self.chunk_bytes),)
         a = create_empty_earray(self.ph5,
                                 self.current_g_das,
                                 name,
                                 batom=batom,
-                                expectedrows=expectedrows)
+                                expectedrows=expectedrows,
+                                filters=self.filters,
+                                chunkshape=chunkshape)
 
         if description is not None:
             a.attrs.description = description
 
         return a
 
-    def newdataearray(self, name, data, batom=None, rows=None):
+    def newdataearray(self, name, data, batom=None, rows=None,
+                      sample_rate=None):
+        '''
+              Data array with chunks of whole seconds of samples of about
+              self.chunk_bytes, no longer than the array
+              inputs: rows        --- samples the array will hold,
+                                      len(data) if None
+                      sample_rate --- samples per second
+        '''
+        if rows is None:
+            rows = len(data)
+        chunkshape = (chunk_rows(batom.itemsize, rows, sample_rate,
+                                 self.chunk_bytes),)
         a = create_data_earray(self.ph5,
                                self.current_g_das,
                                name,
                                data,
                                batom,
-                               rows=rows)
+                               rows=rows,
+                               filters=self.filters,
+                               chunkshape=chunkshape)
 
         return a
 
-    def newarray(self, name, data, dtype=None, description=None):
+    def newarray(self, name, data, dtype=None, description=None,
+                 sample_rate=None, rows=None):
         '''
               name is name of array as follows:
               Data_a_[event_number]   --- Numarray array
@@ -1056,6 +1364,9 @@ class ReceiversGroup:
               inputs: name        --- name of array
                       data        --- data to place in array
                       description --- description of array
+                      sample_rate --- samples per second of a data array
+                      rows        --- samples a data array will hold once
+                                      appended to, len(data) if None
 
               returns: tables array descriptor
         '''
@@ -1078,10 +1389,17 @@ class ReceiversGroup:
                 pass
 
             if dtype == 'int32':
-                a = self.newdataearray(name, data, batom=tables.Int32Atom())
+                a = self.newdataearray(name, data, batom=tables.Int32Atom(),
+                                       rows=rows, sample_rate=sample_rate)
             elif dtype == 'float32':
-                a = self.newdataearray(name, data, batom=tables.Float32Atom())
+                a = self.newdataearray(name, data,
+                                       batom=tables.Float32Atom(),
+                                       rows=rows, sample_rate=sample_rate)
             else:
+                # Earrays convert as they append, arrays keep the order
+                if isinstance(data, numpy.ndarray) and\
+                   not data.dtype.isnative:
+                    data = data.astype(data.dtype.newbyteorder('='))
                 a = self.ph5.create_array(self.current_g_das, name, data)
 
         if description is not None:
@@ -1095,7 +1413,8 @@ class ReceiversGroup:
 
         populate_table(self.current_t_das, p, key, required_keys)
 
-        self.ph5.flush()
+        if not columns.is_buffered(self.current_t_das):
+            self.ph5.flush()
 
     def populateReceiver_t(self, p, key=None):
         required_keys = []
@@ -1118,14 +1437,25 @@ class ReceiversGroup:
 
         populate_table(self.ph5_t_time, p, key, required_keys)
 
-        self.ph5.flush()
+        if not columns.is_buffered(self.ph5_t_time):
+            self.ph5.flush()
 
     def populateIndex_t(self, p, key=None):
         required_keys = ['serial_number_s', 'external_file_name_s']
 
         populate_table(self.ph5_t_index, p, key, required_keys)
 
-        self.ph5.flush()
+        if not columns.is_buffered(self.ph5_t_index):
+            self.ph5.flush()
+
+    def populateAvailability_t(self, p, key=None):
+        required_keys = ['serial_number_s', 'channel_number_i',
+                         'start_epoch_d', 'end_epoch_d']
+
+        populate_table(self.ph5_t_availability, p, key, required_keys)
+
+        if not columns.is_buffered(self.ph5_t_availability):
+            self.ph5.flush()
 
     def indexIndex_t(self):
         '''   Set up indexing on DAS SN and external mini filename   '''
@@ -1171,6 +1501,29 @@ class ReceiversGroup:
             '/Experiment_g/Receivers_g/Time_t', self.ph5_t_time)
         columns.add_reference(
             '/Experiment_g/Receivers_g/Index_t', self.ph5_t_index)
+        # Availability table is only there once it has been built
+        if self.ph5.__contains__('/Experiment_g/Receivers_g/Availability_t'):
+            self.newAvailability_t()
+
+    def newAvailability_t(self):
+        '''   Create Availability_t if it does not exist   '''
+        self.ph5_t_availability = initialize_table(
+            self.ph5,
+            '/Experiment_g/Receivers_g',
+            'Availability_t',
+            columns.Availability)
+        columns.add_reference(
+            '/Experiment_g/Receivers_g/Availability_t',
+            self.ph5_t_availability)
+
+        return self.ph5_t_availability
+
+    def nuke_availability_t(self):
+        if self.ph5_t_availability is None:
+            return
+        self.ph5_t_availability.remove()
+        self.ph5_t_availability = None
+        columns.TABLES.pop('/Experiment_g/Receivers_g/Availability_t', None)
 
     def nuke_index_t(self):
         self.ph5_t_index.remove()
@@ -1189,6 +1542,7 @@ class ReceiversGroup:
         if not g:
             return False
         self.setcurrent(g)
+        columns.touch(self.current_t_das)
         self.current_t_das.truncate(0)
         return True
 
@@ -1360,6 +1714,8 @@ class ExperimentGroup:
         self.ph5_g_reports = None  # Reports group
         self.ph5_g_responses = None
         self.ph5_g_maps = None  # Maps group
+        # Mini files opened through Das_g external links
+        self.mini_files = MiniFilePool()
 
     def version(self):
         return columns.PH5VERSION
@@ -1421,6 +1777,7 @@ class ExperimentGroup:
                           .format(self.filename))
 
     def ph5close(self):
+        self.mini_files.close()
         if self.ph5 is not None and self.ph5.isopen:
             self.ph5.close()
             self.ph5 = None
@@ -1469,7 +1826,9 @@ class ExperimentGroup:
         self.ph5_g_sorts.initgroup()
 
         self.ph5_g_receivers = ReceiversGroup(self.ph5)
+        self.ph5_g_receivers.mini_files = self.mini_files
         self.ph5_g_receivers.initgroup()
+        self.use_compression(self.get_compression())
 
         self.ph5_g_reports = ReportsGroup(self.ph5)
         self.ph5_g_reports.initgroup()
@@ -1480,6 +1839,38 @@ class ExperimentGroup:
         self.ph5_g_maps = MapsGroup(self.ph5)
         self.ph5_g_maps.initgroup()
 
+    def get_compression(self):
+        '''   Compression profile new data, SOH and log arrays are written
+              with, as recorded in Experiment_g, COMPRESSION if none is
+              recorded   '''
+        return getattr(self.ph5_g_experiment._v_attrs,
+                       'compression_profile_s', COMPRESSION)
+
+    def use_compression(self, profile):
+        '''   Write new data, SOH and log arrays with a compression profile
+              without recording it, as mini files do with the profile of
+              their master. Warns and writes with COMPRESSION if profile
+              can not be used here.
+              Inputs:
+                 profile -> one of compression_profiles()
+        '''
+        try:
+            self.ph5_g_receivers.filters = compression_filters(profile)
+        except HDF5InteractionError as e:
+            LOGGER.warning("{0} Writing new arrays with {1}."
+                           .format(e.msg, COMPRESSION))
+            self.ph5_g_receivers.filters = None
+
+    def set_compression(self, profile):
+        '''   Record the compression profile in Experiment_g and write new
+              data, SOH and log arrays with it
+              Inputs:
+                 profile -> one of compression_profiles()
+        '''
+        filters = compression_filters(profile)
+        self.ph5_g_experiment._v_attrs.compression_profile_s = profile
+        self.ph5_g_receivers.filters = filters
+
     def nuke_experiment_t(self):
         self.ph5_t_experiment.remove()
         # Create experiment group
@@ -1529,8 +1920,10 @@ def initialize_table(filenode, where, table, description, expectedrows=None):
 
 
 def populate_table(tablenode, key_value, key=None, required_keys=[]):
+    # Rows going through a BulkWriter are checked against its columns
     err_keys, err_required = columns.validate(
-        tablenode, key_value, required_keys)
+        tablenode, key_value, required_keys,
+        all_keys=columns.bulk_colpaths(tablenode))
 
     if err_keys:
         raise HDF5InteractionError(1, err_keys)
@@ -1540,7 +1933,9 @@ def populate_table(tablenode, key_value, key=None, required_keys=[]):
 
     try:
         columns.populate(tablenode, key_value, key)
-        tablenode.flush()
+        # A BulkWriter flushes once when it closes
+        if not columns.is_buffered(tablenode):
+            tablenode.flush()
     except Exception as e:
         raise HDF5InteractionError(3, e.message)
 
@@ -1548,6 +1943,8 @@ def populate_table(tablenode, key_value, key=None, required_keys=[]):
 def read_table(tablenode):
     ret = []
     keys = None
+    if tablenode is not None:
+        columns.write_pending(tablenode)
     if not tablenode:
         return ret, keys
 
@@ -1563,22 +1960,28 @@ def read_table(tablenode):
 
 
 def create_empty_earray(filenode, groupnode, name,
-                        batom=None, expectedrows=None):
+                        batom=None, expectedrows=None, filters=None,
+                        chunkshape=None):
     try:
-        bfilter = tables.Filters(complevel=ZLIBCOMP, complib='zlib')
+        if filters is None:
+            bfilter = tables.Filters(complevel=ZLIBCOMP, complib='zlib')
+        else:
+            bfilter = filters
         if expectedrows is None:
             a = filenode.create_earray(groupnode,
                                        name,
                                        atom=batom,
                                        shape=(0,),
-                                       filters=bfilter)
+                                       filters=bfilter,
+                                       chunkshape=chunkshape)
         else:
             a = filenode.create_earray(groupnode,
                                        name,
                                        atom=batom,
                                        shape=(0,),
                                        filters=bfilter,
-                                       expectedrows=expectedrows)
+                                       expectedrows=expectedrows,
+                                       chunkshape=chunkshape)
 
     except Exception as e:
         raise HDF5InteractionError(5, e.message)
@@ -1586,7 +1989,8 @@ def create_empty_earray(filenode, groupnode, name,
     return a
 
 
-def create_data_earray(filenode, groupnode, name, data, batom, rows=None):
+def create_data_earray(filenode, groupnode, name, data, batom, rows=None,
+                       filters=None, chunkshape=None):
     try:
         if rows is None:
             rows = len(data) / 4
@@ -1595,7 +1999,9 @@ def create_data_earray(filenode, groupnode, name, data, batom, rows=None):
                                 groupnode,
                                 name,
                                 batom=batom,
-                                expectedrows=rows)
+                                expectedrows=rows,
+                                filters=filters,
+                                chunkshape=chunkshape)
 
         a.append(data)
     except Exception as e:
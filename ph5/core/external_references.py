@@ -0,0 +1,98 @@
+#
+# External links of master.ph5 to the DAS groups of the mini files
+#
+# Each Index_t row names a /Experiment_g/Receivers_g/Das_g_ group in a mini
+# file and each M_Index_t row a /Experiment_g/Maps_g/Das_g_ group. Loaders
+# link them into master.ph5 after every run. Only links that are missing or
+# point elsewhere are made again, so adding one file to a large experiment
+# does not remove and recreate every link.
+#
+
+import logging
+
+import tables
+
+PROG_VERSION = '2026.291'
+LOGGER = logging.getLogger(__name__)
+
+RECEIVERS = '/Experiment_g/Receivers_g'
+MAPS = '/Experiment_g/Maps_g'
+
+
+def link_target(external_file, hdf5_path):
+    '''   Target of the external link to hdf5_path in external_file, the
+          mini file relative to master.ph5 without a leading ./   '''
+    if external_file.startswith('./'):
+        external_file = external_file[2:]
+
+    return "{0}:{1}".format(external_file, hdf5_path)
+
+
+def wanted_links(rows):
+    '''   Links named by Index_t or M_Index_t rows
+          Returns:
+             {group name: target}, the last row of a group wins
+    '''
+    ret = {}
+    for i in rows:
+        external_path = i['hdf5_path_s']
+        ret[external_path.split('/')[3]] = link_target(
+            i['external_file_name_s'], external_path)
+
+    return ret
+
+
+def existing_links(ph5, where):
+    '''   Nodes under where in an open tables.File
+          Returns:
+             {name: target}, target None for nodes that are not external
+             links
+    '''
+    ret = {}
+    for node in ph5.iter_nodes(where):
+        if isinstance(node, tables.link.ExternalLink):
+            target = node.target
+            # Links made by older versions may keep the ./
+            if target.startswith('./'):
+                target = target[2:]
+            ret[node._v_name] = target
+        else:
+            ret[node._v_name] = None
+
+    return ret
+
+
+def update_external_references(ph5, rows, where=RECEIVERS):
+    '''   Make the external links under where match Index_t or M_Index_t
+          rows. Missing links are created and links with another target,
+          or nodes that are not links, are replaced. Other links are left
+          as they are.
+          Inputs:
+             ph5 -> master.ph5 tables.File open for writing
+             rows -> Index_t rows for RECEIVERS, M_Index_t rows for MAPS
+             where -> group the links are in
+          Returns:
+             number of links created, number already up to date
+    '''
+    wanted = wanted_links(rows)
+    existing = existing_links(ph5, where)
+    changed = [(name, target) for name, target in sorted(wanted.items())
+               if existing.get(name, False) != target]
+
+    n = 0
+    for name, target in changed:
+        if name in existing:
+            try:
+                ph5.remove_node(where, name)
+            except Exception as e:
+                LOGGER.error("{0}\n".format(e))
+                continue
+        try:
+            ph5.create_external_link(where, name, target)
+            n += 1
+        except Exception as e:
+            LOGGER.error("{0}\n".format(e))
+    if changed:
+        ph5.flush()
+
+    return n, len(wanted) - len(changed)
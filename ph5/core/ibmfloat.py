@@ -11,8 +11,9 @@
 
 
 import construct
+import numpy
 
-PROG_VERSION = '2015.092'
+PROG_VERSION = '2026.291'
 
 # Masks
 # IBMSIGN  = 0x80000000
@@ -110,6 +111,60 @@ def ieee2ibm32(ieee_float):
     return value
 
 
+#
+# Whole array versions of the above using NumPy
+#
+
+
+def ibm2ieee_array(ibm):
+    '''
+       Convert 32 bit IBM floats to IEEE float32.
+       Inputs:
+          ibm -> a uint32 array of IBM bit patterns, or a string of big
+                 endian IBM floats as found in a SEG-Y trace
+       Returns:
+          a float32 numpy array, values too large or too small for
+          float32 become +-inf or 0
+    '''
+    if isinstance(ibm, str):
+        ibm = numpy.frombuffer(ibm, dtype='>u4')
+    ibm = numpy.asarray(ibm, dtype=numpy.uint32).astype(numpy.uint64)
+    # value = sign * mantissa * 2 ** (4 * (exponent - 64) - 24)
+    # Build the power of 2 (with the sign) as the bits of a float64
+    scale = (((ibm >> 24) & 0x7F) * 4 + (1023 - 256 - 24)) << 52
+    scale |= (ibm >> 31) << 63
+    ret = (ibm & 0x00FFFFFF).astype(numpy.float64)
+    ret *= scale.view(numpy.float64)
+    return ret.astype(numpy.float32)
+
+
+def ieee2ibm_array(ieee):
+    '''
+       Convert IEEE floats to 32 bit IBM floats.
+       Inputs:
+          ieee -> an array like of floats, converted to float32 first
+       Returns:
+          a uint32 numpy array of IBM bit patterns, use
+          .astype('>u4').tostring() to get them as written to SEG-Y.
+          The mantissa is truncated as in ieee2ibm32, inf gives the
+          largest IBM float and nan gives 0.
+    '''
+    ieee = numpy.asarray(ieee, dtype=numpy.float32)
+    finite = numpy.isfinite(ieee)
+    # ieee = f * 2 ** e, 0.5 <= |f| < 1
+    f, e = numpy.frexp(numpy.where(finite, ieee, 0))
+    # ibm = f * 2 ** -shift * 16 ** x
+    x = -(-e // 4)
+    shift = (x * 4 - e).astype(numpy.uint32)
+    m = (numpy.abs(f) * 0x01000000).astype(numpy.uint32) >> shift
+    x = numpy.where(m == 0, 0, x + 64).astype(numpy.uint32)
+    ret = (x << 24) | m
+    ret[numpy.isinf(ieee)] = 0x7FFFFFFF
+    ret |= numpy.signbit(ieee).astype(numpy.uint32) << 31
+    ret[numpy.isnan(ieee)] = 0
+    return ret
+
+
 if __name__ == '__main__':
     pint_s = psint()
     pfloat_s = pfloat()
@@ -7,7 +7,7 @@ import string
 import re
 from ph5.core import columns
 
-PROG_VERSION = '2019.14'
+PROG_VERSION = '2026.291'
 LOGGER = logging.getLogger(__name__)
 
 
@@ -178,6 +178,11 @@ class Kef:
 
     def batch_update(self, trace=False):
         '''   Batch update ph5 file from kef file   '''
+        # Rows to update or delete are found through key indexes
+        with columns.IndexedBatch():
+            return self._batch_update(trace)
+
+    def _batch_update(self, trace):
         err = False
         self.rewind()
         p, kv = self.next()
@@ -12,7 +12,7 @@ import re
 from ph5.core import columns
 from StringIO import StringIO
 
-PROG_VERSION = '2019.53'
+PROG_VERSION = '2026.291'
 LOGGER = logging.getLogger(__name__)
 
 
@@ -25,6 +25,9 @@ arrayRE = re.compile(r"/Experiment_g/Sorts_g/Array_t_(\d+)")
 eventRE = re.compile(r"/Experiment_g/Sorts_g/Event_t(_(\d+))?")
 offsetRE = re.compile(r"/Experiment_g/Sorts_g/Offset_t(_(\d+)_(\d+))?")
 
+# Rows of a table written together by Kef.stream_update
+BATCH_ROWS = 10000
+
 
 class KefError (Exception):
     pass
@@ -205,6 +208,51 @@ class Kef:
 
         return nret
 
+    def records(self):
+        '''   Read the kef file one table row at a time.
+              Yields: (path, keyval) in file order. path keeps any
+                      :Update:key or :Delete:key.
+        '''
+        lines = iter(self.fh)
+        path = None
+        keyval = {}
+        for line in lines:
+            # Skip empty lines and comments
+            if line[0] == '#' or line[0] == '\n':
+                continue
+
+            line = line.strip()
+            if not line:
+                continue
+            # If line ends in '\' it is continued on next line
+            while line[-1] == '\\':
+                appnd = next(lines, None)
+                if appnd is None:
+                    line = line[:-1] + ' '
+                    break
+                line = line[:-1] + ' ' + appnd.strip()
+
+            # This line contains the path to the table to update
+            if line[0] == '/':
+                if path and keyval:
+                    yield path, keyval
+                path = line
+                keyval = {}
+                continue
+
+            # Split on the last = or ; as keyValFileRE does
+            i = max(line.rfind('='), line.rfind(';'))
+            if i < 0:
+                LOGGER.warning("Unparsable line: %s\nSkipping" % line)
+                continue
+
+            value = line[i + 1:].strip()
+            if value != 'None':
+                keyval[line[:i].strip()] = value
+
+        if path and keyval:
+            yield path, keyval
+
     def _next_path(self):
         try:
             path = self.paths.pop(0)
@@ -251,68 +299,187 @@ class Kef:
         '''   Batch update ph5 file from kef file   '''
         err = False
         self.rewind()
-        for p, kv in self:
-            if trace is True:
-                kys = kv.keys()
-                print("=-" * 30)
-                print("{0}".format(p))
-                for k in kys:
-                    print("\t{0} = {1}".format(k, kv[k]))
+        writers = {}
+        batch = columns.IndexedBatch().open()
+        try:
+            for p, kv in self:
+                if trace is True:
+                    kys = kv.keys()
+                    print("=-" * 30)
+                    print("{0}".format(p))
+                    for k in kys:
+                        print("\t{0} = {1}".format(k, kv[k]))
+
+                DELETE = False
+                # Update or Append or Delete
+                mo = deleteRE.match(p)
+                if mo:
+                    DELETE = True
+                else:
+                    mo = updateRE.match(p)
+
+                key = []
+                if mo:
+                    p, k = mo.groups()
+                    key.append(k)
+
+                # columns.TABLES keeps a dictionary of key = table name,
+                # value = reference to table
+                if p not in columns.TABLES:
+                    LOGGER.warning("No table reference for key: {0}\n"
+                                   "Possibly ph5 file is not open or "
+                                   "initialized?".format(p))
+                    continue
+
+                # Get handle
+                ref = columns.TABLES[p]
+                # key needs to be list for columns.validate
+                if trace is True:
+                    LOGGER.info("Validating...")
 
-            DELETE = False
-            # Update or Append or Delete
-            mo = deleteRE.match(p)
-            if mo:
-                DELETE = True
-            else:
-                mo = updateRE.match(p)
+                errs_keys, errs_required = columns.validate(ref, kv, key)
+                for e in errs_keys + errs_required:
+                    err = True
+                    LOGGER.info(e)
 
-            key = []
-            if mo:
-                p, k = mo.groups()
-                key.append(k)
+                if trace is True:
+                    LOGGER.info("Done")
 
-            # columns.TABLES keeps a dictionary of key = table name, value =
-            # reference to table
-            if p not in columns.TABLES:
-                LOGGER.warning("No table reference for key: {0}\n"
-                               "Possibly ph5 file is not open or initialized?"
-                               .format(p))
-                continue
+                if len(key) == 0:
+                    key = None
+                else:
+                    key = key.pop(0)
+
+                if DELETE:
+                    if trace is True:
+                        LOGGER.info("Deleting...")
+                    else:
+                        columns.delete(ref, kv[key], key)
+                else:
+                    if trace is True:
+                        LOGGER.info("Updating...")
+                    else:
+                        if key is None and not columns.is_buffered(ref):
+                            # Appends to a table are buffered
+                            writers[p] = columns.BulkWriter(ref).open()
+                        columns.populate(ref, kv, key)
+
+                if trace is True:
+                    LOGGER.info("Skipped")
+        finally:
+            for w in writers.values():
+                w.close()
+            batch.close()
+
+        return err
+
+    def stream_update(self, trace=False, add_table=None,
+                      batch_rows=BATCH_ROWS):
+        '''   Update ph5 file from kef file read a row at a time.
+              Consecutive rows for the same table and action are
+              validated and written together, up to batch_rows at a
+              time.
+              add_table -> Called with the path of each table before
+                           its first rows are written
+        '''
+        err = False
+        writers = {}
+        tables = set()
+        group = None
+        kvs = []
+        batch = columns.IndexedBatch().open()
+        try:
+            for p, kv in self.records():
+                action = None
+                key = None
+                mo = deleteRE.match(p)
+                if mo:
+                    action = 'Delete'
+                else:
+                    mo = updateRE.match(p)
+                    if mo:
+                        action = 'Update'
+                if mo:
+                    p, key = mo.groups()
+
+                if add_table is not None and p not in tables:
+                    tables.add(p)
+                    add_table(p)
+
+                if (p, action, key) != group or len(kvs) == batch_rows:
+                    if kvs and self._write_rows(group, kvs, writers, trace):
+                        err = True
+                    group = (p, action, key)
+                    kvs = []
+                kvs.append(kv)
+
+            if kvs and self._write_rows(group, kvs, writers, trace):
+                err = True
+        finally:
+            for w in writers.values():
+                w.close()
+            batch.close()
+
+        return err
 
-            # Get handle
-            ref = columns.TABLES[p]
-            # key needs to be list for columns.validate
+    def _write_rows(self, group, kvs, writers, trace):
+        '''   Validate and write rows kvs of a table for stream_update   '''
+        p, action, key = group
+        err = False
+        # columns.TABLES keeps a dictionary of key = table name,
+        # value = reference to table
+        if p not in columns.TABLES:
+            for kv in kvs:
+                LOGGER.warning("No table reference for key: {0}\n"
+                               "Possibly ph5 file is not open or "
+                               "initialized?".format(p))
+            return err
+
+        ref = columns.TABLES[p]
+        all_keys = columns.colpaths(ref)
+        required = [] if key is None else [key]
+        for kv in kvs:
             if trace is True:
+                print("=-" * 30)
+                print("{0}".format(p if key is None else
+                                   "{0}:{1}:{2}".format(p, action, key)))
+                for k in kv.keys():
+                    print("\t{0} = {1}".format(k, kv[k]))
                 LOGGER.info("Validating...")
 
-            errs_keys, errs_required = columns.validate(ref, kv, key)
+            errs_keys, errs_required = columns.validate(ref, kv, required,
+                                                        all_keys)
             for e in errs_keys + errs_required:
                 err = True
                 LOGGER.info(e)
 
             if trace is True:
                 LOGGER.info("Done")
-
-            if len(key) == 0:
-                key = None
-            else:
-                key = key.pop(0)
-
-            if DELETE:
-                if trace is True:
+                if action == 'Delete':
                     LOGGER.info("Deleting...")
                 else:
-                    columns.delete(ref, kv[key], key)
-            else:
-                if trace is True:
                     LOGGER.info("Updating...")
-                else:
-                    columns.populate(ref, kv, key)
-
-            if trace is True:
                 LOGGER.info("Skipped")
 
+        if trace is True:
+            return err
+
+        if key:
+            for kv in kvs:
+                if key not in kv:
+                    LOGGER.warning("No data for key. p.has_key (key) fails")
+            kvs = [kv for kv in kvs if key in kv]
+        if action == 'Delete':
+            columns.delete_rows(ref, [kv[key] for kv in kvs], key)
+        elif key:
+            columns.update_rows(ref, kvs, key)
+        else:
+            if not columns.is_buffered(ref):
+                # Appends to a table are buffered
+                writers[p] = columns.BulkWriter(ref).open()
+            for kv in kvs:
+                columns.append(ref, kv)
+
         return err
 
     def strip_receiver_g(self):
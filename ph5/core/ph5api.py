@@ -7,19 +7,21 @@
 
 import logging
 import os
+import sys
 import time
 import re
 import math
+from collections import OrderedDict
 from decimal import Decimal
 
 import numpy as np
 from pyproj import Geod
 from tables.exceptions import NoSuchNodeError
 
-from ph5.core import columns, experiment, timedoy
+from ph5.core import availability, columns, experiment, timedoy
 
 
-PROG_VERSION = '2022.144'
+PROG_VERSION = '2026.291'
 
 LOGGER = logging.getLogger(__name__)
 PH5VERSION = columns.PH5VERSION
@@ -28,6 +30,12 @@ PH5VERSION = columns.PH5VERSION
 # (.1%)
 MAX_DRIFT_RATE = 0.001
 
+# Default memory limit of the metadata table cache in bytes
+TABLE_CACHE_BYTES = 256 * 1024 * 1024
+
+# Default number of samples per trace yielded by PH5.cut_chunks
+CUT_CHUNK_SAMPLES = 1024 * 1024
+
 __version__ = PROG_VERSION
 
 # Conversion factors to meters
@@ -219,13 +227,335 @@ class Trace(object):
         return timedoy.timecorrect(self.start_time, self.time_correction_ms)
 
 
+class DasIndex(object):
+    '''   Das_t of one DAS read once into numpy column arrays sorted on
+          window start time. Lookups return positions into these arrays.
+          name -> Das_t name, ie. Das_t_3X500
+          keys -> Das_t keys, None if Das_t is empty
+          table -> Das_t rows as a structured array
+          rownum -> Row number of each window in Das_t
+          start -> Window start epoch as a float
+          stop -> Window stop epoch as a float
+          epoch -> time/epoch_l
+          micro_seconds -> time/micro_seconds_i
+          sample_count -> sample_count_i
+          sample_rate -> sample_rate_i
+          sample_rate_multiplier -> sample_rate_multiplier_i
+          (all ones if the column is missing)
+          channel -> channel_number_i
+          array_name -> array_name_data_a
+    '''
+
+    def __init__(self, das_t):
+        '''   das_t -> Das_t table node   '''
+        self.name = das_t._v_parent._v_name.replace('Das_g', 'Das_t')
+        table = das_t.read()
+        self.keys = None
+        if len(table):
+            self.keys, names = columns.keys(das_t)
+        self.has_srm = 'sample_rate_multiplier_i' in table.dtype.names
+        # Stable sort so windows starting together keep Das_t order
+        start = table['time']['epoch_l'].astype(np.float64) + \
+            table['time']['micro_seconds_i'] / 1000000.
+        self.rownum = np.argsort(start, kind='mergesort')
+        self.table = table[self.rownum]
+        self.start = start[self.rownum]
+        self.epoch = self.table['time']['epoch_l']
+        self.micro_seconds = self.table['time']['micro_seconds_i']
+        self.sample_count = self.table['sample_count_i']
+        self.sample_rate = self.table['sample_rate_i']
+        if self.has_srm:
+            self.sample_rate_multiplier = \
+                self.table['sample_rate_multiplier_i']
+        else:
+            self.sample_rate_multiplier = np.ones(len(table), dtype='int16')
+        self.channel = self.table['channel_number_i']
+        self.array_name = self.table['array_name_data_a']
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rate = self.sample_rate.astype(np.float64) / \
+                self.sample_rate_multiplier
+            length = np.where(self.sample_rate > 0,
+                              self.sample_count / rate, 0.)
+            # Window start and length in whole seconds as the numexpr
+            # queries in query_das_t have always computed them
+            self.start_s = self.epoch + \
+                _truncdiv(self.micro_seconds, 1000000)
+            self.length_s = _truncdiv(
+                _truncdiv(self.sample_count, self.sample_rate),
+                self.sample_rate_multiplier)
+        self.sr = np.where(self.sample_rate > 0, rate, 0.)
+        self.stop = self.start + length
+        self.max_length = length.max() if len(table) else 0.
+        self.max_length_s = max(self.length_s.max(), 0) if len(table) else 0
+        # start_s only follows start if micro seconds stay in [0, 1000000)
+        self.regular = bool(np.all((self.micro_seconds >= 0) &
+                                   (self.micro_seconds < 1000000)))
+        self.nbytes = sum([a.nbytes for a in (
+            self.table, self.rownum, self.start, self.stop, self.start_s,
+            self.length_s, self.sr)])
+
+    def __len__(self):
+        return len(self.table)
+
+    def rows(self, pos):
+        '''   Return the windows at positions pos as a list of Das_t
+              dictionaries   '''
+        if self.keys is None:
+            return []
+        table = self.table[pos]
+        cols = []
+        for key in self.keys:
+            col = table
+            for k in key.split('/'):
+                col = col[k]
+            # Python scalars as in rows read with read_table
+            cols.append(col.tolist())
+
+        return [dict(zip(self.keys, row)) for row in zip(*cols)]
+
+    def check_srm(self):
+        '''   Raise the errors ReceiversGroup.read_das raises for a missing
+              or zero sample_rate_multiplier_i   '''
+        bad = np.flatnonzero(self.sample_rate_multiplier == 0)
+        experiment.check_srm_valid(self.rows(bad), self.keys, self.name)
+
+    def select(self, start_epoch=None, stop_epoch=None):
+        '''   Positions of the windows read_das_t keeps, in the order it
+              keeps them. With a time range only windows overlapping it
+              are kept, grouped by sample rate, highest first.   '''
+        if start_epoch is None or stop_epoch is None:
+            return self.read_order(np.arange(len(self)))
+        pos = self.in_range(start_epoch, stop_epoch)
+        return self.read_order(pos, by_sample_rate=True)
+
+    def in_range(self, start_epoch, stop_epoch):
+        '''   Positions of windows that overlap start_epoch to stop_epoch,
+              the same test as is_in   '''
+        lo = np.searchsorted(self.start,
+                             min(start_epoch, stop_epoch) -
+                             self.max_length - 1., 'left')
+        hi = np.searchsorted(self.start, max(start_epoch, stop_epoch),
+                             'right')
+        start = self.start[lo:hi]
+        stop = self.stop[lo:hi]
+        keep = ((start_epoch >= start) & (start_epoch <= stop)) | \
+            ((stop_epoch >= start) & (stop_epoch <= stop)) | \
+            ((start_epoch <= start) & (stop_epoch >= stop))
+
+        return np.arange(lo, hi)[keep]
+
+    def read_order(self, pos, by_sample_rate=False):
+        '''   Order positions as ReceiversGroup.read_das returns rows,
+              on epoch_l then Das_t row number   '''
+        keys = [self.rownum[pos], self.epoch[pos]]
+        if by_sample_rate:
+            keys.append(-self.sr[pos])
+
+        return pos[np.lexsort(keys)]
+
+    def query(self, chan, start_epoch, stop_epoch, sample_rate=None,
+              sample_rate_multiplier=1, check_samplerate=True):
+        '''   Positions of the windows query_das_t returns, in Das_t row
+              order. Times are compared in whole seconds with the literal
+              precision the numexpr query strings had.   '''
+        start_epoch = _literal(start_epoch)
+        stop_epoch = _literal(stop_epoch)
+        window = sample_rate != 0 and sample_rate is not None
+        lo, hi = 0, len(self)
+        if self.regular:
+            lo = np.searchsorted(
+                self.start,
+                start_epoch - (self.max_length_s if window else 0),
+                'left')
+            hi = np.searchsorted(self.start, stop_epoch + 1, 'right')
+        start_s = self.start_s[lo:hi]
+        keep = (self.channel[lo:hi] == chan) & (start_s <= stop_epoch)
+        if not window:
+            keep &= start_s >= start_epoch
+        else:
+            keep &= start_s >= start_epoch - self.length_s[lo:hi]
+            if check_samplerate is not False:
+                keep &= \
+                    (self.sample_rate[lo:hi] == _literal(sample_rate)) & \
+                    (self.sample_rate_multiplier[lo:hi] ==
+                     _literal(sample_rate_multiplier))
+        pos = np.arange(lo, hi)[keep]
+
+        return pos[np.argsort(self.rownum[pos])]
+
+    def filter_channel(self, pos, chan):
+        '''   filter_das_t on the windows at positions pos   '''
+        pos = pos[self.channel[pos] == chan]
+        if len(pos) > 1:
+            same = np.ones(len(pos) - 1, dtype=bool)
+            for col in (self.sample_rate, self.sample_rate_multiplier,
+                        self.micro_seconds, self.epoch):
+                c = col[pos]
+                same &= c[1:] == c[:-1]
+            pos = pos[np.concatenate(([True], ~same))]
+
+        return pos[np.argsort(self.start[pos], kind='mergesort')]
+
+
+class TimeWindows(object):
+    '''   Time_t rows of one DAS sorted on start time so _cor finds the
+          row covering a window by binary search. Iterates like the list
+          of rows.
+          rows -> Time_t rows in table order
+          order -> Position in rows of each window in start order
+          start -> Window start epoch as a float, sorted
+          stop -> Window end epoch as a float, in start order
+          reach -> Latest end epoch of the windows up to each position
+          irregular -> (position in rows, start, stop) of windows ending
+                       before they start, always checked
+    '''
+
+    def __init__(self, rows):
+        self.rows = list(rows)
+        start = np.array([fepoch(t['start_time/epoch_l'],
+                                 t['start_time/micro_seconds_i'])
+                          for t in self.rows], dtype=np.float64)
+        stop = np.array([fepoch(t['end_time/epoch_l'],
+                                t['end_time/micro_seconds_i'])
+                         for t in self.rows], dtype=np.float64)
+        regular = start <= stop
+        self.irregular = [(i, start[i], stop[i])
+                          for i in np.flatnonzero(~regular)]
+        order = np.flatnonzero(regular)
+        # Stable sort so windows starting together keep Time_t order
+        self.order = order[np.argsort(start[order], kind='mergesort')]
+        self.start = start[self.order]
+        self.stop = stop[self.order]
+        if len(self.order):
+            self.reach = np.maximum.accumulate(self.stop)
+        else:
+            self.reach = self.stop
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def __getitem__(self, i):
+        return self.rows[i]
+
+    def find(self, start_fepoch, stop_fepoch):
+        '''   First row in table order with a window overlapping
+              start_fepoch to stop_fepoch as is_in() sees it, None if
+              there is none   '''
+        lo = min(start_fepoch, stop_fepoch)
+        hi = max(start_fepoch, stop_fepoch)
+        found = [i for i, start, stop in self.irregular
+                 if is_in(start, stop, start_fepoch, stop_fepoch)]
+        # Windows starting after hi can not overlap, nor can any window
+        # before the last one that reaches lo
+        j = np.searchsorted(self.start, hi, side='right') - 1
+        while j >= 0 and self.reach[j] >= lo:
+            if is_in(self.start[j], self.stop[j], start_fepoch, stop_fepoch):
+                found.append(self.order[j])
+            j -= 1
+        if not found:
+            return None
+
+        return self.rows[min(found)]
+
+
+class CutPlan(object):
+    '''   What PH5.cut reads, worked out from Das_t before reading any data
+          pending -> One (parts, nsamples, dtype, start_fepoch, sample_rate,
+                     ttype, byteorder, das_t) per trace, parts being a list
+                     of (trace_reference, start, count) of Data_a arrays
+          clock -> Clock shared by the traces
+          das_t -> Das_t rows of the last trace
+          sr -> Sample rate of the last Das_t window
+          apply_time_correction -> Correct traces for clock drift
+          Time_t -> Time_t of the DAS, None without time correction
+          time_cor_guess_ms -> Time correction the parts were shifted by
+    '''
+
+    def __init__(self, pending, clock, das_t, sr, apply_time_correction,
+                 Time_t, time_cor_guess_ms):
+        self.pending = pending
+        self.clock = clock
+        self.das_t = das_t
+        self.sr = sr
+        self.apply_time_correction = apply_time_correction
+        self.Time_t = Time_t
+        self.time_cor_guess_ms = time_cor_guess_ms
+
+
+class TableCache(object):
+    '''   Least recently used cache of tables read from PH5 files. Kept
+          across PH5.clear() so repeated requests do not re-read the same
+          metadata. Tables are keyed on their file, node path and the
+          file's modification time and size. Cached rows are shared, do
+          not modify them.
+          max_bytes -> Memory limit for cached tables, 0 disables caching
+          nbytes -> Approximate memory used by cached tables
+          hits -> Number of tables found in the cache
+          misses -> Number of tables read from file
+    '''
+
+    def __init__(self, max_bytes=TABLE_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._tables = OrderedDict()
+
+    def __len__(self):
+        return len(self._tables)
+
+    def __repr__(self):
+        return "Tables: {0} Bytes: {1}/{2} Hits: {3} Misses: {4}".format(
+            len(self), self.nbytes, self.max_bytes, self.hits, self.misses)
+
+    def get(self, node, read):
+        '''   Return the table node as read by read() from the cache,
+              calling read() if it is not cached   '''
+        filename = node._v_file.filename
+        key = (filename, node._v_pathname)
+        generation = file_generation(filename)
+        if key in self._tables:
+            table_generation, value, nbytes = self._tables.pop(key)
+            if table_generation == generation:
+                # Most recently used last
+                self._tables[key] = (generation, value, nbytes)
+                self.hits += 1
+                return value
+            self.nbytes -= nbytes
+
+        self.misses += 1
+        value = read()
+        nbytes = table_nbytes(value)
+        if nbytes <= self.max_bytes:
+            self._tables[key] = (generation, value, nbytes)
+            self.nbytes += nbytes
+            while self.nbytes > self.max_bytes:
+                k, (g, v, n) = self._tables.popitem(last=False)
+                self.nbytes -= n
+
+        return value
+
+    def reset(self):
+        '''   Empty the cache   '''
+        self._tables.clear()
+        self.nbytes = 0
+
+
 class PH5(experiment.ExperimentGroup):
     das_gRE = re.compile("Das_g_(.*)")
 
-    def __init__(self, path=None, nickname=None, editmode=False):
+    def __init__(self, path=None, nickname=None, editmode=False,
+                 table_cache=None, max_open_files=None):
         '''   path -> Path to ph5 file
               nickname -> The master ph5 file name, ie. master.ph5
               editmode -> Always False
+              table_cache -> TableCache to share between PH5 objects,
+                             a new one is used if None
+              max_open_files -> Most mini files kept open, default
+                                experiment.MAX_OPEN_MINI_FILES
         '''
         if not os.path.exists(os.path.join(path, nickname)):
             raise APIError(0, "PH5 file does not exist: {0}".format(
@@ -235,26 +565,41 @@ class PH5(experiment.ExperimentGroup):
         if self.currentpath is not None and self.nickname is not None:
             self.ph5open(editmode)
             self.initgroup()
+            if max_open_files is not None:
+                self.mini_files.max_open = max_open_files
 
+        if table_cache is None:
+            table_cache = TableCache()
+        self.table_cache = table_cache
         self.clear()
 
     def clear(self):
-        '''   Clears key variables   '''
+        '''   Clears key variables, tables stay in table_cache   '''
         self.Array_t = {
         }  # Array_t[array_name] = { 'byid':byid, 'order':order, 'keys':keys }
         # Event_t[event_name] = { 'byid':byid, 'order':order, 'keys':keys }
         self.Event_t = {}
         self.Sort_t = {}  # Sort_t[array_name] = { 'rows':rows, 'keys':keys }
         self.Das_t = {}  # Das_t[das] = { 'rows':rows, 'keys':keys }
-        # Das_t_full[das], internal complete copy of Das_t
-        self.Das_t_full = {}
+        # Das_index[das], DasIndex of the complete Das_t
+        self.Das_index = {}
         # Offset_t[offset_name] = { 'byid':byid, 'order':order, 'keys':keys }
         self.Offset_t = {}
         self.Index_t = None
         self.Time_t = None
+        # Time_index[das], TimeWindows of the DAS, None if not built
+        self.Time_index = None
         self.Receiver_t = None
+        # Receiver_index[channel], first Receiver_t row of the channel
+        self.Receiver_index = None
         self.Experiment_t = None
         self.Response_t = None
+        # Response_index[n_i], first Response_t row with the n_i
+        self.Response_index = None
+        # AvailabilityIndex of Availability_t, None if not read or missing
+        self.Availability_t = None
+        # Availability_current[das], True if Availability_t is up to date
+        self.Availability_current = {}
         self.Offset_t_names = []
         self.Array_t_names = []
         self.Event_t_names = []
@@ -349,6 +694,54 @@ class PH5(experiment.ExperimentGroup):
                 'azimuth/value_f': az, 'azimuth/units_s': 'degrees',
                 'offset/value_d': dist, 'offset/units_s': 'm'}
 
+    def get_offsets(self, sta_line, sta_ids, evt_line, evt_id):
+        '''   get_offset for a list of stations with all distances
+              calculated in one pass
+              Inputs:
+                 sta_line -> the array or line
+                 sta_ids -> list of station ids
+                 evt_line -> the shot line
+                 evt_id -> the event or shot id
+              Returns:
+                 A list of get_offset dictionaries in sta_ids order
+        '''
+        ret = []
+        found = []
+        lat0, lon0, lat1, lon1 = [], [], [], []
+        for sta_id in sta_ids:
+            chans = self.channels(sta_line, sta_id)
+            if not chans:
+                LOGGER.warning("Couldn't get offset.")
+                ret.append({})
+                continue
+            c = chans[0]
+            try:
+                if sta_line in self.Array_t and evt_line in self.Event_t:
+                    array_t = self.Array_t[sta_line]['byid'][sta_id][c]
+                    event_t = self.Event_t[evt_line]['byid'][evt_id]
+                    coords = (array_t[0]['location/Y/value_d'],
+                              array_t[0]['location/X/value_d'],
+                              event_t['location/Y/value_d'],
+                              event_t['location/X/value_d'])
+                    for coord, l in zip(coords, (lat0, lon0, lat1, lon1)):
+                        l.append(coord)
+                    found.append(len(ret))
+            except Exception as e:
+                LOGGER.warning("Couldn't get offset. {0}".format(repr(e)))
+                ret.append({})
+                continue
+            ret.append({'event_id_s': evt_id, 'receiver_id_s': sta_id,
+                        'azimuth/value_f': 0.0, 'azimuth/units_s': 'degrees',
+                        'offset/value_d': 0.0, 'offset/units_s': 'm'})
+
+        if found:
+            az, baz, dist = run_geod(lat0, lon0, lat1, lon1)
+            for i, a, d in zip(found, az, dist):
+                ret[i]['azimuth/value_f'] = a
+                ret[i]['offset/value_d'] = d
+
+        return ret
+
     def calc_offsets(self, array, shot_id, shot_line="Event_t"):
         '''
            Calculate offset with sign from a shot point to each station in an
@@ -381,13 +774,13 @@ class PH5(experiment.ExperimentGroup):
         else:
             return Offset_t
 
+        sta_ids = []
         for o in order:
             array_t = Array_t['byid'][o]
             chans = self.channels(array, o)
             c = chans[0]
-            offset_t = self.get_offset(
-                array, array_t[c][0]['id_s'], shot_line, shot_id)
-            Offset_t.append(offset_t)
+            sta_ids.append(array_t[c][0]['id_s'])
+        Offset_t = self.get_offsets(array, sta_ids, shot_line, shot_id)
 
         rows = calc_offset_sign(Offset_t)
 
@@ -432,15 +825,16 @@ class PH5(experiment.ExperimentGroup):
 
         Array_t = self.Array_t[array_table_name]
         order = Array_t['order']
+        stations = []
         for o in order:
             c = self.channels(array_table_name, o)[0]
             array_t = Array_t['byid'][o]
-            offset_t = self.ph5_g_sorts. \
-                read_offset_fast(shot_id,
-                                 array_t[c][0]['id_s'],
-                                 name=offset_table_name)
-
-            Offset_t[array_t[c][0]['id_s']] = offset_t
+            stations.append(array_t[c][0]['id_s'])
+        offsets = self.ph5_g_sorts.read_offsets_fast(
+            [(shot_id, station) for station in stations],
+            name=offset_table_name)
+        for station in stations:
+            Offset_t[station] = offsets[(str(shot_id), str(station))]
 
         return Offset_t
 
@@ -479,23 +873,38 @@ class PH5(experiment.ExperimentGroup):
 
         Event_t = self.Event_t[shot_line]
         order = Event_t['order']
-        for o in order:
-            event_t = Event_t['byid'][o]
-            offset_t = self.ph5_g_sorts. \
-                read_offset_fast(event_t['id_s'],
-                                 station_id,
-                                 name=offset_table_name)
-            Offset_t[event_t['id_s']] = offset_t
+        shots = [Event_t['byid'][o]['id_s'] for o in order]
+        offsets = self.ph5_g_sorts.read_offsets_fast(
+            [(shot, station_id) for shot in shots],
+            name=offset_table_name)
+        for shot in shots:
+            Offset_t[shot] = offsets[(str(shot), str(station_id))]
 
         return Offset_t
 
+    def _read_cached(self, node, read):
+        '''   read() table node through table_cache   '''
+        if node is None:
+            return read()
+
+        return self.table_cache.get(node, read)
+
+    def _sorts_node(self, name):
+        '''   Return the Sorts_g table name or None   '''
+        try:
+            return self.ph5.get_node('/Experiment_g/Sorts_g', name=name,
+                                     classname='Table')
+        except NoSuchNodeError:
+            return None
+
     def read_experiment_t(self):
         '''   Read Experiment_t
               Sets:
                  Experiment_t['rows'] (a list of dictionaries)
                  Experiment_t['keys'] (a list of dictionary keys)
         '''
-        rows, keys = self.read_experiment()
+        rows, keys = self._read_cached(self.ph5_t_experiment,
+                                       self.read_experiment)
         self.Experiment_t = {'rows': rows, 'keys': keys}
 
     def read_offset_t_names(self):
@@ -519,7 +928,9 @@ class PH5(experiment.ExperimentGroup):
         if not self.Offset_t_names:
             self.read_offset_t_names()
         if name in self.Offset_t_names:
-            rows, keys = self.ph5_g_sorts.read_offset(name)
+            rows, keys = self._read_cached(
+                self._sorts_node(name),
+                lambda: self.ph5_g_sorts.read_offset(name))
             byid, order = by_id(rows, key=id_order)
             self.Offset_t[name] = {'byid': byid, 'order': order, 'keys': keys}
 
@@ -543,7 +954,9 @@ class PH5(experiment.ExperimentGroup):
         if not self.Event_t_names:
             self.read_event_t_names()
         if name in self.Event_t_names:
-            rows, keys = self.ph5_g_sorts.read_events(name)
+            rows, keys = self._read_cached(
+                self._sorts_node(name),
+                lambda: self.ph5_g_sorts.read_events(name))
             byid, order = by_id(rows)
             self.Event_t[name] = {'byid': byid, 'order': order, 'keys': keys}
 
@@ -568,7 +981,9 @@ class PH5(experiment.ExperimentGroup):
         if not self.Array_t_names:
             self.read_array_t_names()
         if name in self.Array_t_names:
-            rows, keys = self.ph5_g_sorts.read_arrays(name)
+            rows, keys = self._read_cached(
+                self._sorts_node(name),
+                lambda: self.ph5_g_sorts.read_arrays(name))
             byid, order = by_id(
                 rows, secondary_key='channel_number_i', unique_key=False)
             self.Array_t[name] = {'byid': byid, 'order': order, 'keys': keys}
@@ -606,7 +1021,8 @@ class PH5(experiment.ExperimentGroup):
                  Sort_t[array_name]['keys']
         '''
         tmp = {}
-        rows, keys = self.ph5_g_sorts.read_sorts()
+        rows, keys = self._read_cached(self.ph5_g_sorts.ph5_t_sort,
+                                       self.ph5_g_sorts.read_sorts)
         for r in rows:
             if r['array_t_name_s'] not in tmp:
                 tmp[r['array_t_name_s']] = []
@@ -623,32 +1039,87 @@ class PH5(experiment.ExperimentGroup):
                  Index_t['rows'] (a list of dictionaries)
                  Index_t['keys'] (a list of dictionary keys)
         '''
-        rows, keys = self.ph5_g_receivers.read_index()
+        rows, keys = self._read_cached(self.ph5_g_receivers.ph5_t_index,
+                                       self.ph5_g_receivers.read_index)
         self.Index_t = {'rows': rows, 'keys': keys}
 
+    def read_availability_t(self):
+        '''   Read Availability_t
+              Sets:
+                 Availability_t (an AvailabilityIndex, None if there is
+                 no Availability_t)
+        '''
+        node = self.ph5_g_receivers.ph5_t_availability
+        if node is None:
+            self.Availability_t = None
+            return
+        self.Availability_t = self._read_cached(
+            node, lambda: availability.AvailabilityIndex(node.read()))
+
+    def availability_summary(self, das):
+        '''   Availability_t for a DAS
+              Inputs:
+                 das -> DAS serial number as string
+              Returns:
+                 AvailabilityIndex or None if there is no Availability_t
+                 or the rows of das were not written from its current Das_t
+        '''
+        if self.Availability_t is None:
+            self.read_availability_t()
+            if self.Availability_t is None:
+                return None
+        if das not in self.Availability_current:
+            stamp = None
+            node = self.ph5_g_receivers.getdas_g(das)
+            if node:
+                self.ph5_g_receivers.setcurrent(node)
+                if self.ph5_g_receivers.current_t_das is not None:
+                    stamp = columns.das_t_stamp(
+                        self.ph5_g_receivers.current_t_das)
+            self.Availability_current[das] = \
+                self.Availability_t.is_current(das, stamp)
+        if not self.Availability_current[das]:
+            return None
+
+        return self.Availability_t
+
     def read_time_t(self):
         '''   Read Time_t
               Sets:
                  Time_t['rows'] (a list of dictionaries)
                  Time_t['keys'] (a list of dictionary keys)
         '''
-        rows, keys = self.ph5_g_receivers.read_time()
+        rows, keys = self._read_cached(self.ph5_g_receivers.ph5_t_time,
+                                       self.ph5_g_receivers.read_time)
         self.Time_t = {'rows': rows, 'keys': keys}
+        self.Time_index = None
 
     def get_time_t(self, das):
         '''   Return Time_t as a list of dictionaries
               Returns:
                  time_t (a list of dictionaries)
         '''
+        return list(self.time_windows(das))
+
+    def time_windows(self, das):
+        '''   Time_t rows of a DAS sorted for _cor, Time_t is grouped
+              by DAS the first time it is needed
+              Inputs:
+                 das -> DAS serial number as string
+              Returns:
+                 TimeWindows
+        '''
         if not self.Time_t:
             self.read_time_t()
+        if self.Time_index is None:
+            byid, order = by_id(self.Time_t['rows'],
+                                key='das/serial_number_s', unique_key=False)
+            self.Time_index = dict([(d, TimeWindows(rows))
+                                    for d, rows in byid.items()])
+        if das not in self.Time_index:
+            return TimeWindows([])
 
-        time_t = []
-        for t in self.Time_t['rows']:
-            if t['das/serial_number_s'] == das:
-                time_t.append(t)
-
-        return time_t
+        return self.Time_index[das]
 
     def read_receiver_t(self):
         '''   Read Receiver_t
@@ -656,8 +1127,11 @@ class PH5(experiment.ExperimentGroup):
                  Receiver_t['rows] (a list of dictionaries)
                  Receiver_t['keys'] (a list of dictionary keys)
         '''
-        rows, keys = self.ph5_g_receivers.read_receiver()
+        rows, keys = self._read_cached(
+            self.ph5_g_receivers.ph5_t_receiver,
+            self.ph5_g_receivers.read_receiver)
         self.Receiver_t = {'rows': rows, 'keys': keys}
+        self.Receiver_index = None
 
     def get_receiver_t(self, das_t, by_n_i=True):
         '''
@@ -680,9 +1154,12 @@ class PH5(experiment.ExperimentGroup):
         else:
             try:
                 chan = das_t['channel_number_i']
-                for receiver_t in self.Receiver_t['rows']:
-                    if receiver_t['orientation/channel_number_i'] == chan:
-                        break
+                rows = self.Receiver_t['rows']
+                if self.Receiver_index is None:
+                    self.Receiver_index = first_by(
+                        rows, 'orientation/channel_number_i')
+                # Without a match the last row, as the scan this replaced
+                receiver_t = self.Receiver_index.get(chan, rows[-1])
             except BaseException:
                 receiver_t = None
 
@@ -711,8 +1188,26 @@ class PH5(experiment.ExperimentGroup):
                  Response_t['rows'] (a list of dictionaries)
                  Response_t['keys] (a list of dictionary keys)
         '''
-        rows, keys = self.ph5_g_responses.read_responses()
+        rows, keys = self._read_cached(
+            self.ph5_g_responses.ph5_t_response,
+            self.ph5_g_responses.read_responses)
         self.Response_t = {'rows': rows, 'keys': keys}
+        self.Response_index = None
+
+    def response_index(self):
+        '''   Response_t rows by n_i, rebuilt if rows were added
+              Returns:
+                 dictionary of the first Response_t row of each n_i
+        '''
+        if not self.Response_t:
+            self.read_response_t()
+        rows = self.Response_t['rows']
+        if self.Response_index is None or \
+                self.Response_index[0] is not rows or \
+                self.Response_index[1] != len(rows):
+            self.Response_index = (rows, len(rows), first_by(rows, 'n_i'))
+
+        return self.Response_index[2]
 
     def get_response_t(self, das_t):
         '''
@@ -731,9 +1226,9 @@ class PH5(experiment.ExperimentGroup):
 
             response_t = self.Response_t['rows'][n_i]
             if response_t['n_i'] != n_i:
-                for response_t in self.Response_t['rows']:
-                    if response_t['n_i'] == n_i:
-                        break
+                # Without a match the last row, as the scan this replaced
+                response_t = self.response_index().get(
+                    n_i, self.Response_t['rows'][-1])
         except (KeyError, IndexError):
             response_t = None
 
@@ -749,14 +1244,10 @@ class PH5(experiment.ExperimentGroup):
             self.read_response_t()
 
         try:
-            for response_t in self.Response_t['rows']:
-                if response_t['n_i'] == n_i:
-                    return response_t
+            return self.response_index().get(n_i)
         except BaseException:
             return None
 
-        return None
-
     def read_das_g_names(self):
         '''   Read Das_g names
               Sets:
@@ -764,6 +1255,27 @@ class PH5(experiment.ExperimentGroup):
         '''
         self.Das_g_names = self.ph5_g_receivers.alldas_g()
 
+    def das_index(self, das):
+        '''   Mount the Das_g of a DAS and return its DasIndex, reading
+              Das_t the first time the DAS is seen
+              Inputs:
+                 das -> DAS serial number as string
+              Returns:
+                 DasIndex or None if the DAS or its Das_t is not found
+        '''
+        node = self.ph5_g_receivers.getdas_g(das)
+        if not node:
+            return None
+        self.ph5_g_receivers.setcurrent(node)
+        if das not in self.Das_index:
+            das_t = self.ph5_g_receivers.current_t_das
+            if das_t is None:
+                return None
+            self.Das_index[das] = self._read_cached(
+                das_t, lambda: DasIndex(das_t))
+
+        return self.Das_index[das]
+
     def query_das_t(self,
                     das,
                     chan=None,
@@ -773,104 +1285,44 @@ class PH5(experiment.ExperimentGroup):
                     sample_rate_multiplier=1,
                     check_samplerate=True):
         ''' Uses queries to get data from specific das table'''
-        das_g = "Das_g_{0}".format(das)
-        try:
-            node = self.ph5_g_receivers.getdas_g(das)
-        except experiment.HDF5InteractionError as e:
-            raise e
-        if not node:
-            return []
-        self.ph5_g_receivers.setcurrent(node)
-        try:
-            tbl = self.ph5.get_node('/Experiment_g/Receivers_g/' + das_g,
-                                    'Das_t')
-        except NoSuchNodeError:
+        index, pos = self._query_das_t(das, chan, start_epoch, stop_epoch,
+                                       sample_rate, sample_rate_multiplier,
+                                       check_samplerate)
+        if index is None:
             return []
-        try:
-            sample_rate_multiplier_i = tbl.cols.sample_rate_multiplier_i  # noqa
-            sample_rate_multiplier_i = sample_rate_multiplier_i
-        except AttributeError:
+
+        return index.rows(pos)
+
+    def _query_das_t(self, das, chan, start_epoch, stop_epoch, sample_rate,
+                     sample_rate_multiplier=1, check_samplerate=True):
+        '''   query_das_t returning the DasIndex and the positions of the
+              windows found   '''
+        index = self.das_index(das)
+        if index is None:
+            return None, None
+        if not index.has_srm:
             errmsg = ("%s has sample_rate_multiplier_i "
                       "missing. Please run fix_srm to fix "
                       "sample_rate_multiplier_i for PH5 data."
-                      % tbl._v_parent._v_name.replace('Das_g', 'Das_t'))
+                      % index.name)
             raise APIError(-1, errmsg)
 
-        if len(list(tbl.where('sample_rate_multiplier_i==0'))) > 0:
+        if np.any(index.sample_rate_multiplier == 0):
             errmsg = ("%s has sample_rate_multiplier_i "
                       "with value 0. Please run fix_srm to fix "
                       "sample_rate_multiplier_i for PH5 data."
-                      % tbl._v_parent._v_name.replace('Das_g', 'Das_t'))
+                      % index.name)
             raise APIError(-1, errmsg)
 
-        epoch_i = tbl.cols.time.epoch_l  # noqa
-        micro_seconds_i = tbl.cols.time.micro_seconds_i  # noqa
-        sample_count_i = tbl.cols.sample_count_i  # noqa
-        sample_rate_i = tbl.cols.sample_rate_i  # noqa
-        epoch_i = epoch_i
-        micro_seconds_i = micro_seconds_i
-        sample_count_i = sample_count_i
-        sample_rate_i = sample_rate_i
-        das = []
         if not start_epoch:
             start_epoch = 0
         if not stop_epoch:
             stop_epoch = 32509613590
 
-        if sample_rate == 0 or sample_rate is None:
-            numexprstr = (
-                    '(channel_number_i == '
-                    + str(chan) + ' )&(epoch_i+micro_seconds_i/1000000>='
-                    + str(start_epoch) +
-                    ')&(epoch_i+micro_seconds_i/1000000<='
-                    + str(stop_epoch) + ')'
-            )
-        elif check_samplerate is False:
-            numexprstr = (
-                 '(channel_number_i == '
-                 + str(chan) + ' )&(epoch_i+micro_seconds_i/1000000 >= '
-                 + str(start_epoch) +
-                 '-sample_count_i/sample_rate_i/sample_rate_multiplier_i)'
-                 '&(epoch_i+micro_seconds_i/1000000 <= '
-                 + str(stop_epoch) + ')'
-                 )
-        else:
-            numexprstr = (
-                '(channel_number_i == '
-                + str(chan) + ' )&(epoch_i+micro_seconds_i/1000000>='
-                + str(start_epoch) +
-                '-sample_count_i/sample_rate_i/sample_rate_multiplier_i)'
-                '&(epoch_i+micro_seconds_i/1000000<='
-                + str(stop_epoch) + ')&(sample_rate_i==' +
-                str(sample_rate) +
-                ')&(sample_rate_multiplier_i==' +
-                str(sample_rate_multiplier) + ')'
-            )
-
-        for row in tbl.where(numexprstr):
-            row_dict = {'array_name_SOH_a': row['array_name_SOH_a'],
-                        'array_name_data_a': row['array_name_data_a'],
-                        'array_name_event_a': row['array_name_event_a'],
-                        'array_name_log_a': row['array_name_log_a'],
-                        'channel_number_i': row['channel_number_i'],
-                        'event_number_i': row['event_number_i'],
-                        'raw_file_name_s': row['raw_file_name_s'],
-                        'receiver_table_n_i': row['receiver_table_n_i'],
-                        'response_table_n_i': row['response_table_n_i'],
-                        'sample_count_i': row['sample_count_i'],
-                        'sample_rate_i': row['sample_rate_i'],
-                        'sample_rate_multiplier_i':
-                            row['sample_rate_multiplier_i'],
-                        'stream_number_i': row['stream_number_i'],
-                        'time/ascii_s': row['time/ascii_s'],
-                        'time/epoch_l': row['time/epoch_l'],
-                        'time/micro_seconds_i':
-                            row['time/micro_seconds_i'],
-                        'time/type_s': row['time/type_s'],
-                        'time_table_n_i': row['time_table_n_i']
-                        }
-            das.append(row_dict)
-        return das
+        pos = index.query(chan, start_epoch, stop_epoch, sample_rate,
+                          sample_rate_multiplier, check_samplerate)
+
+        return index, pos
 
     def read_das_t(self, das, start_epoch=None, stop_epoch=None, reread=True):
         '''   Read Das_t, return Das_t keyed on DAS serial number
@@ -887,75 +1339,50 @@ class PH5(experiment.ExperimentGroup):
         dass = self.Das_t.keys()
         mo = self.das_gRE.match(das)
         if mo:
-            das_g = das
             das = mo.groups()[0]
-        else:
-            das_g = "Das_g_{0}".format(das)
 
         if das in dass and not reread and not start_epoch:
-            if das in self.Das_t_full:
-                self.Das_t[das] = self.Das_t_full[das]
+            if das in self.Das_index:
+                index = self.Das_index[das]
+                self.Das_t[das] = {'rows': index.rows(index.select()),
+                                   'keys': index.keys}
                 return das
-        if self.Das_g_names == []:
-            self.read_das_g_names()
-        node = None
-
-        if das_g in self.Das_g_names:
-            node = self.ph5_g_receivers.getdas_g(das)
-            self.ph5_g_receivers.setcurrent(node)
-        if node is None:
+        index, pos = self._read_das_t(das, start_epoch, stop_epoch)
+        if index is None:
             return None
-        rows_keep = []
-        rows = []
-        rk = {}
-        rows, keys = self.ph5_g_receivers.read_das()
-        self.Das_t_full[das] = {'rows': rows, 'keys': keys}
-        if stop_epoch is not None and start_epoch is not None:
-            for r in self.Das_t_full[das]['rows']:
-                # Start and stop for this das event window
-                start = float(r['time/epoch_l']) + \
-                        float(r['time/micro_seconds_i']) / 1000000.
-
-                if r['sample_rate_i'] > 0:
-                    stop = start + (float(r['sample_count_i']) / (
-                            float(r['sample_rate_i']) /
-                            float(r['sample_rate_multiplier_i'])))
-                else:
-                    stop = start
-                if r['sample_rate_i'] > 0:
-                    sr = float(r['sample_rate_i']) / \
-                        float(r['sample_rate_multiplier_i'])
-                else:
-                    sr = 0
-                # We need to keep this
-                if is_in(start, stop, start_epoch, stop_epoch):
-                    if sr not in rk:
-                        rk[sr] = []
-                    rk[sr].append(r)
-            rkk = rk.keys()
-            # Sort so higher sample rates are first
-            rkk.sort(reverse=True)
-            for s in rkk:
-                rows_keep.extend(rk[s])
-        else:
-            rows_keep = rows
 
-        if len(rows_keep) > 0:
-            self.Das_t[das] = {'rows': rows_keep,
-                               'keys': self.Das_t_full[das]['keys']}
+        if len(pos) > 0:
+            self.Das_t[das] = {'rows': index.rows(pos),
+                               'keys': index.keys}
             self.num_found_das += 1
         else:
             das = None
 
         return das
 
+    def _read_das_t(self, das, start_epoch=None, stop_epoch=None):
+        '''   read_das_t returning the DasIndex and the positions of the
+              windows kept instead of setting Das_t   '''
+        if self.Das_g_names == []:
+            self.read_das_g_names()
+        if "Das_g_{0}".format(das) not in self.Das_g_names:
+            return None, None
+        index = self.das_index(das)
+        if index is None:
+            return None, None
+        index.check_srm()
+
+        return index, index.select(start_epoch, stop_epoch)
+
     def forget_das_t(self, das):
         node = self.ph5_g_receivers.getdas_g(das)
-        try:
-            node.umount()
-        except NoSuchNodeError:
-            # when no minixxx.ph5 is used
-            pass
+        # Mini files in mini_files stay open for the next DAS
+        if self.ph5_g_receivers.mini_files is None:
+            try:
+                node.umount()
+            except NoSuchNodeError:
+                # when no minixxx.ph5 is used
+                pass
         if das in self.Das_t:
             del self.Das_t[das]
 
@@ -1120,6 +1547,110 @@ class PH5(experiment.ExperimentGroup):
               Returns:
                  A list of PH5 trace objects split on gaps
         '''
+        plan = self._cut_plan(das, start_fepoch, stop_fepoch, chan,
+                              sample_rate, apply_time_correction, das_t)
+        if not isinstance(plan, CutPlan):
+            return plan
+        pending = plan.pending
+        clock = plan.clock
+        # Read every part straight into its slice of a single preallocated
+        # buffer (one per sample type), traces get views of that buffer
+        sizes = {}
+        for p in pending:
+            sizes[p[2]] = sizes.get(p[2], 0) + p[1]
+        buffers = {}
+        for dt in sizes:
+            buffers[dt] = np.empty(sizes[dt], dtype=dt)
+        offsets = dict.fromkeys(buffers, 0)
+        traces = []
+        for parts, nsamples, dt, tstart, tsr, ttype, tbyteorder, tdas_t in \
+                pending:
+            i = offsets[dt]
+            data = buffers[dt][i:i + nsamples]
+            offsets[dt] = i + nsamples
+            j = 0
+            for trace_reference, read_start, count in parts:
+                self.ph5_g_receivers.read_trace(
+                    trace_reference,
+                    start=read_start,
+                    stop=read_start + count,
+                    out=data[j:j + count])
+                j += count
+            trace = Trace(data,
+                          tstart,
+                          0,  # time_correction_ms
+                          nsamples,  # nsamples
+                          tsr,
+                          ttype,
+                          tbyteorder,
+                          tdas_t,
+                          None,  # receiver_t
+                          None,  # response_t
+                          clock=clock)
+            traces.append(trace)
+        self._finish_traces(traces, plan)
+
+        return traces
+
+    def cut_chunks(self, das, start_fepoch, stop_fepoch, chan=1,
+                   sample_rate=None, apply_time_correction=True, das_t=None,
+                   chunk_samples=CUT_CHUNK_SAMPLES):
+        '''   cut() yielding the traces in pieces of at most chunk_samples
+              samples. Each piece is read when it is reached so memory use
+              does not grow with the length of the cut. The pieces of a
+              trace follow each other without a gap and together hold the
+              samples, time correction and start time cut() returns.
+              Inputs:
+                 das, start_fepoch, stop_fepoch, chan, sample_rate,
+                 apply_time_correction, das_t -> as for cut()
+                 chunk_samples -> maximum number of samples per piece
+              Returns:
+                 A generator of PH5 trace objects
+        '''
+        plan = self._cut_plan(das, start_fepoch, stop_fepoch, chan,
+                              sample_rate, apply_time_correction, das_t)
+        if not isinstance(plan, CutPlan):
+            for trace in plan:
+                yield trace
+            return
+        for parts, nsamples, dt, tstart, tsr, ttype, tbyteorder, tdas_t in \
+                plan.pending:
+            # Time correction and tables of the whole trace
+            whole = Trace(None, tstart, 0, nsamples, tsr, ttype, tbyteorder,
+                          tdas_t, None, None, clock=plan.clock)
+            self._finish_traces([whole], plan)
+            for offset, chunk, n in split_parts(parts, nsamples,
+                                                chunk_samples):
+                data = np.empty(n, dtype=dt)
+                j = 0
+                for trace_reference, read_start, count in chunk:
+                    self.ph5_g_receivers.read_trace(
+                        trace_reference,
+                        start=read_start,
+                        stop=read_start + count,
+                        out=data[j:j + count])
+                    j += count
+                start = tstart + offset / float(tsr) if offset else tstart
+                yield Trace(data,
+                            start,
+                            whole.time_correction_ms,
+                            n,
+                            tsr,
+                            ttype,
+                            tbyteorder,
+                            tdas_t,
+                            whole.receiver_t,
+                            whole.response_t,
+                            clock=plan.clock)
+
+    def _cut_plan(self, das, start_fepoch, stop_fepoch, chan, sample_rate,
+                  apply_time_correction, das_t):
+        '''   Work out from Das_t which parts of which Data_a arrays
+              cut() reads, without reading any data
+              Returns:
+                 CutPlan, or the list of traces to return when there is no
+                 Das_t or the cut is textural
+        '''
         if not das_t:
             self.read_das_t(das, start_epoch=start_fepoch,
                             stop_epoch=stop_fepoch, reread=False)
@@ -1144,7 +1675,7 @@ class PH5(experiment.ExperimentGroup):
 
         clock = Clock()
         if apply_time_correction:
-            Time_t = self.get_time_t(das)
+            Time_t = self.time_windows(das)
             time_cor_guess_ms, clock = _cor(start_fepoch, stop_fepoch, Time_t)
             if das in self.Das_t:
                 sr = sample_rate
@@ -1162,16 +1693,19 @@ class PH5(experiment.ExperimentGroup):
             clock.comment.append("No time correction applied.")
             time_cor_guess_samples = 0
 
-        samples_read = 0
         first = True
         new_trace = False
-        traces = []
         das_t = []
+        # Traces waiting to be read, each as a list of
+        # (trace_reference, start, count) parts of Data_a arrays.
+        # Nothing is read until the total number of samples is known.
+        pending = []
+        parts = []
+        nsamples = 0
 
         window_start_fepoch0 = None
         window_stop_fepoch = None
         trace_start_fepoch = None
-        data = None
         for d in Das_t:
             sr = float(d['sample_rate_i']) / \
                  float(d['sample_rate_multiplier_i'])
@@ -1219,10 +1753,13 @@ class PH5(experiment.ExperimentGroup):
             if not trace_reference:
                 continue
 
-            data_tmp = self.ph5_g_receivers.read_trace(
-                trace_reference,
-                start=int(round(cut_start_sample - time_cor_guess_samples)),
-                stop=int(round(cut_stop_sample - time_cor_guess_samples)))
+            # Rows of the data array to read, resolved the same way
+            # PyTables resolves read(start=, stop=)
+            read_start, read_stop, step = slice(
+                int(round(cut_start_sample - time_cor_guess_samples)),
+                int(round(cut_stop_sample - time_cor_guess_samples))
+            ).indices(trace_reference.nrows)
+            samples_tmp = max(0, read_stop - read_start)
             current_trace_type, current_trace_byteorder = (
                 self.ph5_g_receivers.trace_info(trace_reference))
             if first:
@@ -1234,8 +1771,6 @@ class PH5(experiment.ExperimentGroup):
                 dt = 'int32'
                 if current_trace_type == 'float':
                     dt = 'float32'
-
-                data = np.array([], dtype=dt)
             else:
                 # Time difference between the end of last window and the start
                 # of this one
@@ -1245,91 +1780,86 @@ class PH5(experiment.ExperimentGroup):
                 # Data gap
                 if abs(time_diff) > (1. / sr):
                     new_trace = True
-            if len(data_tmp) > 0:
+            if samples_tmp > 0:
                 #  Gap!!!
                 if das_t and new_trace:
                     # Save trace before gap
-                    trace = Trace(data,
-                                  trace_start_fepoch,
-                                  0,  # time_correction
-                                  len(data),  # samples_read
-                                  sr,
-                                  current_trace_type,
-                                  current_trace_byteorder,
-                                  das_t,
-                                  None,  # receiver_t
-                                  None,  # response_t
-                                  clock=clock)
-                    traces.append(trace)
+                    pending.append((parts, nsamples, dt,
+                                    trace_start_fepoch, sr,
+                                    current_trace_type,
+                                    current_trace_byteorder,
+                                    das_t))
                     #
                     # Start of trace after gap
                     #
                     start_fepoch = trace_start_fepoch
                     trace_start_fepoch = window_start_fepoch
-                    samples_read = len(data_tmp)
 
                     dt = 'int32'
                     if current_trace_type == 'float':
                         dt = 'float32'
-                    data = np.array([], dtype=dt)
 
-                    data = np.append(data, data_tmp)
+                    parts = [(trace_reference, read_start, samples_tmp)]
+                    nsamples = samples_tmp
                     das_t = [d]
                     new_trace = False
                 else:
-                    data = np.append(data, data_tmp)
-                    samples_read += len(data_tmp)
+                    parts.append((trace_reference, read_start, samples_tmp))
+                    nsamples += samples_tmp
                     das_t.append(d)
                 # adjust the number of data samples as to not over extend the
                 # cut_stop_fepoch
-                if data is None:
-                    return [Trace(np.array([]), start_fepoch, 0.,
-                                  0, sample_rate, None, None, das_t, None,
-                                  None, clock=clock)]
-                calc_stop_fepoch = trace_start_fepoch + (len(data) / sr)
+                calc_stop_fepoch = trace_start_fepoch + (nsamples / sr)
 
                 # calculate number of overextending samples
                 # num_overextend_samples is specific to the data per das table
                 # needs to be embedded in for loop to work properly.
                 num_overextend_samples = int(math.floor(calc_stop_fepoch -
                                                         cut_stop_fepoch) * sr)
-                samples_to_cut = int(len(data) - num_overextend_samples)
+                samples_to_cut = int(nsamples - num_overextend_samples)
                 if num_overextend_samples > 0:
-                    # trim the data array to exclude the over extending samples
-                    data = data[0:samples_to_cut]
+                    # trim the parts to exclude the over extending samples
+                    s, e, step = slice(0, samples_to_cut).indices(nsamples)
+                    nsamples = max(0, e - s)
+                    parts = trim_parts(parts, nsamples)
         # Done reading all the traces catch the last bit
-        trace = Trace(data,
-                      trace_start_fepoch,
-                      0,  # time_correction_ms
-                      len(data),  # nsamples
-                      sample_rate,
-                      current_trace_type,
-                      current_trace_byteorder,
-                      das_t,
-                      None,  # receiver_t
-                      None,  # response_t
-                      clock=clock)
-        traces.append(trace)
+        pending.append((parts, nsamples, dt,
+                        trace_start_fepoch, sample_rate,
+                        current_trace_type,
+                        current_trace_byteorder,
+                        das_t))
+
+        if not apply_time_correction:
+            Time_t = None
+            time_cor_guess_ms = None
+
+        return CutPlan(pending, clock, das_t, sr, apply_time_correction,
+                       Time_t, time_cor_guess_ms)
+
+    def _finish_traces(self, traces, plan):
+        '''   Set the time correction, receiver_t and response_t of the
+              traces of a CutPlan   '''
+        das_t = plan.das_t
         if das_t:
             receiver_t = self.get_receiver_t(das_t[0])
             response_t = self.get_response_t(das_t[0])
         else:
             receiver_t = None
             response_t = None
-        ret = []
 
         for t in traces:
-            if apply_time_correction:
+            if plan.apply_time_correction:
                 window_start_fepoch0 = t.start_time
-                window_stop_fepoch = window_start_fepoch0 + (t.nsamples / sr)
+                window_stop_fepoch = window_start_fepoch0 + \
+                    (t.nsamples / plan.sr)
                 time_correction, clock = \
                     _cor(window_start_fepoch0.epoch(fepoch=True),
                          window_stop_fepoch.epoch(fepoch=True),
-                         Time_t)
-                if time_correction != time_cor_guess_ms:
+                         plan.Time_t)
+                if time_correction != plan.time_cor_guess_ms:
                     t.clock.comment.append(
                         "Time correction mismatch. {0}ms/{1}ms"
-                        .format(time_correction, time_cor_guess_ms))
+                        .format(time_correction, plan.time_cor_guess_ms))
             else:
                 time_correction = 0.
             # Set time correction
@@ -1337,15 +1867,12 @@ class PH5(experiment.ExperimentGroup):
             # Set receiver_t and response_t
             t.receiver_t = receiver_t
             t.response_t = response_t
-            ret.append(t)
 
         if 'PH5API_DEBUG' in os.environ and os.environ['PH5API_DEBUG']:
-            for t in ret:
+            for t in traces:
                 print('-=' * 40)
                 print(t)
 
-        return ret
-
     def get_extent(self, das, component, sample_rate, start=None, end=None):
         '''
         Takes a das serial number, and option start and end time
@@ -1360,29 +1887,32 @@ class PH5(experiment.ExperimentGroup):
         :param sample_rate: sample rate
         :return: earliest epoch and latest epoch
         '''
-        das_t_t = None
         if component is None:
             raise ValueError("Component required for get_extent")
         if start or end:
             if not (start and end):
                 raise ValueError("if start or end, both are required")
-        # self.read_das_t(das, start, end, reread=True)
 
         if das not in self.Das_t:
-            das_t_t = self.query_das_t(
-                das,
-                chan=component,
-                start_epoch=start,
-                stop_epoch=end,
-                sample_rate=sample_rate)
-            if not das_t_t:
+            index, pos = self._query_das_t(das, component, start, end,
+                                           sample_rate)
+            if index is None or not len(pos):
                 LOGGER.warning("No Das table found for " + das)
                 return None, None
+            pos = index.filter_channel(pos, component)
+            pos = pos[np.argsort(index.epoch[pos], kind='mergesort')]
+            first, last = pos[0], pos[-1]
+            earliest_epoch = float(index.start[first])
+            if index.sample_rate[last] > 0:
+                latest_epoch = float(index.stop[last])
+            else:
+                latest_epoch = earliest_epoch
 
-        if not das_t_t:
-            Das_t = filter_das_t(self.Das_t[das]['rows'], component)
-        else:
-            Das_t = filter_das_t(das_t_t, component)
+            self.forget_das_t(das)
+
+            return earliest_epoch, latest_epoch
+
+        Das_t = filter_das_t(self.Das_t[das]['rows'], component)
         new_das_t = sorted(Das_t, key=lambda k: k['time/epoch_l'])
 
         if not new_das_t:
@@ -1421,42 +1951,37 @@ class PH5(experiment.ExperimentGroup):
         :param end:  end time epoch
         :return: list of tuples (sample_rate, start, end)
         '''
-        das_t_t = None
-        gaps = 0
         if component is None:
             raise ValueError("Component required for get_availability")
         if sample_rate is None:
             raise ValueError("Sample rate required for get_availability")
 
-        self.read_das_t(das, start, end, reread=True)
-
-        if das not in self.Das_t:
-            das_t_t = self.query_das_t(
-                das,
-                chan=component,
-                start_epoch=start,
-                stop_epoch=end,
-                sample_rate=sample_rate)
-            if not das_t_t:
+        index, pos = self._read_das_t(das, start, end)
+        if index is not None and len(pos):
+            self.num_found_das += 1
+        else:
+            index, pos = self._query_das_t(das, component, start, end,
+                                           sample_rate)
+            if index is None or not len(pos):
                 LOGGER.warning("No Das table found for " + das)
                 return None
-        if not das_t_t:
-            Das_t = filter_das_t(self.Das_t[das]['rows'], component)
-        else:
-            Das_t = filter_das_t(das_t_t, component)
+        pos = index.filter_channel(pos, component)
         if sample_rate > 0:
-            Das_t = [das_t for das_t in Das_t if
-                     das_t['sample_rate_i'] /
-                     das_t['sample_rate_multiplier_i'] == sample_rate]
+            with np.errstate(divide='ignore'):
+                sr = index.sample_rate[pos] // \
+                    index.sample_rate_multiplier[pos]
+            pos = pos[sr == sample_rate]
         else:
-            Das_t = [das_t for das_t in Das_t if
-                     das_t['sample_rate_i'] == sample_rate]
-
-        new_das_t = sorted(Das_t, key=lambda k: k['time/epoch_l'])
+            pos = pos[index.sample_rate[pos] == sample_rate]
+        pos = pos[np.argsort(index.epoch[pos], kind='mergesort')]
 
-        if not new_das_t:
+        if not len(pos):
             LOGGER.warning("No Das table found for " + das)
             return None
+        with np.errstate(divide='ignore', invalid='ignore'):
+            lengths = (index.sample_count[pos].astype(np.float64) /
+                       index.sample_rate[pos] /
+                       index.sample_rate_multiplier[pos])
 
         gaps = 0
         prev_start = None
@@ -1464,18 +1989,11 @@ class PH5(experiment.ExperimentGroup):
         prev_len = None
         prev_sr = None
         times = []
-        for entry in new_das_t:
+        for cur_time, cur_len, cur_sr, sample_rate_i in \
+                zip(index.start[pos].tolist(), lengths.tolist(),
+                    index.sr[pos].tolist(), index.sample_rate[pos].tolist()):
             # set the values for this entry
-            cur_time = (float(entry['time/epoch_l']) +
-                        float(entry['time/micro_seconds_i']) /
-                        1000000)
-            if entry['sample_rate_i'] > 0:
-                cur_len = (float(entry['sample_count_i']) /
-                           float(entry['sample_rate_i']) /
-                           float(entry['sample_rate_multiplier_i']))
-                cur_sr = (float(entry['sample_rate_i']) /
-                          float(entry['sample_rate_multiplier_i']))
-            else:
+            if sample_rate_i <= 0:
                 cur_len = 0
                 cur_sr = 0
             cur_end = cur_time + cur_len
@@ -1620,6 +2138,17 @@ def by_id(rows, key='id_s', secondary_key=None, unique_key=True):
     return byid, order
 
 
+def first_by(rows, key):
+    '''   Index rows by key keeping the first row of each value,
+          rows without key are left out   '''
+    first = {}
+    for r in rows:
+        if key in r and r[key] not in first:
+            first[r[key]] = r
+
+    return first
+
+
 def run_geod(lat0, lon0, lat1, lon1):
     UNITS = 'm'
     ELLIPSOID = 'WGS84'
@@ -1628,9 +2157,12 @@ def run_geod(lat0, lon0, lat1, lon1):
 
     g = Geod(config)
 
+    # Takes lists of points as well
     az, baz, dist = g.inv(lon0, lat0, lon1, lat1)
 
-    if dist:
+    if isinstance(dist, list):
+        dist = [d / FACTS_M[UNITS] for d in dist]
+    elif dist:
         dist /= FACTS_M[UNITS]
 
     # Return list containing azimuth, back azimuth, distance
@@ -1767,21 +2299,121 @@ def build_kef(ts, rs):
        rs -> rows object
     '''
     tdoy = timedoy.TimeDOY(epoch=time.time())
-    ret = "#\n### Written by ph5api v{0} at {1}\n#\n".format(
-        PROG_VERSION, tdoy.getFdsnTime())
+    ret = ["#\n### Written by ph5api v{0} at {1}\n#\n".format(
+        PROG_VERSION, tdoy.getFdsnTime())]
     i = 0
     for r in rs:
         i += 1
-        ret += "# {0}\n".format(i)
-        ret += ts + '\n'
+        ret.append("# {0}\n".format(i))
+        ret.append(ts + '\n')
         keys = r.keys()
         for k in keys:
             line = "\t{0} = {1}\n".format(k, r[k])
-            ret += line
+            ret.append(line)
+
+    return ''.join(ret)
+
+
+def file_generation(filename):
+    '''
+       Modification time and size of a file, these change when the file
+       is written. None if the file can not be found.
+    '''
+    try:
+        st = os.stat(filename)
+    except OSError:
+        return None
+
+    return st.st_mtime, st.st_size
+
+
+def table_nbytes(table):
+    '''
+       Approximate memory used by a table as read into a list of
+       dictionaries with its keys, or by an object with nbytes.
+    '''
+    if hasattr(table, 'nbytes'):
+        return table.nbytes
+    rows, keys = table
+    if not rows:
+        return 0
+    # Estimate from the first row
+    row = rows[0]
+    nbytes = sys.getsizeof(row) + sum([sys.getsizeof(v)
+                                       for v in row.values()])
+
+    return len(rows) * nbytes
+
+
+def trim_parts(parts, nsamples):
+    '''
+       Trim a list of (trace_reference, start, count) parts of a trace
+       so that together they hold at most nsamples.
+    '''
+    ret = []
+    for trace_reference, start, count in parts:
+        if nsamples <= 0:
+            break
+        count = min(count, nsamples)
+        ret.append((trace_reference, start, count))
+        nsamples -= count
+
+    return ret
+
+
+def split_parts(parts, nsamples, chunk_samples):
+    '''
+       Split a list of (trace_reference, start, count) parts of a trace of
+       nsamples samples into pieces of at most chunk_samples samples.
+       Returns a list of (offset, parts, nsamples) per piece, offset being
+       the first sample of the piece in the trace. A trace of no samples
+       gives one empty piece.
+    '''
+    chunk_samples = max(1, int(chunk_samples))
+    ret = []
+    chunk = []
+    n = 0
+    offset = 0
+    for trace_reference, start, count in trim_parts(parts, nsamples):
+        while count > 0:
+            take = min(count, chunk_samples - n)
+            chunk.append((trace_reference, start, take))
+            n += take
+            start += take
+            count -= take
+            if n == chunk_samples:
+                ret.append((offset, chunk, n))
+                offset += n
+                chunk = []
+                n = 0
+    if n or not ret:
+        ret.append((offset, chunk, n))
 
     return ret
 
 
+def _truncdiv(a, b):
+    '''
+       Integer division of arrays truncating toward zero with 0 where b is
+       0, the way numexpr divides integers.
+    '''
+    a = np.asarray(a, dtype=np.int64)
+    b = np.asarray(b, dtype=np.int64)
+    zero = b == 0
+    b = np.where(zero, 1, b)
+    q = np.abs(a) // np.abs(b) * np.sign(a) * np.sign(b)
+
+    return np.where(zero, 0, q)
+
+
+def _literal(value):
+    '''
+       Value as read back from str(value), the precision it had in a
+       numexpr query string.
+    '''
+    return float(str(value))
+
+
 def fepoch(epoch, usecs):
     '''
     Given ascii epoch and microseconds return epoch as a float.
@@ -1793,31 +2425,14 @@ def fepoch(epoch, usecs):
 
 
 def _cor(start_fepoch, stop_fepoch, Time_t, max_drift_rate=MAX_DRIFT_RATE):
-    '''   Calculate clock correction in miliseconds   '''
+    '''   Calculate clock correction in miliseconds
+          Time_t -> TimeWindows, or a list of Time_t rows of the DAS
+    '''
     clock = Clock()
-    if not Time_t:
-        Time_t = []
-
-    time_t = None
-    for t in Time_t:
-        if hasattr(t, 'corrected_i'):
-            if t['corrected_i'] != 1:
-                data_start = fepoch(t['start_time/epoch_l'],
-                                    t['start_time/micro_seconds_i'])
-                data_stop = fepoch(t['end_time/epoch_l'],
-                                   t['end_time/micro_seconds_i'])
-                if is_in(data_start, data_stop, start_fepoch, stop_fepoch):
-                    time_t = t
-                    break
-        else:
-            data_start = fepoch(t['start_time/epoch_l'],
-                                t['start_time/micro_seconds_i'])
-            data_stop = fepoch(t['end_time/epoch_l'],
-                               t['end_time/micro_seconds_i'])
-            if is_in(data_start, data_stop, start_fepoch, stop_fepoch):
-                time_t = t
-                break
+    if not isinstance(Time_t, TimeWindows):
+        Time_t = TimeWindows(Time_t or [])
 
+    time_t = Time_t.find(start_fepoch, stop_fepoch)
     if time_t is None:
         clock.comment.append("No clock drift information available.")
         return 0., clock
@@ -1831,6 +2446,8 @@ def _cor(start_fepoch, stop_fepoch, Time_t, max_drift_rate=MAX_DRIFT_RATE):
     if abs(time_t['slope_d']) > MAX_DRIFT_RATE:
         clock.comment.append("Clock drift rate exceeds maximum drift rate.")
 
+    data_start = fepoch(time_t['start_time/epoch_l'],
+                        time_t['start_time/micro_seconds_i'])
     mid_fepoch = start_fepoch + ((stop_fepoch - start_fepoch) / 2.)
     delta_fepoch = mid_fepoch - data_start
 
@@ -1839,18 +2456,9 @@ def _cor(start_fepoch, stop_fepoch, Time_t, max_drift_rate=MAX_DRIFT_RATE):
 
 
 def filter_das_t(Das_t, chan):
-    def sort_on_epoch(a, b):
-        a_epoch = a['time/epoch_l'] + \
-                  (float(a['time/micro_seconds_i']) / 1000000.)
-        b_epoch = b['time/epoch_l'] + \
-                  (float(b['time/micro_seconds_i']) / 1000000.)
-
-        if a_epoch > b_epoch:
-            return 1
-        elif a_epoch < b_epoch:
-            return -1
-        else:
-            return 0
+    def epoch(a):
+        return a['time/epoch_l'] + \
+            (float(a['time/micro_seconds_i']) / 1000000.)
 
     ret = []
     Das_t = [das_t for das_t in Das_t if das_t['channel_number_i'] == chan]
@@ -1869,6 +2477,6 @@ def filter_das_t(Das_t, chan):
         else:
             ret.append(das_t)
 
-    ret.sort(cmp=sort_on_epoch)
+    ret.sort(key=epoch)
 
     return ret
@@ -13,7 +13,7 @@ import sys
 import logging
 import rt_125a_py
 
-PROG_VERSION = '2018.268'
+PROG_VERSION = '2026.291'
 LOGGER = logging.getLogger(__name__)
 
 if sys.version_info >= (2, 3):
@@ -152,6 +152,9 @@ class pn125:
         self.bufPages = 0
         # Event table buffer
         self.eventTable = []
+        # Data of the pages of this event, and samples in them
+        self.pages = []
+        self.samples = 0
 
     def openTRD(self):
         '''   Open raw data file   '''
@@ -169,6 +172,12 @@ class pn125:
         self.nullTrace()
 
     def closeEvent(self):
+        '''   Decode the data pages of the event in one go   '''
+        try:
+            self.trace.trace = rt_125a_py.data_decode(''.join(self.pages),
+                                                      self.samples)
+        except ValueError as e:
+            raise TRDError(e)
         self.trace.sampleCount = len(self.trace.trace)
 
     def readBlock(self):
@@ -203,6 +212,8 @@ class pn125:
         self.trace.trace = []
         self.trace.gain = None
         self.trace.fsd = None
+        self.pages = []
+        self.samples = 0
 
     def table(self, b):
         '''   Process event table info   '''
@@ -311,8 +322,9 @@ class pn125:
         return fk[fsd], gk[gain]
 
     def processEvent(self, b, n):
-        d = rt_125a_py.data_decode(b, n)
-        self.trace.trace.extend(d)
+        '''   Keep the n 24 bit samples of a data page   '''
+        self.pages.append(b[:n * 3])
+        self.samples += n
 
     def data(self, b):
         '''   Process data file   '''
@@ -19,7 +19,7 @@ import math
 import logging
 from ph5.core import rt_130_h, timedoy
 
-PROG_VERSION = '2019.14'
+PROG_VERSION = '2026.291'
 LOGGER = logging.getLogger(__name__)
 
 fileRE = re.compile(r".*\w{9}_\w{8}$")
@@ -1557,9 +1557,9 @@ class PN130:
             if c.data_format == 0xc0 or c.data_format == 0xc2:
                 # x0 = c.data[-2]
                 xn = c.data[-1]
-                del c.data[-2:]
+                c.data = c.data[:-2]
 
-                if self.verbose and c.data:
+                if self.verbose and len(c.data):
                     if xn != c.data[-1]:
                         self.ERRS.append(
                             "Garbled data packet at:"
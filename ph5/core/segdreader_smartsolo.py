@@ -7,9 +7,9 @@
 # Lan Dam, March 2021
 #
 
-import sys
 import logging
 import os
+import mmap
 import exceptions
 
 import numpy as np
@@ -23,8 +23,10 @@ except ImportError:
 from ph5.core import segd_h_smartsolo as segd_h
 from ph5.core.timedoy import TimeDOY
 
-PROG_VERSION = "2021.155"
+PROG_VERSION = "2026.291"
 LOGGER = logging.getLogger(__name__)
+# numpy byte order of Reader.endianess
+ENDIAN = {'big': '>', 'little': '<'}
 
 
 class InputsError (exceptions.Exception):
@@ -72,10 +74,13 @@ class TraceHeaders (object):
 
 
 class Reader ():
-    def __init__(self, infile=None):
+    def __init__(self, infile=None, use_mmap=False):
         self.manufacturer = 'SmartSolo'
         self.infile = infile
         self.FH = None
+        # Read traces as views of the file memory mapped
+        self.use_mmap = use_mmap
+        self.MM = None
         self.endianess = 'big'  # SEG-D is always big endian(?)
         # From General headers
         self.file_number = None
@@ -117,6 +122,34 @@ class Reader ():
 
         return buf
 
+    def read_samples(self, number_of_samples, dtype):
+        '''   Read number_of_samples samples of dtype as a read only
+              numpy array, a view of the file in place if memory mapped,
+              in the byte order of dtype   '''
+        dtype = np.dtype(dtype)
+        if self.use_mmap and self.MM is None and self.FH:
+            try:
+                self.MM = mmap.mmap(self.FH.fileno(), 0,
+                                    access=mmap.ACCESS_READ)
+            except (AttributeError, EnvironmentError, ValueError) as e:
+                LOGGER.debug("Can not memory map {0}, {1}. Reading."
+                             .format(self.infile, e))
+                self.use_mmap = False
+
+        if self.MM is None or self.FH.closed:
+            return np.frombuffer(
+                self.read_buf(dtype.itemsize * number_of_samples),
+                dtype=dtype)
+
+        offset = self.FH.tell()
+        count = min(number_of_samples,
+                    max(len(self.MM) - offset, 0) // dtype.itemsize)
+        self.FH.seek(count * dtype.itemsize, os.SEEK_CUR)
+        self.bytes_read += count * dtype.itemsize
+
+        return np.frombuffer(self.MM, dtype=dtype, count=count,
+                             offset=offset)
+
     def name(self):
         '''   Return name of open file   '''
         if self.FH:
@@ -333,17 +366,12 @@ class Reader ():
         f = self.trace_fmt = self.reel_headers.\
             general_header_blocks[0].data_sample_format_code
 
-        bytes_per_sample = 4  # Assumes 32 bit IEEE floats
-        buf = self.read_buf(bytes_per_sample * number_of_samples)
         # IEEE floats - 4 byte - Should be big endian
         if f == 8058:
             try:
-                if self.endianess != sys.byteorder:
-                    # Swap 4 byte
-                    ret = np.fromstring(buf, dtype=np.float32)
-                    ret = ret.byteswap()
-                else:
-                    ret = np.fromstring(buf, dtype=np.float32)
+                # Left in file order, converted once written to PH5
+                ret = self.read_samples(number_of_samples,
+                                        ENDIAN[self.endianess] + 'f4')
             except Exception as e:
                 raise InputsError(
                     "Error: Could not read data trace: {0}".format(e))
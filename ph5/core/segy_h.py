@@ -12,9 +12,10 @@
 import exceptions
 import logging
 import construct
+import numpy
 from ph5.core import ibmfloat, ebcdic
 
-PROG_VERSION = '2018.268'
+PROG_VERSION = '2026.291'
 LOGGER = logging.getLogger(__name__)
 
 
@@ -1450,6 +1451,111 @@ class Sioseis (Seg):
         Seg.__init__(self, endian)
 
 
+#
+# Trace headers as numpy records
+#
+# Packing many trace headers with construct, one field at a time, is slow.
+# The layouts below come from the construct descriptions above so the
+# records are the same bytes as get() of each header.
+#
+STRUCTS = ((Trace, trace_header, trace_header_le),
+           (Passcal, passcal_header, passcal_header_le),
+           (Menlo, menlo_header, menlo_header_le),
+           (Seg, seg_header, seg_header_le),
+           (iNova, inova_header, inova_header_le))
+
+NUMPY_FORMATS = {'b': 'i1', 'B': 'u1', 'h': 'i2', 'H': 'u2', 'l': 'i4',
+                 'L': 'u4', 'f': 'f4', 'd': 'f8'}
+
+
+def header_struct(header):
+    '''   construct Struct used by get() of a Trace or extended header   '''
+    for klass, big, little in STRUCTS:
+        if isinstance(header, klass):
+            if header.endian == 'big':
+                return big()
+            else:
+                return little()
+
+    raise HeaderError("No trace header layout for {0}.".format(
+        type(header).__name__))
+
+
+def header_dtype(struct):
+    '''   numpy dtype with the layout of a construct Struct, None if it has
+          fields other than numbers and fixed length strings   '''
+    fields = []
+    for sc in struct.subcons:
+        if isinstance(sc, construct.FormatField) and \
+                sc.packer.format[1:] in NUMPY_FORMATS:
+            fmt = sc.packer.format
+            fields.append((sc.name, fmt[0] + NUMPY_FORMATS[fmt[1:]]))
+        elif isinstance(sc, construct.StringAdapter) and \
+                isinstance(sc.subcon, construct.StaticField):
+            fields.append((sc.name, 'S{0}'.format(sc.subcon.length)))
+        else:
+            return None
+
+    return numpy.dtype(fields)
+
+
+def _column(name, values, dtype):
+    '''   Values of one field as an array of dtype, raise HeaderError where
+          construct would fail to build them   '''
+    if dtype.kind == 'S':
+        for v in values:
+            if not isinstance(v, str) or len(v) != dtype.itemsize:
+                raise HeaderError(
+                    "{0}: expected {1}, found {2}".format(
+                        name, dtype.itemsize, repr(v)))
+        return numpy.array(values, dtype=dtype)
+
+    a = numpy.array(values)
+    if a.dtype.kind not in 'biuf':
+        raise HeaderError(
+            "{0}: cannot convert argument to number".format(name))
+
+    if dtype.kind == 'f':
+        bad = numpy.isinf(a.astype(dtype)) & ~numpy.isinf(a)
+    elif a.dtype.kind == 'f':
+        # Like struct.pack floats are truncated
+        if numpy.isnan(a).any():
+            raise HeaderError(
+                "{0}: cannot convert float NaN to integer".format(name))
+        a = numpy.trunc(a)
+        info = numpy.iinfo(dtype)
+        bad = (a < info.min) | (a > info.max)
+    else:
+        info = numpy.iinfo(dtype)
+        bad = (a < info.min) | (a > info.max)
+    if bad.any():
+        raise HeaderError("{0}: {1} does not fit in {2}".format(
+            name, a[bad][0], dtype.name))
+
+    return a.astype(dtype)
+
+
+def header_records(headers):
+    '''
+       Pack headers of one class, Trace, Passcal, Menlo, Seg or iNova, into
+       a numpy structured array. Each record has the same bytes as get()
+       of the header. Layouts with fields numpy can not describe are built
+       with construct, one header at a time.
+    '''
+    struct = header_struct(headers[0])
+    dtype = header_dtype(struct)
+    if dtype is None:
+        buf = ''.join(h.get() for h in headers)
+        return numpy.frombuffer(buf, dtype=('V', struct.sizeof()))
+
+    ret = numpy.empty(len(headers), dtype=dtype)
+    for name in dtype.names:
+        ret[name] = _column(name, [h.__dict__[name] for h in headers],
+                            dtype.fields[name][0])
+
+    return ret
+
+
 #
 # Mixins
 #
@@ -20,7 +20,7 @@ from pyproj import Geod
 from ph5.core.cs2cs import geod2utm
 from ph5.core import segy_h, ebcdic
 
-PROG_VERSION = '2024.151'
+PROG_VERSION = '2026.291'
 LOGGER = logging.getLogger(__name__)
 
 os.environ['TZ'] = 'UTC'
@@ -31,6 +31,8 @@ MIN_16 = -32768.
 MAX_32 = 2147483647.
 MIN_32 = -2147483648.
 MAXSAMPLES = 65536
+# Samples SegyGather keeps before writing
+GATHER_SAMPLES = 2 ** 24
 
 FACTS = {'km': 1000., 'm': 1., 'dm': 1. / 10., 'cm': 1. / 100.,
          'mm': 1. / 1000., 'kmi': 1852.0, 'in': 0.0254, 'ft': 0.3048,
@@ -1226,6 +1228,170 @@ def write_segy(trace, fd, sf):
     return errors
 
 
+class SegyGather(object):
+    '''
+       Write the traces of a gather to a SEG-Y file, byte for byte the same
+       as write_segy_hdr for the first trace and write_segy for the rest.
+       Traces are kept until max_samples samples are waiting or flush() is
+       called. Their trace headers are then packed into numpy records, the
+       data padded and scaled in one pass, and everything written at once.
+    '''
+
+    def __init__(self, fd, sf, num_traces, max_samples=GATHER_SAMPLES):
+        self.fd = fd
+        self.sf = sf
+        self.num_traces = num_traces
+        self.max_samples = max_samples
+        # Text and reel headers until they are written
+        self.reel = ''
+        self.traces = []
+        self.samples = 0
+        self.count = 0
+
+    def add(self, trace):
+        '''   Set the headers of the next trace from sf and keep it
+              Returns: errors and messages for the log   '''
+        sf = self.sf
+        data = trace.data
+        first = self.count == 0
+        errors = []
+        if len(data) > MAX_16 and sf.break_standard is False:
+            errors.append(
+                "Warning: Data trace too long, %d samples, truncating to %d"
+                % (len(data), MAX_16))
+            sf.set_length_points(MAX_16)
+            sf.set_data(data[:MAXSAMPLES])
+        elif first:
+            sf.set_length_points(sf.length_points_all)
+            sf.set_data(data[:MAXSAMPLES])
+        else:
+            sf.set_data(data)
+
+        try:
+            sf.set_trace_type(trace.ttype, trace.byteorder)
+            if first:
+                sf.set_text_header()
+                sf.set_reel_header(self.num_traces)
+                self.reel = sf.text_header.get()[:3200] + \
+                    sf.reel_header.get()[:400]
+            sf.set_trace_header()
+        except Exception as e:
+            errors.append(e.message)
+            raise SEGYError(
+                "Error: Failed to set trace header. {0}\n".format(e.message))
+
+        try:
+            sf.extended_header.set(sf.ext)
+            bw = float(sf.response_t['bit_weight/value_d'])
+            if bw == 0:
+                raise SEGYError("Bit weight is zero.")
+            if sf.trace_type not in ('int', 'float'):
+                raise SEGYError(
+                    "Trace type unknown: {0}".format(sf.trace_type))
+        except Exception as e:
+            errors.append(e.message)
+            raise SEGYError(
+                "Error: Failed to set data array. {0}\n".format(e.message))
+
+        # Pad to length_points_all with the median value
+        pad = max(sf.length_points_all - len(sf.data), 0)
+        if pad and len(sf.data):
+            m = numpy.median(sf.data)
+        else:
+            m = 0
+        self.traces.append((sf.trace_header, sf.extended_header, sf.data,
+                            pad, m, sf.trace_type == 'int', bw))
+        self.count += 1
+        n = len(sf.data) + pad
+        self.samples += n
+
+        L = len(data)
+        p = sf.length_points_all - L
+        errors.append(
+            "Wrote: {0:d} samples with {1:d} sample padding.".format(L, p))
+        if first:
+            errors.append("=-" * 40)
+        if n != sf.length_points_all:
+            errors.append("Only wrote {0} samples.".format(n))
+
+        if self.samples >= self.max_samples:
+            self.flush()
+
+        return errors
+
+    def trace_data(self, lengths):
+        '''   Padded and scaled data of the waiting traces as big endian
+              IEEE floats   '''
+        ends = numpy.cumsum(lengths)
+        x = numpy.empty(ends[-1] if len(ends) else 0, dtype=numpy.float64)
+        for t, e in zip(self.traces, ends):
+            data, pad, m = t[2:5]
+            x[e - pad - len(data):e - pad] = data
+            x[e - pad:e] = m
+
+        is_int = numpy.array([t[5] for t in self.traces])
+        bw = numpy.array([t[6] for t in self.traces])
+        # Float traces are scaled in single precision. The product of two
+        # singles is exact as a double so rounding it once is the same.
+        bw = numpy.where(is_int, bw, bw.astype(numpy.float32))
+        x = numpy.where(numpy.repeat(is_int, lengths),
+                        x.astype(numpy.int32), x.astype(numpy.float32))
+
+        return (x * numpy.repeat(bw, lengths)).astype('>f4')
+
+    def trace_headers(self):
+        '''   Trace and extended headers of the waiting traces, 240 bytes
+              each   '''
+        ret = numpy.empty(len(self.traces),
+                          dtype=[('trace', 'V180'), ('ext', 'V60')])
+        for name, i, size in (('trace', 0, 180), ('ext', 1, 60)):
+            by_class = {}
+            for j, t in enumerate(self.traces):
+                by_class.setdefault(type(t[i]), []).append(j)
+            for rows in by_class.values():
+                records = segy_h.header_records(
+                    [self.traces[j][i] for j in rows])
+                ret[name][rows] = records.view(('V', size))
+
+        return ret.view(numpy.uint8).reshape(len(self.traces), 240)
+
+    def flush(self):
+        '''   Write the waiting traces, with the text and reel headers
+              before the first one   '''
+        if not self.traces:
+            return
+
+        lengths = numpy.array([len(t[2]) + t[3] for t in self.traces],
+                              dtype=numpy.int64)
+        try:
+            headers = self.trace_headers()
+        except Exception as e:
+            raise SEGYError(
+                "Possible SEG-Y trace header overflow: {0}".format(e.message))
+        data = self.trace_data(lengths)
+
+        sizes = 240 + 4 * lengths
+        offsets = len(self.reel) + numpy.cumsum(sizes) - sizes
+        buf = numpy.empty(len(self.reel) + sizes.sum(), dtype=numpy.uint8)
+        buf[:len(self.reel)] = numpy.frombuffer(self.reel, dtype=numpy.uint8)
+        where = offsets[:, numpy.newaxis] + numpy.arange(240)
+        buf[where] = headers
+        is_data = numpy.ones(len(buf), dtype=bool)
+        is_data[:len(self.reel)] = False
+        is_data[where] = False
+        buf[is_data] = data.view(numpy.uint8)
+
+        try:
+            buf.tofile(self.fd)
+        except Exception as e:
+            raise SEGYError(
+                "Failed to write SEG-Y traces: {0}".format(e.message))
+
+        self.reel = ''
+        self.traces = []
+        self.samples = 0
+
+
 def calc_red_vel_secs(offset_t, red_vel):
     errors = []
     if red_vel <= 0:
@@ -8,15 +8,19 @@
 import sys
 import logging
 import os
+import mmap
 import exceptions
-import construct
 import numpy as np
-from ph5.core import segy_h, ebcdic
+from ph5.core import segy_h, ebcdic, ibmfloat
 
-PROG_VERSION = '2018.268'
+PROG_VERSION = '2026.291'
 LOGGER = logging.getLogger(__name__)
 
 SAMPLE_LENGTH = {1: 4, 2: 4, 3: 2, 4: 4, 5: 4, 8: 1}
+# numpy sample type of trace format
+SAMPLE_TYPE = {1: 'u4', 2: 'i4', 3: 'i2', 5: 'f4', 8: 'i1'}
+# numpy byte order of Reader.endianess
+ENDIAN = {'big': '>', 'little': '<'}
 
 SIZEOF = {"lineSeq": 32, "reelSeq": 32, "event_number": 32,
           "channel_number": 32, "energySourcePt": 32, "cdpEns": 32,
@@ -86,7 +90,7 @@ class InputsError (exceptions.Exception):
 
 
 class Reader ():
-    def __init__(self, infile=None):
+    def __init__(self, infile=None, use_mmap=False):
         self.infile = infile
         self.ext_hdr_type = 'S'  # S => SEG, U => MENLO,
         # P => PASSCAL, I => SIOSEIS, N => INOVA
@@ -104,6 +108,9 @@ class Reader ():
         # Number of extended textural headers
         self.number_of_extended_text_headers = None
         self.FH = None
+        # Read traces as views of the file memory mapped
+        self.use_mmap = use_mmap
+        self.MM = None
 
     def set_infile(self, infile):
         self.infile = infile
@@ -191,6 +198,33 @@ class Reader ():
 
         return buf
 
+    def read_samples(self, number_of_samples, dtype):
+        '''   Read number_of_samples samples of dtype as a read only
+              numpy array, a view of the file in place if memory mapped,
+              in the byte order of dtype   '''
+        dtype = np.dtype(dtype)
+        if self.use_mmap and self.MM is None and self.FH:
+            try:
+                self.MM = mmap.mmap(self.FH.fileno(), 0,
+                                    access=mmap.ACCESS_READ)
+            except (AttributeError, EnvironmentError, ValueError) as e:
+                LOGGER.debug("Can not memory map {0}, {1}. Reading."
+                             .format(self.infile, e))
+                self.use_mmap = False
+
+        if self.MM is None or self.FH.closed:
+            return np.frombuffer(
+                self.read_buf(dtype.itemsize * number_of_samples) or '',
+                dtype=dtype)
+
+        offset = self.FH.tell()
+        count = min(number_of_samples,
+                    max(len(self.MM) - offset, 0) // dtype.itemsize)
+        self.FH.seek(count * dtype.itemsize, os.SEEK_CUR)
+
+        return np.frombuffer(self.MM, dtype=dtype, count=count,
+                             offset=offset)
+
     def read_text_header(self):
         ret = {}
         buf = self.read_buf(3200)
@@ -309,47 +343,16 @@ class Reader ():
         # FIXED, NOT FULLY TESTED
         # First version using NumPy 2013.303.a
         f = self.trace_fmt
-        buf = self.read_buf(bytes_per_sample * number_of_samples)
+        if f not in SAMPLE_TYPE:
+            raise InputsError("Format code of {0} not supported!".format(f))
         # IBM floats - 4 byte - Should be big endian
         if f == 1:
-            import ibmfloat
-            ret = []
-            ll = len(buf)
-            i = 0
-            while True:
-                if ll <= 0:
-                    break
-                b = buf[i:4 + i]
-                ret.append(construct.BFloat32(
-                    "x").parse(ibmfloat.ibm2ieee32(b)))
-                i += 4
-                ll -= 4
-        # INT - 4 byte or 2 byte
-        elif f == 2:
-            if self.endianess != sys.byteorder:
-                # Swap 4 byte
-                ret = np.fromstring(buf, dtype=np.int32)
-                ret = ret.byteswap()
-            else:
-                ret = np.fromstring(buf, dtype=np.int32)
-        elif f == 3:
-            if self.endianess != sys.byteorder:
-                # Swap 2 byte
-                ret = np.fromstring(buf, dtype=np.int16)
-                ret = ret.byteswap()
-            else:
-                ret = np.fromstring(buf, dtype=np.int16)
-        # IEEE floats - 4 byte
-        elif f == 5:
-            if self.endianess != sys.byteorder:
-                # Swap 4 byte
-                ret = np.fromstring(buf, dtype=np.float32)
-                ret = ret.byteswap()
-            else:
-                ret = np.fromstring(buf, dtype=np.float32)
-        # INT - 1 byte
-        elif f == 8:
-            ret = np.fromstring(buf, dtype=np.int8)
+            ret = ibmfloat.ibm2ieee_array(
+                self.read_samples(number_of_samples, '>u4'))
+        else:
+            # Left in file order, converted once written to PH5
+            ret = self.read_samples(number_of_samples,
+                                    ENDIAN[self.endianess] + SAMPLE_TYPE[f])
         return ret
 
     def isEOF(self):
@@ -0,0 +1,216 @@
+#
+# Export PH5 tables to kef, csv or npz a chunk of rows at a time
+#
+# Tables are read as structured numpy arrays and each column of a chunk is
+# converted to strings at once, so dumping a large Das_t, Array_t or Offset_t
+# does not build a dictionary per row and a string per value.
+#
+
+import csv
+import logging
+import os
+import tempfile
+import time
+import zipfile
+
+import numpy as np
+
+from ph5.core import columns, experiment
+
+PROG_VERSION = '2026.291'
+LOGGER = logging.getLogger(__name__)
+
+# Rows read and formatted at a time
+CHUNK_ROWS = 10000
+
+FORMATS = ('kef', 'csv', 'npz')
+
+
+def table_keys(table):
+    '''   Column paths of table in the order tabletokef writes them   '''
+    keys, names = columns.keys(table)
+    return keys
+
+
+def read_chunks(table, order=None, chunk_rows=None):
+    '''   Read a table chunk_rows at a time
+          Inputs:
+             table -> PyTables table
+             order -> row numbers to read in this order, all rows by default
+             chunk_rows -> rows per chunk, CHUNK_ROWS by default
+          Returns:
+             generator of structured numpy arrays
+    '''
+    if chunk_rows is None:
+        chunk_rows = CHUNK_ROWS
+    columns.write_pending(table)
+    nrows = table.nrows if order is None else len(order)
+    for start in range(0, nrows, chunk_rows):
+        stop = min(start + chunk_rows, nrows)
+        if order is None:
+            yield table.read(start, stop)
+        else:
+            yield table.read_coordinates(order[start:stop])
+
+
+def das_order(table):
+    '''   Row numbers of a Das_t in the order read_das sorts them, on
+          time/epoch_l keeping the order of rows with the same epoch
+    '''
+    columns.write_pending(table)
+    return np.argsort(table.col('time/epoch_l'), kind='mergesort')
+
+
+def check_srm(table, name, ignore_srm=False):
+    '''   experiment.check_srm_valid reading only sample_rate_multiplier_i
+          Raises experiment.HDF5InteractionError
+    '''
+    if ignore_srm:
+        return
+    if not table.nrows:
+        experiment.check_srm_valid([], None, name)
+        return
+
+    keys = table_keys(table)
+    rows = []
+    if 'sample_rate_multiplier_i' in keys:
+        # Only a row with a multiplier of 0 is an error
+        srm = table.col('sample_rate_multiplier_i')
+        rows = [{'sample_rate_multiplier_i': v} for v in srm[srm == 0][:1]]
+    experiment.check_srm_valid(rows, keys, name)
+
+
+def column_strings(recs, key):
+    '''   Values of column key of a chunk as str () writes the values of
+          table rows, python floats with 12 significant digits
+    '''
+    col = recs
+    for k in key.split('/'):
+        col = col[k]
+    if col.ndim > 1:
+        return [str(v) for v in col]
+    if col.dtype.kind == 'S':
+        return col.tolist()
+
+    return map(str, col.tolist())
+
+
+def table_line(path, keys, update_key=None):
+    '''   The kef table line of a table as tabletokef writes it   '''
+    if update_key in keys:
+        return "{0}:Update:{1} ".format(path, update_key)
+
+    return path
+
+
+class KefWriter(object):
+    '''
+       Write tables as kef, each like tabletokef.table_print
+       Inputs:
+          fh -> open file
+          version -> ph5 version for the header of each table
+          update_key -> write tables with this column as :Update:key
+          separator -> written after each row, '\n' as print adds
+    '''
+
+    def __init__(self, fh, version, update_key=None, separator=''):
+        self.fh = fh
+        self.version = version
+        self.update_key = update_key
+        self.separator = separator
+
+    def write(self, path, table, order=None):
+        '''   Write table as path, optionally rows in order   '''
+        if table is None or not table.nrows:
+            return
+        keys = table_keys(table)
+        line = table_line(path, keys, self.update_key)
+        self.fh.write("#\n#\t%s\tph5 version: %s\n#\n" % (
+            time.ctime(time.time()), self.version))
+        # Text between the values of a row, in order
+        between = ["#   Table row ", "\n{0}\n\t{1}=".format(line, keys[0])]
+        between += ["\n\t{0}=".format(k) for k in keys[1:]]
+        between.append("\n" + self.separator)
+        i = 1
+        for recs in read_chunks(table, order):
+            n = len(recs)
+            parts = np.empty((n, 2 * len(keys) + 3), dtype=object)
+            parts[:, 0::2] = between
+            parts[:, 1] = np.arange(i, i + n).astype('S').tolist()
+            for j, k in enumerate(keys):
+                parts[:, 2 * j + 3] = column_strings(recs, k)
+            self.fh.write(''.join(parts.ravel().tolist()))
+            i += n
+
+    def close(self):
+        self.fh.flush()
+
+
+class CsvWriter(object):
+    '''
+       Write tables as csv in the layout keftocsv gives their kef, a table
+       column then a column per table column. A header row starts each
+       table with different columns than the one before it.
+       Inputs:
+          fh -> open file
+          update_key -> write tables with this column as :Update:key
+    '''
+
+    def __init__(self, fh, update_key=None):
+        self.fh = fh
+        self.update_key = update_key
+        self.writer = csv.writer(fh)
+        self.header = None
+
+    def write(self, path, table, order=None):
+        '''   Write table as path, optionally rows in order   '''
+        if table is None or not table.nrows:
+            return
+        keys = table_keys(table)
+        line = table_line(path, keys, self.update_key).strip()
+        if ['table'] + keys != self.header:
+            self.header = ['table'] + keys
+            self.writer.writerow(self.header)
+        for recs in read_chunks(table, order):
+            self.writer.writerows(
+                zip([line] * len(recs),
+                    *[column_strings(recs, k) for k in keys]))
+
+    def close(self):
+        self.fh.flush()
+
+
+class NpzWriter(object):
+    '''
+       Write tables to a compressed npz file, an array of table rows named
+       as the table path without the leading / for each. numpy.load reads
+       them back.
+       Inputs:
+          filename -> npz file to create
+    '''
+
+    def __init__(self, filename):
+        self.zf = zipfile.ZipFile(filename, 'w', zipfile.ZIP_DEFLATED,
+                                  allowZip64=True)
+
+    def write(self, path, table, order=None):
+        '''   Write table as path, optionally rows in order   '''
+        if table is None:
+            return
+        nrows = table.nrows if order is None else len(order)
+        # Rows go to a .npy a chunk at a time, then into the zip file
+        fd, tmp = tempfile.mkstemp(suffix='.npy')
+        try:
+            with os.fdopen(fd, 'wb') as fh:
+                np.lib.format.write_array_header_1_0(
+                    fh, {'descr': np.lib.format.dtype_to_descr(table.dtype),
+                         'fortran_order': False,
+                         'shape': (nrows,)})
+                for recs in read_chunks(table, order):
+                    fh.write(recs.tobytes())
+            self.zf.write(tmp, path.lstrip('/') + '.npy')
+        finally:
+            os.remove(tmp)
+
+    def close(self):
+        self.zf.close()
@@ -0,0 +1,121 @@
+'''
+Tests for availability
+'''
+import unittest
+
+import numpy as np
+import tables
+
+from ph5.core import availability, columns
+from ph5.core.tests.test_base import LogTestCase
+
+
+def availability_table(rows):
+    '''   Availability_t rows as a structured array   '''
+    dtype = tables.description.dtype_from_descr(columns.Availability)
+    table = np.zeros(len(rows), dtype=dtype)
+    for i, r in enumerate(rows):
+        for k, v in r.items():
+            table[i][k] = v
+    return table
+
+
+class TestMerge(LogTestCase):
+    def test_merge(self):
+        entries = [(0., 10., 100.),
+                   (0., 10., 100.),    # duplicate
+                   (10., 20., 100.),   # continuous
+                   (15., 25., 100.),   # overlap
+                   (30., 40., 100.),   # gap
+                   (40., 50., 200.)]   # sample rate changes
+        self.assertEqual([(100., 0., 25.), (100., 30., 40.),
+                          (200., 40., 50.)],
+                         availability.merge(entries))
+        # deploy and pickup trim the first and last segments
+        self.assertEqual([(100., 5., 25.), (100., 30., 40.),
+                          (200., 40., 45.)],
+                         availability.merge(entries, 5., 45.))
+        # windows after the first outside deploy to pickup are skipped
+        self.assertEqual([(100., 0., 25.)],
+                         availability.merge(entries, 0., 25.))
+        self.assertEqual([], availability.merge([]))
+
+    def test_das_t_entries(self):
+        rows = [{'time/epoch_l': 100, 'time/micro_seconds_i': 500000,
+                 'sample_rate_i': 1, 'sample_rate_multiplier_i': 2,
+                 'sample_count_i': 10},
+                {'time/epoch_l': 200, 'time/micro_seconds_i': 0,
+                 'sample_rate_i': 0, 'sample_rate_multiplier_i': 1,
+                 'sample_count_i': 10}]
+        self.assertEqual([(100.5, 105.5, 0.5), (200., 200., 0)],
+                         availability.das_t_entries(rows))
+
+
+class TestAvailabilityIndex(LogTestCase):
+    def setUp(self):
+        super(TestAvailabilityIndex, self).setUp()
+        rows = []
+        for das, stamp in (('1X1', 'a' * 32), ('1X2', 'b' * 32)):
+            for start in (300., 0., 100., 200.):
+                rows.append({'serial_number_s': das,
+                             'channel_number_i': 1,
+                             'sample_rate_i': 100,
+                             'sample_rate_multiplier_i': 1,
+                             'start_epoch_d': start,
+                             'end_epoch_d': start + 50.,
+                             'das_t_stamp_s': stamp})
+        rows.append({'serial_number_s': '1X1',
+                     'channel_number_i': 1,
+                     'sample_rate_i': 250,
+                     'sample_rate_multiplier_i': 1,
+                     'start_epoch_d': 120.,
+                     'end_epoch_d': 130.,
+                     'das_t_stamp_s': 'a' * 32})
+        # 250 samples per second as 500 / 2
+        rows.append({'serial_number_s': '1X1',
+                     'channel_number_i': 1,
+                     'sample_rate_i': 500,
+                     'sample_rate_multiplier_i': 2,
+                     'start_epoch_d': 140.,
+                     'end_epoch_d': 160.,
+                     'das_t_stamp_s': 'a' * 32})
+        self.index = availability.AvailabilityIndex(
+            availability_table(rows))
+
+    def test_queries(self):
+        index = self.index
+        self.assertEqual(10, len(index))
+        self.assertTrue(index.is_current('1X1', 'a' * 32))
+        self.assertFalse(index.is_current('1X1', 'b' * 32))
+        self.assertFalse(index.is_current('1X3', 'a' * 32))
+        self.assertFalse(index.is_current('1X3', None))
+
+        self.assertEqual([(0., 50., 100.), (100., 150., 100.),
+                          (200., 250., 100.), (300., 350., 100.)],
+                         index.entries('1X1', 1, 100))
+        # segments overlapping the range, including at the edges
+        self.assertEqual([(100., 150., 100.), (200., 250., 100.)],
+                         index.entries('1X1', 1, 100, 150., 200.))
+        self.assertEqual([], index.entries('1X1', 1, 100, 60., 90.))
+        self.assertEqual([], index.entries('1X1', 2, 100))
+        # segments of every multiplier at the sample rate
+        self.assertEqual([(120., 130., 250.), (140., 160., 250.)],
+                         index.entries('1X1', 1, 250))
+        self.assertEqual([(140., 160., 250.)],
+                         index.entries('1X1', 1, 250., 135., 200.))
+
+        rows = index.rows('1X1', 1, 110., 210.)
+        self.assertEqual([(100., 100), (120., 250), (140., 500),
+                          (200., 100)],
+                         [(r['start_epoch_d'], r['sample_rate_i'])
+                          for r in rows])
+
+        self.assertEqual((0., 350.), index.extent('1X2', 1, 100))
+        self.assertEqual((100., 250.),
+                         index.extent('1X2', 1, 100, 110., 210.))
+        self.assertEqual((None, None), index.extent('1X2', 1, 250))
+        self.assertEqual((120., 160.), index.extent('1X1', 1, 250))
+
+
+if __name__ == "__main__":
+    unittest.main()
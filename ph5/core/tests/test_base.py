@@ -11,6 +11,11 @@ from ph5 import logger, ch
 from ph5.core import experiment
 from ph5.utilities import kef2ph5
 
+# Wall-clock benchmarks depend on the load of the host, so they are only run
+# when PH5_BENCHMARK is set, PH5_BENCHMARK=1 python runtests.py
+benchmark = unittest.skipUnless(os.environ.get('PH5_BENCHMARK'),
+                                "set PH5_BENCHMARK to run benchmarks")
+
 
 def initialize_ex(nickname, path, editmode=False):
     ex = experiment.ExperimentGroup(nickname=nickname, currentpath=path)
@@ -0,0 +1,236 @@
+'''
+Tests for columns
+'''
+import unittest
+
+from mock import patch
+
+from ph5.core import columns, experiment
+from ph5.core.tests.test_base import LogTestCase, TempDirTestCase, \
+    initialize_ex
+
+
+def das_rows(n):
+    '''   n Das_t rows with string and numeric values to be cast   '''
+    rows = []
+    for i in range(n):
+        rows.append({'time/epoch_l': str(1500000000 + i),
+                     'time/micro_seconds_i': i % 1000,
+                     'time/type_s': 'BOTH',
+                     'channel_number_i': ' {0} '.format(i % 3 + 1),
+                     'sample_rate_i': 100,
+                     'sample_rate_multiplier_i': '',
+                     'sample_count_i': 'not a number',
+                     'array_name_data_a': 'Data_a_{0:04d}'.format(i),
+                     'raw_file_name_s': None})
+    return rows
+
+
+class TestBulkWriter(TempDirTestCase, LogTestCase):
+    def setUp(self):
+        super(TestBulkWriter, self).setUp()
+        self.ex = initialize_ex('master.ph5', self.tmpdir, True)
+
+    def tearDown(self):
+        self.ex.ph5close()
+        super(TestBulkWriter, self).tearDown()
+
+    def das_t(self, das):
+        self.ex.ph5_g_receivers.newdas(das)
+        self.ex.ph5_g_receivers.setcurrent(
+            self.ex.ph5_g_receivers.getdas_g(das))
+        return self.ex.ph5_g_receivers.current_t_das
+
+    def test_same_rows_as_append(self):
+        rows = das_rows(25)
+        table = self.das_t('1X1')
+        for p in das_rows(25):
+            columns.append(table, p)
+        expected = table.read()
+
+        table = self.das_t('1X2')
+        with columns.BulkWriter(table, chunksize=10) as w:
+            for p in rows:
+                w.append(p)
+            # two full chunks written, five rows pending
+            self.assertEqual(20, table.nrows)
+            self.assertEqual(20, w.nrows)
+            self.assertEqual(5, w.npending)
+            self.assertTrue(columns.is_buffered(table))
+        self.assertFalse(columns.is_buffered(table))
+        self.assertEqual(expected.tolist(), table.read().tolist())
+        self.assertEqual(1500000024, table[24]['time']['epoch_l'])
+        self.assertEqual(3, table[23]['channel_number_i'])
+        self.assertEqual(0, table[23]['sample_count_i'])
+
+    def test_populate_table(self):
+        # populateDas_t goes through an open writer
+        table = self.das_t('1X1')
+        with columns.BulkWriter(table), \
+                patch.object(columns, 'colpaths',
+                             wraps=columns.colpaths) as colpaths:
+            for p in das_rows(5):
+                self.ex.ph5_g_receivers.populateDas_t(p)
+            self.assertEqual(0, table.nrows)
+            # rows are validated against the columns of the writer
+            self.assertFalse(colpaths.called)
+            self.assertRaises(experiment.HDF5InteractionError,
+                              self.ex.ph5_g_receivers.populateDas_t,
+                              dict(das_rows(1)[0], no_such_column=1))
+            # reads see pending rows
+            rows, keys = experiment.read_table(table)
+            self.assertEqual(5, len(rows))
+            self.ex.ph5_g_receivers.populateDas_t(das_rows(6)[5])
+            columns.update(table, {'array_name_data_a': 'Data_a_0005',
+                                   'sample_rate_i': 40},
+                           'array_name_data_a')
+        self.assertEqual(6, table.nrows)
+        self.assertEqual(40, table[5]['sample_rate_i'])
+        self.assertEqual(100, table[4]['sample_rate_i'])
+
+    def test_errors(self):
+        table = self.das_t('1X1')
+        with columns.BulkWriter(table) as w:
+            self.assertRaises(KeyError, w.append, {'no_such_column': 1})
+            self.assertRaises(ValueError, columns.BulkWriter(table).open)
+        # pending rows are written when the block raises
+        try:
+            with columns.BulkWriter(table) as w:
+                w.append(das_rows(1)[0])
+                raise IOError()
+        except IOError:
+            pass
+        self.assertEqual(1, table.nrows)
+        self.assertFalse(columns.is_buffered(table))
+
+
+class TestKeyIndex(TempDirTestCase, LogTestCase):
+    def setUp(self):
+        super(TestKeyIndex, self).setUp()
+        self.ex = initialize_ex('master.ph5', self.tmpdir, True)
+        self.tables = []
+        for das in ('1X1', '1X2'):
+            self.ex.ph5_g_receivers.newdas(das)
+            self.ex.ph5_g_receivers.setcurrent(
+                self.ex.ph5_g_receivers.getdas_g(das))
+            table = self.ex.ph5_g_receivers.current_t_das
+            with columns.BulkWriter(table) as w:
+                for p in das_rows(30):
+                    w.append(p)
+            self.tables.append(table)
+
+    def tearDown(self):
+        self.ex.ph5close()
+        super(TestKeyIndex, self).tearDown()
+
+    def check_lookups(self, table):
+        self.assertEqual(7, columns.lindex(table, ' Data_a_0007',
+                                           'array_name_data_a'))
+        self.assertEqual(None, columns.lindex(table, 'Data_a_0099',
+                                              'array_name_data_a'))
+        self.assertEqual(range(1, 30, 3),
+                         columns.find_rows(table, 'channel_number_i', 2))
+        self.assertEqual(5, columns.lindex(table, '1500000005',
+                                           'time/epoch_l'))
+        r = columns.search(table, 'array_name_data_a', 'Data_a_0009')
+        self.assertEqual(1500000009, r['time/epoch_l'])
+
+        # update every row on channel 2
+        columns.update(table, {'channel_number_i': '2',
+                               'sample_rate_i': 250}, 'channel_number_i')
+        self.assertEqual([250] * 10,
+                         table.read_coordinates(range(1, 30, 3),
+                                                field='sample_rate_i')
+                         .tolist())
+        # update changes another key column
+        columns.update(table, {'array_name_data_a': 'Data_a_0003',
+                               'time/epoch_l': 1400000000},
+                       'array_name_data_a')
+        self.assertEqual(3, columns.lindex(table, '1400000000',
+                                           'time/epoch_l'))
+        self.assertEqual(None, columns.lindex(table, '1500000003',
+                                              'time/epoch_l'))
+        # delete shifts the rows after it
+        columns.delete(table, 'Data_a_0004', 'array_name_data_a')
+        self.assertEqual(29, table.nrows)
+        self.assertEqual(None, columns.lindex(table, 'Data_a_0004',
+                                              'array_name_data_a'))
+        self.assertEqual(4, columns.lindex(table, 'Data_a_0005',
+                                           'array_name_data_a'))
+        # appended rows are found
+        columns.append(table, {'array_name_data_a': 'Data_a_0100'})
+        self.assertEqual(29, columns.lindex(table, 'Data_a_0100',
+                                            'array_name_data_a'))
+        return table.read().tolist()
+
+    def test_lookups(self):
+        expected = self.check_lookups(self.tables[0])
+        self.assertEqual({}, columns.KEY_INDEXES)
+        with columns.IndexedBatch():
+            self.assertEqual(expected, self.check_lookups(self.tables[1]))
+            self.assertTrue(columns.KEY_INDEXES)
+        self.assertEqual({}, columns.KEY_INDEXES)
+
+    def test_batch_reads_key_once(self):
+        with patch('ph5.core.columns._key_values',
+                   wraps=columns._key_values) as key_values:
+            with columns.IndexedBatch():
+                for i in range(30):
+                    columns.update(self.tables[0],
+                                   {'array_name_data_a':
+                                    'Data_a_{0:04d}'.format(i),
+                                    'sample_rate_i': i},
+                                   'array_name_data_a')
+            self.assertEqual(1, key_values.call_count)
+        self.assertEqual(range(30),
+                         self.tables[0].col('sample_rate_i').tolist())
+
+    def test_update_delete_rows(self):
+        ps = [{'channel_number_i': '2', 'sample_rate_i': 250},
+              {'channel_number_i': 3, 'sample_rate_i': 500,
+               'time/epoch_l': '1400000000'},
+              {'channel_number_i': 2, 'sample_rate_i': 40},
+              {'channel_number_i': 9, 'sample_rate_i': 1}]
+        values = ['Data_a_0004', 'Data_a_0029', 'Data_a_0005',
+                  'Data_a_0099', ' Data_a_0003', 'Data_a_0004']
+        last = [{'array_name_data_a': 'Data_a_0001', 'sample_rate_i': 7},
+                {'array_name_data_a': 'Data_a_0011', 'channel_number_i': 1}]
+        table = self.tables[0]
+        for p in ps:
+            columns.update(table, dict(p), 'channel_number_i')
+        for value in values:
+            columns.delete(table, value, 'array_name_data_a')
+        for value in (3, '3'):
+            columns.delete(table, value, 'channel_number_i')
+        for p in last:
+            columns.update(table, dict(p), 'array_name_data_a')
+        expected = table.read().tolist()
+
+        with columns.IndexedBatch():
+            table = self.tables[1]
+            columns.update_rows(table, [dict(p) for p in ps],
+                                'channel_number_i')
+            self.assertEqual(1400000000,
+                             columns.search(table, 'array_name_data_a',
+                                            'Data_a_0002')['time/epoch_l'])
+            columns.delete_rows(table, values, 'array_name_data_a')
+            # repeated values delete the next matching row
+            columns.delete_rows(table, [3, '3'], 'channel_number_i')
+            self.assertEqual(None, columns.lindex(table, 'Data_a_0002',
+                                                  'array_name_data_a'))
+            self.assertEqual(None, columns.lindex(table, 'Data_a_0008',
+                                                  'array_name_data_a'))
+            columns.update_rows(table, [dict(p) for p in last],
+                                'array_name_data_a')
+            rows = columns.find_rows(table, 'channel_number_i', 1)
+            self.assertEqual(10, len(rows))
+            self.assertIn(columns.lindex(table, 'Data_a_0011',
+                                         'array_name_data_a'), rows)
+        self.assertEqual(24, table.nrows)
+        self.assertEqual(expected, table.read().tolist())
+        self.assertEqual([7] + [40] * 8, table.col('sample_rate_i')[
+            table.col('channel_number_i') == 2].tolist())
+
+
+if __name__ == "__main__":
+    unittest.main()
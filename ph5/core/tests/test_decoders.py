@@ -0,0 +1,169 @@
+'''
+Tests for the rt_130_py, rt_125a_py and firfilt_py decoders
+'''
+import binascii
+import math
+import os
+import struct
+import unittest
+import zipfile
+
+import numpy as np
+
+import firfilt_py
+import rt_125a_py
+import rt_130_py
+from ph5.core import decimate, pn125
+from ph5.core.tests.test_base import LogTestCase
+
+TEST_DATA = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(
+        os.path.abspath(__file__)))), 'test_data')
+
+
+def rt130_packets(path):
+    '''   DT packets of a RT-130 ZIP file   '''
+    packets = []
+    with zipfile.ZipFile(path) as z:
+        for name in z.namelist():
+            b = z.read(name)
+            packets.extend(b[i:i + 1024] for i in range(0, len(b), 1024)
+                           if b[i:i + 2] == 'DT')
+    return packets
+
+
+def rt125a_events(path):
+    '''   (data pages, samples) of each event of a RT-125A TRD file   '''
+    pn = pn125.pn125(path)
+    events = []
+    while pn.getEvent():
+        events.append((list(pn.pages), pn.samples))
+    return events
+
+
+def dt_packet(data_format, samples):
+    '''   A DT packet of int16 or int32 samples   '''
+    header = 'DT' + '\x00' * 14
+    # event 1, stream 0, channel 0, samples as BCD
+    header += binascii.unhexlify('00010000{0:04d}'.format(len(samples)))
+    header += struct.pack('>BB', 0, data_format)
+    fmt = '>{0}h' if data_format == 0x16 else '>{0}i'
+    payload = struct.pack(fmt.format(len(samples)), *samples)
+    return (header + payload).ljust(1024, '\x00')
+
+
+class TestRT130Decoders(LogTestCase):
+    def setUp(self):
+        super(TestRT130Decoders, self).setUp()
+        self.packets = rt130_packets(
+            os.path.join(TEST_DATA, 'rt130/2016139.9EEF.ZIP'))
+
+    def test_read_int(self):
+        samples = [0, 1, -1, 32767, -32768, 1234]
+        for data_format, read in ((0x16, rt_130_py.read_int16),
+                                  (0x32, rt_130_py.read_int32)):
+            packet = dt_packet(data_format, samples)
+            data = read(packet, len(samples))
+            self.assertEqual(np.int32, data.dtype)
+            self.assertEqual(samples, data.tolist())
+            # into an array of the caller
+            out = np.zeros(10, dtype=np.int32)
+            self.assertIs(out, read(packet, len(samples), out))
+            self.assertEqual(samples + [0] * 4, out.tolist())
+
+        packet = dt_packet(0x32, [2 ** 31 - 1, -2 ** 31])
+        self.assertEqual([2 ** 31 - 1, -2 ** 31],
+                         rt_130_py.read_int32(packet, 2).tolist())
+
+    def test_read_steim2(self):
+        p = self.packets[0]
+        samples = rt_130_py.get_data_header(p)[3]
+        data = rt_130_py.read_steim2(p, samples)
+        self.assertEqual(np.int32, data.dtype)
+        # samples then x0 and xn
+        self.assertEqual(samples + 2, len(data))
+        self.assertEqual(data[0], data[-2])
+        self.assertEqual(data[samples - 1], data[-1])
+
+        out = np.empty(samples + 2, dtype=np.int32)
+        self.assertIs(out, rt_130_py.read_steim2(p, samples, out))
+        self.assertTrue(np.array_equal(data, out))
+        with self.assertRaises(ValueError):
+            rt_130_py.read_steim2(p, samples, out[:-1])
+        with self.assertRaises(TypeError):
+            rt_130_py.read_steim2(p, samples, out.astype(np.int64))
+        with self.assertRaises(TypeError):
+            rt_130_py.read_steim2(p, samples, out[::2])
+
+    def test_read_packets(self):
+        data, counts = rt_130_py.read_packets(self.packets)
+        expected = [rt_130_py.read_steim2(
+            p, rt_130_py.get_data_header(p)[3])[:-2] for p in self.packets]
+        self.assertEqual([len(e) for e in expected], counts.tolist())
+        self.assertEqual(np.int32, data.dtype)
+        self.assertTrue(np.array_equal(np.concatenate(expected), data))
+
+        int16 = dt_packet(0x16, [1, 2, 3])
+        data, counts = rt_130_py.read_packets(
+            [int16, self.packets[0], int16])
+        self.assertEqual([3, len(expected[0]), 3], counts.tolist())
+        self.assertEqual([1, 2, 3], data[:3].tolist())
+        self.assertTrue(np.array_equal(expected[0], data[3:-3]))
+
+        data, counts = rt_130_py.read_packets([])
+        self.assertEqual(0, len(data))
+        with self.assertRaises(ValueError):
+            rt_130_py.read_packets([self.packets[0], dt_packet(0x33, [1])])
+
+
+class TestRT125aDecoders(LogTestCase):
+    def test_data_decode(self):
+        data = rt_125a_py.data_decode('\x00\x00\x01\xff\xff\xff\x80\x00\x00'
+                                      '\x7f\xff\xff', 4)
+        self.assertEqual(np.int32, data.dtype)
+        self.assertEqual([1, -1, -2 ** 23, 2 ** 23 - 1], data.tolist())
+        out = np.zeros(2, dtype=np.int32)
+        self.assertIs(out, rt_125a_py.data_decode('\x00\x00\x02', 1, out))
+        self.assertEqual([2, 0], out.tolist())
+        with self.assertRaises(ValueError):
+            rt_125a_py.data_decode('\x00\x00\x02', 2)
+
+    def test_pn125(self):
+        # an event is decoded in one call from its pages
+        path = os.path.join(TEST_DATA, 'rt125a/I2183RAW.TRD')
+        pn = pn125.pn125(path)
+        counts = []
+        for pages, samples in rt125a_events(path):
+            self.assertEqual(pn.getEvent(), samples)
+            self.assertEqual(np.int32, pn.trace.trace.dtype)
+            self.assertTrue(np.array_equal(
+                np.concatenate([rt_125a_py.data_decode(b, len(b) // 3)
+                                for b in pages]),
+                pn.trace.trace))
+            counts.append(samples)
+        self.assertEqual([3000, 500, 3000, 500, 4000, 500, 3000, 500, 3000],
+                         counts)
+
+
+class TestFirfilt(LogTestCase):
+    def test_decimate(self):
+        ts = [int(math.sin(math.radians(i)) * 1000.) for i in range(36000)]
+        data = firfilt_py.decimate(ts, len(ts), '2,4,5')
+        self.assertEqual(np.int32, data.dtype)
+        # the shift is the last element
+        self.assertEqual(901, len(data))
+        for data_in in (np.array(ts, dtype=np.int32),
+                        np.array(ts, dtype=np.float64)):
+            self.assertTrue(np.array_equal(
+                data, firfilt_py.decimate(data_in, len(ts), '2,4,5')))
+        with self.assertRaises(ValueError):
+            firfilt_py.decimate(ts[:10], 20, '2')
+
+        shift, decimated = decimate.decimate('2,4,5', ts)
+        self.assertEqual(data[-1], shift)
+        self.assertIsInstance(shift, int)
+        self.assertTrue(np.array_equal(data[:-1], decimated))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,94 @@
+'''
+Benchmarks for the rt_130_py and rt_125a_py decoders against the list
+path they replace: per packet decoding to a list of ints, copied to a
+numpy array at the end
+'''
+import os
+import unittest
+
+import numpy as np
+
+import rt_125a_py
+import rt_130_py
+from ph5.core.tests.test_base import benchmark
+from ph5.core.tests.test_decoders import TEST_DATA, rt130_packets, \
+    rt125a_events
+from ph5.core.tests.test_ibmfloat_benchmark import best_time
+
+
+def rt130_list(packets):
+    data = []
+    for p in packets:
+        samples = rt_130_py.get_data_header(p)[3]
+        data.extend(rt_130_py.read_steim2(p, samples).tolist()[:-2])
+    return np.array(data, dtype=np.int32)
+
+
+def rt130_arrays(packets):
+    return np.concatenate([
+        rt_130_py.read_steim2(p, rt_130_py.get_data_header(p)[3])[:-2]
+        for p in packets])
+
+
+def rt130_batch(packets):
+    return rt_130_py.read_packets(packets)[0]
+
+
+def rt125a_list(events):
+    for pages, samples in events:
+        data = []
+        for b in pages:
+            data.extend(rt_125a_py.data_decode(b, len(b) // 3).tolist())
+        np.array(data, dtype=np.int32)
+
+
+def rt125a_batch(events):
+    for pages, samples in events:
+        rt_125a_py.data_decode(''.join(pages), samples)
+
+
+def repeated(func, n):
+    def run(*args):
+        for i in range(n):
+            func(*args)
+    return run
+
+
+@benchmark
+class TestDecoderThroughput(unittest.TestCase):
+    '''
+    Decoding to arrays, and all packets of an event in one call, should
+    beat building a list of ints per packet several times over. Only run
+    with PH5_BENCHMARK set, test_decoders checks the decoded samples.
+    '''
+    REPEAT = 100
+
+    def assert_throughput(self, name, samples, list_path, paths, args):
+        list_rate = samples / best_time(
+            repeated(list_path, self.REPEAT), args)
+        for path in paths:
+            rate = samples / best_time(repeated(path, self.REPEAT), args)
+            print("\n{0} {1}: list {2:.0f} samples/s, {3:.0f} samples/s "
+                  "({4:.1f}x)".format(name, path.__name__, list_rate, rate,
+                                      rate / list_rate))
+            self.assertGreater(rate, list_rate * 3)
+
+    def test_rt130_throughput(self):
+        packets = rt130_packets(
+            os.path.join(TEST_DATA, 'rt130/2016139.9EEF.ZIP'))
+        self.assertTrue(np.array_equal(rt130_list(packets),
+                                       rt130_batch(packets)))
+        samples = len(rt130_batch(packets)) * self.REPEAT
+        self.assert_throughput('rt130', samples, rt130_list,
+                               (rt130_arrays, rt130_batch), (packets, ))
+
+    def test_rt125a_throughput(self):
+        events = rt125a_events(os.path.join(TEST_DATA,
+                                            'rt125a/I2183RAW.TRD'))
+        samples = sum(e[1] for e in events) * self.REPEAT
+        self.assert_throughput('rt125a', samples, rt125a_list,
+                               (rt125a_batch, ), (events, ))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -4,8 +4,14 @@ Tests for experiment
 import os
 import unittest
 
+import numpy
+import tables
+from mock import patch
+from testfixtures import LogCapture
+
 from ph5.core import ph5api, experiment
-from ph5.core.tests.test_base import LogTestCase, TempDirTestCase
+from ph5.core.tests.test_base import LogTestCase, TempDirTestCase, \
+    initialize_ex
 
 
 class TestExperiment_srm(TempDirTestCase, LogTestCase):
@@ -123,5 +129,276 @@ class TestExperiment_srm(TempDirTestCase, LogTestCase):
         self.assertEqual(len(keys), 38)
 
 
+class TestExperiment_offsets(TempDirTestCase, LogTestCase):
+    def setUp(self):
+        super(TestExperiment_offsets, self).setUp()
+        self.ex = initialize_ex('master.ph5', self.tmpdir, True)
+        self.name = 'Offset_t_001_001'
+        self.ex.ph5_g_sorts.newOffsetSort(self.name)
+        for shot in range(101, 106):
+            for station in range(1, 21):
+                self.ex.ph5_g_sorts.populateOffset_t(
+                    {'event_id_s': str(shot),
+                     'receiver_id_s': str(station),
+                     'offset/value_d': shot * 1000. + station,
+                     'offset/units_s': 'm',
+                     'azimuth/value_f': float(station),
+                     'azimuth/units_s': 'degrees'},
+                    name=self.name)
+
+    def tearDown(self):
+        self.ex.ph5close()
+        super(TestExperiment_offsets, self).tearDown()
+
+    def assert_read_offsets_fast(self, pairs):
+        sorts = self.ex.ph5_g_sorts
+        offsets = sorts.read_offsets_fast(pairs, name=self.name)
+        self.assertEqual(len(pairs), len(offsets))
+        for shot, station in pairs:
+            self.assertEqual(
+                sorts.read_offset_fast(shot, station, name=self.name),
+                offsets[(shot, station)])
+
+    def test_read_offsets_fast(self):
+        sorts = self.ex.ph5_g_sorts
+        offsets = sorts.read_offsets_fast([('102', '7'), ('105', '20')],
+                                          name=self.name)
+        self.assertEqual({'offset/value_d': 102007.,
+                          'offset/units_s': 'm',
+                          'azimuth/value_f': 7.,
+                          'azimuth/units_s': 'degrees',
+                          'event_id_s': '102',
+                          'receiver_id_s': '7'},
+                         offsets[('102', '7')])
+        self.assertEqual(105020., offsets[('105', '20')]['offset/value_d'])
+        # not in Offset_t
+        offsets = sorts.read_offsets_fast([('102', '21'), ('106', '1')],
+                                          name=self.name)
+        self.assertEqual({('102', '21'): {}, ('106', '1'): {}}, offsets)
+        self.assertEqual({}, sorts.read_offsets_fast([], name=self.name))
+
+        shot_order = [('103', str(s)) for s in range(0, 22)]
+        receiver_order = [(str(s), '5') for s in range(100, 107)]
+        mixed = [('101', '1'), ('104', '19'), ('104', '1')]
+        for pairs in (shot_order, receiver_order, mixed):
+            self.assert_read_offsets_fast(pairs)
+        # again using the indexes
+        sorts.index_offset_table(name=self.name)
+        table = sorts.ph5_t_offset[self.name]
+        self.assertTrue(table.cols.event_id_s.is_indexed)
+        for pairs in (shot_order, receiver_order, mixed):
+            self.assert_read_offsets_fast(pairs)
+
+
+class TestExperiment_compression(TempDirTestCase, LogTestCase):
+    def tearDown(self):
+        self.ex.ph5close()
+        super(TestExperiment_compression, self).tearDown()
+
+    def new_data_array(self, name):
+        receivers = self.ex.ph5_g_receivers
+        g = receivers.getdas_g('12345')
+        if g is None:
+            g = receivers.newdas('12345')[0]
+        receivers.setcurrent(g)
+        return receivers.newarray(name, numpy.arange(1000, dtype='int32'),
+                                  dtype='int32')
+
+    def test_compression_filters(self):
+        # the default is what arrays were always written with
+        self.assertEqual(tables.Filters(complevel=experiment.ZLIBCOMP,
+                                        complib='zlib'),
+                         experiment.compression_filters())
+        self.assertEqual(3, experiment.compression_filters('zlib:3')
+                         .complevel)
+        self.assertEqual(0, experiment.compression_filters('none')
+                         .complevel)
+        for profile in ('zlib:0', 'zlib:10', 'lz4', 'gzip'):
+            with self.assertRaises(experiment.HDF5InteractionError):
+                experiment.compression_filters(profile)
+        self.ex = initialize_ex('master.ph5', self.tmpdir, True)
+
+    def test_set_compression(self):
+        self.ex = initialize_ex('master.ph5', self.tmpdir, True)
+        self.assertEqual('zlib', self.ex.get_compression())
+        self.assertEqual('zlib', self.new_data_array('Data_a_0001')
+                         .filters.complib)
+        self.ex.set_compression('blosc:zstd')
+        a = self.new_data_array('Data_a_0002')
+        self.assertEqual('blosc:zstd', a.filters.complib)
+        self.assertTrue(a.filters.shuffle)
+        self.ex.ph5close()
+
+        # recorded in the file and read back codec-agnostic
+        self.ex = initialize_ex('master.ph5', self.tmpdir, True)
+        self.assertEqual('blosc:zstd', self.ex.get_compression())
+        self.assertEqual('blosc:zstd', self.new_data_array('Data_a_0003')
+                         .filters.complib)
+        receivers = self.ex.ph5_g_receivers
+        for name in ('Data_a_0001', 'Data_a_0002', 'Data_a_0003'):
+            self.assertTrue(numpy.array_equal(
+                numpy.arange(1000),
+                receivers.read_trace(receivers.find_trace_ref(name))))
+        with self.assertRaises(experiment.HDF5InteractionError):
+            self.ex.set_compression('gzip')
+        self.assertEqual('blosc:zstd', self.ex.get_compression())
+
+    def test_use_compression(self):
+        # as a mini file uses the profile of its master
+        self.ex = initialize_ex('miniPH5_00001.ph5', self.tmpdir, True)
+        self.ex.use_compression('blosc:zstd')
+        self.assertEqual('blosc:zstd', self.new_data_array('Data_a_0001')
+                         .filters.complib)
+        self.assertEqual('zlib', self.ex.get_compression())
+        # a codec missing here falls back to the default
+        with patch.object(tables, 'which_lib_version', return_value=None), \
+                LogCapture() as log:
+            self.ex.use_compression('blosc:zstd')
+        self.assertEqual(1, len(log.records))
+        self.assertEqual('zlib', self.new_data_array('Data_a_0002')
+                         .filters.complib)
+
+
+class TestChunkRows(LogTestCase):
+    def test_chunk_rows(self):
+        chunk_bytes = experiment.CHUNK_BYTES
+        # whole seconds of samples
+        self.assertEqual(4000, experiment.chunk_rows(4, None, 1000))
+        self.assertEqual(4000, experiment.chunk_rows(4, 10 ** 8, 1000))
+        self.assertEqual(4000, experiment.chunk_rows(4, 10 ** 8, 250))
+        self.assertEqual(chunk_bytes / 4,
+                         experiment.chunk_rows(4, 10 ** 8, 1))
+        self.assertEqual(chunk_bytes / 4,
+                         experiment.chunk_rows(4, 10 ** 8, 0.5))
+        self.assertEqual(chunk_bytes / 4,
+                         experiment.chunk_rows(4, 10 ** 8, 10000))
+        # no longer than the array
+        self.assertEqual(500, experiment.chunk_rows(4, 500, 1000))
+        self.assertEqual(1, experiment.chunk_rows(4, 1, 1000))
+        self.assertEqual(chunk_bytes / 80, experiment.chunk_rows(80))
+        self.assertEqual(8000, experiment.chunk_rows(4, None, 1000,
+                                                     chunk_bytes * 2))
+
+
+class TestExperiment_chunks(TempDirTestCase, LogTestCase):
+    def tearDown(self):
+        self.ex.ph5close()
+        super(TestExperiment_chunks, self).tearDown()
+
+    def test_newarray(self):
+        self.ex = initialize_ex('master.ph5', self.tmpdir, True)
+        receivers = self.ex.ph5_g_receivers
+        receivers.setcurrent(receivers.newdas('12345')[0])
+        data = numpy.arange(100000, dtype='int32')
+        a = receivers.newarray('Data_a_0001', data, dtype='int32',
+                               sample_rate=1000)
+        self.assertEqual((4000,), a.chunkshape)
+        a = receivers.newarray('Data_a_0002', data[:1500], dtype='float32',
+                               sample_rate=1000)
+        self.assertEqual((1500,), a.chunkshape)
+        # chunks for the rows the array will hold once appended to
+        a = receivers.newarray('Data_a_0003', data[:1500], dtype='int32',
+                               sample_rate=1000, rows=len(data))
+        self.assertEqual((4000,), a.chunkshape)
+        receivers.chunk_bytes = 1024
+        a = receivers.newarray('Data_a_0004', data, dtype='int32',
+                               sample_rate=100)
+        self.assertEqual((200,), a.chunkshape)
+        a = receivers.newearray('SOH_a_0001', expectedrows=10)
+        self.assertEqual((10,), a.chunkshape)
+
+
+class TestMiniFilePool(TempDirTestCase, LogTestCase):
+    def test_node(self):
+        for name in ('miniPH5_00001.ph5', 'miniPH5_00002.ph5'):
+            with tables.open_file(name, mode='w') as h5:
+                h5.create_group('/', 'Das_g_' + name[8:13])
+        with tables.open_file('master.ph5', mode='w') as h5:
+            for name in ('miniPH5_00001.ph5', 'miniPH5_00002.ph5'):
+                h5.create_external_link(
+                    '/', 'Das_g_' + name[8:13],
+                    name + ':/Das_g_' + name[8:13])
+            h5.create_external_link('/', 'Das_g_again',
+                                    'miniPH5_00001.ph5:/Das_g_00001')
+
+        h5 = tables.open_file('master.ph5', mode='r')
+        pool = experiment.MiniFilePool(max_open=1)
+        mini1 = pool.node(h5.root.Das_g_00001)._v_file
+        # the second link to a file uses the open file
+        self.assertIs(mini1, pool.node(h5.root.Das_g_again)._v_file)
+        self.assertEqual((1, 1, 0), (pool.opens, pool.hits, pool.closes))
+        g2 = pool.node(h5.root.Das_g_00002)
+        self.assertEqual('/Das_g_00002', g2._v_pathname)
+        mini2 = g2._v_file
+        # over max_open the least recently used file is closed
+        self.assertFalse(mini1.isopen)
+        self.assertEqual((2, 1, 1), (pool.opens, pool.hits, pool.closes))
+        self.assertEqual(1, len(pool))
+        # closing the master closes the files as for any external link
+        h5.close()
+        self.assertFalse(mini2.isopen)
+        pool.close()
+        self.assertEqual(0, len(pool))
+
+    def test_ph5(self):
+        ph5 = ph5api.PH5(path=os.path.join(self.home, 'ph5/test_data/ph5'),
+                         nickname='master.ph5', max_open_files=2)
+        ph5.read_das_g_names()
+        for das in sorted(ph5.Das_g_names):
+            ph5.read_das_t(das[len('Das_g_'):])
+            ph5.forget_das_t(das[len('Das_g_'):])
+        # one mini file opened once for all DAS
+        self.assertEqual(2, ph5.mini_files.max_open)
+        self.assertEqual(1, ph5.mini_files.opens)
+        self.assertEqual(len(ph5.Das_g_names) - 1, ph5.mini_files.hits)
+        h5 = ph5.ph5_g_receivers.current_g_das._v_file
+        ph5.close()
+        self.assertFalse(h5.isopen)
+
+
+class TestMiniAllocator(TempDirTestCase, LogTestCase):
+    def index_rows(self, das_minis):
+        return [{'serial_number_s': das,
+                 'external_file_name_s': './miniPH5_{0:05d}.ph5'.format(n)}
+                for das, n in das_minis]
+
+    def test_allocate(self):
+        # first file added
+        mini = experiment.MiniAllocator(100, first_mini=3)
+        self.assertEqual('miniPH5_00003', mini.allocate('1X1', 60))
+        # a new DAS goes to the newest file while it has room
+        self.assertEqual('miniPH5_00003', mini.allocate('1X2', 40))
+        self.assertEqual('miniPH5_00004', mini.allocate('1X3', 1))
+        # a DAS stays in its file
+        self.assertEqual('miniPH5_00003', mini.allocate('1X1', 50))
+        self.assertEqual({3: 150, 4: 1}, mini.sizes)
+
+        # from Index_t and the sizes of the files on disk
+        with open('miniPH5_00002.ph5', 'w') as fh:
+            fh.write('x' * 90)
+        rows = self.index_rows([('1X1', 1), ('1X2', 2), ('1X1', 2)])
+        mini = experiment.MiniAllocator(100, rows)
+        self.assertEqual({'1X1': 1, '1X2': 2}, mini.das_mini)
+        self.assertEqual(2, mini.newest)
+        self.assertEqual({2: 90}, mini.sizes)
+        self.assertEqual('miniPH5_00001', mini.allocate('1X1', 20))
+        self.assertEqual('miniPH5_00002', mini.allocate('1X3', 10))
+        self.assertEqual('miniPH5_00003', mini.allocate('1X4', 1))
+
+    def test_allocate_num_mini(self):
+        for n, size in ((1, 30), (2, 10), (3, 20)):
+            with open('miniPH5_{0:05d}.ph5'.format(n), 'w') as fh:
+                fh.write('x' * size)
+        rows = self.index_rows([('1X1', 1), ('1X2', 2)])
+        mini = experiment.MiniAllocator(100, rows, num_mini=4)
+        # each new DAS to the next file until there are num_mini
+        self.assertEqual('miniPH5_00003', mini.allocate('1X3', 5))
+        self.assertEqual('miniPH5_00004', mini.allocate('1X4', 15))
+        # then to the smallest
+        self.assertEqual('miniPH5_00002', mini.allocate('1X5', 10))
+        self.assertEqual('miniPH5_00004', mini.allocate('1X6', 1))
+        self.assertEqual({1: 30, 2: 20, 3: 25, 4: 16}, mini.sizes)
+
+
 if __name__ == "__main__":
     unittest.main()
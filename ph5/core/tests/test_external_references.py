@@ -0,0 +1,104 @@
+'''
+Tests for external_references
+'''
+import unittest
+
+import tables
+from testfixtures import LogCapture
+
+from ph5.core import external_references
+from ph5.core.tests.test_base import LogTestCase, TempDirTestCase,\
+    initialize_ex
+
+
+def index_row(das, mini='./miniPH5_00001.ph5',
+              where=external_references.RECEIVERS):
+    return {'serial_number_s': das,
+            'external_file_name_s': mini,
+            'hdf5_path_s': '{0}/Das_g_{1}'.format(where, das)}
+
+
+class TestExternalReferences(TempDirTestCase, LogTestCase):
+    def setUp(self):
+        super(TestExternalReferences, self).setUp()
+        self.ex = initialize_ex('master.ph5', '.', True)
+
+    def tearDown(self):
+        self.ex.ph5close()
+        super(TestExternalReferences, self).tearDown()
+
+    def links(self, where=external_references.RECEIVERS):
+        return dict((n._v_name, n.target)
+                    for n in self.ex.ph5.iter_nodes(where)
+                    if isinstance(n, tables.link.ExternalLink))
+
+    def test_link_target(self):
+        self.assertEqual(
+            'miniPH5_00001.ph5:/Experiment_g/Maps_g/Das_g_1X1',
+            external_references.link_target(
+                './miniPH5_00001.ph5', '/Experiment_g/Maps_g/Das_g_1X1'))
+        self.assertEqual(
+            'miniPH5_00001.ph5:/Experiment_g/Maps_g/Das_g_1X1',
+            external_references.link_target(
+                'miniPH5_00001.ph5', '/Experiment_g/Maps_g/Das_g_1X1'))
+
+    def test_update_external_references(self):
+        ph5 = self.ex.ph5
+        rows = [index_row('1X1'), index_row('1X2'), index_row('1X1')]
+        self.assertEqual(
+            (2, 0),
+            external_references.update_external_references(ph5, rows))
+        self.assertEqual(
+            {'Das_g_1X1': 'miniPH5_00001.ph5:'
+                          '/Experiment_g/Receivers_g/Das_g_1X1',
+             'Das_g_1X2': 'miniPH5_00001.ph5:'
+                          '/Experiment_g/Receivers_g/Das_g_1X2'},
+            self.links())
+        # Receiver_t, Index_t... are left alone
+        self.assertIn('Receiver_t', ph5.get_node(
+            external_references.RECEIVERS)._v_children)
+
+        # only the new DAS and the one moved to another mini file are made
+        link = ph5.get_node(external_references.RECEIVERS, 'Das_g_1X1')
+        rows = [index_row('1X1'), index_row('1X2', './miniPH5_00002.ph5'),
+                index_row('1X3', 'miniPH5_00002.ph5')]
+        self.assertEqual(
+            (2, 1),
+            external_references.update_external_references(ph5, rows))
+        self.assertIs(link, ph5.get_node(external_references.RECEIVERS,
+                                         'Das_g_1X1'))
+        self.assertEqual(
+            'miniPH5_00002.ph5:/Experiment_g/Receivers_g/Das_g_1X2',
+            self.links()['Das_g_1X2'])
+        self.assertEqual(3, len(self.links()))
+        self.assertEqual(
+            (0, 3),
+            external_references.update_external_references(ph5, rows))
+
+        # links made with the ./ are up to date
+        ph5.create_external_link(external_references.MAPS, 'Das_g_1X1',
+                                 './miniPH5_00001.ph5:'
+                                 '/Experiment_g/Maps_g/Das_g_1X1')
+        rows = [index_row('1X1', where=external_references.MAPS)]
+        self.assertEqual(
+            (0, 1),
+            external_references.update_external_references(
+                ph5, rows, external_references.MAPS))
+
+        # a group with data in master is not removed
+        g = ph5.create_group(external_references.MAPS, 'Das_g_1X2')
+        ph5.create_array(g, 'Hdr_a_0001', [1, 2, 3])
+        rows = [index_row('1X2', where=external_references.MAPS)]
+        with LogCapture() as log:
+            self.assertEqual(
+                (0, 0),
+                external_references.update_external_references(
+                    ph5, rows, external_references.MAPS))
+        self.assertEqual('ERROR', log.records[0].levelname)
+        self.assertTrue(isinstance(
+            ph5.get_node(external_references.MAPS, 'Das_g_1X2'),
+            tables.Group))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+'''
+Tests for ibmfloat
+'''
+import unittest
+from StringIO import StringIO
+
+import construct
+import numpy as np
+
+from ph5.core import ibmfloat, segyreader
+
+
+def ibm2ieee_scalar(ibm):
+    '''   ibm2ieee32 on each uint32 in ibm   '''
+    ret = []
+    for b in ibm:
+        v = ibmfloat.ibm2ieee32(np.array(b, dtype='>u4').tostring())
+        ret.append(construct.BFloat32("x").parse(v))
+    return np.array(ret, dtype=np.float32)
+
+
+def ieee2ibm_scalar(ieee):
+    '''   ieee2ibm32 on each float32 in ieee   '''
+    ret = []
+    for f in ieee:
+        v = ibmfloat.ieee2ibm32(np.array(f, dtype='>f4').tostring())
+        ret.append(np.frombuffer(v, dtype='>u4')[0])
+    return np.array(ret, dtype=np.uint32)
+
+
+def random_floats(n, seed=0):
+    rng = np.random.RandomState(seed)
+    return (rng.randn(n) * 10. ** rng.randint(-30, 30, n)).astype(np.float32)
+
+
+class TestIBMFloat(unittest.TestCase):
+    def test_ibm2ieee_array(self):
+        # -177.623764038
+        self.assertEqual([np.float32(-177.623764038)],
+                         ibmfloat.ibm2ieee_array('\xC2\xB1\x9F\xAF').tolist())
+        rng = np.random.RandomState(0)
+        ibm = rng.randint(0, 2 ** 32, 20000, dtype=np.uint64)
+        ibm = ibm.astype(np.uint32)
+        # keep to float32 normal range, the scalar version does not
+        # handle overflow or underflow
+        exponent = (ibm >> 24) & 0x7F
+        ibm = ibm[(exponent > 34) & (exponent < 95) &
+                  (ibm & 0x00FFFFFF != 0)][:2000]
+        ieee = ibmfloat.ibm2ieee_array(ibm)
+        self.assertEqual(np.float32, ieee.dtype)
+        self.assertTrue(np.array_equal(ibm2ieee_scalar(ibm), ieee))
+        # big endian buffer as read from SEG-Y
+        self.assertTrue(np.array_equal(
+            ieee, ibmfloat.ibm2ieee_array(ibm.astype('>u4').tostring())))
+        # zero, overflow and underflow
+        self.assertEqual([0., float('inf'), float('-inf'), 0.],
+                         ibmfloat.ibm2ieee_array([0, 0x7FFFFFFF, 0xFFFFFFFF,
+                                                  0x00100000]).tolist())
+
+    def test_ieee2ibm_array(self):
+        ieee = random_floats(2000)
+        ibm = ibmfloat.ieee2ibm_array(ieee)
+        self.assertEqual(np.uint32, ibm.dtype)
+        self.assertTrue(np.array_equal(ieee2ibm_scalar(ieee), ibm))
+        self.assertEqual([0, 0x80000000, 0x41100000, 0xC2B19FAF,
+                          0x7FFFFFFF, 0xFFFFFFFF, 0],
+                         ibmfloat.ieee2ibm_array(
+                             [0., -0., 1., -177.623764038, float('inf'),
+                              float('-inf'), float('nan')]).tolist())
+
+    def test_round_trip(self):
+        ieee = random_floats(100000, seed=1)
+        back = ibmfloat.ibm2ieee_array(ibmfloat.ieee2ibm_array(ieee))
+        # IBM keeps 21 to 24 bits of the mantissa
+        self.assertLess(np.max(np.abs(back / ieee - 1)), 2. ** -20)
+        self.assertLessEqual(np.max(np.abs(back)), np.max(np.abs(ieee)))
+        ibm = ibmfloat.ieee2ibm_array(ieee)
+        self.assertTrue(np.array_equal(
+            ibm, ibmfloat.ieee2ibm_array(ibmfloat.ibm2ieee_array(ibm))))
+
+    def test_segyreader_ibm(self):
+        ieee = random_floats(1000, seed=2)
+        ibm = ibmfloat.ieee2ibm_array(ieee)
+        sr = segyreader.Reader()
+        sr.trace_fmt = 1
+        sr.FH = StringIO(ibm.astype('>u4').tostring())
+        trace = sr.read_trace(1000, 4)
+        self.assertTrue(np.array_equal(ibmfloat.ibm2ieee_array(ibm), trace))
+
+
+if __name__ == "__main__":
+    unittest.main()
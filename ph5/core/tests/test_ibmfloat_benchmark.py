@@ -0,0 +1,69 @@
+'''
+Benchmarks for ibmfloat
+'''
+import time
+import unittest
+
+import numpy as np
+
+from ph5.core import ibmfloat
+from ph5.core.tests.test_base import benchmark
+from ph5.core.tests.test_ibmfloat import ibm2ieee_scalar, ieee2ibm_scalar, \
+    random_floats
+
+
+def best_time(func, args, repeat=3):
+    '''   Return the best time of repeat calls of func(*args)   '''
+    best = None
+    for i in range(repeat):
+        t0 = time.time()
+        func(*args)
+        elapsed = time.time() - t0
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+
+class TestIBMFloatThroughput(unittest.TestCase):
+    '''
+    The array converters should beat the per sample construct versions
+    by orders of magnitude. The timing is only checked with PH5_BENCHMARK
+    set.
+    '''
+    SCALAR = 5000
+    ARRAY = 1000000
+
+    def setUp(self):
+        self.ieee = random_floats(self.ARRAY)
+        self.ibm = ibmfloat.ieee2ibm_array(self.ieee)
+
+    def assert_throughput(self, name, scalar, scalar_args, array,
+                          array_args):
+        scalar_rate = self.SCALAR / best_time(scalar, scalar_args, 1)
+        array_rate = self.ARRAY / best_time(array, array_args)
+        print("\n{0}: per sample {1:.0f} samples/s, array {2:.0f} "
+              "samples/s ({3:.0f}x)"
+              .format(name, scalar_rate, array_rate,
+                      array_rate / scalar_rate))
+        self.assertGreater(array_rate, scalar_rate * 100)
+
+    @benchmark
+    def test_ibm2ieee_throughput(self):
+        self.assert_throughput('ibm2ieee',
+                               ibm2ieee_scalar, (self.ibm[:self.SCALAR],),
+                               ibmfloat.ibm2ieee_array, (self.ibm,))
+
+    @benchmark
+    def test_ieee2ibm_throughput(self):
+        self.assert_throughput('ieee2ibm',
+                               ieee2ibm_scalar, (self.ieee[:self.SCALAR],),
+                               ibmfloat.ieee2ibm_array, (self.ieee,))
+
+    def test_round_trip_accuracy(self):
+        back = ibmfloat.ibm2ieee_array(self.ibm)
+        error = np.abs(back / self.ieee - 1)
+        self.assertLess(np.max(error), 2. ** -20)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+'''
+Tests for kefx
+'''
+import os
+import unittest
+
+from ph5.core import kefx
+from ph5.core.tests.test_base import LogTestCase, TempDirTestCase
+
+KEF = '''#   Comment
+/Experiment_g/Sorts_g/Array_t_001
+\tid_s = 1001
+\tdescription_s = two \\
+\t\tlines
+\tlocation/description_s = None
+# another comment
+
+/Experiment_g/Sorts_g/Array_t_001:Update:id_s
+\tid_s=1001
+\tdas/model_s = a=b
+/Experiment_g/Sorts_g/Array_t_002
+/Experiment_g/Sorts_g/Array_t_001:Delete:id_s
+\tid_s;1002
+'''
+
+
+class TestKefRecords(TempDirTestCase, LogTestCase):
+    def setUp(self):
+        super(TestKefRecords, self).setUp()
+        self.kef_file = os.path.join(self.tmpdir, 'test.kef')
+        with open(self.kef_file, 'w') as fh:
+            fh.write(KEF)
+
+    def test_records(self):
+        k = kefx.Kef(self.kef_file)
+        k.open()
+        records = list(k.records())
+        k.close()
+        self.assertEqual(
+            [('/Experiment_g/Sorts_g/Array_t_001',
+              {'id_s': '1001', 'description_s': 'two  lines'}),
+             ('/Experiment_g/Sorts_g/Array_t_001:Update:id_s',
+              {'id_s': '1001', 'das/model_s = a': 'b'}),
+             ('/Experiment_g/Sorts_g/Array_t_001:Delete:id_s',
+              {'id_s': '1002'})],
+            records)
+
+    def test_same_as_read(self):
+        # read fails on a path without rows
+        with open(self.kef_file, 'w') as fh:
+            fh.write(KEF.replace('/Experiment_g/Sorts_g/Array_t_002\n', ''))
+        k = kefx.Kef(self.kef_file)
+        k.open()
+        k.read()
+        expected = [(p, kv) for p in k.parsed for kv in k.parsed[p]]
+        k.close()
+        k.open()
+        records = list(k.records())
+        k.close()
+        self.assertEqual(sorted(expected), sorted(records))
+
+
+if __name__ == "__main__":
+    unittest.main()
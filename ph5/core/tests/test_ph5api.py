@@ -5,6 +5,7 @@ import os
 import sys
 import unittest
 
+import numpy as np
 from mock import patch
 
 from ph5.utilities import segd2ph5, initialize_ph5
@@ -449,6 +450,11 @@ class TestPH5API(LogTestCase):
                          table[0]['offset_d'])
         self.assertEqual(-1.66452e-09,
                          table[0]['slope_d'])
+        self.assertEqual(
+            [t for t in self.ph5API_object.Time_t['rows']
+             if t['das/serial_number_s'] == '12183'], table)
+        self.assertIs(self.ph5API_object.time_windows('12183'),
+                      self.ph5API_object.time_windows('12183'))
 
     def test_response_t(self):
         """
@@ -542,6 +548,15 @@ class TestPH5API(LogTestCase):
             table['response_file_das_a'])
         self.assertEqual('',
                          table['response_file_sensor_a'])
+        # rows added as resp_load does are found
+        rows = list(self.ph5API_object.Response_t['rows'])
+        self.ph5API_object.Response_t['rows'] = rows
+        rows.append({'n_i': 99})
+        self.assertIs(rows[-1],
+                      self.ph5API_object.get_response_t_by_n_i(99))
+        rows.append({'n_i': 100})
+        self.assertIs(rows[-1],
+                      self.ph5API_object.get_response_t_by_n_i(100))
 
     def test_offset_t(self):
         """
@@ -1224,6 +1239,260 @@ class TestPH5API(LogTestCase):
         self.ph5API_object.close()
         self.assertIsNone(self.ph5API_object.ph5)
 
+    def test_cut_chunks(self):
+        # 750 samples is not a whole number of seconds at the int rate 500
+        for tc, chunk_samples in ((False, 1000), (True, 1000), (True, 750)):
+            traces = self.ph5API_object.cut('3X500', 1502294400.38,
+                                            1502294460.38, 1, 500, tc)
+            chunks = list(self.ph5API_object.cut_chunks(
+                '3X500', 1502294400.38, 1502294460.38, 1, 500, tc,
+                chunk_samples=chunk_samples))
+            self.assertTrue(all(c.nsamples <= chunk_samples
+                                for c in chunks))
+            # the chunks hold the samples of the traces, in order
+            self.assertEqual(sum(t.nsamples for t in traces),
+                             sum(c.nsamples for c in chunks))
+            self.assertTrue(np.array_equal(
+                np.concatenate([t.data for t in traces]),
+                np.concatenate([c.data for c in chunks])))
+            self.assertEqual(traces[0].start_time.epoch(fepoch=True),
+                             chunks[0].start_time.epoch(fepoch=True))
+            # a chunk starts where the one before it ends or a trace starts
+            starts = [t.start_time.epoch(fepoch=True) for t in traces]
+            for c, n in zip(chunks, chunks[1:]):
+                n_start = n.start_time.epoch(fepoch=True)
+                if n_start not in starts:
+                    self.assertAlmostEqual(
+                        c.start_time.epoch(fepoch=True) + c.nsamples / 500.,
+                        n_start, 5)
+            self.assertEqual(traces[-1].time_correction_ms,
+                             chunks[-1].time_correction_ms)
+
+        # das that doesn't exist
+        chunks = list(self.ph5API_object.cut_chunks('9999', 0, 1599999999,
+                                                    1, 250))
+        self.assertEqual(1, len(chunks))
+        self.assertFalse(chunks[0].data)
+
+
+class TestSplitParts(unittest.TestCase):
+    def test_split_parts(self):
+        parts = [('a', 10, 5), ('b', 0, 7)]
+        self.assertEqual([(0, [('a', 10, 4)], 4),
+                          (4, [('a', 14, 1), ('b', 0, 3)], 4),
+                          (8, [('b', 3, 4)], 4)],
+                         ph5api.split_parts(parts, 12, 4))
+        # parts past nsamples are trimmed
+        self.assertEqual([(0, [('a', 10, 5), ('b', 0, 1)], 6)],
+                         ph5api.split_parts(parts, 6, 100))
+        self.assertEqual([(0, [], 0)], ph5api.split_parts([], 0, 4))
+
+
+class TestTimeWindows(unittest.TestCase):
+    def time_t(self, start, stop, slope):
+        return {'start_time/epoch_l': int(start),
+                'start_time/micro_seconds_i': int(start % 1 * 1000000),
+                'end_time/epoch_l': int(stop),
+                'end_time/micro_seconds_i': int(stop % 1 * 1000000),
+                'slope_d': slope, 'offset_d': 0.}
+
+    def test_find(self):
+        rows = [self.time_t(300, 400, 1e-6), self.time_t(0, 100, 2e-6),
+                self.time_t(50, 1000, 3e-6), self.time_t(150, 120, 4e-6),
+                self.time_t(100.5, 200, 5e-6)]
+        windows = ph5api.TimeWindows(rows)
+        self.assertEqual(rows, list(windows))
+
+        def scan(start, stop):
+            for t in rows:
+                if ph5api.is_in(
+                        ph5api.fepoch(t['start_time/epoch_l'],
+                                      t['start_time/micro_seconds_i']),
+                        ph5api.fepoch(t['end_time/epoch_l'],
+                                      t['end_time/micro_seconds_i']),
+                        start, stop):
+                    return t
+
+        for start, stop in [(0, 10), (-10, -1), (120, 130), (110, 90),
+                            (1001, 2000), (450, 460), (100.25, 100.75),
+                            (140, 160), (2000, 3000), (-5, 5000)]:
+            self.assertIs(scan(start, stop), windows.find(start, stop))
+        self.assertIsNone(ph5api.TimeWindows([]).find(0, 10))
+
+    def test_cor(self):
+        rows = [self.time_t(0, 100, 1e-3), self.time_t(100, 200, 2e-4)]
+        cor, clock = ph5api._cor(150., 160., rows)
+        self.assertEqual(cor, ph5api._cor(150., 160.,
+                                          ph5api.TimeWindows(rows))[0])
+        self.assertEqual(2e-4, clock.slope)
+        cor, clock = ph5api._cor(500., 600., rows)
+        self.assertEqual(0., cor)
+        self.assertEqual(["No clock drift information available."],
+                         clock.comment)
+
+
+class TestDasIndex(LogTestCase):
+    def setUp(self):
+        super(TestDasIndex, self).setUp()
+        self.home = os.getcwd()
+        self.ph5API_object = ph5api.PH5(
+            path=os.path.join(self.home, 'ph5/test_data/ph5'),
+            nickname='master.ph5')
+
+    def tearDown(self):
+        self.ph5API_object.close()
+        super(TestDasIndex, self).tearDown()
+
+    def test_das_index(self):
+        index = self.ph5API_object.das_index('12183')
+        self.assertEqual('Das_t_12183', index.name)
+        self.assertEqual(9, len(index))
+        # sorted on start time, row numbers point back into Das_t
+        self.assertTrue(np.all(np.diff(index.start) >= 0))
+        self.assertEqual(range(9), sorted(index.rownum))
+        self.ph5API_object.read_das_t('12183')
+        rows = self.ph5API_object.Das_t['12183']['rows']
+        self.assertEqual(sorted(rows, key=lambda r: r['time/epoch_l']),
+                         index.rows(index.select()))
+        self.assertIsNone(self.ph5API_object.das_index('NOSUCHDAS'))
+
+    def test_das_index_cache(self):
+        index = self.ph5API_object.das_index('3X500')
+        self.ph5API_object.forget_das_t('3X500')
+        self.assertIs(index, self.ph5API_object.das_index('3X500'))
+        # clear() keeps the index in table_cache
+        self.ph5API_object.clear()
+        self.assertIs(index, self.ph5API_object.das_index('3X500'))
+        self.assertEqual(1, self.ph5API_object.table_cache.hits)
+
+    def test_in_range(self):
+        index = self.ph5API_object.das_index('9EEF')
+        start_epoch = 1463568480
+        stop_epoch = 1463568540
+        expected = [p for p in range(len(index))
+                    if ph5api.is_in(index.start[p], index.stop[p],
+                                    start_epoch, stop_epoch)]
+        self.assertTrue(expected)
+        self.assertEqual(expected,
+                         list(index.in_range(start_epoch, stop_epoch)))
+        self.assertEqual([], list(index.in_range(0, 10)))
+
+    def test_query(self):
+        index = self.ph5API_object.das_index('3X500')
+        pos = index.query(1, 1502294440, 1502294460, 500)
+        self.assertEqual(1, len(pos))
+        self.assertEqual(1502294430, index.epoch[pos[0]])
+        self.assertEqual(380000, index.micro_seconds[pos[0]])
+        # windows overlapping the start are found
+        self.assertEqual(2, len(index.query(1, 1502294400.38,
+                                            1502294460.38, 500)))
+        # without a sample rate only window starts are compared and in
+        # whole seconds, the window starts at 30.38
+        self.assertEqual(1, len(index.query(1, 1502294430, 1502294430.1,
+                                            0)))
+        self.assertEqual(0, len(index.query(1, 1502294430.2, 1502294431,
+                                            0)))
+        # sample rate only checked if check_samplerate
+        self.assertEqual(0, len(index.query(1, 1502294440, 1502294460,
+                                            250)))
+        self.assertEqual(1, len(index.query(1, 1502294440, 1502294460,
+                                            250, check_samplerate=False)))
+
+    def test_filter_channel(self):
+        index = self.ph5API_object.das_index('12183')
+        pos = index.select()
+        filtered = index.filter_channel(pos, 1)
+        self.assertEqual(
+            ph5api.filter_das_t(index.rows(pos), 1),
+            index.rows(filtered))
+        self.assertEqual([], list(index.filter_channel(pos, 99)))
+
+
+class TestTableCache(LogTestCase):
+    def setUp(self):
+        super(TestTableCache, self).setUp()
+        self.home = os.getcwd()
+        self.ph5API_object = ph5api.PH5(
+            path=os.path.join(self.home, 'ph5/test_data/ph5'),
+            nickname='master.ph5')
+
+    def tearDown(self):
+        self.ph5API_object.close()
+        super(TestTableCache, self).tearDown()
+
+    def test_survives_clear(self):
+        cache = self.ph5API_object.table_cache
+        self.ph5API_object.read_receiver_t()
+        self.ph5API_object.read_array_t('Array_t_001')
+        receiver_t = self.ph5API_object.Receiver_t
+        self.assertEqual((0, 2), (cache.hits, cache.misses))
+        self.assertTrue(cache.nbytes > 0)
+
+        self.ph5API_object.clear()
+        self.assertIsNone(self.ph5API_object.Receiver_t)
+        self.assertEqual({}, self.ph5API_object.Array_t)
+        self.ph5API_object.read_receiver_t()
+        self.ph5API_object.read_array_t('Array_t_001')
+        self.assertEqual((2, 2), (cache.hits, cache.misses))
+        self.assertIs(receiver_t['rows'],
+                      self.ph5API_object.Receiver_t['rows'])
+        self.assertEqual(
+            ['500'],
+            self.ph5API_object.Array_t['Array_t_001']['byid'].keys())
+
+    def test_shared_cache(self):
+        cache = self.ph5API_object.table_cache
+        self.ph5API_object.read_response_t()
+        other = ph5api.PH5(path=os.path.join(self.home, 'ph5/test_data/ph5'),
+                           nickname='master.ph5', table_cache=cache)
+        other.read_response_t()
+        other.close()
+        self.assertEqual((1, 1), (cache.hits, cache.misses))
+
+    def test_lru(self):
+        class Table(object):
+            nbytes = 10
+
+        class BigTable(object):
+            nbytes = 30
+
+        experiment_t = self.ph5API_object.ph5_t_experiment
+        receiver_t = self.ph5API_object.ph5_g_receivers.ph5_t_receiver
+        time_t = self.ph5API_object.ph5_g_receivers.ph5_t_time
+        cache = ph5api.TableCache(max_bytes=20)
+        table = cache.get(experiment_t, Table)
+        receiver_table = cache.get(receiver_t, Table)
+        self.assertIs(table, cache.get(experiment_t, Table))
+        # Receiver_t is least recently used
+        cache.get(time_t, Table)
+        self.assertEqual((2, 20), (len(cache), cache.nbytes))
+        self.assertIs(table, cache.get(experiment_t, Table))
+        self.assertIsNot(receiver_table, cache.get(receiver_t, Table))
+        self.assertEqual((2, 4), (cache.hits, cache.misses))
+        # too big to keep
+        cache.reset()
+        cache.get(experiment_t, BigTable)
+        self.assertEqual((0, 0), (len(cache), cache.nbytes))
+
+
+class TestTableCacheGeneration(TempDirTestCase, LogTestCase):
+    def test_modified_file(self):
+        testargs = ['initialize_ph5', '-n', 'master.ph5']
+        with patch.object(sys, 'argv', testargs):
+            initialize_ph5.main()
+        ph5object = ph5api.PH5(path=self.tmpdir, nickname='master.ph5')
+        cache = ph5object.table_cache
+        ph5object.read_experiment_t()
+        ph5object.read_experiment_t()
+        self.assertEqual((1, 1), (cache.hits, cache.misses))
+        # a new modification time means the table has to be read again
+        st = os.stat('master.ph5')
+        os.utime('master.ph5', (st.st_atime, st.st_mtime + 10))
+        ph5object.read_experiment_t()
+        ph5object.close()
+        self.assertEqual((1, 2), (cache.hits, cache.misses))
+        self.assertEqual(1, len(cache))
+
 
 class TestPH5API_srm_query_das_t(TempDirTestCase, LogTestCase):
     def tearDown(self):
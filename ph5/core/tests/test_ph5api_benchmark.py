@@ -0,0 +1,199 @@
+'''
+Benchmarks for ph5api
+'''
+import sys
+import time
+import unittest
+
+import numpy as np
+from mock import patch
+
+from ph5.core import ph5api
+from ph5.utilities import initialize_ph5
+from ph5.core.tests.test_base import LogTestCase, TempDirTestCase, \
+    initialize_ex, benchmark
+
+DAS = 'BENCH'
+SAMPLE_RATE = 100
+WINDOW_SAMPLES = 200
+EPOCH0 = 1500000000
+
+
+def build_windows(path, nwindows):
+    """
+    Write a master.ph5 in path holding nwindows contiguous Das_t windows
+    of WINDOW_SAMPLES samples for DAS on channel 1. Sample n of window w
+    has the value w * WINDOW_SAMPLES + n.
+    """
+    testargs = ['initialize_ph5', '-n', 'master.ph5']
+    with patch.object(sys, 'argv', testargs):
+        initialize_ph5.main()
+    ex = initialize_ex('master.ph5', path, True)
+    ex.ph5_g_receivers.newdas(DAS)
+    for w in range(nwindows):
+        epoch = EPOCH0 + w * WINDOW_SAMPLES / SAMPLE_RATE
+        name = ex.ph5_g_receivers.nextarray('Data_a_')
+        p_das_t = {'receiver_table_n_i': 0,
+                   'time/epoch_l': epoch,
+                   'time/micro_seconds_i': 0,
+                   'time/type_s': 'BOTH',
+                   'time/ascii_s': time.ctime(epoch),
+                   'channel_number_i': 1,
+                   'sample_rate_i': SAMPLE_RATE,
+                   'sample_rate_multiplier_i': 1,
+                   'sample_count_i': WINDOW_SAMPLES,
+                   'array_name_data_a': name}
+        ex.ph5_g_receivers.populateDas_t(p_das_t)
+        data = np.arange(w * WINDOW_SAMPLES, (w + 1) * WINDOW_SAMPLES,
+                         dtype='int32')
+        ex.ph5_g_receivers.newarray(name, data, dtype='int32')
+    ex.ph5close()
+
+
+def time_cut(ph5object, nwindows, repeat=3):
+    """
+    Return the best time of repeat cuts of the first nwindows windows and
+    the traces of the last cut
+    """
+    stop = EPOCH0 + nwindows * WINDOW_SAMPLES / SAMPLE_RATE
+    best = None
+    for i in range(repeat):
+        ph5object.forget_das_t(DAS)
+        t0 = time.time()
+        traces = ph5object.cut(DAS, EPOCH0, stop, chan=1,
+                               sample_rate=SAMPLE_RATE,
+                               apply_time_correction=False)
+        elapsed = time.time() - t0
+        if best is None or elapsed < best:
+            best = elapsed
+    return best, traces
+
+
+class TestCutScaling(TempDirTestCase, LogTestCase):
+    """
+    PH5.cut reads every window into one preallocated buffer, so cut time
+    should grow linearly with the number of Das_t windows. The timing is
+    only checked with PH5_BENCHMARK set.
+    """
+    SMALL = 100
+    LARGE = 800
+
+    def setUp(self):
+        super(TestCutScaling, self).setUp()
+        build_windows(self.tmpdir, self.LARGE)
+        self.ph5object = ph5api.PH5(path=self.tmpdir, nickname='master.ph5')
+
+    def tearDown(self):
+        self.ph5object.close()
+        super(TestCutScaling, self).tearDown()
+
+    def test_cut_data(self):
+        elapsed, traces = time_cut(self.ph5object, self.SMALL, repeat=1)
+        data = np.concatenate([t.data for t in traces])
+        self.assertEqual(sum([t.nsamples for t in traces]),
+                         self.SMALL * WINDOW_SAMPLES)
+        self.assertTrue(np.array_equal(
+            data, np.arange(self.SMALL * WINDOW_SAMPLES, dtype='int32')))
+        self.assertEqual(EPOCH0, traces[0].start_time.epoch(fepoch=True))
+
+    @benchmark
+    def test_cut_scaling(self):
+        small, traces = time_cut(self.ph5object, self.SMALL)
+        large, traces = time_cut(self.ph5object, self.LARGE)
+        self.assertEqual(sum([t.nsamples for t in traces]),
+                         self.LARGE * WINDOW_SAMPLES)
+        ratio = self.LARGE / self.SMALL
+        print("\ncut {0} windows: {1:.4f}s, {2} windows: {3:.4f}s "
+              "({4:.1f}x for {5}x windows)"
+              .format(self.SMALL, small, self.LARGE, large,
+                      large / small, ratio))
+        # Linear scaling with generous head room for timing noise,
+        # quadratic growth would be ratio ** 2
+        self.assertLess(large / small, ratio * 3)
+
+
+def build_long_array(path, nickname, seconds, sample_rate, chunk_bytes):
+    """
+    Write nickname in path holding one window of seconds of data at
+    sample_rate for DAS on channel 1, in chunks of about chunk_bytes
+    """
+    testargs = ['initialize_ph5', '-n', nickname]
+    with patch.object(sys, 'argv', testargs):
+        initialize_ph5.main()
+    ex = initialize_ex(nickname, path, True)
+    ex.ph5_g_receivers.chunk_bytes = chunk_bytes
+    ex.ph5_g_receivers.newdas(DAS)
+    name = ex.ph5_g_receivers.nextarray('Data_a_')
+    nsamples = seconds * sample_rate
+    ex.ph5_g_receivers.populateDas_t(
+        {'receiver_table_n_i': 0,
+         'time/epoch_l': EPOCH0,
+         'time/micro_seconds_i': 0,
+         'time/type_s': 'BOTH',
+         'time/ascii_s': time.ctime(EPOCH0),
+         'channel_number_i': 1,
+         'sample_rate_i': sample_rate,
+         'sample_rate_multiplier_i': 1,
+         'sample_count_i': nsamples,
+         'array_name_data_a': name})
+    rng = np.random.RandomState(0)
+    data = np.cumsum(rng.randint(-100, 100, nsamples)).astype('int32')
+    a = ex.ph5_g_receivers.newarray(name, data, dtype='int32',
+                                    sample_rate=sample_rate)
+    chunkshape = a.chunkshape
+    ex.ph5close()
+    return chunkshape
+
+
+class TestShortCutChunks(TempDirTestCase, LogTestCase):
+    """
+    A cut decompresses every chunk it touches, so one second cuts from a
+    long array get faster as chunks get smaller. The timing is only
+    checked with PH5_BENCHMARK set.
+    """
+    SECONDS = 600
+    SAMPLE_RATE = 1000
+    CUTS = 100
+
+    def build_arrays(self):
+        coarse = build_long_array(self.tmpdir, 'coarse.ph5', self.SECONDS,
+                                  self.SAMPLE_RATE, 1024 * 1024)
+        fine = build_long_array(self.tmpdir, 'fine.ph5', self.SECONDS,
+                                self.SAMPLE_RATE, 16 * 1024)
+        return coarse, fine
+
+    def time_cuts(self, nickname):
+        ph5object = ph5api.PH5(path=self.tmpdir, nickname=nickname)
+        try:
+            ph5object.read_das_t(DAS)
+            rng = np.random.RandomState(1)
+            starts = EPOCH0 + rng.randint(0, self.SECONDS - 1, self.CUTS)
+            t0 = time.time()
+            for start in starts:
+                traces = ph5object.cut(DAS, start, start + 1, chan=1,
+                                       sample_rate=self.SAMPLE_RATE,
+                                       apply_time_correction=False)
+                self.assertEqual(self.SAMPLE_RATE, traces[0].nsamples)
+            return time.time() - t0
+        finally:
+            ph5object.close()
+
+    def test_chunk_shapes(self):
+        coarse, fine = self.build_arrays()
+        self.assertEqual((262000,), coarse)
+        self.assertEqual((4000,), fine)
+
+    @benchmark
+    def test_short_cuts(self):
+        coarse, fine = self.build_arrays()
+        coarse_secs = min(self.time_cuts('coarse.ph5') for i in range(3))
+        fine_secs = min(self.time_cuts('fine.ph5') for i in range(3))
+        print("\n{0} one second cuts: {1:.4f}s with chunks of {2} "
+              "samples, {3:.4f}s with chunks of {4}"
+              .format(self.CUTS, coarse_secs, coarse[0], fine_secs,
+                      fine[0]))
+        self.assertLess(fine_secs, coarse_secs)
+
+
+if __name__ == "__main__":
+    unittest.main()
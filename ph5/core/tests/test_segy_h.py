@@ -0,0 +1,71 @@
+'''
+Tests for segy_h
+'''
+import unittest
+
+import numpy as np
+
+from ph5.core import segy_h
+
+
+class TestHeaderRecords(unittest.TestCase):
+    def test_header_dtype(self):
+        for header in (segy_h.Trace(), segy_h.Passcal(), segy_h.Menlo(),
+                       segy_h.Seg(), segy_h.Trace('little'),
+                       segy_h.Passcal('little'), segy_h.Menlo('little'),
+                       segy_h.Seg('little')):
+            struct = segy_h.header_struct(header)
+            self.assertEqual(struct.sizeof(),
+                             segy_h.header_dtype(struct).itemsize)
+        # iNova has bit fields
+        self.assertIsNone(segy_h.header_dtype(segy_h.inova_header()))
+        with self.assertRaises(segy_h.HeaderError):
+            segy_h.header_struct(segy_h.Reel())
+
+    def test_header_records(self):
+        traces = []
+        menlo = []
+        passcal = []
+        for i in range(5):
+            t = segy_h.Trace()
+            t.set({'lineSeq': i + 1, 'traceID': 15, 'sampleLength': 65535,
+                   'sourceToRecDist': -1234.9, 'recElevation': 2 ** 31 - 1,
+                   'year': np.int64(2016), 'phoneFirstTrace': i * 1000})
+            traces.append(t)
+            m = segy_h.Menlo()
+            m.set({'start_usec': 250000, 'das_sn': 0xFFFF,
+                   'empty2': 2 ** 32 - 1, 'clock_drift': -5,
+                   'shot_size': 10.7})
+            menlo.append(m)
+            p = segy_h.Passcal('little')
+            p.set({'station_name': '{0:<6}'.format(i), 'scale_fac': 1.5e-6,
+                   'max': np.int32(100), 'min': -100})
+            passcal.append(p)
+        for headers in (traces, menlo, passcal,
+                        [segy_h.iNova(), segy_h.iNova()]):
+            records = segy_h.header_records(headers)
+            self.assertEqual(''.join(h.get() for h in headers),
+                             records.tostring())
+
+    def test_header_records_overflow(self):
+        for keyval in ({'traceID': 2 ** 15}, {'sampleLength': -1},
+                       {'lineSeq': 2. ** 31}, {'lineSeq': float('nan')},
+                       {'lineSeq': '1'}, {'lineSeq': None}):
+            t = segy_h.Trace()
+            t.set(keyval)
+            with self.assertRaises(Exception):
+                t.get()
+            with self.assertRaises(segy_h.HeaderError):
+                segy_h.header_records([segy_h.Trace(), t])
+
+        p = segy_h.Passcal()
+        p.set({'station_name': 'abc'})
+        with self.assertRaises(segy_h.HeaderError):
+            segy_h.header_records([p])
+        p.set({'station_name': '      ', 'scale_fac': 1e300})
+        with self.assertRaises(segy_h.HeaderError):
+            segy_h.header_records([p])
+
+
+if __name__ == "__main__":
+    unittest.main()
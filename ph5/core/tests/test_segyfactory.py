@@ -1,11 +1,14 @@
 '''
 Tests for segyfactory
 '''
+import os
 import unittest
 
+import numpy as np
 from testfixtures import LogCapture
 
-from ph5.core.tests.test_base import LogTestCase
+from ph5.core import segyfactory
+from ph5.core.tests.test_base import LogTestCase, TempDirTestCase
 from ph5.core.segyfactory import add_string_to_header
 
 
@@ -66,5 +69,132 @@ class TestAddStringToHeader(LogTestCase):
         self.assertNotIn(self.key, ext)
 
 
+class Trace(object):
+    def __init__(self, data, ttype='int'):
+        self.data = data
+        self.ttype = ttype
+        self.byteorder = 'little'
+
+
+EVENT_T = {'id_s': '5001', 'size/value_d': 10., 'size/units_s': 'kg',
+           'time/epoch_l': 1463568480, 'time/micro_seconds_i': 250000,
+           'location/X/value_d': -106.95, 'location/Y/value_d': 34.0,
+           'location/Z/value_d': 1400., 'description_s': '7'}
+
+
+def array_t(i):
+    return {'id_s': str(1000 + i), 'das/serial_number_s': '9EEF',
+            'das/model_s': 'rt130', 'sensor/model_s': 'L28',
+            'sensor/serial_number_s': '12', 'channel_number_i': 1,
+            'description_s': '', 'location/X/value_d': -106.9 + i * 0.001,
+            'location/Y/value_d': 34.07, 'location/Z/value_d': 1500.5,
+            'location/X/units_s': 'degrees', 'location/Z/units_s': 'm'}
+
+
+def gather_traces(n, empty=True):
+    '''   int traces one sample short, long or just right, some float
+          and some empty traces   '''
+    rng = np.random.RandomState(1)
+    ret = []
+    for i in range(n):
+        length = 1000 + (i % 3) - 1
+        if i % 7 == 3:
+            ret.append(Trace(rng.randn(length).astype(np.float32) * 100,
+                             'float'))
+        elif empty and i % 11 == 5:
+            ret.append(Trace(np.array([], dtype=np.int32)))
+        else:
+            ret.append(Trace(rng.randint(-2 ** 20, 2 ** 20, length)
+                             .astype(np.int32)))
+    return ret
+
+
+def write_gather(path, traces, ext='U', gather=True,
+                 max_samples=segyfactory.GATHER_SAMPLES):
+    '''   Write traces with SegyGather or write_segy_hdr and write_segy
+          Returns: messages for the log   '''
+    sf = segyfactory.Ssegy(None, EVENT_T)
+    sf.set_ext_header_type(ext)
+    logs = []
+    with open(path, 'w+') as fh:
+        segy = segyfactory.SegyGather(fh, sf, len(traces), max_samples)
+        for i, t in enumerate(traces):
+            sf.set_length_points(1000)
+            sf.set_cut_start_epoch(1463568480.25 + i * 0.001)
+            sf.set_array_t(array_t(i))
+            sf.set_response_t({'bit_weight/value_d': 1.5e-6 * (1 + i % 2),
+                               'gain/value_i': 32,
+                               'bit_weight/units_s': 'volts/count'})
+            sf.set_receiver_t({'orientation/description_s': 'Z'})
+            sf.set_line_sequence(i + 1)
+            sf.set_das_t({'sample_rate_i': 250, 'channel_number_i': 1,
+                          'event_number_i': i})
+            if gather:
+                logs.extend(segy.add(t))
+            elif i == 0:
+                logs.extend(segyfactory.write_segy_hdr(t, fh, sf,
+                                                       len(traces)))
+            else:
+                logs.extend(segyfactory.write_segy(t, fh, sf))
+        segy.flush()
+    return logs
+
+
+class TestSegyGather(TempDirTestCase, LogTestCase):
+    def assert_same_file(self, traces, ext, max_samples):
+        logs = write_gather('trace.sgy', traces, ext, False)
+        self.assertEqual(
+            logs, write_gather('gather.sgy', traces, ext, True, max_samples))
+        with open('trace.sgy') as a, open('gather.sgy') as b:
+            self.assertEqual(a.read(), b.read())
+
+    def test_same_as_write_segy(self):
+        for ext in ('P', 'S', 'U', 'N'):
+            # PASSCAL headers need samples for max and min
+            traces = gather_traces(30, ext != 'P')
+            for max_samples in (segyfactory.GATHER_SAMPLES, 5000):
+                self.assert_same_file(traces, ext, max_samples)
+        # short and empty traces are padded, 9 traces are a sample long
+        self.assertEqual(
+            3600 + 30 * 240 + 4 * (30 * 1000 + 9),
+            os.path.getsize('gather.sgy'))
+
+    def test_flush(self):
+        sf = segyfactory.Ssegy(None, EVENT_T)
+        traces = gather_traces(10, False)
+        with open('gather.sgy', 'w+') as fh:
+            segy = segyfactory.SegyGather(fh, sf, 10, 2500)
+            segy.flush()
+            self.assertEqual(0, fh.tell())
+            for i, t in enumerate(traces[:3]):
+                sf.set_length_points(1000)
+                sf.set_cut_start_epoch(1463568480.25)
+                sf.set_array_t(array_t(i))
+                sf.set_response_t({'bit_weight/value_d': 1.,
+                                   'gain/value_i': 32,
+                                   'bit_weight/units_s': 'volts/count'})
+                sf.set_das_t({'sample_rate_i': 250, 'channel_number_i': 1,
+                              'event_number_i': i})
+                segy.add(t)
+            # written once 2500 samples are waiting
+            self.assertEqual(3600 + 3 * 240 + 4 * (1000 + 1000 + 1001),
+                             fh.tell())
+            self.assertEqual([], segy.traces)
+
+    def test_bad_bit_weight(self):
+        sf = segyfactory.Ssegy(None, EVENT_T)
+        sf.set_length_points(1000)
+        sf.set_cut_start_epoch(1463568480.25)
+        sf.set_array_t(array_t(0))
+        sf.set_response_t({'bit_weight/value_d': 0., 'gain/value_i': 32,
+                           'bit_weight/units_s': 'volts/count'})
+        sf.set_das_t({'sample_rate_i': 250, 'channel_number_i': 1,
+                      'event_number_i': 1})
+        segy = segyfactory.SegyGather(None, sf, 1)
+        with self.assertRaises(segyfactory.SEGYError):
+            segy.add(gather_traces(1)[0])
+        self.assertEqual([], segy.traces)
+
+
 if __name__ == "__main__":
     unittest.main()
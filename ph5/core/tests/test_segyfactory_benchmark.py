@@ -0,0 +1,34 @@
+'''
+Benchmarks for SegyGather against writing a trace at a time with
+write_segy_hdr and write_segy
+'''
+import unittest
+
+from ph5.core.tests.test_base import TempDirTestCase, benchmark
+from ph5.core.tests.test_ibmfloat_benchmark import best_time
+from ph5.core.tests.test_segyfactory import gather_traces, write_gather
+
+
+@benchmark
+class TestSegyGatherThroughput(TempDirTestCase):
+    '''
+    Packing the trace headers of a gather as numpy records should beat
+    building them one trace at a time with construct. Only run with
+    PH5_BENCHMARK set, test_segyfactory checks the bytes written.
+    '''
+    TRACES = 500
+
+    def test_gather_throughput(self):
+        traces = gather_traces(self.TRACES)
+        trace_rate = self.TRACES / best_time(
+            write_gather, ('trace.sgy', traces, 'U', False))
+        gather_rate = self.TRACES / best_time(
+            write_gather, ('gather.sgy', traces, 'U', True))
+        print("\nSEG-Y: per trace {0:.0f} traces/s, gather {1:.0f} "
+              "traces/s ({2:.1f}x)".format(trace_rate, gather_rate,
+                                           gather_rate / trace_rate))
+        self.assertGreater(gather_rate, trace_rate * 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,58 @@
+'''
+Tests for segyreader
+'''
+import os
+import unittest
+
+import numpy as np
+
+from ph5.core import ibmfloat, segyreader
+from ph5.core.tests.test_base import LogTestCase, TempDirTestCase
+
+
+class TestReader(TempDirTestCase, LogTestCase):
+    def write_traces(self, traces):
+        path = os.path.join(self.tmpdir, 'traces.sgy')
+        with open(path, 'wb') as fh:
+            for t in traces:
+                fh.write(t.tostring())
+        return path
+
+    def test_read_trace(self):
+        ieee = np.arange(-50, 50, dtype=np.float32) / 3
+        traces = {1: ibmfloat.ieee2ibm_array(ieee).astype('>u4'),
+                  2: (np.arange(-50, 50) * 1000).astype('>i4'),
+                  3: np.arange(-50, 50, dtype='>i2'),
+                  5: ieee.astype('>f4'),
+                  8: np.arange(-50, 50, dtype='i1')}
+        fmts = sorted(traces.keys())
+        path = self.write_traces([traces[f] for f in fmts])
+        for use_mmap in (False, True):
+            sr = segyreader.Reader(path, use_mmap=use_mmap)
+            sr.open_infile()
+            for f in fmts:
+                sr.set_trace_fmt(f)
+                trace = sr.read_trace(100, sr.bytes_per_sample)
+                if f == 1:
+                    self.assertTrue(np.array_equal(
+                        ibmfloat.ibm2ieee_array(traces[1]), trace))
+                    continue
+                # in file order, views of the file if memory mapped
+                self.assertEqual(traces[f].dtype.str, trace.dtype.str)
+                self.assertTrue(np.array_equal(traces[f], trace))
+                self.assertFalse(trace.flags.writeable)
+                if use_mmap:
+                    self.assertIs(sr.MM, trace.base)
+            # short read at the end of the file
+            self.assertEqual(0, len(sr.read_trace(100, 1)))
+            self.assertEqual(use_mmap, sr.MM is not None)
+
+        sr = segyreader.Reader(path)
+        sr.open_infile()
+        sr.trace_fmt = 4
+        with self.assertRaises(segyreader.InputsError):
+            sr.read_trace(100, 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,168 @@
+'''
+Tests for tableexport
+'''
+import csv
+import os
+import unittest
+from StringIO import StringIO
+
+import numpy as np
+from mock import patch
+
+from ph5.core import columns, experiment, tableexport
+from ph5.core.tests.test_base import LogTestCase, TempDirTestCase, \
+    initialize_ex
+
+
+def das_rows(n):
+    '''   n Das_t rows, epochs out of order with repeats   '''
+    rows = []
+    for i in range(n):
+        rows.append({'time/epoch_l': 1500000000 + (i * 7) % 5,
+                     'time/micro_seconds_i': i,
+                     'time/type_s': 'BOTH',
+                     'channel_number_i': i % 3 + 1,
+                     'sample_rate_i': 100,
+                     'sample_rate_multiplier_i': 1,
+                     'sample_count_i': 1000 + i,
+                     'array_name_data_a': 'Data_a_{0:04d}'.format(i),
+                     'raw_file_name_s': 'file{0}.rt'.format(i)})
+    return rows
+
+
+def kef(path, rows, keys, separator=''):
+    '''   kef of rows as tabletokef.table_print writes it, without the
+          header
+    '''
+    s = ''
+    for i, r in enumerate(rows):
+        s += "#   Table row {0}\n{1}\n".format(i + 1, path)
+        for k in keys:
+            s += "\t" + str(k) + "=" + str(r[k]) + "\n"
+        s += separator
+    return s
+
+
+class TestTableExport(TempDirTestCase, LogTestCase):
+    def setUp(self):
+        super(TestTableExport, self).setUp()
+        self.ex = initialize_ex('master.ph5', self.tmpdir, True)
+        self.ex.ph5_g_receivers.newdas('1X1')
+        self.ex.ph5_g_receivers.setcurrent(
+            self.ex.ph5_g_receivers.getdas_g('1X1'))
+        self.das_t = self.ex.ph5_g_receivers.current_t_das
+        with columns.BulkWriter(self.das_t) as w:
+            for p in das_rows(25):
+                w.append(p)
+        self.ex.ph5_g_sorts.newOffsetSort('Offset_t_001_001')
+        self.offset_t = columns.TABLES[
+            '/Experiment_g/Sorts_g/Offset_t_001_001']
+        columns.append(self.offset_t, {'event_id_s': '1',
+                                       'receiver_id_s': '2',
+                                       'offset/value_d': 1234.56789012345,
+                                       'azimuth/value_f': 18.94912})
+
+    def tearDown(self):
+        self.ex.ph5close()
+        super(TestTableExport, self).tearDown()
+
+    def test_das_order(self):
+        rows, keys = self.ex.ph5_g_receivers.read_das()
+        order = tableexport.das_order(self.das_t)
+        self.assertEqual([r['array_name_data_a'] for r in rows],
+                         self.das_t.read_coordinates(
+                             order, field='array_name_data_a').tolist())
+
+    def test_kef(self):
+        rows, keys = self.ex.ph5_g_receivers.read_das()
+        path = '/Experiment_g/Receivers_g/Das_g_1X1/Das_t'
+        out = StringIO()
+        w = tableexport.KefWriter(out, 'v', separator='\n')
+        # rows are numbered across chunks
+        with patch('ph5.core.tableexport.CHUNK_ROWS', 4):
+            w.write(path, self.das_t, tableexport.das_order(self.das_t))
+        w.close()
+        header, text = out.getvalue().split('#\n', 2)[1:]
+        self.assertTrue(header.endswith('\tph5 version: v\n'))
+        self.assertEqual(kef(path, rows, keys, '\n'), text)
+
+        # floats are written with 12 digits as str () writes them
+        rows, keys = experiment.read_table(self.offset_t)
+        path = '/Experiment_g/Sorts_g/Offset_t_001_001'
+        out = StringIO()
+        w = tableexport.KefWriter(out, 'v', update_key='event_id_s')
+        w.write(path, self.offset_t)
+        text = out.getvalue().split('#\n', 2)[2]
+        self.assertEqual(kef(path + ':Update:event_id_s ', rows, keys),
+                         text)
+        self.assertIn('\toffset/value_d=1234.56789012\n', text)
+        self.assertIn('\tazimuth/value_f=18.9491195679\n', text)
+
+        # nothing is written for an empty table
+        self.ex.ph5_g_sorts.newOffsetSort('Offset_t_002_001')
+        w.write('Offset_t_002_001', columns.TABLES[
+            '/Experiment_g/Sorts_g/Offset_t_002_001'])
+        w.write('Offset_t', None)
+        self.assertEqual(text, out.getvalue().split('#\n', 2)[2])
+
+    def test_csv(self):
+        out = StringIO()
+        w = tableexport.CsvWriter(out)
+        with patch('ph5.core.tableexport.CHUNK_ROWS', 10):
+            w.write('/Das_t_1', self.das_t)
+            w.write('/Das_t_2', self.das_t)
+        w.write('/Offset_t', self.offset_t)
+        w.close()
+        lines = list(csv.reader(StringIO(out.getvalue())))
+        keys = tableexport.table_keys(self.das_t)
+        self.assertEqual(['table'] + keys, lines[0])
+        # a header for each change of columns
+        self.assertEqual(['table'] + tableexport.table_keys(self.offset_t),
+                         lines[51])
+        self.assertEqual(53, len(lines))
+        rows = self.das_t.read()
+        for i, line in enumerate(lines[1:51]):
+            self.assertEqual('/Das_t_{0}'.format(i // 25 + 1), line[0])
+            r = dict(zip(keys, line[1:]))
+            self.assertEqual(rows[i % 25]['array_name_data_a'],
+                             r['array_name_data_a'])
+            self.assertEqual(str(rows[i % 25]['time']['epoch_l']),
+                             r['time/epoch_l'])
+
+    def test_npz(self):
+        filename = os.path.join(self.tmpdir, 'tables.npz')
+        w = tableexport.NpzWriter(filename)
+        order = tableexport.das_order(self.das_t)
+        with patch('ph5.core.tableexport.CHUNK_ROWS', 7):
+            w.write('/Experiment_g/Receivers_g/Das_g_1X1/Das_t',
+                    self.das_t, order)
+        w.write('/Experiment_g/Sorts_g/Offset_t_001_001', self.offset_t)
+        w.close()
+        npz = np.load(filename)
+        self.assertEqual(['Experiment_g/Receivers_g/Das_g_1X1/Das_t',
+                          'Experiment_g/Sorts_g/Offset_t_001_001'],
+                         sorted(npz.keys()))
+        self.assertEqual(
+            self.das_t.read_coordinates(order).tolist(),
+            npz['Experiment_g/Receivers_g/Das_g_1X1/Das_t'].tolist())
+        self.assertEqual(
+            self.offset_t.read().tolist(),
+            npz['Experiment_g/Sorts_g/Offset_t_001_001'].tolist())
+        npz.close()
+
+    def test_check_srm(self):
+        tableexport.check_srm(self.das_t, 'Das_t_1X1')
+        columns.update(self.das_t, {'array_name_data_a': 'Data_a_0003',
+                                    'sample_rate_multiplier_i': 0},
+                       'array_name_data_a')
+        with self.assertRaises(experiment.HDF5InteractionError) as cm:
+            tableexport.check_srm(self.das_t, 'Das_t_1X1')
+        self.assertEqual('Das_t_1X1 has sample_rate_multiplier_i with '
+                         'value 0. Please run fix_srm to fix '
+                         'sample_rate_multiplier_i for PH5 data.',
+                         cm.exception.msg)
+        tableexport.check_srm(self.das_t, 'Das_t_1X1', ignore_srm=True)
+
+
+if __name__ == "__main__":
+    unittest.main()
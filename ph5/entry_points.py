@@ -234,6 +234,31 @@ class CommandList():
                            'Index offset table in ph5 file to speed '
                            'up execution of kernel searches.',
                            type=EntryPointTypes.ALL),
+                EntryPoint('availability_t',
+                           'ph5.utilities.availability_t:main',
+                           'Build or refresh the availability summary '
+                           'table used by ph5availability.',
+                           type=EntryPointTypes.ALL),
+                EntryPoint('rechunk',
+                           'ph5.utilities.rechunk:main',
+                           'Rewrite the arrays of mini files with chunks '
+                           'sized for short cuts.',
+                           type=EntryPointTypes.ALL),
+                EntryPoint('compression_benchmark',
+                           'ph5.utilities.compression_benchmark:main',
+                           'Compare write and read speed and ratio of '
+                           'the compression profiles of data arrays.',
+                           type=EntryPointTypes.ALL),
+                EntryPoint('segd_benchmark',
+                           'ph5.utilities.segd_benchmark:main',
+                           'Compare segd2ph5 throughput loading SEG-D '
+                           'serially and with decoder workers.',
+                           type=EntryPointTypes.ALL),
+                EntryPoint('export_benchmark',
+                           'ph5.utilities.export_benchmark:main',
+                           'Compare tabletokef dumping tables a row at '
+                           'a time and a chunk at a time.',
+                           type=EntryPointTypes.ALL),
                 EntryPoint('load_das_t',
                            'ph5.utilities.load_das_t:main',
                            'Load a batch of Das_t keffiles.',
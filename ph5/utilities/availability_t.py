@@ -0,0 +1,77 @@
+#
+# Build or refresh Availability_t, the summary of continuous data segments
+# ph5availability answers from.
+#
+
+import argparse
+import logging
+import sys
+
+from ph5.core import availability, experiment
+
+PROG_VERSION = '2026.291'
+LOGGER = logging.getLogger(__name__)
+
+
+def get_args():
+    parser = argparse.ArgumentParser(
+                                formatter_class=argparse.RawTextHelpFormatter)
+    parser.usage = ("availability_t --nickname ph5-file-prefix "
+                    "[--das DAS[,DAS...]] [--remove]")
+
+    parser.description = ("Build or refresh Availability_t, the continuous "
+                          "segments of data of each DAS, channel and sample "
+                          "rate, so ph5availability does not have to read "
+                          "every Das_t.\n\nVersion: {0}"
+                          .format(PROG_VERSION))
+
+    parser.add_argument("-n", "--nickname", dest="ph5_file_prefix",
+                        help="The ph5 file prefix (experiment nickname).",
+                        metavar="ph5_file_prefix", required=True)
+
+    parser.add_argument("-p", "--path", dest="ph5_path",
+                        help=("Path to ph5 files. Default to current "
+                              "directory."),
+                        metavar="ph5_path", default=".")
+
+    parser.add_argument("-d", "--das", dest="das_sn",
+                        help=("Comma separated DAS serial numbers to "
+                              "refresh. Default all DASes."),
+                        metavar="das_sn", default=None)
+
+    parser.add_argument("-r", "--remove", dest="remove",
+                        action="store_true", default=False,
+                        help="Remove Availability_t.")
+
+    args = parser.parse_args()
+
+    return args
+
+
+def main():
+    args = get_args()
+    try:
+        ex = experiment.ExperimentGroup(args.ph5_path, args.ph5_file_prefix)
+        ex.ph5open(True)
+        ex.initgroup()
+    except Exception:
+        LOGGER.error("Cannot open PH5 file. Use -h argument for help.")
+        sys.exit(-1)
+
+    try:
+        if args.remove:
+            ex.ph5_g_receivers.nuke_availability_t()
+            LOGGER.info("Removed Availability_t.")
+            return
+        dases = None
+        if args.das_sn is not None:
+            dases = [d.strip() for d in args.das_sn.split(',')]
+        ex.ph5_g_receivers.newAvailability_t()
+        n = availability.refresh(ex.ph5_g_receivers, dases)
+        LOGGER.info("Wrote {0} segments to Availability_t.".format(n))
+    finally:
+        ex.ph5close()
+
+
+if __name__ == '__main__':
+    main()
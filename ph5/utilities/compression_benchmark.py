@@ -0,0 +1,183 @@
+#
+# Compare the compression profiles of new Data_a arrays on a sample of the
+# traces of an existing experiment.
+#
+
+import argparse
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import tables
+
+from ph5.core import experiment
+
+PROG_VERSION = '2026.291'
+LOGGER = logging.getLogger(__name__)
+
+
+def get_args():
+    parser = argparse.ArgumentParser(
+                                formatter_class=argparse.RawTextHelpFormatter)
+    parser.usage = ("compression_benchmark --nickname ph5-file-prefix "
+                    "[--profiles profile[,profile...]] [--traces n] "
+                    "[--megabytes n]")
+
+    parser.description = ("Write and read a sample of the Data_a arrays of "
+                          "an experiment with each compression profile and "
+                          "report write MB/s, read MB/s and compression "
+                          "ratio.\n\nVersion: {0}".format(PROG_VERSION))
+
+    parser.add_argument("-n", "--nickname", dest="ph5_file_prefix",
+                        help="The ph5 file prefix (experiment nickname).",
+                        metavar="ph5_file_prefix", required=True)
+
+    parser.add_argument("-p", "--path", dest="ph5_path",
+                        help=("Path to ph5 files. Default to current "
+                              "directory."),
+                        metavar="ph5_path", default=".")
+
+    parser.add_argument("--profiles", dest="profiles",
+                        help=("Comma separated compression profiles. "
+                              "Default all of {0}."
+                              .format(', '.join(
+                                  experiment.compression_profiles()))),
+                        metavar="profiles", default=None)
+
+    parser.add_argument("--traces", dest="traces", type=int,
+                        help="Most Data_a arrays to sample. Default 50.",
+                        metavar="traces", default=50)
+
+    parser.add_argument("--megabytes", dest="megabytes", type=float,
+                        help="Most megabytes of samples. Default 64.",
+                        metavar="megabytes", default=64.)
+
+    args = parser.parse_args()
+
+    return args
+
+
+def sample_traces(ex, max_traces=50, max_bytes=64 * 1024 * 1024):
+    '''   Read Data_a arrays of the experiment, in DAS order
+          Inputs:
+             ex -> experiment.ExperimentGroup of the master file
+             max_traces -> most arrays to read
+             max_bytes -> stop once this many bytes of samples are read
+          Returns:
+             list of (name, numpy array)
+    '''
+    traces = []
+    nbytes = 0
+    receivers = ex.ph5_g_receivers
+    for name in sorted(receivers.alldas_g().keys()):
+        g = receivers.getdas_g(name[len('Das_g_'):])
+        receivers.setcurrent(g)
+        for node in receivers.ph5.list_nodes(receivers.current_g_das,
+                                             classname='Array'):
+            if not node._v_name.startswith('Data_a_') or not node.nrows:
+                continue
+            data = node.read()
+            traces.append(("{0}_{1}".format(name, node._v_name), data))
+            nbytes += data.nbytes
+            if len(traces) >= max_traces or nbytes >= max_bytes:
+                return traces
+
+    return traces
+
+
+def benchmark(traces, profile, path):
+    '''   Time writing and reading traces under a compression profile
+          Inputs:
+             traces -> list of (name, numpy array) from sample_traces
+             profile -> one of experiment.compression_profiles()
+             path -> directory to write the scratch file in
+          Returns:
+             dictionary with profile, bytes, write_mbs, read_mbs and ratio,
+             bytes in memory over bytes on disk
+    '''
+    filters = experiment.compression_filters(profile)
+    filename = os.path.join(path, 'compression_benchmark.h5')
+    nbytes = sum(data.nbytes for name, data in traces)
+
+    then = time.time()
+    h5 = tables.open_file(filename, mode='w')
+    try:
+        for name, data in traces:
+            a = experiment.create_empty_earray(
+                h5, h5.root, name,
+                batom=tables.Atom.from_dtype(data.dtype),
+                expectedrows=len(data), filters=filters)
+            a.append(data)
+        h5.flush()
+        on_disk = sum(a.size_on_disk
+                      for a in h5.list_nodes(h5.root, classname='Array'))
+    finally:
+        h5.close()
+    write_secs = time.time() - then
+
+    then = time.time()
+    h5 = tables.open_file(filename, mode='r')
+    try:
+        for a in h5.list_nodes(h5.root, classname='Array'):
+            a.read()
+    finally:
+        h5.close()
+    read_secs = time.time() - then
+    os.remove(filename)
+
+    mb = nbytes / 1024. / 1024.
+    return {'profile': profile,
+            'bytes': nbytes,
+            'write_mbs': mb / write_secs if write_secs else float('inf'),
+            'read_mbs': mb / read_secs if read_secs else float('inf'),
+            'ratio': float(nbytes) / on_disk if on_disk else float('inf')}
+
+
+def main():
+    args = get_args()
+    if args.profiles is None:
+        profiles = experiment.compression_profiles()
+    else:
+        profiles = [p.strip() for p in args.profiles.split(',')]
+
+    try:
+        ex = experiment.ExperimentGroup(args.ph5_path, args.ph5_file_prefix)
+        ex.ph5open(False)
+        ex.initgroup()
+    except Exception:
+        LOGGER.error("Cannot open PH5 file. Use -h argument for help.")
+        sys.exit(-1)
+
+    try:
+        traces = sample_traces(ex, args.traces,
+                               args.megabytes * 1024 * 1024)
+    finally:
+        ex.ph5close()
+    if not traces:
+        LOGGER.error("No Data_a arrays found.")
+        sys.exit(-1)
+
+    path = tempfile.mkdtemp()
+    try:
+        print("{0} traces, {1:.1f} MB".format(
+            len(traces),
+            sum(data.nbytes for name, data in traces) / 1024. / 1024.))
+        print("{0:<12} {1:>12} {2:>12} {3:>8}".format(
+            'profile', 'write MB/s', 'read MB/s', 'ratio'))
+        for profile in profiles:
+            try:
+                r = benchmark(traces, profile, path)
+            except experiment.HDF5InteractionError as e:
+                LOGGER.warning(e.msg)
+                continue
+            print("{profile:<12} {write_mbs:>12.1f} {read_mbs:>12.1f} "
+                  "{ratio:>8.2f}".format(**r))
+    finally:
+        shutil.rmtree(path)
+
+
+if __name__ == '__main__':
+    main()
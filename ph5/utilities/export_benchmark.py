@@ -0,0 +1,194 @@
+#
+# Compare the time tabletokef takes to dump tables a row at a time and a
+# chunk of rows at a time as kef, csv and npz.
+#
+
+import argparse
+import logging
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+import ph5
+
+PROG_VERSION = '2026.291'
+LOGGER = logging.getLogger(__name__)
+
+# The kef header line with the time it was written
+STAMP_RE = re.compile(r"^#\t.*\tph5 version: .*$", re.M)
+
+# name, tabletokef arguments, file extension. A csv of --rows is the kef
+# converted with keftocsv.
+RUNS = (('kef rows', ['--rows'], 'kef'),
+        ('kef', [], 'kef'),
+        ('csv rows', ['--rows'], 'csv'),
+        ('csv', ['-F', 'csv'], 'csv'),
+        ('npz', ['-F', 'npz'], 'npz'))
+
+
+def get_args():
+    parser = argparse.ArgumentParser(
+                                formatter_class=argparse.RawTextHelpFormatter)
+    parser.usage = ("export_benchmark --nickname ph5-file-prefix "
+                    "[--path ph5-path] [-D das] [-O a_e] [-A n] "
+                    "[--repeat n]")
+
+    parser.description = ("Dump tables with tabletokef a row at a time, "
+                          "--rows, and a chunk of rows at a time as kef, "
+                          "csv and npz, and report the time each took. "
+                          "csv rows is the kef of --rows converted with "
+                          "keftocsv.\n\nVersion: {0}".format(PROG_VERSION))
+
+    parser.add_argument("-n", "--nickname", dest="ph5_file_prefix",
+                        help="The ph5 file prefix (experiment nickname).",
+                        metavar="ph5_file_prefix", required=True)
+
+    parser.add_argument("-p", "--path", dest="ph5_path",
+                        help=("Path to ph5 files. Default to current "
+                              "directory."), default=".",
+                        metavar="ph5_path")
+
+    parser.add_argument("-D", "--Das_t", dest="das_t_", metavar="das",
+                        help="Dump /Experiment_g/Receivers_g/Das_g_[das]/"
+                             "Das_t.")
+
+    parser.add_argument("-O", "--Offset_t", dest="offset_t_", metavar="a_e",
+                        help="Dump /Experiment_g/Sort_g/Offset_t_"
+                             "[arrayID_eventID].")
+
+    parser.add_argument("-A", "--Array_t_", dest="array_t_", metavar="n",
+                        help="Dump /Experiment_g/Sorts_g/Array_t_[n].")
+
+    parser.add_argument("--repeat", dest="repeat", type=int,
+                        help="Dumps timed per format, the fastest is "
+                             "reported. Default 1.",
+                        metavar="repeat", default=1)
+
+    args = parser.parse_args()
+
+    return args
+
+
+def run(module, args, env):
+    '''   Run a ph5 utility
+          Inputs:
+             module -> module name in ph5.utilities
+             args -> command line arguments
+             env -> environment
+          Returns:
+             seconds it took
+    '''
+    then = time.time()
+    with open(os.devnull, 'w') as devnull:
+        subprocess.check_call([sys.executable, '-m',
+                               'ph5.utilities.' + module] + args,
+                              env=env, stdout=devnull, stderr=devnull)
+
+    return time.time() - then
+
+
+def benchmark(table_args, path, repeat=1):
+    '''   Time dumping tables with each of RUNS
+          Inputs:
+             table_args -> tabletokef arguments with -n, -p and the tables
+             path -> directory to write the dumps in
+             repeat -> dumps timed per run, the fastest is kept
+          Returns:
+             list of dictionaries with name, ext, seconds, bytes written,
+             same, if the kef or csv is the same as the one written a row
+             at a time, rows, the number of table rows dumped, rowss, rows
+             per second, and speedup over the same format a row at a time
+    '''
+    # Run the ph5 this module is from, installed or not
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(
+        [os.path.dirname(os.path.dirname(os.path.abspath(ph5.__file__)))] +
+        [p for p in [env.get('PYTHONPATH')] if p])
+
+    ret = []
+    outputs = {}
+    for name, args, ext in RUNS:
+        to_csv = ext == 'csv' and '--rows' in args
+        outfile = os.path.join(path, name.replace(' ', '_') + '.' + ext)
+        seconds = None
+        for i in range(repeat):
+            kef = os.path.splitext(outfile)[0] + '.kef' if to_csv \
+                else outfile
+            secs = run('tabletokef', table_args + args + ['-o', kef], env)
+            if to_csv:
+                secs += run('keftocsv', ['-f', kef, '-o', outfile], env)
+                os.remove(kef)
+            if seconds is None or secs < seconds:
+                seconds = secs
+        r = {'name': name, 'ext': ext, 'seconds': seconds,
+             'bytes': os.path.getsize(outfile), 'same': ''}
+        if ext == 'npz':
+            with np.load(outfile) as npz:
+                r['rows'] = sum(len(npz[k]) for k in npz.keys())
+        else:
+            with open(outfile) as fh:
+                text = STAMP_RE.sub('', fh.read())
+            if ext in outputs:
+                r['same'] = 'yes' if outputs[ext] == text else 'no'
+            else:
+                outputs[ext] = text
+        os.remove(outfile)
+        ret.append(r)
+
+    # Rows are counted in the npz, speedup is over the same format a row
+    # at a time, kef for npz
+    nrows = 0
+    rows_seconds = {}
+    for r in ret:
+        nrows = r.get('rows', nrows)
+        if r['name'].endswith(' rows'):
+            rows_seconds[r['ext']] = r['seconds']
+    for r in ret:
+        r['rows'] = nrows
+        r['rowss'] = nrows / r['seconds'] if r['seconds'] else float('inf')
+        r['speedup'] = rows_seconds.get(r['ext'], rows_seconds['kef']) / \
+            r['seconds'] if r['seconds'] else float('nan')
+
+    return ret
+
+
+def main():
+    args = get_args()
+    table_args = ['-n', args.ph5_file_prefix, '-p',
+                  os.path.abspath(args.ph5_path)]
+    if args.das_t_:
+        table_args += ['-D', args.das_t_]
+    if args.offset_t_:
+        table_args += ['-O', args.offset_t_]
+    if args.array_t_:
+        table_args += ['-A', args.array_t_]
+    if len(table_args) == 4:
+        LOGGER.error("No table given, use -D, -O or -A.")
+        sys.exit(-1)
+
+    path = tempfile.mkdtemp()
+    try:
+        try:
+            results = benchmark(table_args, path, args.repeat)
+        except subprocess.CalledProcessError as e:
+            LOGGER.error("tabletokef failed: {0}".format(e))
+            sys.exit(-1)
+        print("{0} rows".format(results[0]['rows']))
+        print("{0:<10} {1:>10} {2:>10} {3:>10} {4:>8} {5:>5}".format(
+            'format', 'seconds', 'rows/s', 'MB', 'speedup', 'same'))
+        for r in results:
+            print("{name:<10} {seconds:>10.2f} {rowss:>10.0f} {mb:>10.2f} "
+                  "{speedup:>8.2f} {same:>5}".format(
+                      mb=r['bytes'] / 1024. / 1024., **r))
+    finally:
+        shutil.rmtree(path)
+
+
+if __name__ == '__main__':
+    main()
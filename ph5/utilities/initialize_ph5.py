@@ -5,7 +5,7 @@ import logging
 import os
 from ph5.core import kef, experiment
 
-PROG_VERSION = '2018.270'
+PROG_VERSION = '2026.291'
 LOGGER = logging.getLogger(__name__)
 
 
@@ -14,6 +14,7 @@ def get_args():
            -n   output file
            -E   experiment_t kef file (optional)
            -C   receiver_t kef file (optional)
+           --compression   compression profile of data arrays (optional)
     '''
     parser = argparse.ArgumentParser(
                                 formatter_class=argparse.RawTextHelpFormatter)
@@ -34,6 +35,11 @@ def get_args():
                               "/Experiment_g/Receivers_g/Receiver_t kef "
                               "file to load."),
                         required=False)
+    parser.add_argument("--compression", dest="compression",
+                        choices=experiment.compression_profiles(),
+                        help=("Compression profile the loaders write new "
+                              "data, SOH and log arrays with. Default zlib."),
+                        required=False)
     try:
         args = parser.parse_args()
     except BaseException:
@@ -122,6 +128,8 @@ def main():
         ex = experiment.ExperimentGroup(nickname=args.outfile)
         ex.ph5open(True)  # Open ph5 file for editing
         ex.initgroup()
+        if args.compression:
+            ex.set_compression(args.compression)
         # Update /Experiment_g/Experiment_t
         set_experiment_t(args.experiment_t)
 
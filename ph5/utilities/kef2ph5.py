@@ -10,18 +10,21 @@ import logging
 import os
 import os.path
 import time
-from ph5.core import experiment, kefx, columns
+from ph5.core import experiment, kefx, columns, availability
 
-PROG_VERSION = '2018.268'
+PROG_VERSION = '2026.291'
 LOGGER = logging.getLogger(__name__)
 
+# Read the whole kef file in blocks instead of streaming it
+BLOCKS = False
+
 # Force time zone to UTC
 os.environ['TZ'] = 'UTC'
 time.tzset()
 
 
 def get_args():
-    global KEFFILE, PH5, PATH, TRACE
+    global KEFFILE, PH5, PATH, TRACE, BLOCKS
 
     parser = argparse.ArgumentParser(
                                 formatter_class=argparse.RawTextHelpFormatter)
@@ -43,6 +46,11 @@ def get_args():
     parser.add_argument("-c", "--check", action="store_true", default=False,
                         dest="check",
                         help="Show what will be done but don't do it!")
+    parser.add_argument("-b", "--blocks", action="store_true", default=False,
+                        dest="blocks",
+                        help="Read the kef file in blocks of 10000 lines and "
+                        "update row by row\ninstead of streaming rows to "
+                        "the tables in batches.")
 
     args = parser.parse_args()
 
@@ -50,6 +58,7 @@ def get_args():
     PH5 = args.outfile
     PATH = args.path
     TRACE = args.check
+    BLOCKS = args.blocks
 
 
 def initializeExperiment():
@@ -75,12 +84,33 @@ def add_references(rs):
         columns.add_reference(r, EX.ph5_g_receivers.current_t_das)
 
 
+def add_table(path):
+    '''   Make sure the table of a kef path exists and is referenced   '''
+    global EX
+
+    if kefx.receiverRE.match(path):
+        add_references([path])
+    elif kefx.arrayRE.match(path):
+        EX.ph5_g_sorts.newArraySort(path.split('/')[-1])
+    elif kefx.eventRE.match(path):
+        EX.ph5_g_sorts.newEventSort(path.split('/')[-1])
+    elif kefx.offsetRE.match(path):
+        EX.ph5_g_sorts.newOffsetSort(path.split('/')[-1])
+
+
 def populateTables():
-    global EX, KEFFILE, TRACE
+    global EX, KEFFILE, TRACE, BLOCKS
     LOGGER.info("Loading {0} into {1}.".format(KEFFILE, PH5))
     k = kefx.Kef(KEFFILE)
     k.open()
 
+    if not BLOCKS:
+        err = k.stream_update(trace=TRACE is True, add_table=add_table)
+        k.close()
+        if err is True:
+            LOGGER.error("There were errors! See output.")
+        return
+
     while True:
         n = k.read(10000)
         if n == 0:
@@ -159,6 +189,9 @@ def main():
     get_args()
     initializeExperiment()
     populateTables()
+    if TRACE is not True:
+        #   Keep Availability_t up to date if it has been built
+        availability.update(EX.ph5_g_receivers)
     closePH5()
     update_log()
 
@@ -14,7 +14,7 @@ import os.path as path
 from tempfile import mkdtemp
 from copy import deepcopy
 from operator import itemgetter
-from ph5.core import kefutility
+from ph5.core import columns, kefutility
 LOGGER = logging.getLogger(__name__)
 try:
     from PySide2 import QtWidgets, QtCore, QtGui
@@ -1885,6 +1885,8 @@ class TablePanel(QtWidgets.QMainWindow):
         # get the node for the path
         ph5 = self.parent.ph5api.ph5
         node = ph5.get_node(where=path, name=name, classname='Table')
+        # Give an edited Das_t a new stamp so Availability_t is not used
+        columns.touch(node)
 
         # remove all the rows follow the lowest insert row because tables
         # class doesn't allow inserting
@@ -11,14 +11,15 @@ import sys
 import re
 from ph5 import LOGGING_FORMAT
 from ph5.utilities import initialize_ph5
-from ph5.core import experiment, timedoy
+from ph5.core import experiment, timedoy, columns, availability,\
+    external_references
 from obspy.io.mseed.core import _is_mseed
 from obspy.io.mseed.util import get_flags
 from obspy import read as reader
 from obspy import UTCDateTime, Stream, Trace
 from numpy import array
 
-PROG_VERSION = '2024.227'
+PROG_VERSION = '2026.291'
 LOGGER = logging.getLogger(__name__)
 DEPRECATION_WARNING = (
     'mstoph5 is no longer supported by the PH5 software. '
@@ -75,6 +76,7 @@ class ObspytoPH5(object):
             currentpath=self.ph5_path)
         exrec.ph5open(True)
         exrec.initgroup()
+        exrec.use_compression(self.ph5.get_compression())
         return exrec, filename
 
     def get_minis(self, dir):
@@ -388,7 +390,8 @@ class ObspytoPH5(object):
                         data_type = data[0].__class__.__name__
                         mini_handle.ph5_g_receivers.newarray(
                             das['array_name_data_a'], data, dtype=data_type,
-                            description=None)
+                            description=None,
+                            sample_rate=trace.stats.sampling_rate)
                     mini_handle.ph5_g_receivers.populateDas_t(das)
 
                     index_t_entry['external_file_name_s'] = "./{}".format(
@@ -416,29 +419,11 @@ class ObspytoPH5(object):
         :param index_t:
         :return:
         """
-        n = 0
         LOGGER.info("updating external references")
-        for i in index_t:
-            external_file = i['external_file_name_s'][2:]
-            external_path = i['hdf5_path_s']
-            target = external_file + ':' + external_path
-            external_group = external_path.split('/')[3]
-
-            try:
-                group_node = self.ph5.ph5.get_node(external_path)
-                group_node.remove()
-
-            except Exception as e:
-                pass
-
-            #   Re-create node
-            try:
-                self.ph5.ph5.create_external_link(
-                    '/Experiment_g/Receivers_g', external_group, target)
-                n += 1
-            except Exception as e:
-                # pass
-                LOGGER.error(e.message)
+        n, kept = external_references.update_external_references(
+            self.ph5.ph5, index_t, external_references.RECEIVERS)
+        LOGGER.info("done, {0} nodes recreated. {1} up to date."
+                    .format(n, kept))
 
         return
 
@@ -521,6 +506,14 @@ def get_args(args):
         help="Force to run the command.",
         action="store_true", default=False)
 
+    parser.add_argument(
+        "--compression", dest="compression",
+        choices=experiment.compression_profiles(),
+        help=("Compression profile of new data, SOH and log arrays. "
+              "Default the profile recorded in the experiment, zlib if "
+              "none."),
+        default=None)
+
     return parser.parse_args(args)
 
 
@@ -616,6 +609,8 @@ def main():
                                             currentpath=args.ph5path)
     ph5_object.ph5open(True)
     ph5_object.initgroup()
+    if args.compression is not None:
+        ph5_object.set_compression(args.compression)
     obs = ObspytoPH5(ph5_object, args.ph5path,
                      args.num_mini, args.first_mini)
     if args.verbose:
@@ -637,13 +632,17 @@ def main():
             break
     if len(obs.time_t) > 0:
         LOGGER.info('Populating Time table')
-        for entry in obs.time_t:
-            ph5_object.ph5_g_receivers.populateTime_t_(entry)
+        with columns.BulkWriter(ph5_object.ph5_g_receivers.ph5_t_time):
+            for entry in obs.time_t:
+                ph5_object.ph5_g_receivers.populateTime_t_(entry)
     LOGGER.info("Populating Index table")
-    for entry in index_t_full:
-        ph5_object.ph5_g_receivers.populateIndex_t(entry)
+    with columns.BulkWriter(ph5_object.ph5_g_receivers.ph5_t_index):
+        for entry in index_t_full:
+            ph5_object.ph5_g_receivers.populateIndex_t(entry)
 
     obs.update_external_references(index_t_full)
+    # Keep Availability_t up to date if it has been built
+    availability.update(ph5_object.ph5_g_receivers)
     ph5_object.ph5close()
 
 
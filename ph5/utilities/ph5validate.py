@@ -7,18 +7,22 @@ errors and make sure it is ready for archival at IRIS DMC
 from __future__ import print_function
 
 import argparse
+import collections
+import itertools
 import logging
+import multiprocessing
 import re
 import subprocess
 import os
 import sys
 import copy
-import operator
 
-from ph5.core import ph5api, experiment
+import numpy as np
+
+from ph5.core import ph5api
 from ph5.utilities import validation
 
-PROG_VERSION = "2026.055"
+PROG_VERSION = "2026.291"
 LOGGER = logging.getLogger(__name__)
 
 
@@ -30,6 +34,23 @@ def check_rt125_format(serial):
     return bool(re.match(r"^[1-9][0-9]{4}$", serial))
 
 
+def in_channel_time_order(das_t):
+    """
+    Return True if the rows of the Das_t table das_t are sorted by
+    channel_number_i, time/epoch_l, time/micro_seconds_i.
+    Only the three columns are read, and compared a row with the next.
+    """
+    c = das_t.col('channel_number_i')
+    t = das_t.col('time/epoch_l')
+    us = das_t.col('time/micro_seconds_i')
+    in_order = ((c[:-1] < c[1:]) |
+                ((c[:-1] == c[1:]) &
+                 ((t[:-1] < t[1:]) |
+                  ((t[:-1] == t[1:]) & (us[:-1] <= us[1:])))))
+
+    return bool(np.all(in_order))
+
+
 class ValidationBlock(object):
 
     def __init__(self, heading="", info=None, warning=None, error=None):
@@ -63,9 +84,11 @@ class PH5ValidateException(Exception):
 
 
 class PH5Validate(object):
-    def __init__(self, ph5API_object, ph5path):
+    def __init__(self, ph5API_object, ph5path, workers=1):
         self.ph5 = ph5API_object
         self.path = ph5path
+        self.workers = workers
+        self.das_time = {}
         if not self.ph5.Array_t_names:
             self.ph5.read_array_t_names()
         if not self.ph5.Experiment_t:
@@ -657,6 +680,54 @@ class PH5Validate(object):
             # Don't check Data exitsts after pickup time here
             # it will be check in check_station_completeness
 
+    def station_keys(self):
+        """
+        (array name, ph5 station) of each station of Array_t, in the order
+        check_array_t reports them
+        """
+        for array_name in sorted(self.ph5.Array_t_names):
+            for ph5_station in self.ph5.Array_t[array_name]['order']:
+                yield array_name, ph5_station
+
+    def station_rows(self, array_name, ph5_station):
+        """
+        Array_t rows of each deployment and channel of ph5_station
+        """
+        station_list = self.ph5.Array_t[array_name]['byid'].get(ph5_station)
+        for deployment in station_list:
+            for station in station_list[deployment]:
+                yield station
+
+    def check_stations(self, array_name, ph5_station):
+        """
+        check_station_completeness() of each of station_rows()
+        """
+        return [self.check_station_completeness(station)
+                for station in self.station_rows(array_name, ph5_station)]
+
+    def in_pool(self, worker, tasks):
+        """
+        Run worker on each task in a pool of self.workers processes, each
+        with its own read only PH5 handle and a copy of self.das_time.
+        Results are yielded in the order of tasks, with at most two tasks
+        per worker in flight.
+        """
+        pool = multiprocessing.Pool(
+            processes=self.workers, initializer=_init_worker,
+            initargs=(self.ph5.currentpath, self.ph5.nickname,
+                      self.das_time))
+        try:
+            pending = collections.deque()
+            for task in tasks:
+                pending.append(pool.apply_async(worker, task))
+                if len(pending) >= self.workers * 2:
+                    yield pending.popleft().get()
+            while pending:
+                yield pending.popleft().get()
+        finally:
+            pool.terminate()
+            pool.join()
+
     def check_array_t(self):
         LOGGER.info("Validating Array_t")
         validation_blocks = []
@@ -672,85 +743,82 @@ class PH5Validate(object):
             LOGGER.error(msg)
         else:
             self.analyze_time()
-            array_names = sorted(self.ph5.Array_t_names)
-            for array_name in array_names:
-                arraybyid = self.ph5.Array_t[array_name]['byid']
-                arrayorder = self.ph5.Array_t[array_name]['order']
-                for ph5_station in arrayorder:
-                    station_list = arraybyid.get(ph5_station)
-                    for deployment in station_list:
-                        station_len = len(station_list[deployment])
-                        for st_num in range(0, station_len):
-                            station = station_list[deployment][st_num]
-                            station_id = station['id_s']
-                            channel_id = station['channel_number_i']
-                            cha_code = (station['seed_band_code_s'] +
-                                        station['seed_instrument_code_s'] +
-                                        station['seed_orientation_code_s'])
-                            resp_n_i = station['response_table_n_i']
-                            das_model = station['das/model_s']
-                            if das_model.startswith("ZLAND"):
-                                sensor_model = ''
-                            else:
-                                sensor_model = station['sensor/model_s']
-                            errors = set()
-                            resp_info = {
-                                'n_i': resp_n_i,
-                                'array': array_name[8:],
-                                'sta': station_id,
-                                'cha_id': channel_id,
-                                'cha_code': cha_code,
-                                'dmodel': das_model,
-                                'smodel': sensor_model,
-                                'spr': station['sample_rate_i'],
-                                'sprm': station['sample_rate_multiplier_i']
-                            }
-
-                            LOGGER.debug("Validating Station {0} Channel {1}"
-                                         .format(str(station_id),
-                                                 str(channel_id)))
-                            info, warning, error = \
-                                self.check_station_completeness(station)
-
-                            check_info = validation.check_response_info(
-                                resp_info,
-                                self.ph5,
-                                checked_data_files,
-                                errors,
-                                None)
-                            if check_info[0] is False:
-                                for errmsg in check_info[1]:
-                                    errors.add((errmsg, 'error'))
-                            error += [': '.join(e[0].split(': ')[1:])
-                                      for e in errors if e[1] == 'error']
-                            warning += [': '.join(w[0].split(': ')[1:])
-                                        for w in errors if w[1] == 'warning']
-                            if any("repeated" in w for w in warning):
-                                item = (station_id, channel_id,
-                                        station['deploy_time/epoch_l'],
-                                        station['pickup_time/epoch_l'])
-                                if item in track_repeated:
-                                    # skip creating vb for repeated station
-                                    continue
-                                else:
-                                    track_repeated.append(item)
-
-                            if info or warning or error:
-                                header = ("-=-=-=-=-=-=-=-=-\n"
-                                          "Station {0} Channel {1}\n"
-                                          "{2} error, {3} warning, "
-                                          "{4} info\n"
-                                          "-=-=-=-=-=-=-=-=-\n"
-                                          .format(str(station_id),
-                                                  str(channel_id),
-                                                  len(error),
-                                                  len(warning),
-                                                  len(info)))
-                                vb = ValidationBlock(heading=header,
-                                                     info=info,
-                                                     warning=warning,
-                                                     error=error)
-                                validation_blocks.append(vb)
+            keys = list(self.station_keys())
+            if self.workers > 1:
+                checked = self.in_pool(_stations_worker, keys)
+            else:
+                checked = (self.check_stations(*k) for k in keys)
+            for (array_name, ph5_station), results in itertools.izip(
+                    keys, checked):
+                for station, (info, warning, error) in itertools.izip(
+                        self.station_rows(array_name, ph5_station), results):
+                    station_id = station['id_s']
+                    channel_id = station['channel_number_i']
+                    cha_code = (station['seed_band_code_s'] +
+                                station['seed_instrument_code_s'] +
+                                station['seed_orientation_code_s'])
+                    resp_n_i = station['response_table_n_i']
+                    das_model = station['das/model_s']
+                    if das_model.startswith("ZLAND"):
+                        sensor_model = ''
+                    else:
+                        sensor_model = station['sensor/model_s']
+                    errors = set()
+                    resp_info = {
+                        'n_i': resp_n_i,
+                        'array': array_name[8:],
+                        'sta': station_id,
+                        'cha_id': channel_id,
+                        'cha_code': cha_code,
+                        'dmodel': das_model,
+                        'smodel': sensor_model,
+                        'spr': station['sample_rate_i'],
+                        'sprm': station['sample_rate_multiplier_i']
+                    }
+
+                    LOGGER.debug("Validating Station {0} Channel {1}"
+                                 .format(str(station_id),
+                                         str(channel_id)))
+
+                    check_info = validation.check_response_info(
+                        resp_info,
+                        self.ph5,
+                        checked_data_files,
+                        errors,
+                        None)
+                    if check_info[0] is False:
+                        for errmsg in check_info[1]:
+                            errors.add((errmsg, 'error'))
+                    error += [': '.join(e[0].split(': ')[1:])
+                              for e in errors if e[1] == 'error']
+                    warning += [': '.join(w[0].split(': ')[1:])
+                                for w in errors if w[1] == 'warning']
+                    if any("repeated" in w for w in warning):
+                        item = (station_id, channel_id,
+                                station['deploy_time/epoch_l'],
+                                station['pickup_time/epoch_l'])
+                        if item in track_repeated:
+                            # skip creating vb for repeated station
+                            continue
+                        else:
+                            track_repeated.append(item)
+
+                    if info or warning or error:
+                        header = ("-=-=-=-=-=-=-=-=-\n"
+                                  "Station {0} Channel {1}\n"
+                                  "{2} error, {3} warning, "
+                                  "{4} info\n"
+                                  "-=-=-=-=-=-=-=-=-\n"
+                                  .format(str(station_id),
+                                          str(channel_id),
+                                          len(error),
+                                          len(warning),
+                                          len(info)))
+                        vb = ValidationBlock(heading=header,
+                                             info=info,
+                                             warning=warning,
+                                             error=error)
+                        validation_blocks.append(vb)
         return validation_blocks
 
     def check_event_t_completeness(self, event):
@@ -886,6 +954,17 @@ class PH5Validate(object):
                         validation_blocks.append(vb)
         return validation_blocks
 
+    def das_t_in_order(self, das_sn):
+        """
+        in_channel_time_order() of the Das_t of das_sn,
+        None if there is no Das_g for das_sn
+        """
+        das_g = self.ph5.ph5_g_receivers.getdas_g(das_sn)
+        if das_g is None:
+            return None
+        self.ph5.ph5_g_receivers.setcurrent(das_g)
+        return in_channel_time_order(self.ph5.ph5_g_receivers.current_t_das)
+
     def check_das_order(self):
         """
         Check if das_t for each das is in order of channel and time
@@ -894,22 +973,17 @@ class PH5Validate(object):
         validation_blocks = []
         error = []
         self.ph5.read_das_g_names()
-        for das_g_name in self.ph5.Das_g_names.keys():
-            das_sn = das_g_name.replace('Das_g_', '')
+        das_sns = [(das_g_name.replace('Das_g_', ''), )
+                   for das_g_name in self.ph5.Das_g_names.keys()]
+        if self.workers > 1:
+            checked = self.in_pool(_das_order_worker, das_sns)
+        else:
+            checked = (self.das_t_in_order(*d) for d in das_sns)
+        for (das_sn, ), in_order in itertools.izip(das_sns, checked):
             LOGGER.info("Validating Das_t_%s" % das_sn)
-            das_g = self.ph5.ph5_g_receivers.getdas_g(das_sn)
-            if das_g is None:
+            if in_order is None:
                 error.append('DAS %s not exist.' % das_sn)
-                continue
-            self.ph5.ph5_g_receivers.setcurrent(das_g)
-            das_rows, das_keys = experiment.read_table(
-                self.ph5.ph5_g_receivers.current_t_das)
-            sorted_das_rows = sorted(
-                das_rows,
-                key=operator.itemgetter('channel_number_i',
-                                        'time/epoch_l',
-                                        'time/micro_seconds_i'))
-            if das_rows != sorted_das_rows:
+            elif not in_order:
                 error.append("Das %s: Das_t isn't in channel/time order. "
                              "Run fix_das_t_order to fix that."
                              % das_sn)
@@ -927,6 +1001,25 @@ class PH5Validate(object):
         return validation_blocks
 
 
+# PH5Validate of a worker process in PH5Validate.in_pool
+_WORKER = None
+
+
+def _init_worker(path, nickname, das_time):
+    global _WORKER
+    _WORKER = PH5Validate(ph5api.PH5(path=path, nickname=nickname), path)
+    _WORKER.read_arrays(None)
+    _WORKER.das_time = das_time
+
+
+def _stations_worker(array_name, ph5_station):
+    return _WORKER.check_stations(array_name, ph5_station)
+
+
+def _das_order_worker(das_sn):
+    return _WORKER.das_t_in_order(das_sn)
+
+
 def get_args():
     parser = argparse.ArgumentParser(
         description='Runs set of checks on PH5 archvive',
@@ -953,6 +1046,12 @@ def get_args():
                               "Default is ph5_validate.log.")
                         )
 
+    parser.add_argument(
+        "--workers", action="store", type=int, default=1,
+        metavar="workers",
+        help=("Number of processes to check stations and DAS tables "
+              "with, default 1"))
+
     parser.add_argument(
         "-v", "--verbose", action="store_true",
         help="Verbose logging.")
@@ -984,7 +1083,8 @@ def main():
         args = get_args()
         ph5API_object = ph5api.PH5(path=args.ph5path, nickname=args.nickname)
         ph5validate = PH5Validate(ph5API_object,
-                                  args.ph5path)
+                                  args.ph5path,
+                                  workers=args.workers)
         validation_blocks = []
         validation_blocks.extend(ph5validate.check_experiment_t())
         validation_blocks.extend(ph5validate.check_array_t())
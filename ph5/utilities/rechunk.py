@@ -0,0 +1,133 @@
+#
+# Rewrite the data, SOH and log arrays of mini files with the chunk shapes
+# new arrays get, see experiment.chunk_rows.
+#
+
+import argparse
+import glob
+import logging
+import os
+import sys
+
+from ph5.core import experiment
+
+PROG_VERSION = '2026.291'
+LOGGER = logging.getLogger(__name__)
+
+
+def get_args():
+    parser = argparse.ArgumentParser(
+                                formatter_class=argparse.RawTextHelpFormatter)
+    parser.usage = ("rechunk [--path ph5_path] [--minis mini[,mini...]] "
+                    "[--chunk_kb kb]")
+
+    parser.description = ("Rewrite the arrays of mini files in place with "
+                          "chunks of whole seconds of samples of about "
+                          "--chunk_kb, so short cuts from long arrays "
+                          "decompress less. Freed space is reused by later "
+                          "writes; run ptrepack to shrink the files.\n\n"
+                          "Version: {0}".format(PROG_VERSION))
+
+    parser.add_argument("-p", "--path", dest="ph5_path",
+                        help=("Path to ph5 files. Default to current "
+                              "directory."),
+                        metavar="ph5_path", default=".")
+
+    parser.add_argument("-m", "--minis", dest="minis",
+                        help=("Comma separated mini files to rewrite. "
+                              "Default all miniPH5_xxxxx.ph5 in ph5_path."),
+                        metavar="minis", default=None)
+
+    parser.add_argument("-k", "--chunk_kb", dest="chunk_kb", type=float,
+                        help=("Target chunk size in kilobytes. Default "
+                              "{0}.".format(experiment.CHUNK_BYTES / 1024)),
+                        metavar="chunk_kb",
+                        default=experiment.CHUNK_BYTES / 1024)
+
+    args = parser.parse_args()
+
+    return args
+
+
+def sample_rates(receivers):
+    '''   Samples per second of the data arrays of the current DAS, keyed on
+          array name, from Das_t   '''
+    rates = {}
+    das_t = receivers.current_t_das
+    if das_t is None:
+        return rates
+    for r in das_t.read():
+        if r['sample_rate_multiplier_i'] > 0:
+            rates[r['array_name_data_a'].strip()] = \
+                float(r['sample_rate_i']) / r['sample_rate_multiplier_i']
+
+    return rates
+
+
+def rechunk(ex, chunk_bytes=experiment.CHUNK_BYTES):
+    '''   Rewrite the chunked arrays of every DAS whose chunk shape is not
+          the one experiment.chunk_rows gives. Compression filters and
+          attributes are kept.
+          Inputs:
+             ex -> experiment.ExperimentGroup of a mini file opened for
+                   editing
+             chunk_bytes -> target size of a chunk
+          Returns:
+             (number of arrays rewritten, number of arrays)
+    '''
+    receivers = ex.ph5_g_receivers
+    rewritten = 0
+    total = 0
+    for name in sorted(receivers.alldas_g().keys()):
+        receivers.setcurrent(receivers.getdas_g(name[len('Das_g_'):]))
+        rates = sample_rates(receivers)
+        group = receivers.current_g_das
+        for node in ex.ph5.list_nodes(group, classname='EArray'):
+            total += 1
+            array_name = node._v_name
+            chunkshape = (experiment.chunk_rows(node.atom.itemsize,
+                                                node.nrows,
+                                                rates.get(array_name),
+                                                chunk_bytes),)
+            if node.chunkshape == chunkshape:
+                continue
+            tmp_name = array_name + '_rechunk'
+            node.copy(group, tmp_name, overwrite=True, chunkshape=chunkshape)
+            node.remove()
+            ex.ph5.rename_node(group, array_name, name=tmp_name)
+            rewritten += 1
+        ex.ph5.flush()
+
+    return rewritten, total
+
+
+def main():
+    args = get_args()
+    if args.minis is None:
+        minis = sorted(glob.glob(os.path.join(args.ph5_path,
+                                              'miniPH5_*.ph5')))
+    else:
+        minis = [os.path.join(args.ph5_path, m.strip())
+                 for m in args.minis.split(',')]
+    if not minis:
+        LOGGER.error("No mini files found in {0}.".format(args.ph5_path))
+        sys.exit(-1)
+
+    for mini in minis:
+        if not os.path.exists(mini):
+            LOGGER.error("{0} not found.".format(mini))
+            continue
+        ex = experiment.ExperimentGroup(os.path.dirname(mini),
+                                        os.path.basename(mini))
+        try:
+            ex.ph5open(True)
+            ex.initgroup()
+            rewritten, total = rechunk(ex, int(args.chunk_kb * 1024))
+        finally:
+            ex.ph5close()
+        LOGGER.info("{0}: rewrote {1} of {2} arrays."
+                    .format(mini, rewritten, total))
+
+
+if __name__ == '__main__':
+    main()
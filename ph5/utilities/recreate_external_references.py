@@ -8,9 +8,9 @@ import argparse
 import os
 import logging
 import time
-from ph5.core import experiment
+from ph5.core import experiment, external_references
 
-PROG_VERSION = '2018.268'
+PROG_VERSION = '2026.291'
 LOGGER = logging.getLogger(__name__)
 
 INDEX_T = {}
@@ -56,57 +56,16 @@ def read_m_index_table():
 
 
 def update_external_references():
-    global EX, INDEX_T
-
     LOGGER.info("Updating external references...")
-    n = 0
-    for i in INDEX_T.rows:
-        external_file = i['external_file_name_s']
-        external_path = i['hdf5_path_s']
-        das = i['serial_number_s']
-        target = external_file + ':' + external_path
-        external_group = external_path.split('/')[3]
-
-        # Nuke old node
-        try:
-            group_node = EX.ph5.get_node(external_path)
-            group_node.remove()
-        except Exception as e:
-            LOGGER.error("E1 {0}".format(e.message))
-        # Re-create node
-        try:
-            EX.ph5.create_external_link(
-                '/Experiment_g/Receivers_g', external_group, target)
-            n += 1
-        except Exception as e:
-            LOGGER.error("E2 {0}".format(e.message))
-
-    m = 0
-    for i in M_INDEX_T.rows:
-        external_file = i['external_file_name_s']
-        external_path = i['hdf5_path_s']
-        das = i['serial_number_s']
-        target = external_file + ':' + external_path
-        external_group = external_path.split('/')[3]
-        print external_file, external_path, das, target, external_group
-
-        # Nuke old node
-        try:
-            group_node = EX.ph5.get_node(external_path)
-            group_node.remove()
-        except Exception as e:
-            LOGGER.error("E3: {0}".format(e.message))
-
-        # Re-create node
-        try:
-            EX.ph5.create_external_link(
-                '/Experiment_g/Maps_g', external_group, target)
-            m += 1
-        except Exception as e:
-            LOGGER.error("E4: {0}".format(e.message))
-            LOGGER.error("Done, Index_t {0} nodes recreated. "
-                         "M_Index_t {1} nodes recreated.\n"
-                         .format(n, m))
+    n, kept = external_references.update_external_references(
+        EX.ph5, INDEX_T.rows, external_references.RECEIVERS)
+    LOGGER.info("done, {0} das nodes recreated. {1} up to date.\n"
+                .format(n, kept))
+
+    n, kept = external_references.update_external_references(
+        EX.ph5, M_INDEX_T.rows, external_references.MAPS)
+    LOGGER.info("done, {0} map nodes recreated. {1} up to date.\n"
+                .format(n, kept))
 
 
 #
@@ -5,21 +5,24 @@ import os
 import sys
 import warnings
 import logging
-import re
 import time
 import math
 import json
 from math import modf
 from ph5 import LOGGING_FORMAT
-from ph5.core import experiment, timedoy
+from ph5.core import experiment, external_references, timedoy, \
+    availability
 
 from obspy import read as readSEG2
 
-PROG_VERSION = "2021.97"
+PROG_VERSION = "2026.291"
 LOGGER = logging.getLogger(__name__)
+# Compression profile of new arrays, None for the one of the experiment
+COMPRESSION = None
 
 MAX_PH5_BYTES = 1073741824 * 1.  # 1 GB (1024 X 1024 X 1024 X 2)
-miniPH5RE = re.compile(r".*miniPH5_(\d\d\d\d\d)\.ph5")
+# Mini file of each DAS, made from Index_t on first use
+MINI = None
 
 DAS_INFO = {}
 MAP_INFO = {}
@@ -108,6 +111,7 @@ def get_args():
            -S   First index of miniPH5_xxxxx.ph5
     '''
     global FILES, PH5, NUM_MINI, FIRST_MINI, PATH
+    global COMPRESSION
 
     parser = argparse.ArgumentParser()
     parser.usage = "Version %s seg2toph5 [--help][--raw raw_file |\
@@ -140,12 +144,19 @@ def get_args():
                         help="Do print",
                         dest="doprint",
                         action="store_true", default=False)
+    parser.add_argument("--compression", dest="compression",
+                        choices=experiment.compression_profiles(),
+                        help=("Compression profile of new data, SOH and log "
+                              "arrays. Default the profile recorded in the "
+                              "experiment, zlib if none."),
+                        default=None)
     args = parser.parse_args()
 
     FILES = []
     PH5 = None
     NUM_MINI = args.num_mini
     FIRST_MINI = args.first_mini
+    COMPRESSION = args.compression
 
     if args.infile is not None:
         read_infile(args.infile)
@@ -183,6 +194,8 @@ def initializeExperiment():
     EDIT = True
     EX.ph5open(EDIT)
     EX.initgroup()
+    if COMPRESSION is not None:
+        EX.set_compression(COMPRESSION)
 
 
 def openPH5(filename):
@@ -190,6 +203,7 @@ def openPH5(filename):
     exrec = experiment.ExperimentGroup(nickname=filename)
     exrec.ph5open(True)
     exrec.initgroup()
+    exrec.use_compression(EX.get_compression())
     return exrec
 
 
@@ -197,106 +211,27 @@ def get_current_data_only(size_of_data, das=None):
     '''   Return opened file handle for data only PH5 file that will be
           less than MAX_PH5_BYTES after raw data is added to it.
     '''
+    global MINI
 
-    def sstripp(s):
-        s = s.replace('.ph5', '')
-        s = s.replace('./', '')
-        return s
-
-    def smallest():
-        '''   Return the name of the smallest miniPH5_xxxxx.ph5   '''
-        minifiles = filter(miniPH5RE.match, os.listdir('.'))
-
-        tiny = minifiles[0]
-        for f in minifiles:
-            if os.path.getsize(f) < os.path.getsize(tiny):
-                tiny = f
-
-        return tiny
-
-    das = str(CURRENT_DAS)
-    newestfile = ''
-    # Get the most recent data only PH5 file or match DAS serialnumber
-    n = 0
-    for index_t in INDEX_T_DAS.rows:
-        # This DAS already exists in a ph5 file
-        if index_t['serial_number_s'] == das:
-            newestfile = sstripp(index_t['external_file_name_s'])
-            return openPH5(newestfile)
-        # miniPH5_xxxxx.ph5 with largest xxxxx
-        mh = miniPH5RE.match(index_t['external_file_name_s'])
-        if n < int(mh.groups()[0]):
-            newestfile = sstripp(index_t['external_file_name_s'])
-            n = int(mh.groups()[0])
-
-    if not newestfile:
-        # This is the first file added
-        mf = 'miniPH5_{0:05d}'.format(FIRST_MINI)
-        return openPH5(mf)
-    else:
-        mf = newestfile + '.ph5'
-
-    size_of_exrec = os.path.getsize(mf)
-    if NUM_MINI is not None:
-        fm = FIRST_MINI - 1
-        if (int(newestfile[8:13]) - fm) < NUM_MINI:
-            newestfile = "miniPH5_{0:05d}".format(int(newestfile[8:13]) + 1)
-        else:
-            small = sstripp(smallest())
-            return openPH5(small)
+    if MINI is None:
+        MINI = experiment.MiniAllocator(MAX_PH5_BYTES, INDEX_T_DAS.rows,
+                                        first_mini=FIRST_MINI,
+                                        num_mini=NUM_MINI)
 
-    elif (size_of_data + size_of_exrec) > MAX_PH5_BYTES:
-        newestfile = "miniPH5_{0:05d}".format(int(newestfile[8:13]) + 1)
-
-    return openPH5(newestfile)
+    return openPH5(MINI.allocate(CURRENT_DAS, size_of_data))
 
 
 def update_external_references():
     LOGGER.info("Updating external references...")
-    n = 0
-    for i in INDEX_T_DAS.rows:
-        external_file = i['external_file_name_s'][2:]
-        external_path = i['hdf5_path_s']
-        target = external_file + ':' + external_path
-        external_group = external_path.split('/')[3]
-
-        # Nuke old node
-        try:
-            group_node = EX.ph5.get_node(external_path)
-            group_node.remove()
-        except Exception as e:
-            pass
-
-        # Re-create node
-        try:
-            EX.ph5.create_external_link(
-                '/Experiment_g/Receivers_g', external_group, target)
-            n += 1
-        except Exception as e:
-            LOGGER.error(e)
-
-    n = 0
-    for i in INDEX_T_MAP.rows:
-        external_file = i['external_file_name_s'][2:]
-        external_path = i['hdf5_path_s']
-        target = external_file + ':' + external_path
-        external_group = external_path.split('/')[3]
-
-        # Nuke old node
-        try:
-            group_node = EX.ph5.get_node(external_path)
-            group_node.remove()
-        except Exception as e:
-            pass
+    n, kept = external_references.update_external_references(
+        EX.ph5, INDEX_T_DAS.rows, external_references.RECEIVERS)
+    LOGGER.info("done, {0} das nodes recreated. {1} up to date.\n"
+                .format(n, kept))
 
-        # Re-create node
-        try:
-            EX.ph5.create_external_link(
-                '/Experiment_g/Maps_g', external_group, target)
-            n += 1
-        except Exception as e:
-            LOGGER.error(e.message)
-    LOGGER.info("Done, {0} nodes recreated.\n".format(n))
+    n, kept = external_references.update_external_references(
+        EX.ph5, INDEX_T_MAP.rows, external_references.MAPS)
+    LOGGER.info("done, {0} map nodes recreated. {1} up to date.\n"
+                .format(n, kept))
 
 
 def update_index_t_info(starttime, samples, sps):
@@ -504,7 +439,7 @@ def updatePH5(stream):
         # Write out array data (it would be nice if we had int24) we use int32!
         EXREC.ph5_g_receivers.newarray(
             p_das_t['array_name_data_a'], trace.data, dtype='int32',
-            description=des)
+            description=des, sample_rate=trace.stats.sampling_rate)
         update_index_t_info(p_das_t['time/epoch_l'] + (
                     float(p_das_t['time/micro_seconds_i']) / 1000000.),
                             p_das_t['sample_count_i'],
@@ -536,7 +471,7 @@ def getLOG(Das):
 
 
 def main():
-    global F, RESP, INDEX_T_DAS
+    global F, RESP, INDEX_T_DAS, MINI
     get_args()
     import time
     then = time.time()
@@ -548,6 +483,7 @@ def main():
         Resp(EX.ph5_g_responses)
         rows, keys = EX.ph5_g_receivers.read_index()
         INDEX_T_DAS = Rows_Keys(rows, keys)
+        MINI = None
 
     for f in FILES:
         F = f
@@ -579,6 +515,8 @@ def main():
         update_external_references()
         sys.stdout.write(":<Finished>: {0}\n".format(f))
         sys.stdout.flush()
+    #   Keep Availability_t up to date if it has been built
+    availability.update(EX.ph5_g_receivers)
     seconds = time.time() - then
     print "Done...{0:b}".format(int(seconds / 6.))  # Minutes X 10
     LOGGER.info("Done...{0:b}".format(int(seconds / 6.)))
@@ -14,6 +14,11 @@ import logging
 import time
 import json
 import re
+import collections
+import copy_reg
+import multiprocessing
+import Queue
+import traceback
 from decimal import Decimal
 from math import modf
 import warnings
@@ -25,13 +30,20 @@ import bcd_py
 from tables import NaturalNameWarning
 
 from ph5.core import (experiment, columns, segdreader, segdreader_smartsolo,
-                      ph5api)
+                      ph5api, availability, external_references)
 from ph5 import LOGGING_FORMAT
 warnings.filterwarnings('ignore', category=NaturalNameWarning)
 
 
-PROG_VERSION = "2022.109"
+PROG_VERSION = "2026.291"
 LOGGER = logging.getLogger(__name__)
+# Compression profile of new arrays, None for the one of the experiment
+COMPRESSION = None
+# Number of processes decoding SEG-D files, 1 to decode in the writer
+WORKERS = 1
+# Traces a decoder process sends at a time, and batches it can have queued
+DECODE_BATCH = 64
+DECODE_QUEUE = 4
 
 MAX_PH5_BYTES = 1073741824 * 100.  # 100 GB (1024 X 1024 X 1024 X 2)
 
@@ -44,8 +56,8 @@ DAS_INFO = {}
 MAP_INFO = {}
 #   Current raw file processing
 F = None
-#   RE for mini files
-miniPH5RE = re.compile(r".*miniPH5_(\d\d\d\d\d)\.ph5")
+# Mini file of each DAS, made from Index_t on first use
+MINI = None
 
 # -2.5V to 2.5V
 mV_full_scale = 5000
@@ -171,6 +183,59 @@ class Resp(object):
         return len(self.lines)
 
 
+class Decoded(object):
+    '''   A SEG-D file read by a decoder process in decode_files. Stands
+          in for its Reader in the writer, replaying the header attributes
+          segd2ph5 uses and the traces as their batches arrive.
+          traces -> (trace, trace_headers) received and not replayed yet
+          error -> Message of the InputsError that stopped reading, or None
+    '''
+
+    def __init__(self, headers, receive):
+        '''   headers -> Reader attributes with its headers processed,
+                         trace_headers as before the first trace
+              receive -> Returns the next (kind, value) the decoder sent
+                         for this file
+        '''
+        self.__dict__.update(headers)
+        self.receive = receive
+        self.traces = collections.deque()
+        self.done = False
+        self.error = None
+
+    def _fill(self):
+        '''   Receive batches until there is a trace or the file ended   '''
+        while not self.traces and not self.done:
+            kind, value = self.receive()
+            if kind == 'traces':
+                self.traces.extend(value)
+            else:
+                self.done = True
+                self.error = value
+
+    def drain(self):
+        '''   Receive the rest of the file so the next one can be read   '''
+        while not self.done:
+            self.traces.clear()
+            self._fill()
+        self.traces.clear()
+
+    def name(self):
+        return self.filename
+
+    def isEOF(self):
+        self._fill()
+        return not self.traces and self.error is None
+
+    def process_trace(self, trace_index):
+        self._fill()
+        if not self.traces:
+            raise segdreader.InputsError(self.error)
+        trace, self.trace_headers = self.traces.popleft()
+        # Return trace and channel set number
+        return trace, self.trace_headers.trace_header.channel_set
+
+
 class Trace(object):
     __slots__ = ("trace", "headers")
 
@@ -209,6 +274,7 @@ def read_infile(infile):
 def get_args():
     global PH5, FILES, EVERY, NUM_MINI, TSPF, UTM, FIRST_MINI, APPEND,\
         MANUFACTURERS_CODE
+    global COMPRESSION, WORKERS
 
     TSPF = False
     from optparse import OptionParser
@@ -280,6 +346,21 @@ def get_args():
                          data loggers,",
                        type='int', default=None)
 
+    oparser.add_option("--compression", dest="compression",
+                       type="choice",
+                       choices=experiment.compression_profiles(),
+                       help="Compression profile of new data, SOH and log "
+                       "arrays. Default the profile recorded in the "
+                       "experiment, zlib if none.",
+                       default=None)
+
+    oparser.add_option("--workers", dest="workers",
+                       help="Number of processes decoding SEG-D files "
+                       "ahead of the one writing PH5. Each holds up to two "
+                       "whole files in memory. Default 1, decode and write "
+                       "in one process.",
+                       metavar="workers", type='int', default=1)
+
     options, args = oparser.parse_args()
 
     if options.rawfile and options.infile:
@@ -295,6 +376,8 @@ def get_args():
     TSPF = options.texas_spc
     APPEND = options.combine
     MANUFACTURERS_CODE = options.manufacturers_code
+    COMPRESSION = options.compression
+    WORKERS = options.workers
 
     if options.infile is not None:
         read_infile(options.infile)
@@ -314,6 +397,196 @@ def get_args():
     setLogger()
 
 
+def read_headers(f):
+    '''   Open SEG-D file f and process its headers
+          Returns:
+             size of f, Reader or None, None if f can not be read
+    '''
+    try:
+        size = os.path.getsize(f)
+    except Exception as e:
+        LOGGER.error("Failed to read {0}, {1}.\
+         Skipping...\n".format(f, str(e.message)))
+        return None, None
+    try:
+        segd_reader = get_segdreader(f, MANUFACTURERS_CODE)
+    except Exception:
+        return None, None
+    sd = segd_reader.Reader(infile=f, use_mmap=True)
+
+    try:
+        sd.process_general_headers()
+        sd.process_channel_set_descriptors()
+        sd.process_extended_headers()
+        sd.process_external_headers()
+        if sd.manufacturer == 'SmartSolo':
+            sd.process_trace_headers()
+    except segdreader.InputsError as e:
+        LOGGER.error(
+            "Possible bad SEG-D file -- {0}".format(
+                "".join(e.message)))
+        return None, None
+
+    return size, sd
+
+
+def read_files(files):
+    '''   Yield f, size of f and its Reader for each SEG-D file in files,
+          Reader None if f can not be read
+    '''
+    for f in files:
+        size, sd = read_headers(f)
+        yield f, size, sd
+
+
+def decode_files(files, workers):
+    '''   read_files() with the files decoded in workers processes, each
+          yielded in order as a Decoded. Decoder i reads files i,
+          i + workers, ... in turn and sends their traces in batches of
+          DECODE_BATCH through a queue holding DECODE_QUEUE batches, so
+          a decoder is at most that far ahead of the writer. Decoders log
+          through this process, in file order.
+    '''
+    files = list(files)
+    decoders = []
+    for i in range(workers):
+        queue = multiprocessing.Queue(DECODE_QUEUE)
+        process = multiprocessing.Process(
+            target=_decode_worker,
+            args=(files[i::workers], queue, MANUFACTURERS_CODE))
+        process.daemon = True
+        process.start()
+        decoders.append((process, queue))
+    try:
+        for i, f in enumerate(files):
+            receive = _receiver(*decoders[i % workers])
+            kind, value = receive()
+            size, headers = value
+            if headers is None:
+                yield f, size, None
+                continue
+            decoded = Decoded(headers, receive)
+            yield f, size, decoded
+            decoded.drain()
+    finally:
+        for process, queue in decoders:
+            process.terminate()
+            process.join()
+
+
+def _receiver(process, queue):
+    '''   Function returning the next (kind, value) from a decoder, after
+          logging the records sent with it   '''
+    def receive():
+        while True:
+            try:
+                kind, value, records = queue.get(timeout=1)
+                break
+            except Queue.Empty:
+                if not process.is_alive() and queue.empty():
+                    raise RuntimeError("Decoder process {0} exited"
+                                       .format(process.pid))
+        for record in records:
+            logging.getLogger(record.name).handle(record)
+        if kind == 'failed':
+            raise RuntimeError("Decoder process failed:\n" + value)
+
+        return kind, value
+
+    return receive
+
+
+def _container(keys_order, items):
+    c = construct.Container()
+    dict.update(c, items)
+    # Keep the order as is, the header dumps list repeated keys again
+    object.__setattr__(c, '__keys_order__', keys_order)
+
+    return c
+
+
+def _reduce_container(c):
+    return _container, (list(c.__keys_order__), dict(c))
+
+
+# Parsed headers are construct Containers, which do not pickle by
+# themselves, and headers are pickled from decoders to the writer
+copy_reg.pickle(construct.Container, _reduce_container)
+
+
+class _Records(logging.Handler):
+    '''   Keeps the log records of a decoder process for the writer   '''
+
+    def __init__(self):
+        logging.Handler.__init__(self)
+        self.records = []
+
+    def emit(self, record):
+        # Format now so the record pickles
+        record.msg = record.getMessage()
+        record.args = None
+        record.exc_info = None
+        self.records.append(record)
+
+
+# _Records of a decoder process in decode_files
+_RECORDS = None
+
+
+def _init_decoder(manufacturers_code):
+    global _RECORDS, MANUFACTURERS_CODE
+    MANUFACTURERS_CODE = manufacturers_code
+    _RECORDS = _Records()
+    LOGGER.handlers = []
+    logging.getLogger('ph5').handlers = [_RECORDS]
+
+
+def _send(queue, kind, value):
+    '''   Put (kind, value) on queue with the log records since the last   '''
+    records = _RECORDS.records
+    _RECORDS.records = []
+    queue.put((kind, value, records))
+
+
+def _decode_worker(files, queue, manufacturers_code):
+    '''   Decoder process of decode_files. Sends ('headers', (size,
+          headers)) for each file, headers None if it can not be read,
+          then ('traces', batch) and ('end', InputsError message or None).
+          Sends ('failed', traceback) and stops on any other error.
+    '''
+    _init_decoder(manufacturers_code)
+    try:
+        for f in files:
+            size, sd = read_headers(f)
+            if sd is None:
+                _send(queue, 'headers', (size, None))
+                continue
+            headers = dict(sd.__dict__)
+            headers['FH'] = None
+            headers['filename'] = sd.name()
+            _send(queue, 'headers', (size, headers))
+            batch = []
+            error = None
+            trace_index = 0
+            while not sd.isEOF():
+                try:
+                    trace, cs = sd.process_trace(trace_index)
+                except segdreader.InputsError as e:
+                    error = e.message
+                    break
+                trace_index += 1
+                # Each trace has its own TraceHeaders
+                batch.append((trace, sd.trace_headers))
+                if len(batch) == DECODE_BATCH:
+                    _send(queue, 'traces', batch)
+                    batch = []
+            if batch:
+                _send(queue, 'traces', batch)
+            _send(queue, 'end', error)
+    except Exception:
+        _send(queue, 'failed', traceback.format_exc())
+
+
 def setLogger():
     if LOGGER.handlers != []:
         LOGGER.removeHandler(LOGGER.handlers[0])
@@ -334,6 +607,8 @@ def initializeExperiment():
     EDIT = True
     EX.ph5open(EDIT)
     EX.initgroup()
+    if COMPRESSION is not None:
+        EX.set_compression(COMPRESSION)
 
 
 def openPH5(filename):
@@ -349,6 +624,7 @@ def openPH5(filename):
     exrec = experiment.ExperimentGroup(nickname=filename)
     exrec.ph5open(True)
     exrec.initgroup()
+    exrec.use_compression(EX.get_compression())
     return exrec
 
 
@@ -378,112 +654,30 @@ def update_index_t_info(starttime, samples, sps):
 def update_external_references():
     '''   Update external references in master.ph5 to
           miniPH5 files in Receivers_t    '''
-    global F
     LOGGER.info("Updating external references...")
-    n = 0
-    for i in INDEX_T_DAS.rows:
-        external_file = i['external_file_name_s'][2:]
-        external_path = i['hdf5_path_s']
-        target = external_file + ':' + external_path
-        external_group = external_path.split('/')[3]
-
-        #   Nuke old node
-        try:
-            group_node = EX.ph5.get_node(external_path)
-            group_node.remove()
-        except Exception as e:
-            pass
-
-        #   Re-create node
-        try:
-            EX.ph5.create_external_link(
-                '/Experiment_g/Receivers_g', external_group, target)
-            n += 1
-        except Exception as e:
-            # pass
-            LOGGER.error("{0}\n".format(e.message))
+    n, kept = external_references.update_external_references(
+        EX.ph5, INDEX_T_DAS.rows, external_references.RECEIVERS)
+    LOGGER.info("done, {0} das nodes recreated. {1} up to date.\n"
+                .format(n, kept))
 
-    LOGGER.info("done, {0} das nodes recreated.\n".format(n))
-
-    n = 0
-    for i in INDEX_T_MAP.rows:
-        external_file = i['external_file_name_s'][2:]
-        external_path = i['hdf5_path_s']
-        target = external_file + ':' + external_path
-        external_group = external_path.split('/')[3]
-
-        #   Nuke old node
-        try:
-            group_node = EX.ph5.get_node(external_path)
-            group_node.remove()
-        except Exception as e:
-            pass
-
-        #   Re-create node
-        try:
-            EX.ph5.create_external_link(
-                '/Experiment_g/Maps_g', external_group, target)
-            n += 1
-        except Exception as e:
-            # pass
-            LOGGER.error("{0}\n".format(e.message))
-
-    LOGGER.info("done, {0} map nodes recreated.\n".format(n))
+    n, kept = external_references.update_external_references(
+        EX.ph5, INDEX_T_MAP.rows, external_references.MAPS)
+    LOGGER.info("done, {0} map nodes recreated. {1} up to date.\n"
+                .format(n, kept))
 
 
 def get_current_data_only(size_of_data, das=None):
     '''   Return opened file handle for data only PH5 file that will be
           less than MAX_PH5_BYTES after raw data is added to it.
     '''
+    global MINI
 
-    def sstripp(s):
-        s = s.replace('.ph5', '')
-        s = s.replace('./', '')
-        return s
-
-    def smallest():
-        '''   Return the name of the smallest miniPH5_xxxxx.ph5   '''
-        minifiles = filter(miniPH5RE.match, os.listdir('.'))
-
-        tiny = minifiles[0]
-        for f in minifiles:
-            if os.path.getsize(f) < os.path.getsize(tiny):
-                tiny = f
-
-        return tiny
-
-    das = str(das)
-    newestfile = ''
-    #   Get the most recent data only PH5 file or match DAS serialnumber
-    n = 0
-    for index_t in INDEX_T_DAS.rows:
-        #   This DAS already exists in a ph5 file
-        if index_t['serial_number_s'] == das:
-            newestfile = sstripp(index_t['external_file_name_s'])
-            return openPH5(newestfile)
-        #   miniPH5_xxxxx.ph5 with largest xxxxx
-        mh = miniPH5RE.match(index_t['external_file_name_s'])
-        if n < int(mh.groups()[0]):
-            newestfile = sstripp(index_t['external_file_name_s'])
-            n = int(mh.groups()[0])
-
-    if not newestfile:
-        #   This is the first file added
-        return openPH5('miniPH5_{0:05d}'.format(FIRST_MINI))
-
-    size_of_exrec = os.path.getsize(newestfile + '.ph5')
-    if NUM_MINI is not None:
-        fm = FIRST_MINI - 1
-        if (int(newestfile[8:13]) - fm) < NUM_MINI:
-            newestfile = "miniPH5_{0:05d}".format(int(newestfile[8:13]) + 1)
-        else:
-            small = sstripp(smallest())
-            return openPH5(small)
-
-    elif (size_of_data + size_of_exrec) > MAX_PH5_BYTES:
-        newestfile = "miniPH5_{0:05d}".format(int(newestfile[8:13]) + 1)
+    if MINI is None:
+        MINI = experiment.MiniAllocator(MAX_PH5_BYTES, INDEX_T_DAS.rows,
+                                        first_mini=FIRST_MINI,
+                                        num_mini=NUM_MINI)
 
-    return openPH5(newestfile)
+    return openPH5(MINI.allocate(das, size_of_data))
 
 
 def getLOG():
@@ -692,18 +886,20 @@ def process_traces(rh, th, tr):
         des = "Epoch: " + str(p_das_t['time/epoch_l']) + \
               " Channel: " + str(p_das_t['channel_number_i'])
         #   Write trace data here
+        sample_rate = float(p_das_t['sample_rate_i']) / \
+            p_das_t['sample_rate_multiplier_i']
         try:
             if SD.manufacturer == 'FairfieldNodal':
                 #   Convert to counts
                 tr_counts = tr / LSB
                 EXREC.ph5_g_receivers.newarray(
                     p_das_t['array_name_data_a'], tr_counts, dtype='int32',
-                    description=des)
+                    description=des, sample_rate=sample_rate)
             elif SD.manufacturer == 'SmartSolo':
                 # SmartSolo is recorded by mV
                 EXREC.ph5_g_receivers.newarray(
                     p_das_t['array_name_data_a'], tr, dtype='float32',
-                    description=des)
+                    description=des, sample_rate=sample_rate)
         except Exception as e:
             #   Failed, leave as float
             LOGGER.warning(
@@ -713,7 +909,7 @@ def process_traces(rh, th, tr):
             p_response_t['bit_weight/value_d'] = 1.
             EXREC.ph5_g_receivers.newarray(
                 p_das_t['array_name_data_a'], tr, dtype='float32',
-                description=des)
+                description=des, sample_rate=sample_rate)
         update_index_t_info(p_das_t['time/epoch_l'] + (
                     float(p_das_t['time/micro_seconds_i']) / 1000000.),
                             p_das_t['sample_count_i'],
@@ -977,22 +1173,25 @@ def write_arrays(SD, Array_t):
         name = "Array_t_{0:03d}".format(int(line))
         a = EX.ph5_g_sorts.newArraySort(name)
         das_list = sorted(Array_t[line].keys())
-        #   Loop through das_list
-        for das in das_list:
-            if SD.manufacturer == 'SmartSolo':
-                Array_t[line][das] = combine_array_entries(
-                    name, Array_t[line][das])
-            dtimes = sorted(Array_t[line][das].keys())
-            #   Loop through deploying times
-            for dtime in dtimes:
-                chan_sets = sorted(Array_t[line][das][dtime].keys())
-                #   Loop through channel sets
-                for chan_set in chan_sets:
-                    try:
-                        for array_t in Array_t[line][das][dtime][chan_set]:
-                            columns.populate(a, array_t)
-                    except Exception as e:
-                        print(e.message)
+        #   Rows for the line are appended in chunks
+        with columns.BulkWriter(a):
+            #   Loop through das_list
+            for das in das_list:
+                if SD.manufacturer == 'SmartSolo':
+                    Array_t[line][das] = combine_array_entries(
+                        name, Array_t[line][das])
+                dtimes = sorted(Array_t[line][das].keys())
+                #   Loop through deploying times
+                for dtime in dtimes:
+                    chan_sets = sorted(Array_t[line][das][dtime].keys())
+                    #   Loop through channel sets
+                    for chan_set in chan_sets:
+                        try:
+                            for array_t in \
+                                    Array_t[line][das][dtime][chan_set]:
+                                columns.populate(a, array_t)
+                        except Exception as e:
+                            print(e.message)
 
 
 def reorder_das(PH5):
@@ -1017,10 +1216,13 @@ def reorder_das(PH5):
                           key=operator.itemgetter('channel_number_i',
                                                   'time/epoch_l',
                                                   'time/micro_seconds_i'))
-        for r in das_rows:
-            ph5object.ph5_g_receivers.populateDas_t(r)
-    ph5object.close()
+        with columns.BulkWriter(ph5object.ph5_g_receivers.current_t_das):
+            for r in das_rows:
+                ph5object.ph5_g_receivers.populateDas_t(r)
     LOGGER.info("Reorder and populate Das_t")
+    #   Keep Availability_t up to date if it has been built
+    availability.update(ph5object.ph5_g_receivers)
+    ph5object.close()
 
 
 def combine_array_entries(aName, aOfDas):
@@ -1086,54 +1288,57 @@ def writeINDEX():
 
     dass = sorted(DAS_INFO.keys())
 
-    for das in dass:
-        di = {}
-        mi = {}
-        start = sys.maxsize
-        stop = 0.
-        dm = [(d, m) for d in DAS_INFO[das] for m in MAP_INFO[das]]
-        for d, m in dm:
-            di['external_file_name_s'] = d.ph5file
-            mi['external_file_name_s'] = m.ph5file
-            di['hdf5_path_s'] = d.ph5path
-            mi['hdf5_path_s'] = m.ph5path
-            di['serial_number_s'] = das
-            mi['serial_number_s'] = das
-            if d.startepoch < start:
-                start = d.startepoch
-
-            if d.stopepoch > stop:
-                stop = d.stopepoch
-
-        di['time_stamp/epoch_l'] = int(time.time())
-        mi['time_stamp/epoch_l'] = int(time.time())
-        di['time_stamp/micro_seconds_i'] = 0
-        mi['time_stamp/micro_seconds_i'] = 0
-        di['time_stamp/type_s'] = 'BOTH'
-        mi['time_stamp/type_s'] = 'BOTH'
-        di['time_stamp/ascii_s'] = time.ctime(di['time_stamp/epoch_l'])
-        mi['time_stamp/ascii_s'] = time.ctime(mi['time_stamp/epoch_l'])
-
-        di['start_time/epoch_l'] = int(modf(start)[1])
-        mi['start_time/epoch_l'] = int(modf(start)[1])
-        di['start_time/micro_seconds_i'] = int(modf(start)[0] * 1000000)
-        mi['start_time/micro_seconds_i'] = int(modf(start)[0] * 1000000)
-        di['start_time/type_s'] = 'BOTH'
-        mi['start_time/type_s'] = 'BOTH'
-        di['start_time/ascii_s'] = time.ctime(start)
-        mi['start_time/ascii_s'] = time.ctime(start)
-
-        di['end_time/epoch_l'] = modf(stop)[1]
-        mi['end_time/epoch_l'] = modf(stop)[1]
-        di['end_time/micro_seconds_i'] = int(modf(stop)[0] * 1000000)
-        mi['end_time/micro_seconds_i'] = int(modf(stop)[0] * 1000000)
-        di['end_time/type_s'] = 'BOTH'
-        mi['end_time/type_s'] = 'BOTH'
-        di['end_time/ascii_s'] = time.ctime(stop)
-        mi['end_time/ascii_s'] = time.ctime(stop)
-
-        EX.ph5_g_receivers.populateIndex_t(di)
-        EX.ph5_g_maps.populateIndex_t(mi)
+    #   Index_t rows are appended in chunks
+    with columns.BulkWriter(EX.ph5_g_receivers.ph5_t_index), \
+            columns.BulkWriter(EX.ph5_g_maps.ph5_t_index):
+        for das in dass:
+            di = {}
+            mi = {}
+            start = sys.maxsize
+            stop = 0.
+            dm = [(d, m) for d in DAS_INFO[das] for m in MAP_INFO[das]]
+            for d, m in dm:
+                di['external_file_name_s'] = d.ph5file
+                mi['external_file_name_s'] = m.ph5file
+                di['hdf5_path_s'] = d.ph5path
+                mi['hdf5_path_s'] = m.ph5path
+                di['serial_number_s'] = das
+                mi['serial_number_s'] = das
+                if d.startepoch < start:
+                    start = d.startepoch
+
+                if d.stopepoch > stop:
+                    stop = d.stopepoch
+
+            di['time_stamp/epoch_l'] = int(time.time())
+            mi['time_stamp/epoch_l'] = int(time.time())
+            di['time_stamp/micro_seconds_i'] = 0
+            mi['time_stamp/micro_seconds_i'] = 0
+            di['time_stamp/type_s'] = 'BOTH'
+            mi['time_stamp/type_s'] = 'BOTH'
+            di['time_stamp/ascii_s'] = time.ctime(di['time_stamp/epoch_l'])
+            mi['time_stamp/ascii_s'] = time.ctime(mi['time_stamp/epoch_l'])
+
+            di['start_time/epoch_l'] = int(modf(start)[1])
+            mi['start_time/epoch_l'] = int(modf(start)[1])
+            di['start_time/micro_seconds_i'] = int(modf(start)[0] * 1000000)
+            mi['start_time/micro_seconds_i'] = int(modf(start)[0] * 1000000)
+            di['start_time/type_s'] = 'BOTH'
+            mi['start_time/type_s'] = 'BOTH'
+            di['start_time/ascii_s'] = time.ctime(start)
+            mi['start_time/ascii_s'] = time.ctime(start)
+
+            di['end_time/epoch_l'] = modf(stop)[1]
+            mi['end_time/epoch_l'] = modf(stop)[1]
+            di['end_time/micro_seconds_i'] = int(modf(stop)[0] * 1000000)
+            mi['end_time/micro_seconds_i'] = int(modf(stop)[0] * 1000000)
+            di['end_time/type_s'] = 'BOTH'
+            mi['end_time/type_s'] = 'BOTH'
+            di['end_time/ascii_s'] = time.ctime(stop)
+            mi['end_time/ascii_s'] = time.ctime(stop)
+
+            EX.ph5_g_receivers.populateIndex_t(di)
+            EX.ph5_g_maps.populateIndex_t(mi)
 
     rows, keys = EX.ph5_g_receivers.read_index()
     INDEX_T_DAS = Rows_Keys(rows, keys)
@@ -1218,8 +1423,8 @@ def main():
     from numpy import append as npappend
 
     def prof():
-        global RESP, INDEX_T_DAS, INDEX_T_MAP, SD, EXREC, MINIPH5, Das, SIZE,\
-            ARRAY_T, RH, LAT, LON, F, TRACE_JSON, APPEND
+        global RESP, INDEX_T_DAS, INDEX_T_MAP, MINI, SD, EXREC, MINIPH5, Das,\
+            SIZE, ARRAY_T, RH, LAT, LON, F, TRACE_JSON, APPEND
 
         MINIPH5 = None
         ARRAY_T = {}
@@ -1294,39 +1499,24 @@ def main():
             INDEX_T_DAS = Rows_Keys(rows, keys)
             rows, keys = EX.ph5_g_maps.read_index()
             INDEX_T_MAP = Rows_Keys(rows, keys)
+            MINI = None
 
-        for f in FILES:
+        if WORKERS > 1:
+            segd_files = decode_files(FILES, WORKERS)
+        else:
+            segd_files = read_files(FILES)
+        for f, size, sd in segd_files:
             F = f
             traces = []
             TRACE_JSON = []
-            try:
-                SIZE = os.path.getsize(f)
-            except Exception as e:
-                LOGGER.error("Failed to read {0}, {1}.\
-                 Skipping...\n".format(f, str(e.message)))
-                continue
-            try:
-                segd_reader = get_segdreader(f, MANUFACTURERS_CODE)
-            except Exception:
+            if sd is None:
                 continue
-            SD = segd_reader.Reader(infile=f)
+            SIZE = size
+            SD = sd
             LAT = None
             LON = None
             RH = False
 
-            try:
-                SD.process_general_headers()
-                SD.process_channel_set_descriptors()
-                SD.process_extended_headers()
-                SD.process_external_headers()
-                if SD.manufacturer == 'SmartSolo':
-                    SD.process_trace_headers()
-            except segdreader.InputsError as e:
-                LOGGER.error(
-                    "Possible bad SEG-D file -- {0}".format(
-                        "".join(e.message)))
-                continue
-
             nleft = APPEND
             Das = get_das(SD, warn=True)
             if not Das.isalnum():
@@ -0,0 +1,173 @@
+#
+# Compare the throughput of segd2ph5 loading SEG-D files serially and with
+# decoder worker processes.
+#
+
+import argparse
+import logging
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import ph5
+
+PROG_VERSION = '2026.291'
+LOGGER = logging.getLogger(__name__)
+
+SEGD_EXTENSIONS = ('.fcnt', '.segd', '.sgd')
+
+
+def get_args():
+    parser = argparse.ArgumentParser(
+                                formatter_class=argparse.RawTextHelpFormatter)
+    parser.usage = ("segd_benchmark --directory segd-directory "
+                    "[--workers n[,n...]] [--repeat n]")
+
+    parser.description = ("Load the SEG-D files of a directory into scratch "
+                          "PH5 files with segd2ph5, serially and with "
+                          "decoder worker processes, and report MB/s of "
+                          "SEG-D read.\n\nVersion: {0}".format(PROG_VERSION))
+
+    parser.add_argument("-d", "--directory", dest="segd_dir",
+                        help=("Directory searched for SEG-D files, "
+                              "{0}.".format(', '.join(SEGD_EXTENSIONS))),
+                        metavar="segd_dir", required=True)
+
+    parser.add_argument("--workers", dest="workers",
+                        help=("Comma separated decoder worker counts. "
+                              "Default 2. 1, serial, is always run."),
+                        metavar="workers", default="2")
+
+    parser.add_argument("--repeat", dest="repeat", type=int,
+                        help="Loads timed per worker count, the fastest is "
+                             "reported. Default 1.",
+                        metavar="repeat", default=1)
+
+    args = parser.parse_args()
+
+    return args
+
+
+def find_segd(segd_dir):
+    '''   Find SEG-D files under a directory
+          Inputs:
+             segd_dir -> directory to walk
+          Returns:
+             sorted list of paths
+    '''
+    files = []
+    for root, dirs, names in os.walk(segd_dir):
+        for name in names:
+            if name.lower().endswith(SEGD_EXTENSIONS):
+                files.append(os.path.abspath(os.path.join(root, name)))
+
+    return sorted(files)
+
+
+def load(files, workers, path):
+    '''   Load SEG-D files into a new experiment with segd2ph5
+          Inputs:
+             files -> list of SEG-D paths
+             workers -> segd2ph5 --workers
+             path -> new directory to create the experiment in
+          Returns:
+             seconds segd2ph5 took
+    '''
+    os.mkdir(path)
+    # Run the ph5 this module is from, installed or not
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(
+        [os.path.dirname(os.path.dirname(os.path.abspath(ph5.__file__)))] +
+        [p for p in [env.get('PYTHONPATH')] if p])
+    with open(os.path.join(path, 'segd_list'), 'w') as fh:
+        fh.write("\n".join(files) + "\n")
+    with open(os.devnull, 'w') as devnull:
+        subprocess.check_call([sys.executable, '-m',
+                               'ph5.utilities.initialize_ph5',
+                               '-n', 'master.ph5'],
+                              cwd=path, env=env, stdout=devnull,
+                              stderr=devnull)
+        then = time.time()
+        subprocess.check_call([sys.executable, '-m',
+                               'ph5.utilities.segd2ph5',
+                               '-n', 'master.ph5', '-f', 'segd_list',
+                               '--workers', str(workers)],
+                              cwd=path, env=env, stdout=devnull,
+                              stderr=devnull)
+
+    return time.time() - then
+
+
+def benchmark(files, workers, path, repeat=1):
+    '''   Time loading files with a number of decoder workers
+          Inputs:
+             files -> list of SEG-D paths
+             workers -> segd2ph5 --workers
+             path -> directory to load the scratch experiments in
+             repeat -> loads timed, the fastest is kept
+          Returns:
+             dictionary with workers, bytes, seconds and mbs, MB of SEG-D
+             read per second
+    '''
+    nbytes = sum(os.path.getsize(f) for f in files)
+    seconds = None
+    for i in range(repeat):
+        scratch = os.path.join(path, 'workers_{0}_{1}'.format(workers, i))
+        try:
+            secs = load(files, workers, scratch)
+        finally:
+            shutil.rmtree(scratch, ignore_errors=True)
+        if seconds is None or secs < seconds:
+            seconds = secs
+
+    mb = nbytes / 1024. / 1024.
+    return {'workers': workers,
+            'bytes': nbytes,
+            'seconds': seconds,
+            'mbs': mb / seconds if seconds else float('inf')}
+
+
+def main():
+    args = get_args()
+    try:
+        workers = [int(w) for w in args.workers.split(',')]
+    except ValueError:
+        LOGGER.error("--workers takes comma separated integers.")
+        sys.exit(-1)
+    workers = [1] + sorted(set(w for w in workers if w > 1))
+
+    files = find_segd(args.segd_dir)
+    if not files:
+        LOGGER.error("No SEG-D files found in {0}.".format(args.segd_dir))
+        sys.exit(-1)
+
+    path = tempfile.mkdtemp()
+    try:
+        print("{0} files, {1:.1f} MB".format(
+            len(files),
+            sum(os.path.getsize(f) for f in files) / 1024. / 1024.))
+        print("{0:<8} {1:>10} {2:>10} {3:>8}".format(
+            'workers', 'seconds', 'MB/s', 'speedup'))
+        serial = None
+        for w in workers:
+            try:
+                r = benchmark(files, w, path, args.repeat)
+            except subprocess.CalledProcessError as e:
+                LOGGER.warning("segd2ph5 --workers {0} failed: {1}"
+                               .format(w, e))
+                continue
+            if w == 1:
+                serial = r['seconds']
+            r['speedup'] = serial / r['seconds'] if serial and r['seconds']\
+                else float('nan')
+            print("{workers:<8} {seconds:>10.2f} {mbs:>10.1f} "
+                  "{speedup:>8.2f}".format(**r))
+    finally:
+        shutil.rmtree(path)
+
+
+if __name__ == '__main__':
+    main()
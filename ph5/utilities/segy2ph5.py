@@ -15,10 +15,13 @@ import time
 import json
 from math import modf
 from ph5 import LOGGING_FORMAT
-from ph5.core import experiment, columns, segyreader, timedoy
+from ph5.core import experiment, columns, external_references, segyreader,\
+    timedoy, availability
 
-PROG_VERSION = "2024.227"
+PROG_VERSION = "2026.291"
 LOGGER = logging.getLogger(__name__)
+# Compression profile of new arrays, None for the one of the experiment
+COMPRESSION = None
 DEPRECATION_WARNING = (
     'segy2ph5 is no longer supported by the PH5 software. '
     'Please use different functions to format data as PH5.\n\n'
@@ -95,6 +98,7 @@ class Resp(object):
 def get_args():
     global SR, TYPE, PRINT, L, T, F, ENDIAN, EBCDIC, PH5, RECV_ORDER, DAS,\
         SIZE, CHAN3
+    global COMPRESSION
 
     parser = argparse.ArgumentParser(
                                 formatter_class=argparse.RawTextHelpFormatter)
@@ -186,14 +190,22 @@ def get_args():
                         help="Force to run the command.",
                         action="store_true", default=False)
 
+    parser.add_argument("--compression", dest="compression",
+                        choices=experiment.compression_profiles(),
+                        help=("Compression profile of new data, SOH and log "
+                              "arrays. Default the profile recorded in the "
+                              "experiment, zlib if none."),
+                        default=None)
+
     args = parser.parse_args()
+    COMPRESSION = args.compression
     if not args.force_run:
         LOGGER.warning(DEPRECATION_WARNING)
         sys.exit()
 
     try:
         SIZE = os.path.getsize(args.infile)
-        SR = segyreader.Reader(args.infile)
+        SR = segyreader.Reader(args.infile, use_mmap=True)
         SR.open_infile()
         if SR.FH is None:
             raise IOError()
@@ -268,6 +280,8 @@ def initializeExperiment():
     EDIT = True
     EX.ph5open(EDIT)
     EX.initgroup()
+    if COMPRESSION is not None:
+        EX.set_compression(COMPRESSION)
 
 
 def openPH5(filename):
@@ -283,6 +297,7 @@ def openPH5(filename):
     exrec = experiment.ExperimentGroup(nickname=filename)
     exrec.ph5open(True)
     exrec.initgroup()
+    exrec.use_compression(EX.get_compression())
     return exrec
 
 
@@ -483,57 +498,16 @@ def set_from_binary_header(bh):
 def update_external_references():
     '''   Update external references in master.ph5 to miniPH5 files in
           Receivers_t    '''
-    global EX
-
     LOGGER.info("Updating external references...")
-    n = 0
-    for i in INDEX_T_DAS.rows:
-        external_file = i['external_file_name_s'][2:]
-        external_path = i['hdf5_path_s']
-        i['serial_number_s']
-        target = external_file + ':' + external_path
-        external_group = external_path.split('/')[3]
-
-        # Nuke old node
-        try:
-            group_node = EX.ph5.get_node(external_path)
-            group_node.remove()
-        except Exception as e:
-            LOGGER.error("DAS nuke - {0}".format(e))
-
-        # Re-create node
-        try:
-            EX.ph5.create_external_link(
-                '/Experiment_g/Receivers_g', external_group, target)
-            n += 1
-        except Exception as e:
-            LOGGER.error("{0}\n".format(e))
-
-    LOGGER.info("done, {0} das nodes recreated.\n".format(n))
+    n, kept = external_references.update_external_references(
+        EX.ph5, INDEX_T_DAS.rows, external_references.RECEIVERS)
+    LOGGER.info("done, {0} das nodes recreated. {1} up to date.\n"
+                .format(n, kept))
 
-    n = 0
-    for i in INDEX_T_MAP.rows:
-        external_file = i['external_file_name_s'][2:]
-        external_path = i['hdf5_path_s']
-        i['serial_number_s']
-        target = external_file + ':' + external_path
-        external_group = external_path.split('/')[3]
-
-        # Nuke old node
-        try:
-            group_node = EX.ph5.get_node(external_path)
-            group_node.remove()
-        except Exception as e:
-            pass
-
-        # Re-create node
-        try:
-            EX.ph5.create_external_link(
-                '/Experiment_g/Maps_g', external_group, target)
-            n += 1
-        except Exception as e:
-            LOGGER.error("{0}\n".format(e))
-    LOGGER.info("done, {0} map nodes recreated.\n".format(n))
+    n, kept = external_references.update_external_references(
+        EX.ph5, INDEX_T_MAP.rows, external_references.MAPS)
+    LOGGER.info("done, {0} map nodes recreated. {1} up to date.\n"
+                .format(n, kept))
 
 
 def read_trace():
@@ -925,7 +899,9 @@ def process_trace(th, bh, rh, eh, tr):
         # Write trace data here
         EXREC.ph5_g_receivers.newarray(
             p_das_t['array_name_data_a'], tr, dtype=DTYPE[SR.trace_fmt],
-            description=des)
+            description=des,
+            sample_rate=float(p_das_t['sample_rate_i']) /
+            p_das_t['sample_rate_multiplier_i'])
         update_index_t_info(p_das_t['time/epoch_l'] + (
                     float(p_das_t['time/micro_seconds_i']) / 1000000.),
                             p_das_t['sample_count_i'],
@@ -1094,6 +1070,8 @@ def main():
             write_events(EVENT_T)
 
         update_external_references()
+        #   Keep Availability_t up to date if it has been built
+        availability.update(EX.ph5_g_receivers)
 
         try:
             EX.ph5close()
@@ -8,16 +8,17 @@
 
 
 import argparse
+import re
 import string
 import sys
 import logging
 import time
 # This provides the base functionality
-from ph5.core import experiment
+from ph5.core import experiment, tableexport
 
 # Timeseries are stored as numpy arrays
 
-PROG_VERSION = '2024.318'
+PROG_VERSION = '2026.291'
 LOGGER = logging.getLogger(__name__)
 
 
@@ -104,7 +105,8 @@ def get_args():
     global PH5, PATH, DEBUG, EXPERIMENT_TABLE, SORT_TABLE, OFFSET_TABLE, \
         EVENT_TABLE, ARRAY_TABLE, RESPONSE_TABLE, REPORT_TABLE, \
         RECEIVER_TABLE, DAS_TABLE, TIME_TABLE, TABLE_KEY, INDEX_TABLE, \
-        M_INDEX_TABLE, ALL_ARRAYS, ALL_EVENTS, OFILE, IGNORE_SRM
+        M_INDEX_TABLE, ALL_ARRAYS, ALL_EVENTS, OFILE, IGNORE_SRM, FORMAT, \
+        ROWS, OFILENAME
 
     parser = argparse.ArgumentParser(
                                 formatter_class=argparse.RawTextHelpFormatter)
@@ -213,6 +215,17 @@ def get_args():
                         help=("Ignore checking sample_rate_multiplier_i "
                               "in Array_t or Das_t"))
 
+    parser.add_argument("-F", "--format", dest="format",
+                        choices=tableexport.FORMATS, default='kef',
+                        help=("Write kef, csv as keftocsv converts the kef "
+                              "to, or npz,\nan array of rows per table "
+                              "that needs --outfile. Default kef."))
+
+    parser.add_argument("--rows", dest="rows", action="store_true",
+                        default=False,
+                        help=("Read and write kef a row at a time instead "
+                              "of a chunk of\nrows at a time."))
+
     args = parser.parse_args()
 
     PH5 = args.ph5_file_prefix
@@ -253,9 +266,19 @@ def get_args():
         LOGGER.error("No table specified for output. See --help for more "
                      "details.")
 
+    FORMAT = args.format
+    ROWS = args.rows
+    if ROWS and FORMAT != 'kef':
+        LOGGER.error("--rows only writes kef.")
+        sys.exit()
+    if FORMAT == 'npz' and args.output_file is None:
+        LOGGER.error("npz is written to a file given with --outfile.")
+        sys.exit()
+
     # define OFILE to write output
     o_filename = args.output_file
-    if o_filename is None:
+    OFILENAME = o_filename
+    if o_filename is None or FORMAT == 'npz':
         OFILE = None
     else:
         OFILE = open(o_filename, 'w')
@@ -628,17 +651,11 @@ def readPH5(exp, filename, path, tableType, arg=None):
         return DAS_T
 
 
-def main():
-    global PH5, PATH, DEBUG, EXPERIMENT_TABLE, SORT_TABLE, OFFSET_TABLE,\
-        EVENT_TABLE, \
-        ARRAY_TABLE, RESPONSE_TABLE, REPORT_TABLE, RECEIVER_TABLE, DAS_TABLE,\
-        TIME_TABLE, INDEX_TABLE, IGNORE_SRM
-
-    init_local()
-
-    get_args()
-
-    initialize_ph5()
+def print_tables():
+    '''   Read the tables asked for into rows and print them as kef   '''
+    global EXPERIMENT_TABLE, SORT_TABLE, OFFSET_TABLE, EVENT_TABLE, \
+        ARRAY_TABLE, RESPONSE_TABLE, REPORT_TABLE, RECEIVER_TABLE, \
+        DAS_TABLE, TIME_TABLE, INDEX_TABLE, IGNORE_SRM
 
     if EXPERIMENT_TABLE:
         read_experiment_table()
@@ -715,6 +732,144 @@ def main():
             table_print("/Experiment_g/Receivers_g/Das_g_" +
                         d + "/Das_t", DAS_T[d])
 
+
+def sorts_table(name):
+    '''   /Experiment_g/Sorts_g/name, None if it does not exist   '''
+    try:
+        return EX.ph5.get_node('/Experiment_g/Sorts_g', name=name,
+                               classname='Table')
+    except Exception:
+        return None
+
+
+def open_writer():
+    '''   tableexport writer for --format and --outfile   '''
+    if FORMAT == 'npz':
+        return tableexport.NpzWriter(OFILENAME)
+    if OFILE is None:
+        fh = sys.stdout
+    else:
+        fh = OFILE
+    if FORMAT == 'csv':
+        return tableexport.CsvWriter(fh, update_key=TABLE_KEY)
+    # print_report ends each row with a new line
+    return tableexport.KefWriter(fh, EX.version(), update_key=TABLE_KEY,
+                                 separator='\n')
+
+
+def export_tables(writer):
+    '''   Write the tables asked for with writer a chunk at a time   '''
+    global EX, EXPERIMENT_TABLE, SORT_TABLE, OFFSET_TABLE, EVENT_TABLE, \
+        ARRAY_TABLE, RESPONSE_TABLE, REPORT_TABLE, RECEIVER_TABLE, \
+        DAS_TABLE, TIME_TABLE, INDEX_TABLE, IGNORE_SRM
+
+    if EXPERIMENT_TABLE:
+        writer.write("/Experiment_g/Experiment_t", EX.ph5_t_experiment)
+
+    if SORT_TABLE:
+        writer.write("/Experiment_g/Sorts_g/Sort_t",
+                     EX.ph5_g_sorts.ph5_t_sort)
+
+    if OFFSET_TABLE:
+        if OFFSET_TABLE[0] == 0 or OFFSET_TABLE[1] == 0:
+            name = "Offset_t"
+        else:
+            name = "Offset_t_{0:03d}_{1:03d}".format(
+                OFFSET_TABLE[0], OFFSET_TABLE[1])
+        writer.write("/Experiment_g/Sorts_g/{0}".format(name),
+                     sorts_table(name))
+
+    if EVENT_TABLE is not None:
+        if EVENT_TABLE == 0:
+            name = "Event_t"
+        else:
+            name = "Event_t_{0:03d}".format(EVENT_TABLE)
+        table = sorts_table(name)
+        if table is None:
+            LOGGER.error("Can't read {0}.\nDoes it exist?\n".format(name))
+            sys.exit()
+        writer.write("/Experiment_g/Sorts_g/{0}".format(name), table)
+    elif ALL_EVENTS is not False:
+        events = {}
+        for name in EX.ph5_g_sorts.namesRE(re.compile("Event_t.*")):
+            events[name] = sorts_table(name)
+        for name in events.keys():
+            writer.write("/Experiment_g/Sorts_g/{0}".format(name),
+                         events[name])
+
+    if INDEX_TABLE:
+        if EX.ph5.__contains__('/Experiment_g/Receivers_g/Index_t'):
+            writer.write("/Experiment_g/Receivers_g/Index_t",
+                         EX.ph5_g_receivers.ph5_t_index)
+
+    if M_INDEX_TABLE:
+        writer.write("/Experiment_g/Maps_g/Index_t", EX.ph5_g_maps.ph5_t_index)
+
+    if TIME_TABLE:
+        writer.write("/Experiment_g/Receivers_g/Time_t",
+                     EX.ph5_g_receivers.ph5_t_time)
+
+    if ARRAY_TABLE or ALL_ARRAYS:
+        arrays = {}
+        for name in EX.ph5_g_sorts.names():
+            if ARRAY_TABLE and \
+                    int(string.split(name, '_')[2]) != int(ARRAY_TABLE):
+                continue
+            table = sorts_table(name)
+            try:
+                tableexport.check_srm(table, name, IGNORE_SRM)
+            except experiment.HDF5InteractionError as e:
+                LOGGER.error(e.msg)
+                break
+            arrays[name] = table
+        for name in arrays.keys():
+            writer.write("/Experiment_g/Sorts_g/" + name, arrays[name])
+
+    if RESPONSE_TABLE:
+        writer.write("/Experiment_g/Responses_g/Response_t",
+                     EX.ph5_g_responses.ph5_t_response)
+
+    if REPORT_TABLE:
+        writer.write("/Experiment_g/Reports_g/Report_t",
+                     EX.ph5_g_reports.ph5_t_report)
+
+    if RECEIVER_TABLE:
+        writer.write("/Experiment_g/Receivers_g/Receiver_t",
+                     EX.ph5_g_receivers.ph5_t_receiver)
+
+    if DAS_TABLE:
+        dasGroups = EX.ph5_g_receivers.alldas_g()
+        if "Das_g_" + DAS_TABLE in dasGroups:
+            EX.ph5_g_receivers.setcurrent(dasGroups["Das_g_" + DAS_TABLE])
+            table = EX.ph5_g_receivers.current_t_das
+            if table is not None:
+                try:
+                    tableexport.check_srm(table,
+                                          "Das_t_" + DAS_TABLE, IGNORE_SRM)
+                except experiment.HDF5InteractionError as e:
+                    LOGGER.error(e.msg)
+                    return
+                writer.write("/Experiment_g/Receivers_g/Das_g_" +
+                             DAS_TABLE + "/Das_t", table,
+                             tableexport.das_order(table))
+
+
+def main():
+    init_local()
+
+    get_args()
+
+    initialize_ph5()
+
+    if ROWS:
+        print_tables()
+    else:
+        writer = open_writer()
+        try:
+            export_tables(writer)
+        finally:
+            writer.close()
+
     EX.ph5close()
     if OFILE is not None:
         OFILE.close()
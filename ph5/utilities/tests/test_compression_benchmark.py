@@ -0,0 +1,64 @@
+'''
+Tests for compression_benchmark
+'''
+import os
+import sys
+import unittest
+
+from mock import patch
+from testfixtures import OutputCapture, LogCapture
+
+from ph5.core import experiment
+from ph5.utilities import compression_benchmark
+from ph5.core.tests.test_base import LogTestCase, TempDirTestCase,\
+    initialize_ex
+
+
+class TestCompressionBenchmark(TempDirTestCase, LogTestCase):
+    def setUp(self):
+        super(TestCompressionBenchmark, self).setUp()
+        self.ph5path = os.path.join(self.home, 'ph5/test_data/ph5')
+        self.ex = initialize_ex('master.ph5', self.ph5path, False)
+
+    def tearDown(self):
+        self.ex.ph5close()
+        super(TestCompressionBenchmark, self).tearDown()
+
+    def test_sample_traces(self):
+        traces = compression_benchmark.sample_traces(self.ex, max_traces=3)
+        self.assertEqual(3, len(traces))
+        self.assertEqual(3, len(set(name for name, data in traces)))
+        traces = compression_benchmark.sample_traces(self.ex, max_bytes=1)
+        self.assertEqual(1, len(traces))
+
+    def test_benchmark(self):
+        traces = compression_benchmark.sample_traces(self.ex, max_traces=5)
+        ret = compression_benchmark.benchmark(traces, 'zlib', self.tmpdir)
+        self.assertEqual('zlib', ret['profile'])
+        self.assertEqual(sum(data.nbytes for name, data in traces),
+                         ret['bytes'])
+        self.assertGreater(ret['ratio'], 1)
+        self.assertGreater(ret['write_mbs'], 0)
+        self.assertGreater(ret['read_mbs'], 0)
+        # the scratch file is removed
+        self.assertEqual([], os.listdir(self.tmpdir))
+        with self.assertRaises(experiment.HDF5InteractionError):
+            compression_benchmark.benchmark(traces, 'gzip', self.tmpdir)
+
+    def test_main(self):
+        testargs = ['compression_benchmark', '-n', 'master.ph5', '-p',
+                    self.ph5path, '--profiles', 'zlib:1,none,gzip',
+                    '--traces', '4']
+        with patch.object(sys, 'argv', testargs):
+            with OutputCapture() as out, LogCapture() as log:
+                compression_benchmark.main()
+        lines = out.captured.strip().split('\n')
+        self.assertTrue(lines[0].startswith('4 traces'))
+        self.assertEqual(['profile', 'zlib:1', 'none'],
+                         [line.split()[0] for line in lines[1:]])
+        # unknown profiles are skipped
+        self.assertIn('gzip', log.records[-1].msg)
+
+
+if __name__ == "__main__":
+    unittest.main()
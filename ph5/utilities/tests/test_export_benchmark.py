@@ -0,0 +1,55 @@
+'''
+Tests for export_benchmark
+'''
+import os
+import sys
+import unittest
+
+from mock import patch
+from testfixtures import OutputCapture, LogCapture
+
+from ph5.utilities import export_benchmark
+from ph5.core.tests.test_base import LogTestCase, TempDirTestCase
+
+
+class TestExportBenchmark(TempDirTestCase, LogTestCase):
+    def setUp(self):
+        super(TestExportBenchmark, self).setUp()
+        self.ph5_path = os.path.join(self.home, 'ph5/test_data/ph5')
+
+    def test_benchmark(self):
+        ret = export_benchmark.benchmark(
+            ['-n', 'master.ph5', '-p', self.ph5_path, '-D', '12183'],
+            self.tmpdir)
+        self.assertEqual(['kef rows', 'kef', 'csv rows', 'csv', 'npz'],
+                         [r['name'] for r in ret])
+        self.assertEqual(['', 'yes', '', 'yes', ''],
+                         [r['same'] for r in ret])
+        self.assertEqual([9] * 5, [r['rows'] for r in ret])
+        self.assertTrue(all(r['seconds'] > 0 and r['bytes'] > 0
+                            for r in ret))
+        self.assertEqual(1, ret[0]['speedup'])
+        # the dumps are removed
+        self.assertEqual([], os.listdir(self.tmpdir))
+
+    def test_main(self):
+        testargs = ['export_benchmark', '-n', 'master.ph5',
+                    '-p', self.ph5_path, '-A', '1']
+        with patch.object(sys, 'argv', testargs):
+            with OutputCapture() as out:
+                export_benchmark.main()
+        lines = out.captured.strip().split('\n')
+        self.assertEqual('3 rows', lines[0])
+        self.assertEqual(['format', 'kef', 'kef', 'csv', 'csv', 'npz'],
+                         [line.split()[0] for line in lines[1:]])
+
+        testargs = ['export_benchmark', '-n', 'master.ph5']
+        with patch.object(sys, 'argv', testargs):
+            with LogCapture() as log:
+                with self.assertRaises(SystemExit):
+                    export_benchmark.main()
+        self.assertIn('No table given', log.records[-1].msg)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,123 @@
+'''
+Tests for kef2ph5
+'''
+import os
+import shutil
+import sys
+import unittest
+
+import tables
+from mock import patch
+from testfixtures import OutputCapture
+
+from ph5.utilities import kef2ph5, availability_t
+from ph5.core import availability, columns, experiment
+from ph5.core.tests.test_base import LogTestCase, TempDirTestCase
+
+UPDATE_KEF = '''/Experiment_g/Sorts_g/Array_t_008:Update:channel_number_i
+\tchannel_number_i = 2
+\tsample_rate_i = 250
+\tdescription_s = updated
+/Experiment_g/Sorts_g/Array_t_008:Update:channel_number_i
+\tsample_rate_i = 40
+/Experiment_g/Sorts_g/Array_t_008
+\tid_s = 8002
+\tchannel_number_i = 1
+/Experiment_g/Sorts_g/Array_t_008:Update:id_s
+\tid_s = 8002
+\tsample_rate_i = 500
+/Experiment_g/Sorts_g/Array_t_008:Delete:channel_number_i
+\tchannel_number_i = 3
+/Experiment_g/Sorts_g/Array_t_008:Delete:id_s
+\tid_s = 8001
+/Experiment_g/Sorts_g/Array_t_008:Delete:id_s
+\tid_s = 8001
+/Experiment_g/Sorts_g/Offset_t_001_001:Update:receiver_id_s
+\treceiver_id_s=0407
+\toffset/value_d=1.5
+/Experiment_g/Sorts_g/Offset_t_002_001:Delete:receiver_id_s
+\treceiver_id_s=0407
+'''
+
+
+class TestKef2PH5(TempDirTestCase, LogTestCase):
+    def load(self, subdir, *args):
+        os.mkdir(subdir)
+        os.chdir(subdir)
+        kefs = [os.path.join(self.home, 'ph5/test_data/metadata', f)
+                for f in ('array_8_130.kef', 'event_t.kef', 'offset_t.kef',
+                          'response_t.kef')]
+        kefs.append(os.path.join(self.tmpdir, 'update.kef'))
+        for kef in kefs:
+            testargs = ['kef2ph5', '-n', 'master.ph5', '-k', kef] + \
+                list(args)
+            with patch.object(sys, 'argv', testargs):
+                with OutputCapture():
+                    kef2ph5.main()
+            columns.TABLES.clear()
+
+        ret = {}
+        h = tables.open_file('master.ph5')
+        for n in h.walk_nodes('/', 'Table'):
+            ret[n._v_pathname] = n.read().tolist()
+        h.close()
+        os.chdir(self.tmpdir)
+        return ret
+
+    def test_main(self):
+        with open('update.kef', 'w') as fh:
+            fh.write(UPDATE_KEF)
+        blocks = self.load('blocks', '-b')
+        streamed = self.load('streamed')
+        self.assertEqual(sorted(blocks.keys()), sorted(streamed.keys()))
+        for k in blocks:
+            self.assertEqual(blocks[k], streamed[k], k)
+
+        array_t = streamed['/Experiment_g/Sorts_g/Array_t_008']
+        self.assertEqual(1, len(array_t))
+        self.assertEqual(1, len(
+            streamed['/Experiment_g/Sorts_g/Offset_t_001_001']))
+        self.assertEqual(
+            0, len(streamed['/Experiment_g/Sorts_g/Offset_t_002_001']))
+        self.assertEqual(1, len(
+            streamed['/Experiment_g/Sorts_g/Event_t_001']))
+        # nothing is written with -c
+        checked = self.load('checked', '-c')
+        self.assertEqual(
+            0, len(checked['/Experiment_g/Sorts_g/Array_t_008']))
+
+    def test_main_availability_t(self):
+        # Availability_t is refreshed after Das_t is updated in place
+        for f in ('master.ph5', 'miniPH5_00001.ph5'):
+            shutil.copy(os.path.join(self.home, 'ph5/test_data/ph5', f),
+                        self.tmpdir)
+        with patch.object(sys, 'argv', ['availability_t', '-n',
+                                        'master.ph5']):
+            availability_t.main()
+        with open('das_t.kef', 'w') as fh:
+            fh.write('/Experiment_g/Receivers_g/Das_g_9EEF/Das_t'
+                     ':Update:array_name_data_a\n'
+                     '\tarray_name_data_a = Data_a_0001\n'
+                     '\tsample_count_i = 1000\n')
+        with patch.object(sys, 'argv', ['kef2ph5', '-n', 'master.ph5',
+                                        '-k', 'das_t.kef']), \
+                patch.object(availability, 'refresh',
+                             wraps=availability.refresh) as refresh:
+            kef2ph5.main()
+        # Only the DAS written is summarized again
+        self.assertEqual(['9EEF'], refresh.call_args[0][1])
+
+        ex = experiment.ExperimentGroup(self.tmpdir, 'master.ph5')
+        ex.ph5open(False)
+        ex.initgroup()
+        self.assertEqual([], availability.stale(ex.ph5_g_receivers))
+        rows, keys = ex.ph5_g_receivers.read_availability()
+        self.assertEqual(
+            [(1, 1463568490.), (2, 1463568517.88), (3, 1463568517.88)],
+            [(r['channel_number_i'], r['end_epoch_d']) for r in rows
+             if r['serial_number_s'] == '9EEF'])
+        ex.ph5close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -9,7 +9,9 @@ import numpy
 from mock import patch
 from testfixtures import OutputCapture, LogCapture
 
-from ph5.utilities import obspytoph5, metadatatoph5, initialize_ph5
+from ph5.core import columns
+from ph5.utilities import obspytoph5, metadatatoph5, initialize_ph5, \
+    availability_t
 from ph5.core.tests.test_base import LogTestCase, TempDirTestCase,\
     initialize_ex
 
@@ -56,6 +58,53 @@ class TestObspytoPH5Main(TempDirTestCase, LogTestCase):
         self.assertEqual('../miniseed/0407LHN.ms',
                          ret[1]['raw_file_name_s'])
 
+    def test_main_availability_t(self):
+        # Availability_t built before loading data is refreshed
+        testargs = ['availability_t', '-n', 'master.ph5']
+        with patch.object(sys, 'argv', testargs):
+            availability_t.main()
+        testargs = ['obspytoph5', '-n', 'master.ph5', '-d',
+                    '../miniseed/', '--force']
+        with patch.object(sys, 'argv', testargs):
+            obspytoph5.main()
+
+        self.ph5_object = initialize_ex('master.ph5', '.', False)
+        rows, keys = self.ph5_object.ph5_g_receivers.read_availability()
+        self.assertEqual(['5553'] * 3,
+                         [r['serial_number_s'] for r in rows])
+        self.assertEqual([(-2, 0), (1, 100), (1, 200)],
+                         sorted([(r['channel_number_i'], r['sample_rate_i'])
+                                 for r in rows]))
+        node = self.ph5_object.ph5_g_receivers.getdas_g('5553')
+        self.ph5_object.ph5_g_receivers.setcurrent(node)
+        das_t = self.ph5_object.ph5_g_receivers.current_t_das
+        self.assertEqual([columns.das_t_stamp(das_t)] * 3,
+                         [r['das_t_stamp_s'] for r in rows])
+
+    def test_main_compression(self):
+        testargs = ['obspytoph5', '-n', 'master.ph5', '-r',
+                    '../miniseed/0407HHN.ms', '--force',
+                    '--compression', 'blosc:lz4']
+        with patch.object(sys, 'argv', testargs):
+            obspytoph5.main()
+
+        self.ph5_object = initialize_ex('master.ph5', '.', False)
+        self.assertEqual('blosc:lz4', self.ph5_object.get_compression())
+        # the profile is recorded in master only
+        mini = initialize_ex('miniPH5_00001.ph5', '.', False)
+        try:
+            self.assertFalse(hasattr(mini.ph5_g_experiment._v_attrs,
+                                     'compression_profile_s'))
+        finally:
+            mini.ph5close()
+        receivers = self.ph5_object.ph5_g_receivers
+        receivers.setcurrent(receivers.getdas_g('5553'))
+        das_t, keys = receivers.read_das()
+        a = receivers.find_trace_ref(das_t[0]['array_name_data_a'])
+        self.assertEqual('blosc:lz4', a.filters.complib)
+        self.assertEqual(das_t[0]['sample_count_i'],
+                         len(receivers.read_trace(a)))
+
     def test_main2(self):
 
         # need to use relative path '../miniseed/' because das_t's
@@ -199,6 +199,20 @@ class TestPh5Validate_main_detect_data(TempDirTestCase, LogTestCase):
             'ERROR: No Response table found. Have you run resp_load yet?\n'
             'ERROR: Response_t has no entry for n_i=7\n')
 
+    def test_main_workers(self):
+        logs = []
+        for workers in ('1', '2'):
+            testargs = ['ph5_validate', '-n', 'master.ph5',
+                        '-p', self.tmpdir, '-l', 'INFO',
+                        '--workers', workers]
+            with patch.object(sys, 'argv', testargs):
+                with OutputCapture():
+                    ph5validate.main()
+            with open('ph5_validate.log') as f:
+                logs.append(f.read())
+        self.assertIn('Station 9003 Channel 1\n', logs[0])
+        self.assertEqual(logs[0], logs[1])
+
     def test_get_args(self):
         testargs = ['ph5_validate', '-n', 'master.ph5', '-p', self.tmpdir,
                     '-l', 'WARN']
@@ -220,6 +234,7 @@ class TestPh5Validate_main_detect_data(TempDirTestCase, LogTestCase):
         self.assertEqual(ret.outfile, 'ph5_validate.log')
         self.assertEqual(ret.ph5path, self.tmpdir)
         self.assertEqual(ret.verbose, False)
+        self.assertEqual(ret.workers, 1)
 
 
 class TestPh5Validate_conflict_time(TempDirTestCase, LogTestCase):
@@ -691,17 +706,31 @@ class TestPH5Validate_das_t_order(LogTestCase, TempDirTestCase):
         ph5_object.close()
 
     def test_main(self):
-        testargs = ['ph5validate', '-n', 'master.ph5']
-        with patch.object(sys, 'argv', testargs):
-            ph5validate.main()
+        for workers in ('1', '2'):
+            testargs = ['ph5validate', '-n', 'master.ph5',
+                        '--workers', workers]
+            with patch.object(sys, 'argv', testargs):
+                ph5validate.main()
 
-        with open(os.path.join(self.tmpdir, 'ph5_validate.log'),
-                  'r') as content_file:
-            loglines = content_file.read().strip().split("\n")
-        self.assertIn("ERROR: Das 1X1: Das_t isn't in channel/time order."
-                      " Run fix_das_t_order to fix that.",
-                      loglines)
+            with open(os.path.join(self.tmpdir, 'ph5_validate.log'),
+                      'r') as content_file:
+                loglines = content_file.read().strip().split("\n")
+            self.assertIn("ERROR: Das 1X1: Das_t isn't in channel/time "
+                          "order. Run fix_das_t_order to fix that.",
+                          loglines)
 
+    def test_in_channel_time_order(self):
+        ph5_object = ph5api.PH5(
+            path=os.path.join(self.home, "ph5/test_data/ph5"),
+            nickname='master.ph5')
+        receivers = ph5_object.ph5_g_receivers
+        for das_sn, in_order in (('12183', True), ('3X500', True),
+                                 ('5553', False)):
+            receivers.setcurrent(receivers.getdas_g(das_sn))
+            self.assertEqual(
+                in_order,
+                ph5validate.in_channel_time_order(receivers.current_t_das))
+        ph5_object.close()
 
 
 class Test_Location_value0(LogTestCase, TempDirTestCase):
@@ -0,0 +1,89 @@
+'''
+Tests for rechunk
+'''
+import os
+import shutil
+import sys
+import unittest
+
+import numpy as np
+from mock import patch
+from testfixtures import LogCapture
+
+from ph5.core import ph5api, experiment
+from ph5.utilities import rechunk
+from ph5.core.tests.test_base import LogTestCase, TempDirTestCase,\
+    initialize_ex
+
+
+def cut_all(path):
+    '''   Data of every window of every DAS with a sample rate   '''
+    ph5object = ph5api.PH5(path=path, nickname='master.ph5')
+    ret = []
+    try:
+        ph5object.read_das_g_names()
+        for name in sorted(ph5object.Das_g_names):
+            das = name[len('Das_g_'):]
+            ph5object.read_das_t(das)
+            for r in ph5object.Das_t[das]['rows']:
+                if not r['sample_rate_i']:
+                    continue
+                sr = float(r['sample_rate_i']) / \
+                    r['sample_rate_multiplier_i']
+                start = r['time/epoch_l'] + \
+                    r['time/micro_seconds_i'] / 1000000.
+                traces = ph5object.cut(das, start,
+                                       start + r['sample_count_i'] / sr,
+                                       chan=r['channel_number_i'],
+                                       sample_rate=sr,
+                                       apply_time_correction=False)
+                ret.append(np.concatenate([t.data for t in traces]))
+    finally:
+        ph5object.close()
+
+    return ret
+
+
+class TestRechunk(TempDirTestCase, LogTestCase):
+    def setUp(self):
+        super(TestRechunk, self).setUp()
+        for name in ('master.ph5', 'miniPH5_00001.ph5'):
+            shutil.copy(os.path.join(self.home, 'ph5/test_data/ph5', name),
+                        self.tmpdir)
+
+    def test_main(self):
+        before = cut_all(self.tmpdir)
+        testargs = ['rechunk', '-p', self.tmpdir, '-k', '8']
+        with patch.object(sys, 'argv', testargs):
+            with LogCapture() as log:
+                rechunk.main()
+        self.assertIn('rewrote 22 of 22 arrays', log.records[-1].msg)
+
+        # same samples
+        after = cut_all(self.tmpdir)
+        self.assertEqual(len(before), len(after))
+        for b, a in zip(before, after):
+            self.assertTrue(np.array_equal(b, a))
+
+        ex = initialize_ex('miniPH5_00001.ph5', self.tmpdir, False)
+        try:
+            receivers = ex.ph5_g_receivers
+            receivers.setcurrent(receivers.getdas_g('3X500'))
+            rates = rechunk.sample_rates(receivers)
+            self.assertEqual(500., rates['Data_a_0001'])
+            a = receivers.find_trace_ref('Data_a_0001')
+            # 8 kB chunks of whole seconds at 500 sps
+            self.assertEqual((2000,), a.chunkshape)
+            self.assertEqual(experiment.compression_filters(), a.filters)
+        finally:
+            ex.ph5close()
+
+        # nothing left to rewrite
+        with patch.object(sys, 'argv', testargs):
+            with LogCapture() as log:
+                rechunk.main()
+        self.assertIn('rewrote 0 of 22 arrays', log.records[-1].msg)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -9,10 +9,10 @@ import logging
 from mock import patch
 from testfixtures import OutputCapture, LogCapture
 
-from ph5.utilities import seg2toph5, initialize_ph5
+from ph5.utilities import seg2toph5, initialize_ph5, availability_t
 from ph5.core.tests.test_base import LogTestCase, TempDirTestCase,\
     initialize_ex
-from ph5.core import ph5api
+from ph5.core import ph5api, availability
 
 
 class TestSeg2toPH5_main(TempDirTestCase, LogTestCase):
@@ -83,6 +83,26 @@ class TestSeg2toPH5_main(TempDirTestCase, LogTestCase):
                 i += 1
         self.assertEqual(ret_targets, targets)
 
+    def test_main_availability_t(self):
+        # Availability_t built before loading data is refreshed
+        testargs = ['initialize_ph5', '-n', 'master.ph5']
+        with patch.object(sys, 'argv', testargs):
+            initialize_ph5.main()
+        testargs = ['availability_t', '-n', 'master.ph5']
+        with patch.object(sys, 'argv', testargs):
+            availability_t.main()
+        testargs = ['seg2toph5', '-n', 'master.ph5', '-r',
+                    os.path.join(self.home, "ph5/test_data/seg2/15001.dat")]
+        with patch.object(sys, 'argv', testargs):
+            with OutputCapture():
+                seg2toph5.main()
+
+        self.ph5object = initialize_ex('master.ph5', '.', False)
+        receivers = self.ph5object.ph5_g_receivers
+        rows, keys = receivers.read_availability()
+        self.assertEqual(60, len(set([r['serial_number_s'] for r in rows])))
+        self.assertEqual([], availability.stale(receivers))
+
     def test_update_external_references(self):
         self.ph5object = seg2toph5.EX = \
             initialize_ex('master.ph5', '.', True)
@@ -7,6 +7,7 @@ import unittest
 import logging
 import operator
 
+import tables
 from mock import patch
 from testfixtures import LogCapture, OutputCapture
 
@@ -79,6 +80,7 @@ class TestSegDtoPH5(TempDirTestCase, LogTestCase):
         segd2ph5.DAS_INFO = {}
         segd2ph5.MAP_INFO = {}
         segd2ph5.ARRAY_T = {}
+        segd2ph5.MINI = None
         super(TestSegDtoPH5, self).tearDown()
 
     def test_bit_weights(self):
@@ -459,5 +461,126 @@ class TestSegDtoPH5_precision(TempDirTestCase, LogTestCase):
         self.assertEqual(das_rows[5]['time/micro_seconds_i'], 20000)
 
 
+class TestSegDReader_mmap(unittest.TestCase):
+    def read_traces(self, reader, path, use_mmap):
+        SD = reader.Reader(infile=path, use_mmap=use_mmap)
+        SD.process_general_headers()
+        SD.process_channel_set_descriptors()
+        SD.process_extended_headers()
+        SD.process_external_headers()
+        if SD.manufacturer == 'SmartSolo':
+            SD.process_trace_headers()
+        traces = []
+        while not SD.isEOF():
+            trace, cs = SD.process_trace(len(traces))
+            traces.append(trace)
+        return SD, traces
+
+    def test_read_trace(self):
+        """
+        test memory mapped readers return views of the same samples in
+        file order
+        """
+        home = os.getcwd()
+        for reader, f in (
+                (segdreader, 'fairfield/3ch.fcnt'),
+                (segdreader_smartsolo,
+                 'smartsolo/453005513.2.2021.05.08.20.06.00.000.E.segd')):
+            path = os.path.join(home, 'ph5/test_data/segd', f)
+            SD, read = self.read_traces(reader, path, False)
+            MM, mapped = self.read_traces(reader, path, True)
+            self.assertIsNone(SD.MM)
+            self.assertIsNotNone(MM.MM)
+            self.assertEqual(SD.bytes_read, MM.bytes_read)
+            self.assertEqual(len(read), len(mapped))
+            for r, m in zip(read, mapped):
+                self.assertEqual('>f4', r.dtype.str)
+                self.assertEqual('>f4', m.dtype.str)
+                self.assertIs(MM.MM, m.base)
+                self.assertFalse(m.flags.writeable)
+                self.assertTrue((r == m).all())
+
+
+def load_segd(path, segd_files, workers=1):
+    """
+    Initialize master.ph5 in path and load segd_files into it with
+    segd2ph5 using workers decoder processes
+    """
+    os.mkdir(path)
+    os.chdir(path)
+    try:
+        testargs = ['initialize_ph5', '-n', 'master.ph5']
+        with patch.object(sys, 'argv', testargs):
+            initialize_ph5.main()
+        with open('segd_list', 'w') as segdlistfile:
+            segdlistfile.write("\n".join(segd_files) + "\n")
+        testargs = ['segdtoph5', '-n', 'master.ph5', '-f', 'segd_list',
+                    '--workers', str(workers)]
+        with patch.object(sys, 'argv', testargs):
+            with LogCapture() as log:
+                with OutputCapture():
+                    segd2ph5.main()
+    finally:
+        os.chdir('..')
+    return [r.getMessage() for r in log.records
+            if r.name != 'ph5.core.experiment']
+
+
+def ph5_contents(path):
+    """
+    Return {file: {node path: rows or data}} of the PH5 files in path,
+    leaving out the load time stamps of Index_t
+    """
+    contents = {}
+    for name in sorted(os.listdir(path)):
+        if not name.endswith('.ph5'):
+            continue
+        nodes = {}
+        with tables.open_file(os.path.join(path, name)) as h5:
+            for node in h5.walk_nodes('/'):
+                if isinstance(node, tables.Table):
+                    rows = []
+                    for r in node.read():
+                        rows.append([v.tolist() for k, v in zip(
+                            node.colnames, r)
+                            if not k.startswith('time_stamp')])
+                    nodes[node._v_pathname] = rows
+                elif isinstance(node, tables.Leaf):
+                    nodes[node._v_pathname] = node.read().tolist()
+                elif isinstance(node, tables.link.ExternalLink):
+                    nodes[node._v_pathname] = node.target
+        contents[name] = nodes
+    return contents
+
+
+class TestSegDtoPH5_workers(TempDirTestCase, LogTestCase):
+    def test_main(self):
+        """
+        test decoding in worker processes loads the same PH5 as decoding
+        in the writer
+        """
+        segd_files = []
+        for d in ('fairfield', 'messed_order', 'smartsolo'):
+            segd_dir = os.path.join(self.home, 'ph5/test_data/segd', d)
+            segd_files += [os.path.join(segd_dir, f)
+                           for f in sorted(os.listdir(segd_dir))
+                           if f.endswith('.fcnt') or f.endswith('.segd')]
+        segd_files.append(os.path.join(self.home, 'ph5/test_data/segd',
+                                       'no_such_file.fcnt'))
+        serial_log = load_segd('serial', segd_files)
+        # Batches of two traces so files are sent in several
+        with patch.object(segd2ph5, 'DECODE_BATCH', 2):
+            workers_log = load_segd('workers', segd_files, workers=2)
+        # the same messages in the same order, but for the start time and
+        # the time taken
+        self.assertEqual(serial_log[2:-1], workers_log[2:-1])
+        self.assertTrue(workers_log[-1].startswith('Done...'))
+        self.assertTrue([m for m in serial_log if "Failed to read" in m])
+        serial = ph5_contents('serial')
+        self.assertEqual(['master.ph5', 'miniPH5_00001.ph5'],
+                         sorted(serial.keys()))
+        self.assertTrue(serial == ph5_contents('workers'))
+
+
 if __name__ == "__main__":
     unittest.main()
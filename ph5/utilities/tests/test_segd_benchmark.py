@@ -0,0 +1,61 @@
+'''
+Tests for segd_benchmark
+'''
+import os
+import sys
+import unittest
+
+from mock import patch
+from testfixtures import OutputCapture, LogCapture
+
+from ph5.utilities import segd_benchmark
+from ph5.core.tests.test_base import LogTestCase, TempDirTestCase
+
+
+class TestSegdBenchmark(TempDirTestCase, LogTestCase):
+    def setUp(self):
+        super(TestSegdBenchmark, self).setUp()
+        self.segd_dir = os.path.join(self.home,
+                                     'ph5/test_data/segd/smartsolo')
+
+    def test_find_segd(self):
+        files = segd_benchmark.find_segd(self.segd_dir)
+        # the .segd.header sidecar is not SEG-D
+        self.assertEqual(['453005513.2.2021.05.08.20.06.00.000.E.segd'],
+                         [os.path.basename(f) for f in files])
+        self.assertTrue(all(os.path.isabs(f) for f in files))
+        self.assertEqual([], segd_benchmark.find_segd(self.tmpdir))
+
+    def test_benchmark(self):
+        files = segd_benchmark.find_segd(self.segd_dir)
+        ret = segd_benchmark.benchmark(files, 2, self.tmpdir)
+        self.assertEqual(2, ret['workers'])
+        self.assertEqual(sum(os.path.getsize(f) for f in files),
+                         ret['bytes'])
+        self.assertGreater(ret['seconds'], 0)
+        self.assertGreater(ret['mbs'], 0)
+        # the scratch experiment is removed
+        self.assertEqual([], os.listdir(self.tmpdir))
+
+    def test_main(self):
+        testargs = ['segd_benchmark', '-d', self.segd_dir,
+                    '--workers', '2']
+        with patch.object(sys, 'argv', testargs):
+            with OutputCapture() as out:
+                segd_benchmark.main()
+        lines = out.captured.strip().split('\n')
+        self.assertTrue(lines[0].startswith('1 files'))
+        self.assertEqual(['workers', '1', '2'],
+                         [line.split()[0] for line in lines[1:]])
+        self.assertEqual('1.00', lines[2].split()[-1])
+
+        testargs = ['segd_benchmark', '-d', self.tmpdir]
+        with patch.object(sys, 'argv', testargs):
+            with LogCapture() as log:
+                with self.assertRaises(SystemExit):
+                    segd_benchmark.main()
+        self.assertIn('No SEG-D files', log.records[-1].msg)
+
+
+if __name__ == "__main__":
+    unittest.main()
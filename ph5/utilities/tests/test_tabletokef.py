@@ -2,10 +2,12 @@
 Tests for tabletokef
 '''
 import os
+import re
 import sys
 import unittest
 import logging
 
+import numpy as np
 from mock import patch
 from testfixtures import OutputCapture, LogCapture
 
@@ -84,5 +86,57 @@ class TestTabletokef_SRM(TempDirTestCase, LogTestCase):
                          row_total=9, srm_total=0)
 
 
+class TestTabletokefFormats(TempDirTestCase, LogTestCase):
+    def setUp(self):
+        super(TestTabletokefFormats, self).setUp()
+        self.testargs = ['tabletokef', '-n', 'master.ph5', '-p',
+                         os.path.join(self.home, 'ph5/test_data/ph5')]
+
+    def main(self, args):
+        with patch.object(sys, 'argv', self.testargs + args):
+            with OutputCapture() as out:
+                tabletokef.main()
+        # Remove the time the tables were written
+        return re.sub(r'#\t.*\tph5 version: .*\n', '', out.captured)
+
+    def test_same_as_rows(self):
+        for args in (['-D', '12183'], ['-D', '5553', '-i'],
+                     ['-A', '1', '-u', 'id_s'], ['--all_arrays'],
+                     ['-O', '1_1'], ['-V', '1'], ['-E'], ['-S'], ['-R'],
+                     ['-I'], ['-M'], ['-C'], ['-T']):
+            self.assertEqual(self.main(args + ['--rows']), self.main(args),
+                             args)
+        self.assertEqual(3, self.main(['-A', '1']).count('Table row'))
+
+    def test_csv_npz(self):
+        csv_text = self.main(['-D', '12183', '-F', 'csv'])
+        lines = csv_text.strip().split('\n')
+        self.assertEqual(10, len(lines))
+        self.assertTrue(lines[0].startswith('table,array_name_SOH_a,'))
+        self.assertTrue(all(line.startswith(
+            '/Experiment_g/Receivers_g/Das_g_12183/Das_t,')
+            for line in lines[1:]))
+
+        self.main(['-D', '12183', '-A', '1', '-F', 'npz', '-o', 'out.npz'])
+        npz = np.load('out.npz')
+        self.assertEqual(['Experiment_g/Receivers_g/Das_g_12183/Das_t',
+                          'Experiment_g/Sorts_g/Array_t_001'],
+                         sorted(npz.keys()))
+        das_t = npz['Experiment_g/Receivers_g/Das_g_12183/Das_t']
+        self.assertEqual(9, len(das_t))
+        self.assertTrue((np.diff(das_t['time']['epoch_l']) >= 0).all())
+        npz.close()
+
+        for args, msg in ((['-A', '1', '-F', 'npz'],
+                           'npz is written to a file given with '
+                           '--outfile.'),
+                          (['-A', '1', '-F', 'csv', '--rows'],
+                           '--rows only writes kef.')):
+            with LogCapture() as log:
+                with self.assertRaises(SystemExit):
+                    self.main(args)
+            self.assertEqual(msg, log.records[-1].msg)
+
+
 if __name__ == "__main__":
     unittest.main()
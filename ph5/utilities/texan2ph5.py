@@ -16,17 +16,21 @@ import string
 import sys
 import time
 from ph5 import LOGGING_FORMAT
-from ph5.core import columns, experiment, kef, pn125, timedoy
+from ph5.core import columns, experiment, external_references, kef, pn125,\
+    timedoy, availability
 
-PROG_VERSION = '2019.14'
+PROG_VERSION = '2026.291'
 LOGGER = logging.getLogger(__name__)
+# Compression profile of new arrays, None for the one of the experiment
+COMPRESSION = None
 
 MAX_PH5_BYTES = 1073741824 * 2  # GB (1024 X 1024 X 1024 X 2)
 INDEX_T = None
 
 TRDfileRE = re.compile(r".*[Ii](\d\d\d\d)[Rr][Aa][Ww].*")
 TRDfileREpunt = re.compile(r".*(\d\d\d\d).*[Tt][Rr][Dd]$")
-miniPH5RE = re.compile(r".*miniPH5_(\d\d\d\d\d)\.ph5")
+# Mini file of each DAS, made from Index_t on first use
+MINI = None
 
 CURRENT_DAS = None
 DAS_INFO = {}
@@ -165,6 +169,7 @@ def get_args():
            -S   First index of miniPH5_xxxxx.ph5
     '''
     global FILES, PH5, SR, WINDOWS, OVERIDE, NUM_MINI, FIRST_MINI
+    global COMPRESSION
 
     parser = argparse.ArgumentParser(
                                 formatter_class=argparse.RawTextHelpFormatter)
@@ -214,6 +219,12 @@ def get_args():
                         dest="doprint",
                         action="store_true",
                         default=False)
+    parser.add_argument("--compression", dest="compression",
+                        choices=experiment.compression_profiles(),
+                        help=("Compression profile of new data, SOH and log "
+                              "arrays. Default the profile recorded in the "
+                              "experiment, zlib if none."),
+                        default=None)
     args = parser.parse_args()
 
     FILES = []
@@ -222,6 +233,7 @@ def get_args():
     SR = args.samplerate
     NUM_MINI = args.num_mini
     FIRST_MINI = args.first_mini
+    COMPRESSION = args.compression
 
     if args.infile is not None:
         read_infile(args.infile)
@@ -341,6 +353,8 @@ def initializeExperiment():
     EDIT = True
     EX.ph5open(EDIT)
     EX.initgroup()
+    if COMPRESSION is not None:
+        EX.set_compression(COMPRESSION)
 
 
 def populateExperimentTable():
@@ -486,7 +500,9 @@ def writeEvent(trace, page):
     # Write out array data (it would be nice if we had int24) we use int32!
     EXREC.ph5_g_receivers.newarray(
         p_das_t['array_name_data_a'],
-        trace.trace, dtype='int32', description=des)
+        trace.trace, dtype='int32', description=des,
+        sample_rate=float(p_das_t['sample_rate_i']) /
+        p_das_t['sample_rate_multiplier_i'])
     update_index_t_info(p_das_t['time/epoch_l'] +
                         (float(p_das_t['time/micro_seconds_i']) / 1000000.),
                         p_das_t['sample_count_i'], p_das_t['sample_rate_i'] /
@@ -537,6 +553,7 @@ def openPH5(filename):
     exrec = experiment.ExperimentGroup(nickname=filename)
     exrec.ph5open(True)
     exrec.initgroup()
+    exrec.use_compression(EX.get_compression())
     return exrec
 
 
@@ -544,55 +561,14 @@ def get_current_data_only(size_of_data, das=None):
     '''   Return opened file handle for data only PH5 file that will be
           less than MAX_PH5_BYTES after raw data is added to it.
     '''
-    def sstripp(s):
-        s = s.replace('.ph5', '')
-        s = s.replace('./', '')
-        return s
-
-    def smallest():
-        '''   Return the name of the smallest miniPH5_xxxxx.ph5   '''
-        minifiles = filter(miniPH5RE.match, os.listdir('.'))
-
-        tiny = minifiles[0]
-        for f in minifiles:
-            if os.path.getsize(f) < os.path.getsize(tiny):
-                tiny = f
-
-        return tiny
-
-    das = str(CURRENT_DAS)
-    newestfile = ''
-    # Get the most recent data only PH5 file or match DAS serialnumber
-    n = 0
-    for index_t in INDEX_T.rows:
-        # This DAS already exists in a ph5 file
-        if index_t['serial_number_s'] == das:
-            newestfile = sstripp(index_t['external_file_name_s'])
-            return openPH5(newestfile)
-        # miniPH5_xxxxx.ph5 with largest xxxxx
-        mh = miniPH5RE.match(index_t['external_file_name_s'])
-        if n < int(mh.groups()[0]):
-            newestfile = sstripp(index_t['external_file_name_s'])
-            n = int(mh.groups()[0])
-
-    if not newestfile:
-        # This is the first file added
-        return openPH5('miniPH5_{0:05d}'.format(FIRST_MINI))
-
-    size_of_exrec = os.path.getsize(newestfile + '.ph5')
-    if NUM_MINI is not None:
-        fm = FIRST_MINI - 1
-        if (int(newestfile[8:13]) - fm) < NUM_MINI:
-            newestfile = "miniPH5_{0:05d}"\
-                .format(int(newestfile[8:13]) + 1)
-        else:
-            small = sstripp(smallest())
-            return openPH5(small)
-
-    elif (size_of_data + size_of_exrec) > MAX_PH5_BYTES:
-        newestfile = "miniPH5_{0:05d}".format(int(newestfile[8:13]) + 1)
-
-    return openPH5(newestfile)
+    global MINI
+
+    if MINI is None:
+        MINI = experiment.MiniAllocator(MAX_PH5_BYTES, INDEX_T.rows,
+                                        first_mini=FIRST_MINI,
+                                        num_mini=NUM_MINI)
+
+    return openPH5(MINI.allocate(CURRENT_DAS, size_of_data))
 
 
 def writeINDEX():
@@ -684,36 +660,17 @@ def ph5flush():
 
 
 def update_external_references():
-    global EX, INDEX_T
     LOGGER.info("Updating external references...")
-    n = 0
-    for i in INDEX_T.rows:
-        external_file = i['external_file_name_s'][2:]
-        external_path = i['hdf5_path_s']
-        i['serial_number_s']
-        target = external_file + ':' + external_path
-        external_group = external_path.split('/')[3]
-        # Nuke old node
-        try:
-            group_node = EX.ph5.get_node(external_path)
-            group_node.remove()
-        except Exception as e:
-            pass
-            # print "E1 ", e
-
-        # Re-create node
-        try:
-            EX.ph5.create_external_link(
-                '/Experiment_g/Receivers_g', external_group, target)
-            n += 1
-        except Exception as e:
-            LOGGER.info("{0}\n".format(e))
-    LOGGER.info("done, {0} nodes recreated.\n".format(n))
+    n, kept = external_references.update_external_references(
+        EX.ph5, INDEX_T.rows, external_references.RECEIVERS)
+    LOGGER.info("done, {0} nodes recreated. {1} up to date.\n"
+                .format(n, kept))
 
 
 def main():
     def prof():
-        global PH5, KEFFILE, FILES, DEPFILE, RESP, INDEX_T, CURRENT_DAS, F
+        global PH5, KEFFILE, FILES, DEPFILE, RESP, INDEX_T, CURRENT_DAS, F,\
+            MINI
 
         get_args()
 
@@ -724,6 +681,7 @@ def main():
             RESP = Resp(EX.ph5_g_responses)
             rows, keys = EX.ph5_g_receivers.read_index()
             INDEX_T = Rows_Keys(rows, keys)
+            MINI = None
 
         for f in FILES:
             F = f
@@ -749,6 +707,8 @@ def main():
                     .format(f))
 
         update_external_references()
+        #   Keep Availability_t up to date if it has been built
+        availability.update(EX.ph5_g_receivers)
         closePH5()
         logging.shutdown()
     prof()